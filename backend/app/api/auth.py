@@ -2,9 +2,6 @@ from datetime import datetime, timedelta
 import logging
 import secrets
 import pyotp
-import qrcode
-import io
-import base64
 import uuid
 from typing import Any, Dict, Optional, List
 
@@ -23,7 +20,6 @@ from app.models.user import User, Company, ActivityLog
 from app.models.token import RefreshToken, TokenBlacklist
 from app.models.invitation import Invitation
 from app.services.token import TokenService
-from app.services.email import EmailService
 from app.schemas.auth import (
     Login, TokenResponse, RefreshToken as RefreshTokenSchema, CompanyRegistration, 
     UserInvite, EmailVerification, PasswordReset, 
@@ -214,6 +210,8 @@ async def invite_user(
     if not inviter_name:
         inviter_name = current_user.email
         
+    # Imported here so SMTP/MIME modules are only loaded when an invite is sent
+    from app.services.email import EmailService
     background_tasks.add_task(
         EmailService.send_user_invitation,
         recipient_email=invite_data.email,
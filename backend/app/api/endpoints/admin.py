@@ -1,10 +1,12 @@
 from typing import Any, List, Optional
 
-from fastapi import APIRouter, Body, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 
 from app.core.dependencies import get_db, get_current_admin_user
+from app.core.pagination import paginate_keyset, set_pagination_headers
+from app.core.streaming import export_response
 from app.models.user import User, UserActivity
 from app.models.property import Property
 from app.models.search import SavedSearch
@@ -62,23 +64,14 @@ def manage_users(
     users = db.query(User).filter(User.company_id == current_user.company_id).offset(skip).limit(limit).all()
     return users
 
-@router.get("/activity", response_model=List[ActivityLog])
-def view_activity_logs(
-    db: Session = Depends(get_db),
-    skip: int = 0,
-    limit: int = 100,
-    user_id: Optional[int] = None,
-    activity_type: Optional[str] = None,
-    current_user: User = Depends(get_current_admin_user)
-) -> Any:
+def _activity_query(db: Session, current_user: User, user_id: Optional[int], activity_type: Optional[str]):
     """
-    View activity logs. Admin only.
+    Build the activity log query for the admin's company.
     """
-    # Build query
     query = db.query(
         UserActivity.id,
         UserActivity.user_id,
-        User.email,
+        User.email.label("user_email"),
         UserActivity.activity_type,
         UserActivity.description,
         UserActivity.timestamp,
@@ -95,11 +88,32 @@ def view_activity_logs(
     if activity_type:
         query = query.filter(UserActivity.activity_type == activity_type)
     
-    # Order by timestamp descending
-    query = query.order_by(UserActivity.timestamp.desc())
+    return query
+
+@router.get("/activity", response_model=List[ActivityLog])
+def view_activity_logs(
+    response: Response,
+    db: Session = Depends(get_db),
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = Query(None, description="Cursor from X-Next-Cursor; enables keyset pagination"),
+    user_id: Optional[int] = None,
+    activity_type: Optional[str] = None,
+    current_user: User = Depends(get_current_admin_user)
+) -> Any:
+    """
+    View activity logs. Admin only.
+    """
+    query = _activity_query(db, current_user, user_id, activity_type)
     
-    # Apply pagination
-    results = query.offset(skip).limit(limit).all()
+    # Apply pagination, newest first
+    if cursor is not None:
+        order = [(UserActivity.timestamp, True), (UserActivity.id, True)]
+        results, next_cursor = paginate_keyset(query, "activity", order, cursor, limit)
+        set_pagination_headers(response, next_cursor=next_cursor)
+    else:
+        query = query.order_by(UserActivity.timestamp.desc(), UserActivity.id.desc())
+        results = query.offset(skip).limit(limit).all()
     
     # Convert to response model
     activity_logs = []
@@ -118,6 +132,22 @@ def view_activity_logs(
     
     return activity_logs
 
+@router.get("/activity/export")
+def export_activity_logs(
+    db: Session = Depends(get_db),
+    format: str = Query("ndjson", regex="^(ndjson|csv)$"),
+    user_id: Optional[int] = None,
+    activity_type: Optional[str] = None,
+    current_user: User = Depends(get_current_admin_user)
+) -> Any:
+    """
+    Stream activity logs as NDJSON or CSV. Admin only.
+    """
+    query = _activity_query(db, current_user, user_id, activity_type)
+    query = query.order_by(UserActivity.timestamp.desc(), UserActivity.id.desc())
+    
+    return export_response(query, ActivityLog, format, filename="activity")
+
 @router.post("/settings", response_model=SystemSettings)
 def update_settings(
     *,
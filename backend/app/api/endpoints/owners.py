@@ -1,35 +1,141 @@
 from typing import Any, List, Optional
 
-from fastapi import APIRouter, Body, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
 
 from app.core.dependencies import get_db, get_current_user
+from app.core.pagination import get_total, order_clauses, paginate_keyset, set_pagination_headers
+from app.core.streaming import export_response
 from app.models.user import User
-from app.models.owner import Owner, OwnerWealthData
+from app.models.owner import Owner, PropertyOwnership, WealthData as OwnerWealthData
 from app.models.property import Property
 from app.schemas.owner import (
     Owner as OwnerSchema,
     OwnerWithProperties,
     OwnerWealthData as OwnerWealthDataSchema,
-    OwnerWithWealthData
+    OwnerSearchResult
 )
 from app.schemas.property import Property as PropertySchema
+from app.services.owner_search import OwnerSearchService
+from app.services.unified_search import latest_wealth
 
 router = APIRouter()
 
+# Keyset order for owner listings
+OWNER_ORDER = [(Owner.name, False), (Owner.id, False)]
+
 @router.get("/", response_model=List[OwnerSchema])
 def list_owners(
+    response: Response,
     db: Session = Depends(get_db),
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = Query(None, description="Cursor from X-Next-Cursor; enables keyset pagination"),
+    estimate_total: bool = False,
     current_user: User = Depends(get_current_user)
 ) -> Any:
     """
-    Retrieve owners.
+    Retrieve owners, ordered by name.
     """
-    owners = db.query(Owner).offset(skip).limit(limit).all()
+    query = db.query(Owner)
+    
+    if estimate_total:
+        total, is_estimate = get_total(db, query)
+        set_pagination_headers(response, total=total, is_estimate=is_estimate)
+    
+    if cursor is not None:
+        owners, next_cursor = paginate_keyset(query, "owners", OWNER_ORDER, cursor, limit)
+        set_pagination_headers(response, next_cursor=next_cursor)
+        return owners
+    
+    owners = query.order_by(Owner.name, Owner.id).offset(skip).limit(limit).all()
     return owners
 
+@router.get("/search", response_model=List[OwnerSearchResult])
+def search_owners(
+    response: Response,
+    db: Session = Depends(get_db),
+    q: Optional[str] = None,
+    fuzzy: bool = Query(False, description="Match similar names, ignoring case, punctuation and entity suffixes"),
+    owner_type: Optional[str] = None,
+    min_net_worth: Optional[float] = None,
+    wealth_tier: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = Query(None, description="Cursor from X-Next-Cursor; enables keyset pagination"),
+    estimate_total: bool = False,
+    current_user: User = Depends(get_current_user)
+) -> Any:
+    """
+    Search owners with various filters.
+    
+    With `fuzzy=true`, `q` matches similar names ("Jon Smith LLC" finds
+    "John Smith, L.L.C.") and results are ranked by `match_score`.
+    """
+    query = db.query(Owner)
+    score = None
+    
+    # Apply filters
+    if q:
+        query, score = OwnerSearchService.apply_name_filter(query, db, q, fuzzy)
+    
+    if owner_type:
+        query = query.filter(Owner.owner_type == owner_type)
+    
+    if min_net_worth is not None or wealth_tier:
+        # One wealth row per owner, so ranking and keyset pages never repeat an owner
+        query = query.join(latest_wealth, latest_wealth.c.owner_id == Owner.id)
+    
+    if min_net_worth is not None:
+        query = query.filter(latest_wealth.c.estimated_net_worth >= min_net_worth)
+    
+    if wealth_tier:
+        query = query.filter(latest_wealth.c.wealth_tier == wealth_tier)
+    
+    if estimate_total:
+        total, is_estimate = get_total(db, query)
+        set_pagination_headers(response, total=total, is_estimate=is_estimate)
+    
+    # Execute query with pagination
+    if score is not None:
+        # Best matches first; scores are only comparable for the same query
+        query = query.add_columns(score.label("match_score"))
+        order = [(score, True)] + OWNER_ORDER
+        if cursor is not None:
+            scope = f"owners-fuzzy:{OwnerSearchService.normalize_name(q)}"
+            rows, next_cursor = paginate_keyset(
+                query, scope, order, cursor, limit,
+                key=lambda row: [row.match_score, row[0].name, row[0].id]
+            )
+            set_pagination_headers(response, next_cursor=next_cursor)
+        else:
+            rows = query.order_by(*order_clauses(order)).offset(skip).limit(limit).all()
+    elif cursor is not None:
+        owners, next_cursor = paginate_keyset(query, "owners", OWNER_ORDER, cursor, limit)
+        set_pagination_headers(response, next_cursor=next_cursor)
+        rows = [(owner, None) for owner in owners]
+    else:
+        owners = query.order_by(Owner.name, Owner.id).offset(skip).limit(limit).all()
+        rows = [(owner, None) for owner in owners]
+    
+    # Convert to response model
+    result = []
+    for owner, match_score in rows:
+        result.append(
+            OwnerSearchResult(
+                id=owner.id,
+                name=owner.name,
+                owner_type=owner.owner_type,
+                contact_info=owner.contact_info,
+                created_at=owner.created_at,
+                updated_at=owner.updated_at,
+                wealth_data=owner.wealth_data,
+                match_score=match_score
+            )
+        )
+    
+    return result
+
 @router.get("/{owner_id}", response_model=OwnerWithProperties)
 def get_owner(
     owner_id: int,
@@ -101,52 +207,28 @@ def get_owner_properties(
     
     return properties
 
-@router.get("/search", response_model=List[OwnerWithWealthData])
-def search_owners(
+@router.get("/{owner_id}/properties/export")
+def export_owner_properties(
+    owner_id: int,
     db: Session = Depends(get_db),
-    q: Optional[str] = None,
-    owner_type: Optional[str] = None,
-    min_net_worth: Optional[float] = None,
-    wealth_tier: Optional[str] = None,
-    skip: int = 0,
-    limit: int = 100,
+    format: str = Query("ndjson", regex="^(ndjson|csv)$"),
     current_user: User = Depends(get_current_user)
 ) -> Any:
     """
-    Search owners with various filters.
+    Stream an owner's full property portfolio as NDJSON or CSV.
     """
-    # Build query with join to wealth data
-    query = db.query(Owner).outerjoin(OwnerWealthData)
-    
-    # Apply filters
-    if q:
-        query = query.filter(Owner.name.ilike(f"%{q}%"))
-    
-    if owner_type:
-        query = query.filter(Owner.owner_type == owner_type)
-    
-    if min_net_worth is not None:
-        query = query.filter(OwnerWealthData.estimated_net_worth >= min_net_worth)
-    
-    if wealth_tier:
-        query = query.filter(OwnerWealthData.wealth_tier == wealth_tier)
-    
-    # Execute query with pagination
-    owners = query.offset(skip).limit(limit).all()
-    
-    # Convert to response model
-    result = []
-    for owner in owners:
-        result.append(
-            OwnerWithWealthData(
-                id=owner.id,
-                name=owner.name,
-                owner_type=owner.owner_type,
-                contact_info=owner.contact_info,
-                created_at=owner.created_at,
-                updated_at=owner.updated_at,
-                wealth_data=owner.wealth_data
-            )
+    # Check if owner exists
+    owner = db.query(Owner).filter(Owner.id == owner_id).first()
+    if not owner:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Owner not found"
         )
     
-    return result
\ No newline at end of file
+    query = db.query(Property).join(
+        PropertyOwnership, PropertyOwnership.property_id == Property.id
+    ).filter(
+        PropertyOwnership.owner_id == owner_id
+    ).order_by(Property.id)
+    
+    return export_response(query, PropertySchema, format, filename=f"owner-{owner_id}-properties")
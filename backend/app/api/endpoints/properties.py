@@ -1,198 +1,250 @@
 from typing import Any, List, Optional, Dict
 import uuid
 
-from fastapi import APIRouter, Body, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Query, Response, status
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 
+from app.core.config import settings
 from app.core.dependencies import get_db, get_current_user
+from app.core.geo import is_valid_tile
+from app.core.map_encoding import (
+    ARROW_CONTENT_TYPE,
+    COLUMNAR_CONTENT_TYPE,
+    arrow_available,
+    encode_arrow,
+    encode_columnar,
+    negotiate_map_format,
+)
+from app.core.pagination import get_total, paginate_keyset, set_pagination_headers
+from app.core.streaming import export_response
 from app.models.user import User
 from app.models.property import Property, Bookmark
 from app.models.property_mapping import PropertyMapping
-from app.services.property import PropertyService
-from app.external.zillow import ZillowAPIService
+from app.services.heatmap import HEATMAP_LAYERS, HeatmapService
+from app.services.map_tiles import MVT_CONTENT_TYPE, MapTileService
+from app.services.map_viewport import MapViewportService, format_tile_id
+from app.services.property_facets import PropertyFacetService
+from app.services.property_search import PropertySearchService
+from app.services.property_search_cache import PropertySearchCache
+from app.services.spatial_search import SpatialSearchService
 from app.schemas.property import (
     Property as PropertySchema,
     PropertyCreate,
     PropertyUpdate,
     PropertyMap,
+    PropertyMapDelta,
+    PropertyNearby,
+    PropertyFacets,
     Bookmark as BookmarkSchema,
     BookmarkCreate
 )
 
 router = APIRouter()
 
+# Keyset order for property listings; backed by properties_updated_at_id_idx
+PROPERTY_ORDER = [(Property.updated_at, True), (Property.id, True)]
+
+def get_zillow_service():
+    """
+    Create a Zillow API client, importing it (and httpx) on first use only.
+    """
+    from app.services.zillow_api import ZillowAPIService
+    return ZillowAPIService()
+
 @router.get("/", response_model=List[PropertySchema])
 def list_properties(
+    response: Response,
     db: Session = Depends(get_db),
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = Query(None, description="Cursor from X-Next-Cursor; enables keyset pagination"),
+    estimate_total: bool = False,
     current_user: User = Depends(get_current_user)
 ) -> Any:
     """
     Retrieve properties.
+    
+    Pass `cursor` (empty for the first page) to page by keyset instead of offset.
     """
-    properties = db.query(Property).offset(skip).limit(limit).all()
+    query = db.query(Property)
+    
+    if estimate_total:
+        total, is_estimate = get_total(db, query)
+        set_pagination_headers(response, total=total, is_estimate=is_estimate)
+    
+    if cursor is not None:
+        properties, next_cursor = paginate_keyset(query, "properties", PROPERTY_ORDER, cursor, limit)
+        set_pagination_headers(response, next_cursor=next_cursor)
+        return properties
+    
+    properties = query.order_by(Property.updated_at.desc(), Property.id.desc()).offset(skip).limit(limit).all()
     return properties
 
-@router.get("/{property_id}", response_model=PropertySchema)
-def get_property(
-    property_id: int,
+@router.get("/map", response_model=List[PropertyMap])
+async def get_properties_for_map(
     db: Session = Depends(get_db),
+    lat_min: float = Query(..., description="Minimum latitude"),
+    lat_max: float = Query(..., description="Maximum latitude"),
+    lng_min: float = Query(..., description="Minimum longitude"),
+    lng_max: float = Query(..., description="Maximum longitude"),
+    property_type: Optional[str] = None,
+    min_value: Optional[float] = None,
+    max_value: Optional[float] = None,
+    format: Optional[str] = Query(None, regex="^(json|columnar|arrow)$", description="Response encoding; defaults to the Accept header"),
+    accept: Optional[str] = Header(None),
     current_user: User = Depends(get_current_user)
 ) -> Any:
     """
-    Get a specific property by id.
+    Get properties for map display within a bounding box.
+    
+    The viewport is snapped to map tiles, so the response covers the whole
+    tiles around it; large areas return grid clusters instead of properties.
+    Compact columnar JSON or Arrow IPC encodings can be requested with
+    `format` or the Accept header.
     """
-    property = db.query(Property).filter(Property.id == property_id).first()
-    if not property:
+    if lat_min > lat_max or lng_min > lng_max:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Property not found"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid bounding box"
         )
     
-    return property
+    map_format = negotiate_map_format(format, accept)
+    if map_format == "arrow" and not arrow_available():
+        raise HTTPException(
+            status_code=status.HTTP_406_NOT_ACCEPTABLE,
+            detail="Arrow encoding is not available"
+        )
+    
+    features = await MapViewportService.get_viewport(
+        db, lat_min, lat_max, lng_min, lng_max,
+        property_type=property_type, min_value=min_value, max_value=max_value
+    )
+    
+    if map_format == "columnar":
+        return JSONResponse(content=encode_columnar(features), media_type=COLUMNAR_CONTENT_TYPE)
+    if map_format == "arrow":
+        return Response(content=encode_arrow(features), media_type=ARROW_CONTENT_TYPE)
+    return features
 
-@router.get("/map", response_model=List[PropertyMap])
-async def get_properties_for_map(
+@router.get("/map/delta", response_model=PropertyMapDelta)
+async def get_properties_for_map_delta(
     db: Session = Depends(get_db),
     lat_min: float = Query(..., description="Minimum latitude"),
     lat_max: float = Query(..., description="Maximum latitude"),
     lng_min: float = Query(..., description="Minimum longitude"),
     lng_max: float = Query(..., description="Maximum longitude"),
+    loaded_tiles: Optional[str] = Query(None, description="Comma-separated z/x/y ids of tiles already loaded"),
+    prev_lat_min: Optional[float] = Query(None, description="Previous viewport minimum latitude"),
+    prev_lat_max: Optional[float] = Query(None, description="Previous viewport maximum latitude"),
+    prev_lng_min: Optional[float] = Query(None, description="Previous viewport minimum longitude"),
+    prev_lng_max: Optional[float] = Query(None, description="Previous viewport maximum longitude"),
     property_type: Optional[str] = None,
     min_value: Optional[float] = None,
     max_value: Optional[float] = None,
     current_user: User = Depends(get_current_user)
 ) -> Any:
     """
-    Get properties for map display within a bounding box.
+    Get only the map tiles added by a pan, plus the ids of tiles to drop.
+    
+    Pass the tiles already loaded (with the same filters), or the previous
+    viewport to have them derived from it.
     """
-    # Use Redis cache if available
-    cache_key = f"map:{lat_min}:{lat_max}:{lng_min}:{lng_max}:{property_type}:{min_value}:{max_value}"
+    if lat_min > lat_max or lng_min > lng_max:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid bounding box"
+        )
     
-    # Try to get from cache first
-    from app.core.cache import redis_cache
-    if redis_cache:
-        cached_result = await redis_cache.get(cache_key)
-        if cached_result:
-            import json
-            return json.loads(cached_result)
+    loaded = [tile_id for tile_id in (loaded_tiles or "").split(",") if tile_id.strip()]
+    if len(loaded) > settings.MAP_VIEWPORT_MAX_TILES * 4:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Too many loaded tiles"
+        )
     
-    # Build optimized query with specific columns to reduce data transfer
-    query = db.query(
-        Property.id,
-        Property.address,
-        Property.property_type,
-        Property.estimated_value,
-        # Use PostGIS functions to extract coordinates
-        func.ST_X(Property.location).label('longitude'),
-        func.ST_Y(Property.location).label('latitude')
-    )
+    previous = (prev_lat_min, prev_lat_max, prev_lng_min, prev_lng_max)
+    if all(v is not None for v in previous):
+        prev_zoom, prev_tiles = MapViewportService.snap_viewport(*previous)
+        loaded.extend(format_tile_id(prev_zoom, x, y) for x, y in prev_tiles)
     
-    # Filter by bounding box using spatial index
-    # This uses PostGIS ST_MakeEnvelope and ST_Contains for efficient spatial queries
-    query = query.filter(
-        func.ST_Contains(
-            func.ST_MakeEnvelope(lng_min, lat_min, lng_max, lat_max, 4326),
-            Property.location
+    try:
+        return await MapViewportService.get_viewport_delta(
+            db, lat_min, lat_max, lng_min, lng_max, loaded,
+            property_type=property_type, min_value=min_value, max_value=max_value
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
         )
+
+@router.get("/tiles/{z}/{x}/{y}.mvt")
+async def get_property_tile(
+    z: int,
+    x: int,
+    y: int,
+    db: Session = Depends(get_db),
+    property_type: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+) -> Any:
+    """
+    Get a Mapbox Vector Tile of properties.
+    
+    Individual parcels are returned from MAP_TILE_POINT_MIN_ZOOM upwards;
+    lower zooms return grid-aggregated features with a `count` attribute.
+    """
+    if not is_valid_tile(z, x, y):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Tile not found"
+        )
+    
+    tile = await MapTileService.get_property_tile(db, z, x, y, property_type)
+    
+    return Response(
+        content=tile,
+        media_type=MVT_CONTENT_TYPE,
+        headers={"Cache-Control": f"public, max-age={settings.MAP_TILE_MAX_AGE}"}
     )
+
+@router.get("/heatmap/{layer}/{z}/{x}/{y}.mvt")
+async def get_heatmap_tile(
+    layer: str,
+    z: int,
+    x: int,
+    y: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+) -> Any:
+    """
+    Get a Mapbox Vector Tile of a precomputed heatmap layer.
     
-    # Filter by property type if provided
-    if property_type:
-        query = query.filter(Property.property_type == property_type)
-    
-    # Filter by value range if provided
-    if min_value is not None:
-        query = query.filter(Property.estimated_value >= min_value)
-    if max_value is not None:
-        query = query.filter(Property.estimated_value <= max_value)
-    
-    # Use clustering for large result sets to improve performance
-    # Limit results and use spatial clustering for better map rendering
-    if lat_max - lat_min > 0.1 or lng_max - lng_min > 0.1:
-        # For larger areas, use clustering to reduce marker count
-        cluster_size = 0.005  # Adjust based on zoom level
-        query = db.query(
-            func.ST_ClusterDBSCAN(Property.location, cluster_size, 3).over().label('cluster_id'),
-            func.avg(Property.estimated_value).label('avg_value'),
-            func.count(Property.id).label('property_count'),
-            func.ST_Centroid(func.ST_Collect(Property.location)).label('centroid')
-        ).filter(
-            func.ST_Contains(
-                func.ST_MakeEnvelope(lng_min, lat_min, lng_max, lat_max, 4326),
-                Property.location
-            )
+    Layers are `property-values` and `wealth-heatmap`; each feature is a grid
+    cell with `weight`, `value` (median) and `count` attributes.
+    """
+    if layer not in HEATMAP_LAYERS:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Heatmap layer not found"
+        )
+    if not is_valid_tile(z, x, y):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Tile not found"
         )
-        
-        if property_type:
-            query = query.filter(Property.property_type == property_type)
-        
-        if min_value is not None:
-            query = query.filter(Property.estimated_value >= min_value)
-        if max_value is not None:
-            query = query.filter(Property.estimated_value <= max_value)
-        
-        query = query.group_by('cluster_id').limit(500)
-        
-        clusters = query.all()
-        result = []
-        
-        for cluster in clusters:
-            if cluster.property_count == 1:
-                # Single property
-                result.append(
-                    PropertyMap(
-                        id=str(cluster.cluster_id),
-                        address=f"{cluster.property_count} property",
-                        property_type="cluster",
-                        estimated_value=cluster.avg_value,
-                        latitude=func.ST_Y(cluster.centroid),
-                        longitude=func.ST_X(cluster.centroid),
-                        count=1
-                    )
-                )
-            else:
-                # Cluster of properties
-                result.append(
-                    PropertyMap(
-                        id=str(cluster.cluster_id),
-                        address=f"{cluster.property_count} properties",
-                        property_type="cluster",
-                        estimated_value=cluster.avg_value,
-                        latitude=func.ST_Y(cluster.centroid),
-                        longitude=func.ST_X(cluster.centroid),
-                        count=cluster.property_count
-                    )
-                )
-    else:
-        # For smaller areas, return individual properties with limit
-        properties = query.limit(500).all()
-        
-        # Convert to map format
-        result = []
-        for prop in properties:
-            result.append(
-                PropertyMap(
-                    id=prop.id,
-                    address=prop.address,
-                    property_type=prop.property_type,
-                    estimated_value=prop.estimated_value,
-                    latitude=prop.latitude,
-                    longitude=prop.longitude
-                )
-            )
-    
-    # Cache the result
-    if redis_cache:
-        import json
-        await redis_cache.set(cache_key, json.dumps([p.dict() for p in result]), expire=300)  # Cache for 5 minutes
     
-    return result
+    tile = await HeatmapService.get_tile(db, layer, z, x, y)
+    
+    return Response(
+        content=tile,
+        media_type=MVT_CONTENT_TYPE,
+        headers={"Cache-Control": f"public, max-age={settings.MAP_TILE_MAX_AGE}"}
+    )
 
 @router.get("/search", response_model=List[PropertySchema])
 async def search_properties(
+    response: Response,
     db: Session = Depends(get_db),
     q: Optional[str] = None,
     property_type: Optional[str] = None,
@@ -203,89 +255,201 @@ async def search_properties(
     min_square_feet: Optional[int] = None,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = Query(None, description="Cursor from X-Next-Cursor; enables keyset pagination"),
+    estimate_total: bool = False,
     current_user: User = Depends(get_current_user)
 ) -> Any:
     """
     Search properties with various filters.
-    """
-    # Use cache for common searches
-    from app.core.cache import cache
-    cache_key = f"search:{q}:{property_type}:{min_value}:{max_value}:{min_bedrooms}:{min_bathrooms}:{min_square_feet}:{skip}:{limit}"
-    
-    cached_result = await cache.get(cache_key)
-    if cached_result:
-        return cached_result
-    
-    # Build optimized query with specific columns
-    query = db.query(Property)
     
-    # Apply filters
-    if q:
-        # Use full-text search if available
-        if hasattr(Property, 'search_vector'):
-            query = query.filter(Property.search_vector.match(q))
-        else:
-            # Fall back to ILIKE for text search
-            query = query.filter(
-                Property.address.ilike(f"%{q}%") | 
-                Property.city.ilike(f"%{q}%") | 
-                Property.state.ilike(f"%{q}%") |
-                Property.zip_code.ilike(f"%{q}%")
-            )
-    
-    if property_type:
-        query = query.filter(Property.property_type == property_type)
+    Pass `cursor` (empty for the first page) to page by keyset instead of offset,
+    and `estimate_total` to get a planner-estimated X-Total-Count header.
+    Offset pages are cut from a cached list of the matching ids, shared by
+    equivalent filters and every page size.
+    """
+    filters = PropertyFacetService.normalize_filters(
+        q=q,
+        property_type=property_type,
+        min_value=min_value,
+        max_value=max_value,
+        min_bedrooms=min_bedrooms,
+        min_bathrooms=min_bathrooms,
+        min_square_feet=min_square_feet
+    )
     
-    if min_value is not None:
-        query = query.filter(Property.estimated_value >= min_value)
+    if cursor is None:
+        properties, total, is_estimate = await PropertySearchCache.search(
+            db, filters, skip, limit, estimate_total=estimate_total
+        )
+        set_pagination_headers(response, total=total, is_estimate=is_estimate)
+        return properties
     
-    if max_value is not None:
-        query = query.filter(Property.estimated_value <= max_value)
+    query = PropertySearchService.build_query(db, **filters)
     
-    if min_bedrooms is not None:
-        query = query.filter(Property.bedrooms >= min_bedrooms)
+    # Only count when asked to, and from planner statistics rather than COUNT(*)
+    total, is_estimate = None, False
+    if estimate_total:
+        total, is_estimate = get_total(db, query)
     
-    if min_bathrooms is not None:
-        query = query.filter(Property.bathrooms >= min_bathrooms)
+    properties, next_cursor = paginate_keyset(query, "properties", PROPERTY_ORDER, cursor, limit)
+    set_pagination_headers(response, next_cursor=next_cursor, total=total, is_estimate=is_estimate)
     
-    if min_square_feet is not None:
-        query = query.filter(Property.square_feet >= min_square_feet)
+    return properties
+
+@router.get("/search/facets", response_model=PropertyFacets)
+async def get_search_facets(
+    db: Session = Depends(get_db),
+    q: Optional[str] = None,
+    property_type: Optional[str] = None,
+    min_value: Optional[float] = None,
+    max_value: Optional[float] = None,
+    min_bedrooms: Optional[int] = None,
+    min_bathrooms: Optional[float] = None,
+    min_square_feet: Optional[int] = None,
+    current_user: User = Depends(get_current_user)
+) -> Any:
+    """
+    Count the results of /search per property type, value range and minimum
+    bedrooms, for the same filters.
     
-    # Get total count for pagination
-    total = query.count()
+    Each facet is counted with every filter except its own, so the counts
+    show what choosing another value would yield; `total` applies them all.
+    """
+    filters = PropertyFacetService.normalize_filters(
+        q=q,
+        property_type=property_type,
+        min_value=min_value,
+        max_value=max_value,
+        min_bedrooms=min_bedrooms,
+        min_bathrooms=min_bathrooms,
+        min_square_feet=min_square_feet
+    )
+    return await PropertyFacetService.get_facets(db, filters)
+
+@router.get("/search/coordinates", response_model=List[PropertyNearby])
+def search_properties_by_location(
+    response: Response,
+    db: Session = Depends(get_db),
+    latitude: Optional[float] = Query(None, ge=-90, le=90),
+    longitude: Optional[float] = Query(None, ge=-180, le=180),
+    radius: Optional[float] = Query(None, gt=0, description="Search radius around latitude/longitude"),
+    radius_unit: str = Query("km", regex="^(m|km|mi)$"),
+    polygon: Optional[str] = Query(None, description="Ring of 'lng lat' pairs separated by commas"),
+    q: Optional[str] = None,
+    property_type: Optional[str] = None,
+    min_value: Optional[float] = None,
+    max_value: Optional[float] = None,
+    min_bedrooms: Optional[int] = None,
+    min_bathrooms: Optional[float] = None,
+    min_square_feet: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Cursor from X-Next-Cursor"),
+    current_user: User = Depends(get_current_user)
+) -> Any:
+    """
+    Search properties within a radius and/or a drawn polygon, nearest first.
     
-    # Execute query with pagination and optimized ordering
-    properties = query.order_by(Property.updated_at.desc()).offset(skip).limit(limit).all()
+    Results are ordered by distance from latitude/longitude (or the polygon's
+    center when no point is given) and can be combined with the regular search
+    filters. Pass the X-Next-Cursor header back as `cursor` for the next page.
+    """
+    has_point = latitude is not None and longitude is not None
+    if not has_point and (latitude is not None or longitude is not None):
+        raise HTTPException(status_code=400, detail="latitude and longitude must be given together")
+    if radius is not None and not has_point:
+        raise HTTPException(status_code=400, detail="radius requires latitude and longitude")
+    if not has_point and not polygon:
+        raise HTTPException(status_code=400, detail="Provide latitude/longitude or a polygon")
+    
+    try:
+        radius_meters = SpatialSearchService.radius_meters(radius, radius_unit) if radius is not None else None
+        ring = SpatialSearchService.parse_polygon(polygon) if polygon else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    center = (longitude, latitude) if has_point else SpatialSearchService.ring_center(ring)
+    
+    query = PropertySearchService.build_query(
+        db,
+        q=q,
+        property_type=property_type,
+        min_value=min_value,
+        max_value=max_value,
+        min_bedrooms=min_bedrooms,
+        min_bathrooms=min_bathrooms,
+        min_square_feet=min_square_feet
+    )
+    rows, next_cursor = SpatialSearchService.search(
+        query, center, radius_meters=radius_meters, polygon=ring, cursor=cursor, limit=limit
+    )
+    set_pagination_headers(response, next_cursor=next_cursor)
     
-    # Cache the result for 5 minutes
-    await cache.set(cache_key, properties, 300)
+    return [
+        PropertyNearby(**PropertySchema.from_orm(prop).dict(), distance_meters=distance)
+        for prop, distance in rows
+    ]
+
+@router.get("/export")
+def export_properties(
+    db: Session = Depends(get_db),
+    format: str = Query("ndjson", regex="^(ndjson|csv)$"),
+    q: Optional[str] = None,
+    property_type: Optional[str] = None,
+    min_value: Optional[float] = None,
+    max_value: Optional[float] = None,
+    min_bedrooms: Optional[int] = None,
+    min_bathrooms: Optional[float] = None,
+    min_square_feet: Optional[int] = None,
+    current_user: User = Depends(get_current_user)
+) -> Any:
+    """
+    Stream every property matching the search filters as NDJSON or CSV.
+    """
+    query = PropertySearchService.build_query(
+        db,
+        q=q,
+        property_type=property_type,
+        min_value=min_value,
+        max_value=max_value,
+        min_bedrooms=min_bedrooms,
+        min_bathrooms=min_bathrooms,
+        min_square_feet=min_square_feet
+    )
     
-    return properties
+    return export_response(query.order_by(Property.id), PropertySchema, format, filename="properties")
 
 @router.get("/bookmarked", response_model=List[PropertySchema])
 def get_bookmarked_properties(
+    response: Response,
     db: Session = Depends(get_db),
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = Query(None, description="Cursor from X-Next-Cursor; enables keyset pagination"),
     current_user: User = Depends(get_current_user)
 ) -> Any:
     """
-    Get bookmarked properties for the current user.
+    Get bookmarked properties for the current user, most recently bookmarked first.
     """
-    # Get property IDs from bookmarks
-    bookmarked_property_ids = db.query(Bookmark.property_id).filter(
+    # Single join instead of loading every bookmarked id into an IN list
+    query = db.query(
+        Property,
+        Bookmark.created_at.label("bookmarked_at"),
+        Bookmark.id.label("bookmark_id")
+    ).join(Bookmark, Bookmark.property_id == Property.id).filter(
         Bookmark.user_id == current_user.id
-    ).all()
-    
-    # Extract IDs from result tuples
-    property_ids = [id for (id,) in bookmarked_property_ids]
+    )
+    order = [(Bookmark.created_at, True), (Bookmark.id, True)]
     
-    # Get properties
-    properties = db.query(Property).filter(
-        Property.id.in_(property_ids)
-    ).offset(skip).limit(limit).all()
+    if cursor is not None:
+        rows, next_cursor = paginate_keyset(
+            query, "bookmarks", order, cursor, limit,
+            key=lambda row: [row.bookmarked_at, row.bookmark_id]
+        )
+        set_pagination_headers(response, next_cursor=next_cursor)
+    else:
+        rows = query.order_by(Bookmark.created_at.desc(), Bookmark.id.desc()).offset(skip).limit(limit).all()
     
-    return properties
+    return [row[0] for row in rows]
 
 @router.post("/bookmark", response_model=BookmarkSchema)
 def bookmark_property(
@@ -355,6 +519,26 @@ def remove_bookmark(
     
     return None
 
+# Registered after the fixed paths above (/map, /search, /bookmarked) so they
+# are not captured by the path parameter
+@router.get("/{property_id}", response_model=PropertySchema)
+def get_property(
+    property_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+) -> Any:
+    """
+    Get a specific property by id.
+    """
+    property = db.query(Property).filter(Property.id == property_id).first()
+    if not property:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Property not found"
+        )
+    
+    return property
+
 # Zillow API Endpoints
 
 @router.get("/zillow/search", response_model=Dict)
@@ -366,7 +550,7 @@ async def zillow_search_property(
     """
     Search for a property by address using Zillow API.
     """
-    zillow_service = ZillowAPIService()
+    zillow_service = get_zillow_service()
     result = await zillow_service.get_search_results(address, citystatezip)
     
     if not result.get("success", False):
@@ -385,7 +569,7 @@ async def zillow_get_zestimate(
     """
     Get Zillow's estimated value for a property.
     """
-    zillow_service = ZillowAPIService()
+    zillow_service = get_zillow_service()
     result = await zillow_service.get_zestimate(zpid)
     
     if not result.get("success", False):
@@ -405,7 +589,7 @@ async def zillow_get_comps(
     """
     Get comparable properties for a given property.
     """
-    zillow_service = ZillowAPIService()
+    zillow_service = get_zillow_service()
     result = await zillow_service.get_comps(zpid, count)
     
     if not result.get("success", False):
@@ -425,7 +609,7 @@ async def zillow_get_deep_comps(
     """
     Get detailed comparable properties for a given property.
     """
-    zillow_service = ZillowAPIService()
+    zillow_service = get_zillow_service()
     result = await zillow_service.get_deep_comps(zpid, count)
     
     if not result.get("success", False):
@@ -444,7 +628,7 @@ async def zillow_get_property_details(
     """
     Get enhanced property information.
     """
-    zillow_service = ZillowAPIService()
+    zillow_service = get_zillow_service()
     result = await zillow_service.get_updated_property_details(zpid)
     
     if not result.get("success", False):
@@ -463,7 +647,7 @@ async def zillow_get_demographics(
     """
     Get neighborhood demographics information.
     """
-    zillow_service = ZillowAPIService()
+    zillow_service = get_zillow_service()
     result = await zillow_service.get_demographics(region_id)
     
     if not result.get("success", False):
@@ -483,7 +667,7 @@ async def zillow_get_region_children(
     """
     Get geographic hierarchy information.
     """
-    zillow_service = ZillowAPIService()
+    zillow_service = get_zillow_service()
     result = await zillow_service.get_region_children(region_id, region_type)
     
     if not result.get("success", False):
@@ -1,53 +1,112 @@
 from typing import Any, List, Optional, Dict
+from uuid import UUID
 
 from fastapi import APIRouter, Body, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
 from app.core.dependencies import get_db, get_current_user
 from app.models.user import User
 from app.models.search import SavedSearch
+from app.schemas.property import Property as PropertySchema, PropertyNearby
 from app.schemas.search import (
+    AdvancedSearchRequest,
+    GeocodeBatchRequest,
+    GeocodeResult,
     SavedSearch as SavedSearchSchema,
     SavedSearchCreate,
     SavedSearchUpdate,
     SearchRequest,
     SearchSuggestion
 )
+from app.services.advanced_search import AdvancedSearchService
+from app.services.geocoder import geocode, geocode_many
+from app.services.property_search import PropertySearchService
+from app.services.saved_search_alerts import SavedSearchAlertService
+from app.services.spatial_search import SpatialSearchService
+from app.services.typeahead import suggest_from_db, typeahead_index
+from app.services.unified_search import UnifiedSearchService
 
 router = APIRouter()
 
+# Default /location search radius by how precisely the location was found
+LOCATION_RADIUS_METERS = {
+    "address": 1000,
+    "interpolated": 1000,
+    "street": 2000,
+    "zip": 5000,
+    "city": 15000,
+}
+
 @router.post("/", response_model=Dict)
-def perform_search(
+async def perform_search(
     *,
     db: Session = Depends(get_db),
     search_request: SearchRequest,
     current_user: User = Depends(get_current_user)
 ) -> Any:
     """
-    Perform a search across properties and owners.
+    Perform a search across properties, owners and addresses.
+    
+    `filters` may contain `types` (any of property, owner, address), the
+    property filters of /properties/search and `owner_type` / `min_net_worth`.
+    `sort_by` is relevance (default), value or name.
     """
-    # In a real implementation, we would perform a search across multiple entities
-    # but for simplicity we'll just return a dummy response
+    try:
+        request = UnifiedSearchService.parse_request(
+            search_request.query,
+            search_request.filters,
+            search_request.sort_by,
+            search_request.sort_order,
+            search_request.page,
+            search_request.page_size
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     
-    return {
-        "total": 42,
-        "page": search_request.page,
-        "page_size": search_request.page_size,
-        "results": [
-            {
-                "type": "property",
-                "id": 1,
-                "address": "123 Main St",
-                "estimated_value": 500000
-            },
-            {
-                "type": "owner",
-                "id": 1,
-                "name": "John Doe",
-                "properties_count": 3
-            }
-        ]
-    }
+    return await UnifiedSearchService.search(db, request)
+
+@router.post("/advanced", response_model=Dict)
+def perform_advanced_search(
+    *,
+    db: Session = Depends(get_db),
+    search_request: AdvancedSearchRequest,
+    current_user: User = Depends(get_current_user)
+) -> Any:
+    """
+    Search properties or owners with a filter expression.
+    
+    `where` combines conditions with `and`, `or` and `not`; a condition is
+    `{"field": "property.current_value", "op": "between", "value": [a, b]}`.
+    Fields cover properties, their current owners and the owners' wealth
+    data, and `property.location` takes `near`, `within_bbox` and
+    `within_polygon`. Results are grouped as properties, owners and companies.
+    """
+    try:
+        spec, params = AdvancedSearchService.parse_request(
+            search_request.entity,
+            search_request.query,
+            search_request.where,
+            search_request.sort_by,
+            search_request.sort_order
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    return AdvancedSearchService.search(
+        db,
+        spec,
+        params,
+        skip=search_request.skip,
+        limit=search_request.limit,
+        estimate_total=search_request.estimate_total
+    )
 
 @router.get("/saved", response_model=List[SavedSearchSchema])
 def get_saved_searches(
@@ -78,7 +137,8 @@ def save_search(
     saved_search = SavedSearch(
         user_id=current_user.id,
         name=search_in.name,
-        search_parameters=search_in.search_parameters
+        search_parameters=search_in.search_parameters,
+        alerts_enabled=search_in.alerts_enabled
     )
     db.add(saved_search)
     db.commit()
@@ -86,11 +146,55 @@ def save_search(
     
     return saved_search
 
+@router.put("/{search_id}", response_model=SavedSearchSchema)
+def update_saved_search(
+    *,
+    db: Session = Depends(get_db),
+    search_id: UUID,
+    search_in: SavedSearchUpdate,
+    current_user: User = Depends(get_current_user)
+) -> Any:
+    """
+    Update a saved search, e.g. to turn its alerts off or on.
+    """
+    saved_search = db.query(SavedSearch).filter(
+        SavedSearch.id == search_id,
+        SavedSearch.user_id == current_user.id
+    ).first()
+    
+    if not saved_search:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Saved search not found"
+        )
+    
+    alerts_resumed = search_in.alerts_enabled and not saved_search.alerts_enabled
+    criteria_changed = (
+        search_in.search_parameters is not None
+        and search_in.search_parameters != saved_search.search_parameters
+    )
+    
+    if search_in.name is not None:
+        saved_search.name = search_in.name
+    if search_in.search_parameters is not None:
+        saved_search.search_parameters = search_in.search_parameters
+    if search_in.alerts_enabled is not None:
+        saved_search.alerts_enabled = search_in.alerts_enabled
+    
+    # Matches recorded before the change were not for this search
+    if alerts_resumed or criteria_changed:
+        saved_search.last_notified_delta_id = SavedSearchAlertService.latest_delta_id(db)
+    
+    db.commit()
+    db.refresh(saved_search)
+    
+    return saved_search
+
 @router.delete("/{search_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_saved_search(
     *,
     db: Session = Depends(get_db),
-    search_id: int,
+    search_id: UUID,
     current_user: User = Depends(get_current_user)
 ) -> Any:
     """
@@ -116,30 +220,111 @@ def delete_saved_search(
 def get_search_suggestions(
     db: Session = Depends(get_db),
     q: str = Query(..., min_length=2),
+    limit: int = Query(10, ge=1, le=20),
     current_user: User = Depends(get_current_user)
 ) -> Any:
     """
     Get search suggestions based on input.
+    
+    Matches addresses, street names, cities, zip codes and owner names by
+    prefix, most popular first. Served from the in-memory typeahead index
+    when TYPEAHEAD_INDEX is enabled.
     """
-    # In a real implementation, we would query the database for suggestions
-    # but for simplicity we'll just return dummy data
-    
-    suggestions = [
-        SearchSuggestion(
-            type="property",
-            value="123 Main St",
-            display="123 Main St, San Francisco, CA"
-        ),
-        SearchSuggestion(
-            type="owner",
-            value="John Doe",
-            display="John Doe (3 properties)"
-        ),
-        SearchSuggestion(
-            type="address",
-            value="Market Street",
-            display="Market Street, San Francisco, CA"
-        )
+    if typeahead_index.ready:
+        entries = typeahead_index.suggest(q, limit)
+    else:
+        entries = suggest_from_db(db, q, limit)
+    
+    return [
+        SearchSuggestion(type=entry.kind, value=entry.value, display=entry.display)
+        for entry in entries
     ]
+
+
+@router.get("/geocode", response_model=GeocodeResult)
+def geocode_address(
+    db: Session = Depends(get_db),
+    address: str = Query(..., min_length=2),
+    current_user: User = Depends(get_current_user)
+) -> Any:
+    """
+    Geocode an address or place (city, zip code) from the local gazetteer.
+    
+    `precision` tells how it was found: address, interpolated (along a
+    street segment), street, zip or city.
+    """
+    result = geocode(db, address)
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Location not found"
+        )
+    return result.dict()
+
+@router.post("/geocode", response_model=List[Optional[GeocodeResult]])
+def geocode_addresses(
+    *,
+    db: Session = Depends(get_db),
+    request: GeocodeBatchRequest,
+    current_user: User = Depends(get_current_user)
+) -> Any:
+    """
+    Geocode up to GEOCODER_BATCH_LIMIT addresses; results are in request
+    order, with null for addresses that were not found.
+    """
+    if len(request.addresses) > settings.GEOCODER_BATCH_LIMIT:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.GEOCODER_BATCH_LIMIT} addresses per request"
+        )
+    return [result.dict() if result else None for result in geocode_many(db, request.addresses)]
+
+@router.get("/location", response_model=Dict)
+def search_by_location(
+    db: Session = Depends(get_db),
+    location: str = Query(..., min_length=2),
+    radius: Optional[float] = Query(None, gt=0, description="Defaults to a radius suited to the match precision"),
+    radius_unit: str = Query("km", regex="^(m|km|mi)$"),
+    property_type: Optional[str] = Query(None, alias="propertyType"),
+    min_value: Optional[float] = Query(None, alias="minValue"),
+    max_value: Optional[float] = Query(None, alias="maxValue"),
+    limit: int = Query(50, ge=1, le=1000),
+    current_user: User = Depends(get_current_user)
+) -> Any:
+    """
+    Search properties around a geocoded address or place, nearest first.
+    """
+    result = geocode(db, location)
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Location not found"
+        )
+    
+    try:
+        if radius is not None:
+            radius_meters = SpatialSearchService.radius_meters(radius, radius_unit)
+        else:
+            radius_meters = min(LOCATION_RADIUS_METERS[result.precision], settings.SPATIAL_SEARCH_MAX_RADIUS)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     
-    return suggestions
\ No newline at end of file
+    query = PropertySearchService.build_query(
+        db,
+        property_type=property_type,
+        min_value=min_value,
+        max_value=max_value
+    )
+    rows, _ = SpatialSearchService.search(
+        query, (result.longitude, result.latitude), radius_meters=radius_meters, limit=limit
+    )
+    
+    return {
+        "location": {**result.dict(), "radius_meters": radius_meters},
+        "properties": [
+            PropertyNearby(**PropertySchema.from_orm(prop).dict(), distance_meters=distance).dict()
+            for prop, distance in rows
+        ],
+        "owners": [],
+        "companies": []
+    }
@@ -0,0 +1,324 @@
+"""
+Operational commands for the Wealth Map backend.
+
+These tasks used to run inside the API's startup hook on every worker. They
+are now run once per deploy (or on a schedule) via the ``wealthmap-admin``
+console script:
+
+    wealthmap-admin migrate     # apply pending SQL migrations
+    wealthmap-admin bootstrap   # create ORM tables and the initial admin user
+    wealthmap-admin cleanup     # purge expired blacklisted and refresh tokens
+    wealthmap-admin rebuild-grid  # recompute the map cluster grid aggregates
+    wealthmap-admin rollup-grid  # apply queued property writes to the map cluster grid
+    wealthmap-admin refresh-heatmaps [--layer L] [--full]  # update heatmap layers
+    wealthmap-admin invalidate-tiles  # drop stored tiles touched by property changes
+    wealthmap-admin prerender-tiles [--region R] [--min-zoom Z] [--max-zoom Z] [--force]
+    wealthmap-admin sweep-tiles  # delete expired tile files from MAP_TILE_STORE_DIR
+    wealthmap-admin run-saved-searches [--no-notify]  # record new matches and email alerts
+    wealthmap-admin prune-changes [--days N]  # delete change feed rows every consumer has passed
+    wealthmap-admin load-gazetteer {points,ranges,zips} FILE [--replace]  # bulk load geocoding data
+    wealthmap-admin geocode INPUT OUTPUT [--column C]  # geocode a CSV file of addresses offline
+"""
+import argparse
+import asyncio
+import logging
+import sys
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+def migrate(args: argparse.Namespace) -> int:
+    """Apply pending SQL migrations."""
+    from app.db.run_migrations import run_migrations
+
+    applied = run_migrations()
+    logger.info(f"Applied {len(applied)} migration(s)")
+    return 0
+
+def bootstrap(args: argparse.Namespace) -> int:
+    """Create ORM-managed tables and the initial admin user."""
+    from app.db.init_db import init_db, create_initial_admin
+    from app.db.session import SessionLocal
+
+    init_db()
+
+    db = SessionLocal()
+    try:
+        create_initial_admin(db)
+    finally:
+        db.close()
+
+    logger.info("Bootstrap completed")
+    return 0
+
+def cleanup(args: argparse.Namespace) -> int:
+    """Remove expired tokens from the database."""
+    from app.db.session import SessionLocal
+    from app.services.token import TokenService
+
+    db = SessionLocal()
+    try:
+        deleted = TokenService.cleanup_expired_tokens(db)
+    finally:
+        db.close()
+
+    logger.info(f"Removed {deleted} expired token(s)")
+    return 0
+
+def rebuild_grid(args: argparse.Namespace) -> int:
+    """Recompute the precomputed map cluster grid."""
+    from app.db.session import SessionLocal
+    from app.services.map_grid import PropertyGridService
+
+    db = SessionLocal()
+    try:
+        cells = PropertyGridService.rebuild(db)
+    finally:
+        db.close()
+
+    logger.info(f"Map grid rebuilt with {cells} cell(s)")
+    return 0
+
+def rollup_grid(args: argparse.Namespace) -> int:
+    """Apply the grid cell deltas queued by property writes."""
+    from app.db.session import SessionLocal
+    from app.services.map_grid import PropertyGridService
+
+    db = SessionLocal()
+    try:
+        applied = PropertyGridService.rollup(db)
+    finally:
+        db.close()
+
+    logger.info(f"Applied {applied} queued map grid delta(s)")
+    return 0
+
+def refresh_heatmaps(args: argparse.Namespace) -> int:
+    """Incrementally refresh (or fully rebuild) the map heatmap layers."""
+    from app.db.session import SessionLocal
+    from app.services.heatmap import HEATMAP_LAYERS, HeatmapService
+
+    layers = [args.layer] if args.layer else list(HEATMAP_LAYERS)
+    db = SessionLocal()
+    try:
+        for layer in layers:
+            if args.full:
+                HeatmapService.rebuild(db, layer)
+            else:
+                dirty = HeatmapService.refresh(db, layer)
+                asyncio.run(HeatmapService.invalidate_tiles(layer, dirty))
+    finally:
+        db.close()
+
+    logger.info(f"Heatmap layers updated: {', '.join(layers)}")
+    return 0
+
+def invalidate_tiles(args: argparse.Namespace) -> int:
+    """Drop stored map tiles that contain changed properties."""
+    from app.db.session import SessionLocal
+    from app.services.tile_maintenance import TileMaintenanceService
+
+    db = SessionLocal()
+    try:
+        asyncio.run(TileMaintenanceService.invalidate_changes(db))
+    finally:
+        db.close()
+    return 0
+
+def prerender_tiles(args: argparse.Namespace) -> int:
+    """Render and store the map tiles of the configured metros."""
+    from app.core.config import settings
+    from app.db.session import SessionLocal
+    from app.services.tile_maintenance import TileMaintenanceService
+
+    regions = settings.MAP_PRERENDER_REGIONS
+    if args.region:
+        if args.region not in regions:
+            logger.error(f"Unknown region '{args.region}' (configured: {', '.join(sorted(regions))})")
+            return 1
+        regions = {args.region: regions[args.region]}
+
+    min_zoom = settings.MAP_PRERENDER_MIN_ZOOM if args.min_zoom is None else args.min_zoom
+    max_zoom = settings.MAP_PRERENDER_MAX_ZOOM if args.max_zoom is None else args.max_zoom
+
+    async def run(db) -> int:
+        # Drop tiles changed since the last pass first, so they are re-rendered too
+        await TileMaintenanceService.invalidate_changes(db)
+        return await TileMaintenanceService.prerender(db, regions, min_zoom, max_zoom, force=args.force)
+
+    db = SessionLocal()
+    try:
+        rendered = asyncio.run(run(db))
+    finally:
+        db.close()
+
+    logger.info(f"Pre-rendered {rendered} tile(s) for {len(regions)} region(s)")
+    return 0
+
+def sweep_tiles(args: argparse.Namespace) -> int:
+    """Delete expired map tile files from the on-disk tile store."""
+    from app.services.tile_store import tile_store
+
+    if not tile_store.on_disk:
+        logger.info("MAP_TILE_STORE_DIR is not set; tiles expire in the cache")
+        return 0
+
+    removed = tile_store.sweep()
+    logger.info(f"Removed {removed} expired tile file(s) from {tile_store.root}")
+    return 0
+
+def run_saved_searches(args: argparse.Namespace) -> int:
+    """Re-run saved searches against property changes and alert their owners."""
+    from app.db.session import SessionLocal
+    from app.services.saved_search_alerts import SavedSearchAlertService
+
+    db = SessionLocal()
+    try:
+        SavedSearchAlertService.run(db)
+        if not args.no_notify:
+            asyncio.run(SavedSearchAlertService.notify(db))
+    finally:
+        db.close()
+    return 0
+
+def prune_changes(args: argparse.Namespace) -> int:
+    """Delete old property_changes rows that every consumer has applied."""
+    from app.core.config import settings
+    from app.db.change_feed import prune_changes as prune
+    from app.db.session import SessionLocal
+
+    days = settings.CHANGE_FEED_RETENTION_DAYS if args.days is None else args.days
+    db = SessionLocal()
+    try:
+        deleted = prune(db, days)
+    finally:
+        db.close()
+
+    logger.info(f"Pruned {deleted} change feed row(s) older than {days} day(s)")
+    return 0
+
+def load_gazetteer(args: argparse.Namespace) -> int:
+    """Load a CSV file of address points, street ranges or zip centroids."""
+    from app.db.session import SessionLocal
+    from app.services.geocoder import load_gazetteer_file
+
+    db = SessionLocal()
+    try:
+        with open(args.file, newline="", encoding="utf-8-sig") as stream:
+            loaded, skipped = load_gazetteer_file(db, args.kind, stream, replace=args.replace)
+    finally:
+        db.close()
+
+    logger.info(f"Loaded {loaded} gazetteer {args.kind} row(s), skipped {skipped} unusable row(s)")
+    return 0
+
+def geocode_file(args: argparse.Namespace) -> int:
+    """Add longitude, latitude and geocode_precision columns to a CSV file of addresses."""
+    import csv
+    import itertools
+
+    from app.db.session import SessionLocal
+    from app.services.geocoder import gazetteer_index, geocode_many
+
+    db = SessionLocal()
+    found = total = 0
+    try:
+        gazetteer_index.load(db)
+        with open(args.input, newline="", encoding="utf-8-sig") as source, \
+             open(args.output, "w", newline="", encoding="utf-8") as target:
+            reader = csv.DictReader(source)
+            if args.column not in (reader.fieldnames or []):
+                logger.error(f"Column '{args.column}' not found in {args.input}")
+                return 1
+            writer = csv.DictWriter(target, list(reader.fieldnames) + ["longitude", "latitude", "geocode_precision"])
+            writer.writeheader()
+
+            while True:
+                rows = list(itertools.islice(reader, 10000))
+                if not rows:
+                    break
+                for row, result in zip(rows, geocode_many(db, [row[args.column] for row in rows])):
+                    if result is not None:
+                        row.update(longitude=result.longitude, latitude=result.latitude, geocode_precision=result.precision)
+                        found += 1
+                    writer.writerow(row)
+                total += len(rows)
+    finally:
+        db.close()
+
+    logger.info(f"Geocoded {found} of {total} address(es) into {args.output}")
+    return 0
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="wealthmap-admin",
+        description="Wealth Map backend administration commands"
+    )
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.required = True
+
+    subparsers.add_parser("migrate", help="Apply pending SQL migrations").set_defaults(func=migrate)
+    subparsers.add_parser("bootstrap", help="Create tables and the initial admin user").set_defaults(func=bootstrap)
+    subparsers.add_parser("cleanup", help="Purge expired tokens").set_defaults(func=cleanup)
+    subparsers.add_parser("rebuild-grid", help="Recompute map cluster aggregates").set_defaults(func=rebuild_grid)
+    subparsers.add_parser(
+        "rollup-grid", help="Apply queued property writes to the map cluster aggregates"
+    ).set_defaults(func=rollup_grid)
+
+    heatmaps = subparsers.add_parser("refresh-heatmaps", help="Update precomputed heatmap layers")
+    heatmaps.add_argument("--layer", choices=["property-values", "wealth-heatmap"], help="Only this layer")
+    heatmaps.add_argument("--full", action="store_true", help="Rebuild from scratch instead of applying changes")
+    heatmaps.set_defaults(func=refresh_heatmaps)
+
+    subparsers.add_parser(
+        "invalidate-tiles", help="Drop stored map tiles touched by property changes"
+    ).set_defaults(func=invalidate_tiles)
+
+    prerender = subparsers.add_parser("prerender-tiles", help="Warm the map tile store for configured metros")
+    prerender.add_argument("--region", help="Only this MAP_PRERENDER_REGIONS entry")
+    prerender.add_argument("--min-zoom", type=int, help="Defaults to MAP_PRERENDER_MIN_ZOOM")
+    prerender.add_argument("--max-zoom", type=int, help="Defaults to MAP_PRERENDER_MAX_ZOOM")
+    prerender.add_argument("--force", action="store_true", help="Re-render tiles that are still fresh")
+    prerender.set_defaults(func=prerender_tiles)
+
+    subparsers.add_parser(
+        "sweep-tiles", help="Delete expired tile files from the on-disk tile store"
+    ).set_defaults(func=sweep_tiles)
+
+    saved = subparsers.add_parser("run-saved-searches", help="Find new saved search matches and send alerts")
+    saved.add_argument("--no-notify", action="store_true", help="Record new matches without emailing")
+    saved.set_defaults(func=run_saved_searches)
+
+    prune = subparsers.add_parser("prune-changes", help="Delete change feed rows every consumer has applied")
+    prune.add_argument("--days", type=int, help="Defaults to CHANGE_FEED_RETENTION_DAYS")
+    prune.set_defaults(func=prune_changes)
+
+    gazetteer = subparsers.add_parser("load-gazetteer", help="Load a CSV file into the local geocoding gazetteer")
+    gazetteer.add_argument("kind", choices=["points", "ranges", "zips"])
+    gazetteer.add_argument("file")
+    gazetteer.add_argument("--replace", action="store_true", help="Drop the existing rows of this kind first")
+    gazetteer.set_defaults(func=load_gazetteer)
+
+    geocode = subparsers.add_parser("geocode", help="Geocode a CSV file of addresses from the gazetteer")
+    geocode.add_argument("input")
+    geocode.add_argument("output")
+    geocode.add_argument("--column", default="address", help="Column holding the full address")
+    geocode.set_defaults(func=geocode_file)
+
+    return parser
+
+def main(argv: Optional[List[str]] = None) -> int:
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    args = build_parser().parse_args(argv)
+
+    try:
+        return args.func(args)
+    except Exception as e:
+        logger.error(f"Command '{args.command}' failed: {e}", exc_info=True)
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
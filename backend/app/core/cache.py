@@ -1,7 +1,7 @@
 import os
 import json
 import logging
-from typing import Any, Optional, Union
+from typing import Any, Dict, List, Optional, Union
 
 # Try to import Redis, but make it optional
 redis_cache = None
@@ -55,6 +55,58 @@ class Cache:
             logging.error(f"Error setting cache: {e}")
             return False
     
+    async def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """Get several values in one round trip; missing keys are omitted"""
+        if not keys:
+            return {}
+        if not self.enabled:
+            return {key: self.local_cache[key] for key in keys if key in self.local_cache}
+        
+        try:
+            values = await redis_cache.mget(keys)
+            return {key: json.loads(value) for key, value in zip(keys, values) if value}
+        except Exception as e:
+            logging.error(f"Error getting from cache: {e}")
+            return {}
+    
+    async def get_bytes(self, key: str) -> Optional[bytes]:
+        """Get a raw binary value (e.g. a vector tile) from cache"""
+        if not self.enabled:
+            return self.local_cache.get(key)
+        
+        try:
+            return await redis_cache.get(key)
+        except Exception as e:
+            logging.error(f"Error getting from cache: {e}")
+            return None
+    
+    async def set_bytes(self, key: str, value: bytes, expire: int = 300) -> bool:
+        """Set a raw binary value in cache with expiration in seconds"""
+        if not self.enabled:
+            self.local_cache[key] = value
+            return True
+        
+        try:
+            await redis_cache.set(key, value, ex=expire)
+            return True
+        except Exception as e:
+            logging.error(f"Error setting cache: {e}")
+            return False
+    
+    async def get_many_bytes(self, keys: List[str]) -> Dict[str, bytes]:
+        """Get several raw binary values in one round trip; missing keys are omitted"""
+        if not keys:
+            return {}
+        if not self.enabled:
+            return {key: self.local_cache[key] for key in keys if key in self.local_cache}
+        
+        try:
+            values = await redis_cache.mget(keys)
+            return {key: value for key, value in zip(keys, values) if value is not None}
+        except Exception as e:
+            logging.error(f"Error getting from cache: {e}")
+            return {}
+    
     async def delete(self, key: str) -> bool:
         """Delete value from cache"""
         if not self.enabled:
@@ -69,6 +121,22 @@ class Cache:
             logging.error(f"Error deleting from cache: {e}")
             return False
     
+    async def delete_many(self, keys: List[str]) -> bool:
+        """Delete several values in one round trip"""
+        if not keys:
+            return True
+        if not self.enabled:
+            for key in keys:
+                self.local_cache.pop(key, None)
+            return True
+        
+        try:
+            await redis_cache.delete(*keys)
+            return True
+        except Exception as e:
+            logging.error(f"Error deleting from cache: {e}")
+            return False
+    
     async def flush(self) -> bool:
         """Clear all cache"""
         if not self.enabled:
@@ -1,3 +1,4 @@
+import json
 import os
 from pydantic import BaseSettings, validator
 from typing import Optional, Dict, Any, List
@@ -22,6 +23,11 @@ class Settings(BaseSettings):
     # Database
     DATABASE_URL: str = os.getenv("DATABASE_URL", "postgresql://postgres:postgres@db:5432/wealth_map")
     
+    # Startup behaviour. Migrations, table creation and the admin bootstrap
+    # normally run via `wealthmap-admin`; AUTO_MIGRATE keeps the old
+    # run-everything-on-boot behaviour for local development.
+    AUTO_MIGRATE: bool = os.getenv("AUTO_MIGRATE", "False").lower() == "true"
+    
     # CORS
     BACKEND_CORS_ORIGINS: List[str] = os.getenv("BACKEND_CORS_ORIGINS", "")
     
@@ -111,8 +117,68 @@ class Settings(BaseSettings):
     # Invitation settings
     INVITATION_EXPIRE_DAYS: int = int(os.getenv("INVITATION_EXPIRE_DAYS", "7"))
     
+    # Result totals (X-Total-Count): exact up to this many rows, estimated above
+    COUNT_EXACT_THRESHOLD: int = int(os.getenv("COUNT_EXACT_THRESHOLD", "10000"))
+    COUNT_SAMPLE_PERCENT: float = float(os.getenv("COUNT_SAMPLE_PERCENT", "1"))  # TABLESAMPLE size; 0 uses planner estimates only
+    
+    # Streaming exports: rows fetched per server-side cursor round trip
+    EXPORT_BATCH_SIZE: int = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+    
+    # Unified search (POST /api/search)
+    SEARCH_MAX_RESULTS: int = int(os.getenv("SEARCH_MAX_RESULTS", "1000"))  # Deepest result reachable by paging
+    SEARCH_CACHE_EXPIRY: int = int(os.getenv("SEARCH_CACHE_EXPIRY", "300"))  # 5 minutes in seconds
+    FACET_CACHE_EXPIRY: int = int(os.getenv("FACET_CACHE_EXPIRY", "300"))  # 5 minutes in seconds
+    # property_changes rows are kept this long (wealthmap-admin prune-changes); in-memory
+    # indexes and the tile store read the feed at least this often
+    CHANGE_FEED_RETENTION_DAYS: int = int(os.getenv("CHANGE_FEED_RETENTION_DAYS", "7"))
+    # Saved search alerts (wealthmap-admin run-saved-searches)
+    SAVED_SEARCH_DELTA_RETENTION_DAYS: int = int(os.getenv("SAVED_SEARCH_DELTA_RETENTION_DAYS", "30"))
+    
     # Map settings
     MAP_TILE_CACHE_EXPIRY: int = int(os.getenv("MAP_TILE_CACHE_EXPIRY", "86400"))  # 24 hours in seconds
+    MAP_TILE_MAX_AGE: int = int(os.getenv("MAP_TILE_MAX_AGE", "3600"))  # Browser/CDN Cache-Control max-age
+    MAP_TILE_POINT_MIN_ZOOM: int = int(os.getenv("MAP_TILE_POINT_MIN_ZOOM", "13"))  # Individual parcels from this zoom
+    MAP_TILE_CLUSTER_GRID: int = int(os.getenv("MAP_TILE_CLUSTER_GRID", "64"))  # Aggregation cells per tile edge
+    MAP_CLUSTER_CELLS_ACROSS: int = int(os.getenv("MAP_CLUSTER_CELLS_ACROSS", "32"))  # Grid cells across a /map viewport
+    MAP_VIEWPORT_TILES_ACROSS: int = int(os.getenv("MAP_VIEWPORT_TILES_ACROSS", "2"))  # Min tiles across a snapped /map viewport
+    MAP_VIEWPORT_MAX_TILES: int = int(os.getenv("MAP_VIEWPORT_MAX_TILES", "64"))
+    MAP_TILE_FEATURE_LIMIT: int = int(os.getenv("MAP_TILE_FEATURE_LIMIT", "100"))  # Point features per /map tile
+    # Rendered tile store: tile bytes on disk when MAP_TILE_STORE_DIR is set, otherwise in Redis
+    MAP_TILE_STORE_DIR: str = os.getenv("MAP_TILE_STORE_DIR", "")
+    MAP_TILE_STORE_MAX_ZOOM: int = int(os.getenv("MAP_TILE_STORE_MAX_ZOOM", "18"))
+    # Regions warmed by `wealthmap-admin prerender-tiles`: name -> [lng_min, lat_min, lng_max, lat_max]
+    MAP_PRERENDER_REGIONS: Dict[str, List[float]] = json.loads(os.getenv("MAP_PRERENDER_REGIONS", json.dumps({
+        "new-york": [-74.26, 40.49, -73.70, 40.92],
+        "los-angeles": [-118.67, 33.70, -118.15, 34.34],
+        "chicago": [-87.94, 41.64, -87.52, 42.03],
+        "san-francisco": [-122.52, 37.70, -122.35, 37.83],
+        "miami": [-80.32, 25.70, -80.12, 25.86],
+    })))
+    MAP_PRERENDER_MIN_ZOOM: int = int(os.getenv("MAP_PRERENDER_MIN_ZOOM", "8"))
+    MAP_PRERENDER_MAX_ZOOM: int = int(os.getenv("MAP_PRERENDER_MAX_ZOOM", "14"))
+    # Heatmap layers: cells are aggregated at this zoom and rolled up below it
+    HEATMAP_BASE_ZOOM: int = int(os.getenv("HEATMAP_BASE_ZOOM", "14"))
+    HEATMAP_TILE_CACHE_EXPIRY: int = int(os.getenv("HEATMAP_TILE_CACHE_EXPIRY", "3600"))  # 1 hour in seconds
+    # In-memory columnar map index (requires numpy); loaded per worker at startup
+    MAP_MEMORY_INDEX: bool = os.getenv("MAP_MEMORY_INDEX", "False").lower() == "true"
+    MAP_MEMORY_INDEX_REFRESH_SECONDS: int = int(os.getenv("MAP_MEMORY_INDEX_REFRESH_SECONDS", "30"))
+    MAP_MEMORY_INDEX_MAX_DELTA: int = int(os.getenv("MAP_MEMORY_INDEX_MAX_DELTA", "50000"))  # Changed properties that trigger a full reload
+    # In-memory typeahead index for /api/search/suggestions; loaded per worker at startup
+    TYPEAHEAD_INDEX: bool = os.getenv("TYPEAHEAD_INDEX", "False").lower() == "true"
+    TYPEAHEAD_REFRESH_SECONDS: int = int(os.getenv("TYPEAHEAD_REFRESH_SECONDS", "30"))
+    TYPEAHEAD_REBUILD_SECONDS: int = int(os.getenv("TYPEAHEAD_REBUILD_SECONDS", "86400"))  # Recounts popularity weights
+    TYPEAHEAD_MAX_DELTA: int = int(os.getenv("TYPEAHEAD_MAX_DELTA", "50000"))  # Overlay size that triggers a full reload
+    # Offline geocoding from the local gazetteer (/api/search/geocode, /api/search/location)
+    GEOCODER_INDEX: bool = os.getenv("GEOCODER_INDEX", "False").lower() == "true"  # Load the gazetteer per worker
+    GEOCODER_CACHE_SIZE: int = int(os.getenv("GEOCODER_CACHE_SIZE", "100000"))  # Results kept per process
+    GEOCODER_BATCH_LIMIT: int = int(os.getenv("GEOCODER_BATCH_LIMIT", "1000"))  # Addresses per batch request
+    # Compiled /api/search/advanced statements kept per process, by filter shape
+    SEARCH_PLAN_CACHE_SIZE: int = int(os.getenv("SEARCH_PLAN_CACHE_SIZE", "1000"))
+    # Spatial search (/properties/search/coordinates)
+    SPATIAL_SEARCH_MAX_RADIUS: float = float(os.getenv("SPATIAL_SEARCH_MAX_RADIUS", "100000"))  # meters
+    SPATIAL_SEARCH_MAX_VERTICES: int = int(os.getenv("SPATIAL_SEARCH_MAX_VERTICES", "500"))
+    # Upper bounds of the current_value buckets exposed on map features
+    MAP_VALUE_BUCKETS: List[int] = [250000, 500000, 1000000, 2500000, 5000000, 10000000]
     
     class Config:
         case_sensitive = True
@@ -1,13 +1,6 @@
 from typing import Generator, Optional
 import uuid
 import logging
-import sys
-import os
-from pathlib import Path
-
-# Add the parent directory to sys.path
-backend_dir = Path(__file__).parent.parent.parent
-sys.path.insert(0, str(backend_dir))
 
 from fastapi import Depends, HTTPException, status, Request, Header
 from fastapi.security import OAuth2PasswordBearer
@@ -0,0 +1,106 @@
+"""
+Web Mercator (slippy map) tile math shared by the map endpoints.
+
+Tiles follow the XYZ scheme used by Mapbox GL: zoom ``z`` has ``2**z`` by
+``2**z`` tiles, ``x`` grows eastwards and ``y`` grows southwards.
+"""
+import math
+from typing import Iterable, List, Tuple
+
+MAX_ZOOM = 22
+MAX_LATITUDE = 85.0511287798066
+
+# Width of the Web Mercator world in EPSG:3857 metres
+WORLD_SIZE_METERS = 2 * math.pi * 6378137
+
+def is_valid_tile(z: int, x: int, y: int) -> bool:
+    """Return True if (z, x, y) addresses an existing tile."""
+    if z < 0 or z > MAX_ZOOM:
+        return False
+    n = 1 << z
+    return 0 <= x < n and 0 <= y < n
+
+def lnglat_to_tile_fraction(lng: float, lat: float, z: int) -> Tuple[float, float]:
+    """Return the fractional tile coordinates of a point at zoom ``z``."""
+    lat = max(min(lat, MAX_LATITUDE), -MAX_LATITUDE)
+    n = 1 << z
+    lat_rad = math.radians(lat)
+    x = (lng + 180.0) / 360.0 * n
+    y = (1.0 - math.log(math.tan(lat_rad) + 1.0 / math.cos(lat_rad)) / math.pi) / 2.0 * n
+    return x, y
+
+def lnglat_to_tile(lng: float, lat: float, z: int) -> Tuple[int, int]:
+    """Return the (x, y) tile containing a point at zoom ``z``."""
+    n = 1 << z
+    x, y = lnglat_to_tile_fraction(lng, lat, z)
+    return min(max(int(x), 0), n - 1), min(max(int(y), 0), n - 1)
+
+def tile_bounds(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """Return ``(lng_min, lat_min, lng_max, lat_max)`` of a tile in degrees."""
+    n = 1 << z
+
+    def lat_at(tile_y: int) -> float:
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * tile_y / n))))
+
+    return (
+        x / n * 360.0 - 180.0,
+        lat_at(y + 1),
+        (x + 1) / n * 360.0 - 180.0,
+        lat_at(y),
+    )
+
+def tile_size_meters(z: int) -> float:
+    """Return the width of a tile at zoom ``z`` in EPSG:3857 metres."""
+    return WORLD_SIZE_METERS / (1 << z)
+
+def zoom_for_bbox(
+    lat_min: float,
+    lat_max: float,
+    lng_min: float,
+    lng_max: float,
+    tiles_across: int,
+    max_zoom: int = MAX_ZOOM
+) -> int:
+    """Return the deepest zoom at which a bounding box spans at least ``tiles_across`` tiles."""
+    span = max(lng_max - lng_min, lat_max - lat_min, 1e-9)
+    zoom = int(math.floor(math.log2(tiles_across * 360.0 / span)))
+    return min(max(zoom, 0), max_zoom)
+
+def tiles_for_bbox(z: int, lat_min: float, lat_max: float, lng_min: float, lng_max: float) -> List[Tuple[int, int]]:
+    """Return the (x, y) tiles at zoom ``z`` that cover a bounding box."""
+    # Tile y grows southwards, so the north-west corner has the smallest indexes
+    x_min, y_min = lnglat_to_tile(lng_min, lat_max, z)
+    x_max, y_max = lnglat_to_tile(lng_max, lat_min, z)
+    return [(x, y) for x in range(x_min, x_max + 1) for y in range(y_min, y_max + 1)]
+
+def tile_blocks(tiles: Iterable[Tuple[int, int]]) -> List[Tuple[int, int, int, int]]:
+    """
+    Split tiles into contiguous ``(x_min, x_max, y_min, y_max)`` blocks.
+
+    Each row is cut into runs of adjacent tiles and a run is merged into the
+    block above it when both span the same columns, so the tiles newly
+    covered by a diagonal pan (an L shape) come back as two blocks rather
+    than one box over the whole viewport.
+    """
+    rows = {}
+    for x, y in sorted(set(tiles), key=lambda tile: (tile[1], tile[0])):
+        runs = rows.setdefault(y, [])
+        if runs and runs[-1][1] == x - 1:
+            runs[-1][1] = x
+        else:
+            runs.append([x, x])
+
+    blocks = []
+    open_blocks = {}  # (x_min, x_max) -> index of the block ending on the previous row
+    for y in sorted(rows):
+        still_open = {}
+        for x_min, x_max in rows[y]:
+            index = open_blocks.get((x_min, x_max))
+            if index is not None and blocks[index][3] == y - 1:
+                blocks[index] = (x_min, x_max, blocks[index][2], y)
+            else:
+                index = len(blocks)
+                blocks.append((x_min, x_max, y, y))
+            still_open[(x_min, x_max)] = index
+        open_blocks = still_open
+    return blocks
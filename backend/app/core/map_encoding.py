@@ -0,0 +1,165 @@
+"""
+Compact encodings for map feature lists.
+
+``/properties/map`` returns up to a few thousand features whose JSON objects
+repeat every field name. Clients that opt in get one of two compact forms:
+
+- columnar JSON (``application/vnd.wealthmap.map+json``): one array per
+  field, coordinates quantized to ``COORDINATE_SCALE`` and delta-encoded,
+  property types dictionary-encoded and values reduced to the index of
+  their ``MAP_VALUE_BUCKETS`` bucket
+- Arrow IPC stream (``application/vnd.apache.arrow.stream``): the same
+  columns as a typed record batch, available when pyarrow is installed
+"""
+import io
+from bisect import bisect_right
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+
+COLUMNAR_CONTENT_TYPE = "application/vnd.wealthmap.map+json"
+ARROW_CONTENT_TYPE = "application/vnd.apache.arrow.stream"
+COLUMNAR_FORMAT_VERSION = "columnar-v1"
+
+# 1e-5 degrees is about a metre at the equator
+COORDINATE_SCALE = 100000
+
+MAP_FORMATS = {
+    "json": "application/json",
+    "columnar": COLUMNAR_CONTENT_TYPE,
+    "arrow": ARROW_CONTENT_TYPE,
+}
+
+def negotiate_map_format(requested: Optional[str], accept: Optional[str]) -> str:
+    """
+    Pick a map encoding from an explicit ``format`` parameter, falling back
+    to the Accept header and then plain JSON.
+    """
+    if requested:
+        return requested
+    accept = accept or ""
+    if ARROW_CONTENT_TYPE in accept:
+        return "arrow"
+    if COLUMNAR_CONTENT_TYPE in accept:
+        return "columnar"
+    return "json"
+
+def value_bucket(value: Optional[float]) -> Optional[int]:
+    """Index of the MAP_VALUE_BUCKETS bucket (0 = lowest), like SQL width_bucket."""
+    if value is None:
+        return None
+    return bisect_right(settings.MAP_VALUE_BUCKETS, value)
+
+def _quantize(value: float) -> int:
+    return int(round(value * COORDINATE_SCALE))
+
+def _delta(values: List[int]) -> List[int]:
+    previous = 0
+    deltas = []
+    for value in values:
+        deltas.append(value - previous)
+        previous = value
+    return deltas
+
+def _undelta(deltas: List[int]) -> List[int]:
+    total = 0
+    values = []
+    for delta in deltas:
+        total += delta
+        values.append(total)
+    return values
+
+def _columns(features: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Split features into plain columns shared by both encodings."""
+    types: Dict[str, int] = {}
+    columns = {
+        "id": [str(f["id"]) for f in features],
+        "address": [f["address"] for f in features],
+        "x": [_quantize(f["longitude"]) for f in features],
+        "y": [_quantize(f["latitude"]) for f in features],
+        "property_type": [types.setdefault(f.get("property_type") or "", len(types)) for f in features],
+        "value_bucket": [value_bucket(f.get("estimated_value")) for f in features],
+    }
+    columns["property_types"] = list(types)
+    if any(f.get("count") is not None for f in features):
+        columns["count"] = [f.get("count") for f in features]
+    return columns
+
+def encode_columnar(features: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Encode features as columnar JSON."""
+    columns = _columns(features)
+    payload = {
+        "format": COLUMNAR_FORMAT_VERSION,
+        "length": len(features),
+        "scale": COORDINATE_SCALE,
+        "value_buckets": settings.MAP_VALUE_BUCKETS,
+        "property_types": columns.pop("property_types"),
+    }
+    payload.update(columns)
+    payload["x"] = _delta(columns["x"])
+    payload["y"] = _delta(columns["y"])
+    return payload
+
+def decode_columnar(payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Decode columnar JSON back into feature dicts (values become buckets)."""
+    xs = _undelta(payload["x"])
+    ys = _undelta(payload["y"])
+    scale = payload["scale"]
+    features = []
+    for i in range(payload["length"]):
+        feature = {
+            "id": payload["id"][i],
+            "address": payload["address"][i],
+            "longitude": xs[i] / scale,
+            "latitude": ys[i] / scale,
+            "property_type": payload["property_types"][payload["property_type"][i]] or None,
+            "value_bucket": payload["value_bucket"][i],
+        }
+        if "count" in payload:
+            feature["count"] = payload["count"][i]
+        features.append(feature)
+    return features
+
+@lru_cache(maxsize=None)
+def _pyarrow():
+    """
+    Import pyarrow on the first Arrow request. It is optional (without it only
+    the JSON encodings are offered) and slow to import on every cold start.
+    """
+    try:
+        import pyarrow
+        import pyarrow.ipc
+    except ImportError:
+        return None
+    return pyarrow
+
+def arrow_available() -> bool:
+    return _pyarrow() is not None
+
+def encode_arrow(features: List[Dict[str, Any]]) -> bytes:
+    """Encode features as an Arrow IPC stream with a single record batch."""
+    pyarrow = _pyarrow()
+    columns = _columns(features)
+    arrays = {
+        "id": pyarrow.array(columns["id"], type=pyarrow.string()),
+        "address": pyarrow.array(columns["address"], type=pyarrow.string()),
+        "x": pyarrow.array(columns["x"], type=pyarrow.int32()),
+        "y": pyarrow.array(columns["y"], type=pyarrow.int32()),
+        "property_type": pyarrow.DictionaryArray.from_arrays(
+            pyarrow.array(columns["property_type"], type=pyarrow.int16()),
+            pyarrow.array(columns["property_types"], type=pyarrow.string()),
+        ),
+        "value_bucket": pyarrow.array(columns["value_bucket"], type=pyarrow.int8()),
+    }
+    if "count" in columns:
+        arrays["count"] = pyarrow.array(columns["count"], type=pyarrow.int32())
+
+    batch = pyarrow.RecordBatch.from_pydict(arrays, metadata={
+        "scale": str(COORDINATE_SCALE),
+        "value_buckets": ",".join(str(b) for b in settings.MAP_VALUE_BUCKETS),
+    })
+    sink = io.BytesIO()
+    with pyarrow.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue()
@@ -0,0 +1,266 @@
+"""
+Pagination helpers.
+
+Offset pagination (``skip``/``limit``) costs O(offset) because the database
+has to produce and throw away every skipped row. Keyset (cursor) pagination
+instead remembers the sort key of the last row returned and continues with a
+``WHERE (key) < (last key)`` predicate, which an index on the sort key can
+answer directly regardless of page depth.
+
+Cursors are opaque, URL-safe strings. Endpoints return the cursor for the next
+page, and optionally an estimated total, in response headers so the response
+bodies stay the same in both modes. Totals are only counted exactly when they
+are small (see ``get_total``); X-Total-Count-Estimated tells which is which.
+"""
+import base64
+import json
+import logging
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, List, Optional, Sequence, Tuple, Union
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import Table, and_, func, literal, or_, select, tablesample, tuple_
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Query, Session
+from sqlalchemy.sql.expression import ClauseElement, Executable, Select
+from sqlalchemy.sql.util import ClauseAdapter
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+TOTAL_COUNT_HEADER = "X-Total-Count"
+TOTAL_ESTIMATED_HEADER = "X-Total-Count-Estimated"
+PAGINATION_HEADERS = [NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER, TOTAL_ESTIMATED_HEADER]
+
+# (column, descending)
+KeysetOrder = Sequence[Tuple[Any, bool]]
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"d": value.isoformat()}
+    if isinstance(value, uuid.UUID):
+        return {"uuid": str(value)}
+    if isinstance(value, Decimal):
+        return {"dec": str(value)}
+    return value
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if "dt" in value:
+            return datetime.fromisoformat(value["dt"])
+        if "d" in value:
+            return date.fromisoformat(value["d"])
+        if "uuid" in value:
+            return uuid.UUID(value["uuid"])
+        if "dec" in value:
+            return Decimal(value["dec"])
+        raise ValueError("Unknown cursor value")
+    return value
+
+def encode_cursor(scope: str, values: Sequence[Any]) -> str:
+    """
+    Encode the sort key of the last row of a page as an opaque cursor
+    """
+    payload = json.dumps({"s": scope, "k": [_encode_value(v) for v in values]}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(scope: str, cursor: str) -> List[Any]:
+    """
+    Decode a cursor produced by encode_cursor for the same scope
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        if payload.get("s") != scope:
+            raise ValueError("Cursor belongs to a different listing")
+        return [_decode_value(v) for v in payload["k"]]
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        logger.info(f"Rejected pagination cursor: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
+
+def keyset_filter(order: KeysetOrder, values: Sequence[Any]):
+    """
+    Build the "rows after this key" predicate for the given sort order.
+
+    Uniform directions use a row comparison, which PostgreSQL can answer
+    with a single index range scan; mixed directions expand to OR terms.
+    """
+    columns = [column for column, _ in order]
+    values = [literal(value, type_=column.type) for column, value in zip(columns, values)]
+    directions = {descending for _, descending in order}
+
+    if len(directions) == 1:
+        if directions.pop():
+            return tuple_(*columns) < tuple_(*values)
+        return tuple_(*columns) > tuple_(*values)
+
+    clauses = []
+    for i, (column, descending) in enumerate(order):
+        equal_prefix = [columns[j] == values[j] for j in range(i)]
+        step = column < values[i] if descending else column > values[i]
+        clauses.append(and_(*equal_prefix, step))
+    return or_(*clauses)
+
+def order_clauses(order: KeysetOrder) -> list:
+    return [column.desc() if descending else column.asc() for column, descending in order]
+
+def paginate_keyset(
+    query: Query,
+    scope: str,
+    order: KeysetOrder,
+    cursor: Optional[str],
+    limit: int,
+    key: Optional[Callable[[Any], Sequence[Any]]] = None
+) -> Tuple[list, Optional[str]]:
+    """
+    Return one page of ``query`` after ``cursor`` and the cursor for the next page.
+
+    ``key`` extracts the sort key from a result row; by default it reads the
+    attribute named after each order column.
+    """
+    if cursor:
+        query = query.filter(keyset_filter(order, decode_cursor(scope, cursor)))
+
+    rows = query.order_by(*order_clauses(order)).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        values = key(last) if key else [getattr(last, column.key) for column, _ in order]
+        next_cursor = encode_cursor(scope, values)
+
+    return rows, next_cursor
+
+class _Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+@compiles(_Explain, "postgresql")
+def _compile_explain(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+def estimate_count(db: Session, query: Union[Query, Select]) -> Optional[int]:
+    """
+    Estimate the number of rows an ORM query or Core select returns from
+    planner statistics.
+
+    Returns None when the database can't provide an estimate (non-PostgreSQL).
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return None
+
+    statement = query.order_by(None).limit(None).offset(None)
+    if isinstance(statement, Query):
+        statement = statement.statement
+    plan = db.execute(_Explain(statement)).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+def _count_statement(query: Union[Query, Select]) -> Select:
+    statement = query.statement if isinstance(query, Query) else query
+    return statement.order_by(None).limit(None).offset(None)
+
+def bounded_count(db: Session, query: Union[Query, Select], bound: int) -> int:
+    """
+    Count the rows of ``query``, stopping after ``bound + 1`` so the cost
+    stays proportional to the bound rather than to the full result.
+    """
+    subquery = _count_statement(query).limit(bound + 1).subquery()
+    return db.execute(select(func.count()).select_from(subquery)).scalar()
+
+def sample_count(db: Session, query: Union[Query, Select], percent: float) -> Optional[int]:
+    """
+    Estimate the rows of a filtered select over one table by counting the
+    matches in a ``TABLESAMPLE SYSTEM (percent)`` sample of that table.
+
+    Returns None for other queries (joins, grouping, DISTINCT) and on
+    databases without TABLESAMPLE.
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return None
+
+    statement = _count_statement(query)
+    froms = statement.get_final_froms()
+    if len(froms) != 1 or not isinstance(froms[0], Table) or statement._group_by_clauses or statement._distinct:
+        return None
+
+    table = froms[0]
+    # Same name as the table, so textual column references still resolve
+    sample = tablesample(table, func.system(percent), name=table.name)
+    count = select(func.count()).select_from(sample)
+    if statement.whereclause is not None:
+        count = count.where(ClauseAdapter(sample).traverse(statement.whereclause))
+    return round(db.execute(count).scalar() * 100.0 / percent)
+
+def round_estimate(value: int) -> int:
+    """Round an estimated count to two significant figures ("about 1.2M")."""
+    if value < 100:
+        return value
+    step = 10 ** (len(str(value)) - 2)
+    return round(value / step) * step
+
+def get_total(db: Session, query: Union[Query, Select], estimate: bool = True) -> Tuple[int, bool]:
+    """
+    Return ``(total, is_estimate)``.
+
+    With ``estimate``, results the planner expects to hold at most
+    COUNT_EXACT_THRESHOLD rows are counted exactly (with a bounded count);
+    larger ones are estimated from a TABLESAMPLE of COUNT_SAMPLE_PERCENT
+    of the table, or from the planner's row estimate when the query can't
+    be sampled. A sample that finds at most COUNT_EXACT_THRESHOLD rows
+    also leads to a bounded count. Estimates are rounded to two
+    significant figures.
+    """
+    if estimate:
+        estimated = estimate_count(db, query)
+        if estimated is not None:
+            threshold = settings.COUNT_EXACT_THRESHOLD
+            counted = estimated <= threshold
+            if counted:
+                exact = bounded_count(db, query, threshold)
+                if exact <= threshold:
+                    return exact, False
+                # The planner underestimated
+                estimated = exact
+
+            sampled = None
+            if settings.COUNT_SAMPLE_PERCENT > 0:
+                sampled = sample_count(db, query, settings.COUNT_SAMPLE_PERCENT)
+            if sampled is not None and sampled <= threshold and not counted:
+                # The planner overestimated; a result this small is cheap to count
+                exact = bounded_count(db, query, threshold)
+                if exact <= threshold:
+                    return exact, False
+
+            # A sample below the threshold missed rows the bounded count found
+            total = sampled if sampled is not None and sampled > threshold else estimated
+            return round_estimate(max(total, threshold + 1)), True
+
+    if isinstance(query, Query):
+        return query.order_by(None).count(), False
+    return db.execute(select(func.count()).select_from(_count_statement(query).subquery())).scalar(), False
+
+def set_pagination_headers(
+    response: Response,
+    next_cursor: Optional[str] = None,
+    total: Optional[int] = None,
+    is_estimate: bool = False
+) -> None:
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    if total is not None:
+        response.headers[TOTAL_COUNT_HEADER] = str(total)
+        response.headers[TOTAL_ESTIMATED_HEADER] = "true" if is_estimate else "false"
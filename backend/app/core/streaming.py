@@ -0,0 +1,103 @@
+"""
+Streaming exports of large result sets.
+
+Rows are read through a server-side cursor (``stream_results`` +
+``yield_per``), validated one at a time against the response schema and
+written out as NDJSON or CSV in batches. Memory use is bounded by the batch
+size, not the result size, and because StreamingResponse only pulls the next
+chunk after the previous one has been sent, a slow client slows the database
+cursor down instead of piling rows up in the worker.
+
+The generator uses the request's session; FastAPI closes ``get_db``
+sessions after the response has finished streaming.
+"""
+import csv
+import io
+import json
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Type
+
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy.orm import Query
+
+from app.core.config import settings
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+def stream_query(query: Query, batch_size: Optional[int] = None) -> Iterator[Any]:
+    """
+    Iterate over a query's rows using a server-side cursor.
+    """
+    batch_size = batch_size or settings.EXPORT_BATCH_SIZE
+    return iter(
+        query.execution_options(stream_results=True, max_row_buffer=batch_size).yield_per(batch_size)
+    )
+
+def _serialize_rows(rows: Iterable[Any], schema: Type[BaseModel], transform: Optional[Callable[[Any], Any]]) -> Iterator[Dict[str, Any]]:
+    for row in rows:
+        if transform:
+            row = transform(row)
+        yield schema.from_orm(row).dict()
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    return value
+
+def iter_ndjson(records: Iterable[Dict[str, Any]], batch_size: int) -> Iterator[str]:
+    batch = []
+    for record in records:
+        batch.append(json.dumps(record, default=str))
+        if len(batch) >= batch_size:
+            yield "\n".join(batch) + "\n"
+            batch = []
+    if batch:
+        yield "\n".join(batch) + "\n"
+
+def iter_csv(records: Iterable[Dict[str, Any]], fieldnames: Iterable[str], batch_size: int) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=list(fieldnames), extrasaction="ignore")
+    writer.writeheader()
+
+    count = 0
+    for record in records:
+        writer.writerow({key: _csv_value(value) for key, value in record.items()})
+        count += 1
+        if count % batch_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+
+    remainder = buffer.getvalue()
+    if remainder:
+        yield remainder
+
+def export_response(
+    query: Query,
+    schema: Type[BaseModel],
+    export_format: str = "ndjson",
+    filename: str = "export",
+    transform: Optional[Callable[[Any], Any]] = None,
+    batch_size: Optional[int] = None
+) -> StreamingResponse:
+    """
+    Stream ``query`` as NDJSON or CSV, validating each row against ``schema``.
+
+    ``transform`` maps a raw result row to the object passed to ``schema.from_orm``.
+    """
+    batch_size = batch_size or settings.EXPORT_BATCH_SIZE
+    records = _serialize_rows(stream_query(query, batch_size), schema, transform)
+
+    if export_format == "csv":
+        body = iter_csv(records, schema.__fields__.keys(), batch_size)
+    else:
+        body = iter_ndjson(records, batch_size)
+
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{export_format}"'}
+    )
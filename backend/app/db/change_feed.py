@@ -0,0 +1,72 @@
+"""
+Helpers for reading the ``property_changes`` feed (migrations 005, 006 and 010).
+
+Change ids are allocated before commit, so they do not tell a consumer
+which changes it may still be missing. Every change row instead records the
+transaction that wrote it (``txid``), and a consumer's position is the xmin
+of a database snapshot: all transactions below it have finished. A pass
+reads the changes with ``after <= txid < upto`` where ``upto`` is the
+current ``feed_position``; a long transaction holds the position back until
+it commits, and nothing it wrote is skipped.
+
+``prune_changes`` deletes changes older than ``CHANGE_FEED_RETENTION_DAYS``
+that every persisted consumer position has passed.
+"""
+from typing import List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# Rows deleted per statement by prune_changes
+PRUNE_BATCH_SIZE = 10000
+
+PERSISTED_POSITIONS_SQL = """
+    SELECT min(position) FROM (
+        SELECT feed_position AS position FROM heatmap_layers
+        UNION ALL
+        SELECT feed_position FROM saved_search_groups WHERE feed_position IS NOT NULL
+    ) positions
+"""
+
+PRUNE_SQL = """
+    DELETE FROM property_changes
+    WHERE id IN (
+        SELECT id FROM property_changes
+        WHERE changed_at < now() - CAST(:days AS integer) * INTERVAL '1 day' AND txid < :floor
+        LIMIT :batch
+    )
+"""
+
+def feed_position(db: Session) -> int:
+    """Return the position below which every change is committed (or rolled back)."""
+    return db.execute(text("SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint")).scalar()
+
+def changes_between(db: Session, after: int, upto: int) -> List[Tuple[int, str, str]]:
+    """Return ``(change id, property id, operation)`` rows with ``after <= txid < upto``."""
+    return db.execute(
+        text("""
+            SELECT id, property_id::text, operation FROM property_changes
+            WHERE txid >= :after AND txid < :upto
+            ORDER BY id
+        """),
+        {"after": after, "upto": upto}
+    ).fetchall()
+
+def prune_changes(db: Session, retention_days: int) -> int:
+    """
+    Delete changes older than ``retention_days`` that every persisted
+    position has passed. Returns the number of rows deleted.
+    """
+    floor = db.execute(text(PERSISTED_POSITIONS_SQL)).scalar()
+    if floor is None:
+        floor = feed_position(db)
+
+    deleted = 0
+    while True:
+        count = db.execute(
+            text(PRUNE_SQL), {"days": retention_days, "floor": floor, "batch": PRUNE_BATCH_SIZE}
+        ).rowcount
+        db.commit()
+        deleted += count
+        if count < PRUNE_BATCH_SIZE:
+            return deleted
@@ -0,0 +1,59 @@
+"""
+Runtime detection of optional database features.
+
+Some query paths depend on objects created by SQL migrations (generated
+columns, extension-backed indexes) rather than by the ORM models. Endpoints
+use these helpers to pick the fast path when the objects exist and fall back
+to portable SQL otherwise. Results are cached per process because the schema
+only changes between deploys; call ``reset_feature_cache`` after migrating.
+"""
+import logging
+from typing import Dict, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+_feature_cache: Dict[Tuple[str, ...], bool] = {}
+
+def _cached(key: Tuple[str, ...], db: Session, check) -> bool:
+    if key not in _feature_cache:
+        try:
+            _feature_cache[key] = bool(check(db))
+        except Exception as e:
+            logger.warning(f"Could not detect database feature {key}: {e}")
+            return False
+    return _feature_cache[key]
+
+def has_column(db: Session, table: str, column: str) -> bool:
+    """Return True if ``table.column`` exists in the connected database."""
+    def check(db):
+        return any(c["name"] == column for c in inspect(db.get_bind()).get_columns(table))
+    return _cached(("column", table, column), db, check)
+
+def has_table(db: Session, table: str) -> bool:
+    """Return True if ``table`` exists in the connected database."""
+    def check(db):
+        return inspect(db.get_bind()).has_table(table)
+    return _cached(("table", table), db, check)
+
+def has_index(db: Session, table: str, index: str) -> bool:
+    """Return True if the named index exists on ``table``."""
+    def check(db):
+        return any(i["name"] == index for i in inspect(db.get_bind()).get_indexes(table))
+    return _cached(("index", table, index), db, check)
+
+def has_extension(db: Session, extension: str) -> bool:
+    """Return True if the PostgreSQL extension is installed."""
+    def check(db):
+        if db.get_bind().dialect.name != "postgresql":
+            return False
+        return db.execute(
+            text("SELECT 1 FROM pg_extension WHERE extname = :name"), {"name": extension}
+        ).first() is not None
+    return _cached(("extension", extension), db, check)
+
+def reset_feature_cache() -> None:
+    """Forget detected features, e.g. after running migrations."""
+    _feature_cache.clear()
@@ -0,0 +1,34 @@
+-- Search-oriented indexes for properties
+
+-- Trigram matching for fuzzy address lookups
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Full-text search column over the address fields. The 'simple' configuration
+-- is used because street names and cities should not be stemmed.
+ALTER TABLE properties
+    ADD COLUMN IF NOT EXISTS search_vector TSVECTOR
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(address, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(city, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(state, '') || ' ' || coalesce(zip_code, '')), 'C')
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS properties_search_vector_idx ON properties USING GIN (search_vector);
+
+-- Trigram indexes for fuzzy / substring address and city matching
+CREATE INDEX IF NOT EXISTS properties_address_trgm_idx ON properties USING GIN (address gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS properties_city_trgm_idx ON properties USING GIN (city gin_trgm_ops);
+
+-- Prefix lookups on zip codes
+CREATE INDEX IF NOT EXISTS properties_zip_code_idx ON properties (zip_code text_pattern_ops);
+
+-- Composite indexes matching the search filter patterns
+CREATE INDEX IF NOT EXISTS properties_type_value_idx ON properties (property_type, current_value);
+CREATE INDEX IF NOT EXISTS properties_value_idx ON properties (current_value);
+CREATE INDEX IF NOT EXISTS properties_bedrooms_value_idx ON properties (bedrooms, current_value);
+CREATE INDEX IF NOT EXISTS properties_square_feet_idx ON properties (square_feet);
+
+-- Default ordering of search results
+CREATE INDEX IF NOT EXISTS properties_updated_at_id_idx ON properties (updated_at DESC, id DESC);
+
+ANALYZE properties;
@@ -0,0 +1,6 @@
+-- Geometry expression index for map tiles and bounding-box queries.
+-- properties.location is GEOGRAPHY; Web Mercator tile queries work on
+-- location::geometry, which can only use an index built on that expression.
+CREATE INDEX IF NOT EXISTS properties_location_geom_idx ON properties USING GIST ((location::geometry));
+
+ANALYZE properties;
@@ -0,0 +1,116 @@
+-- Precomputed multi-resolution aggregates for map clustering.
+--
+-- Every property is counted in one Web Mercator tile cell per zoom level
+-- 0-16 (the same XYZ scheme as the vector tiles), split by property type.
+-- A trigger keeps the cells up to date on property writes, so map cluster
+-- requests become a primary-key range scan instead of clustering raw points.
+-- Keep the zoom range in sync with PropertyGridService.GRID_MAX_ZOOM.
+
+CREATE OR REPLACE FUNCTION wm_tile_x(lng DOUBLE PRECISION, z INTEGER) RETURNS INTEGER AS $$
+    SELECT LEAST(GREATEST(floor((lng + 180.0) / 360.0 * (1 << z))::INTEGER, 0), (1 << z) - 1)
+$$ LANGUAGE SQL IMMUTABLE STRICT;
+
+CREATE OR REPLACE FUNCTION wm_tile_y(lat DOUBLE PRECISION, z INTEGER) RETURNS INTEGER AS $$
+    SELECT LEAST(GREATEST(floor(
+        (1.0 - ln(tan(radians(LEAST(GREATEST(lat, -85.0511287798066), 85.0511287798066)))
+                  + 1.0 / cos(radians(LEAST(GREATEST(lat, -85.0511287798066), 85.0511287798066)))) / pi())
+        / 2.0 * (1 << z))::INTEGER, 0), (1 << z) - 1)
+$$ LANGUAGE SQL IMMUTABLE STRICT;
+
+CREATE TABLE IF NOT EXISTS property_grid_cells (
+    zoom SMALLINT NOT NULL,
+    tile_x INTEGER NOT NULL,
+    tile_y INTEGER NOT NULL,
+    property_type VARCHAR(50) NOT NULL,
+    property_count INTEGER NOT NULL DEFAULT 0,
+    value_count INTEGER NOT NULL DEFAULT 0, -- properties with a current_value
+    value_sum NUMERIC(20,2) NOT NULL DEFAULT 0,
+    value_min NUMERIC(15,2), -- bounds only; not narrowed on delete until a rebuild
+    value_max NUMERIC(15,2),
+    lng_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+    lat_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+    PRIMARY KEY (zoom, tile_x, tile_y, property_type)
+);
+
+CREATE OR REPLACE FUNCTION property_grid_apply(loc GEOGRAPHY, ptype TEXT, val NUMERIC, sign INTEGER) RETURNS VOID AS $$
+DECLARE
+    lng DOUBLE PRECISION := ST_X(loc::geometry);
+    lat DOUBLE PRECISION := ST_Y(loc::geometry);
+    z INTEGER;
+BEGIN
+    FOR z IN 0..16 LOOP
+        INSERT INTO property_grid_cells AS c
+            (zoom, tile_x, tile_y, property_type, property_count, value_count, value_sum,
+             value_min, value_max, lng_sum, lat_sum)
+        VALUES
+            (z, wm_tile_x(lng, z), wm_tile_y(lat, z), ptype, sign,
+             CASE WHEN val IS NULL THEN 0 ELSE sign END, sign * COALESCE(val, 0),
+             CASE WHEN sign > 0 THEN val END, CASE WHEN sign > 0 THEN val END,
+             sign * lng, sign * lat)
+        ON CONFLICT (zoom, tile_x, tile_y, property_type) DO UPDATE SET
+            property_count = c.property_count + EXCLUDED.property_count,
+            value_count = c.value_count + EXCLUDED.value_count,
+            value_sum = c.value_sum + EXCLUDED.value_sum,
+            value_min = LEAST(c.value_min, EXCLUDED.value_min),
+            value_max = GREATEST(c.value_max, EXCLUDED.value_max),
+            lng_sum = c.lng_sum + EXCLUDED.lng_sum,
+            lat_sum = c.lat_sum + EXCLUDED.lat_sum;
+
+        IF sign < 0 THEN
+            DELETE FROM property_grid_cells
+            WHERE zoom = z AND tile_x = wm_tile_x(lng, z) AND tile_y = wm_tile_y(lat, z)
+              AND property_type = ptype AND property_count <= 0;
+        END IF;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION property_grid_trigger() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        IF TG_OP = 'UPDATE'
+           AND NEW.location IS NOT DISTINCT FROM OLD.location
+           AND NEW.property_type IS NOT DISTINCT FROM OLD.property_type
+           AND NEW.current_value IS NOT DISTINCT FROM OLD.current_value THEN
+            RETURN NEW;
+        END IF;
+        PERFORM property_grid_apply(OLD.location, OLD.property_type, OLD.current_value, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM property_grid_apply(NEW.location, NEW.property_type, NEW.current_value, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS properties_grid_aggregate ON properties;
+CREATE TRIGGER properties_grid_aggregate
+    AFTER INSERT OR UPDATE OR DELETE ON properties
+    FOR EACH ROW EXECUTE FUNCTION property_grid_trigger();
+
+-- Full rebuild (initial backfill; also tightens value_min/value_max after deletes)
+CREATE OR REPLACE FUNCTION property_grid_rebuild() RETURNS VOID AS $$
+BEGIN
+    TRUNCATE property_grid_cells;
+    INSERT INTO property_grid_cells
+        (zoom, tile_x, tile_y, property_type, property_count, value_count, value_sum,
+         value_min, value_max, lng_sum, lat_sum)
+    SELECT z,
+           wm_tile_x(ST_X(p.location::geometry), z),
+           wm_tile_y(ST_Y(p.location::geometry), z),
+           p.property_type,
+           count(*),
+           count(p.current_value),
+           COALESCE(sum(p.current_value), 0),
+           min(p.current_value),
+           max(p.current_value),
+           sum(ST_X(p.location::geometry)),
+           sum(ST_Y(p.location::geometry))
+    FROM properties p, generate_series(0, 16) AS z
+    GROUP BY 1, 2, 3, 4;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT property_grid_rebuild();
+
+ANALYZE property_grid_cells;
@@ -0,0 +1,31 @@
+-- Append-only change feed for properties.
+--
+-- Every insert, update and delete on properties appends the affected id.
+-- In-process read models (e.g. the in-memory map index) remember the last
+-- change id they applied and re-read only the properties changed since.
+-- Old entries can be pruned once every consumer has moved past them.
+
+CREATE TABLE IF NOT EXISTS property_changes (
+    id BIGSERIAL PRIMARY KEY,
+    property_id UUID NOT NULL,
+    operation CHAR(1) NOT NULL, -- I, U or D
+    changed_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS property_changes_changed_at_idx ON property_changes(changed_at);
+
+CREATE OR REPLACE FUNCTION property_changes_trigger() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        INSERT INTO property_changes (property_id, operation) VALUES (OLD.id, 'D');
+    ELSE
+        INSERT INTO property_changes (property_id, operation) VALUES (NEW.id, left(TG_OP, 1));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS properties_change_feed ON properties;
+CREATE TRIGGER properties_change_feed
+    AFTER INSERT OR UPDATE OR DELETE ON properties
+    FOR EACH ROW EXECUTE FUNCTION property_changes_trigger();
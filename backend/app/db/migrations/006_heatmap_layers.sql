@@ -0,0 +1,80 @@
+-- Precomputed heatmap layers for the map.
+--
+-- heatmap_cells holds one row per (layer, zoom, tile_x, tile_y) Web Mercator
+-- cell. The base zoom is aggregated from raw rows; coarser zooms are rolled
+-- up from the level below by HeatmapService. Refreshes are incremental:
+-- the cells touched by entries in property_changes since the layer's
+-- last_change_id are recomputed.
+
+-- Record where a property used to be, so cells it moved out of are refreshed too
+ALTER TABLE property_changes ADD COLUMN IF NOT EXISTS old_location GEOGRAPHY(POINT);
+
+CREATE OR REPLACE FUNCTION property_changes_trigger() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        INSERT INTO property_changes (property_id, operation, old_location) VALUES (OLD.id, 'D', OLD.location);
+    ELSIF TG_OP = 'UPDATE' THEN
+        INSERT INTO property_changes (property_id, operation, old_location)
+        VALUES (NEW.id, 'U', CASE WHEN NEW.location IS DISTINCT FROM OLD.location THEN OLD.location END);
+    ELSE
+        INSERT INTO property_changes (property_id, operation) VALUES (NEW.id, 'I');
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Ownership and wealth changes alter the wealth layer of the owned properties
+CREATE OR REPLACE FUNCTION property_ownership_changes_trigger() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.property_id IS NOT NULL THEN
+        INSERT INTO property_changes (property_id, operation) VALUES (OLD.property_id, 'O');
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.property_id IS NOT NULL THEN
+        INSERT INTO property_changes (property_id, operation) VALUES (NEW.property_id, 'O');
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS property_ownership_change_feed ON property_ownership;
+CREATE TRIGGER property_ownership_change_feed
+    AFTER INSERT OR UPDATE OR DELETE ON property_ownership
+    FOR EACH ROW EXECUTE FUNCTION property_ownership_changes_trigger();
+
+CREATE OR REPLACE FUNCTION wealth_data_changes_trigger() RETURNS TRIGGER AS $$
+DECLARE
+    changed_owner UUID := CASE WHEN TG_OP = 'DELETE' THEN OLD.owner_id ELSE NEW.owner_id END;
+BEGIN
+    INSERT INTO property_changes (property_id, operation)
+    SELECT DISTINCT po.property_id, 'W'
+    FROM property_ownership po
+    WHERE po.owner_id = changed_owner AND po.property_id IS NOT NULL;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS wealth_data_change_feed ON wealth_data;
+CREATE TRIGGER wealth_data_change_feed
+    AFTER INSERT OR UPDATE OR DELETE ON wealth_data
+    FOR EACH ROW EXECUTE FUNCTION wealth_data_changes_trigger();
+
+CREATE INDEX IF NOT EXISTS property_ownership_owner_id_idx ON property_ownership(owner_id);
+CREATE INDEX IF NOT EXISTS property_ownership_property_id_idx ON property_ownership(property_id);
+CREATE INDEX IF NOT EXISTS wealth_data_owner_id_idx ON wealth_data(owner_id);
+
+CREATE TABLE IF NOT EXISTS heatmap_cells (
+    layer VARCHAR(32) NOT NULL,
+    zoom SMALLINT NOT NULL,
+    tile_x INTEGER NOT NULL,
+    tile_y INTEGER NOT NULL,
+    sample_count INTEGER NOT NULL,
+    weight DOUBLE PRECISION NOT NULL, -- density: properties or attributed net worth
+    value NUMERIC(15,2), -- median (count-weighted median of child cells below the base zoom)
+    PRIMARY KEY (layer, zoom, tile_x, tile_y)
+);
+
+CREATE TABLE IF NOT EXISTS heatmap_layers (
+    layer VARCHAR(32) PRIMARY KEY,
+    last_change_id BIGINT NOT NULL DEFAULT 0,
+    refreshed_at TIMESTAMP WITH TIME ZONE
+);
@@ -0,0 +1,30 @@
+-- Fuzzy owner name search
+--
+-- Owner names are stored as entered ("John Smith, L.L.C.", "SMITH JOHN LLC").
+-- normalized_name drops case, punctuation and legal entity suffixes so that
+-- trigram similarity compares the distinctive part of the name; the GIN
+-- trigram indexes serve both similarity (%, <%) and ILIKE substring matches.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Keep in sync with OwnerSearchService.normalize_name
+CREATE OR REPLACE FUNCTION normalize_owner_name(name TEXT) RETURNS TEXT AS $$
+    SELECT btrim(regexp_replace(
+        regexp_replace(
+            regexp_replace(lower(replace(coalesce(name, ''), '.', '')), '[^a-z0-9]+', ' ', 'g'),
+            '\m(llc|lllp|llp|lp|pllc|plc|pc|inc|incorporated|corp|corporation|co|company|ltd|limited)\M', ' ', 'g'
+        ),
+        '\s+', ' ', 'g'
+    ))
+$$ LANGUAGE SQL IMMUTABLE PARALLEL SAFE;
+
+ALTER TABLE owners
+    ADD COLUMN IF NOT EXISTS normalized_name TEXT
+    GENERATED ALWAYS AS (normalize_owner_name(name)) STORED;
+
+CREATE INDEX IF NOT EXISTS owners_normalized_name_trgm_idx ON owners USING GIN (normalized_name gin_trgm_ops);
+
+-- Substring (ILIKE) and prefix lookups on the raw name
+CREATE INDEX IF NOT EXISTS owners_name_trgm_idx ON owners USING GIN (name gin_trgm_ops);
+
+ANALYZE owners;
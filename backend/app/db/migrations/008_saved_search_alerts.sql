@@ -0,0 +1,41 @@
+-- Saved search alerts
+--
+-- Saved searches with the same normalized criteria share one group, so a
+-- search saved by many users is evaluated once. saved_search_results holds
+-- each group's current matches. Runs re-evaluate only the properties that
+-- appear in property_changes since the group's last_change_id and record
+-- what started ('A') or stopped ('R') matching in saved_search_deltas.
+-- Users are alerted of new matches after their last_notified_delta_id.
+
+ALTER TABLE saved_searches ADD COLUMN IF NOT EXISTS alerts_enabled BOOLEAN NOT NULL DEFAULT TRUE;
+ALTER TABLE saved_searches ADD COLUMN IF NOT EXISTS criteria_hash TEXT;
+ALTER TABLE saved_searches ADD COLUMN IF NOT EXISTS last_notified_delta_id BIGINT NOT NULL DEFAULT 0;
+
+CREATE INDEX IF NOT EXISTS saved_searches_criteria_hash_idx ON saved_searches(criteria_hash);
+
+CREATE TABLE IF NOT EXISTS saved_search_groups (
+    criteria_hash TEXT PRIMARY KEY,
+    criteria JSONB NOT NULL,
+    last_change_id BIGINT, -- NULL until the initial matches are recorded
+    last_run_at TIMESTAMP WITH TIME ZONE
+);
+
+CREATE TABLE IF NOT EXISTS saved_search_results (
+    criteria_hash TEXT NOT NULL REFERENCES saved_search_groups(criteria_hash) ON DELETE CASCADE,
+    property_id UUID NOT NULL REFERENCES properties(id) ON DELETE CASCADE,
+    PRIMARY KEY (criteria_hash, property_id)
+);
+
+-- Serves the cascade when a property is deleted
+CREATE INDEX IF NOT EXISTS saved_search_results_property_idx ON saved_search_results(property_id);
+
+CREATE TABLE IF NOT EXISTS saved_search_deltas (
+    id BIGSERIAL PRIMARY KEY,
+    criteria_hash TEXT NOT NULL REFERENCES saved_search_groups(criteria_hash) ON DELETE CASCADE,
+    property_id UUID NOT NULL,
+    change CHAR(1) NOT NULL, -- A or R
+    detected_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS saved_search_deltas_group_idx ON saved_search_deltas(criteria_hash, id);
+CREATE INDEX IF NOT EXISTS saved_search_deltas_detected_at_idx ON saved_search_deltas(detected_at);
@@ -0,0 +1,50 @@
+-- Local gazetteer for offline geocoding
+--
+-- Loaded from bulk files with `wealthmap-admin load-gazetteer` (see
+-- app/services/geocoder.py). Street, city and state values are stored
+-- normalized ("n main st", "austin", "tx") so lookups are plain equality.
+--
+-- gazetteer_points: individual address points (e.g. OpenAddresses)
+-- gazetteer_ranges: house number ranges along street segments (e.g. TIGER
+--                   address features), interpolated between their ends
+-- gazetteer_zips:   zip code centroids, also used for city centroids
+
+CREATE TABLE IF NOT EXISTS gazetteer_points (
+    number TEXT NOT NULL,
+    street TEXT NOT NULL,
+    city TEXT,
+    state TEXT,
+    zip_code TEXT,
+    lng DOUBLE PRECISION NOT NULL,
+    lat DOUBLE PRECISION NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS gazetteer_points_zip_idx ON gazetteer_points(street, zip_code, number);
+CREATE INDEX IF NOT EXISTS gazetteer_points_city_idx ON gazetteer_points(street, city, state, number);
+
+CREATE TABLE IF NOT EXISTS gazetteer_ranges (
+    street TEXT NOT NULL,
+    city TEXT,
+    state TEXT,
+    zip_code TEXT,
+    from_number INTEGER NOT NULL,
+    to_number INTEGER NOT NULL,
+    parity CHAR(1) NOT NULL DEFAULT 'B', -- E(ven), O(dd) or B(oth) numbers
+    start_lng DOUBLE PRECISION NOT NULL,
+    start_lat DOUBLE PRECISION NOT NULL,
+    end_lng DOUBLE PRECISION NOT NULL,
+    end_lat DOUBLE PRECISION NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS gazetteer_ranges_zip_idx ON gazetteer_ranges(street, zip_code);
+CREATE INDEX IF NOT EXISTS gazetteer_ranges_city_idx ON gazetteer_ranges(street, city, state);
+
+CREATE TABLE IF NOT EXISTS gazetteer_zips (
+    zip_code TEXT PRIMARY KEY,
+    city TEXT,
+    state TEXT,
+    lng DOUBLE PRECISION NOT NULL,
+    lat DOUBLE PRECISION NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS gazetteer_zips_city_idx ON gazetteer_zips(city, state);
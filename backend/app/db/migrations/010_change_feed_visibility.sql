@@ -0,0 +1,27 @@
+-- Order the change feed by commit visibility instead of by id.
+--
+-- Change ids are allocated before commit, so a long transaction (a bulk
+-- import) can make ids visible long after higher ids were read. Each row now
+-- records the id of the transaction that wrote it. A consumer's feed
+-- position is the xmin of a snapshot: every transaction below it has
+-- finished, so the changes with txid in [previous position, new position)
+-- are complete and are read exactly once.
+--
+-- Positions are plain BIGINTs (xid8 with its epoch, as text -> bigint).
+
+ALTER TABLE property_changes ADD COLUMN IF NOT EXISTS txid BIGINT NOT NULL DEFAULT 0;
+
+-- Existing rows near any persisted consumer position are re-read once
+UPDATE property_changes SET txid = 1
+WHERE id > (
+    SELECT COALESCE(min(last_change_id), 0) - 1000
+    FROM (
+        SELECT last_change_id FROM heatmap_layers
+        UNION ALL
+        SELECT last_change_id FROM saved_search_groups WHERE last_change_id IS NOT NULL
+    ) positions
+);
+
+ALTER TABLE property_changes ALTER COLUMN txid SET DEFAULT pg_current_xact_id()::text::bigint;
+
+CREATE INDEX IF NOT EXISTS property_changes_txid_idx ON property_changes(txid);
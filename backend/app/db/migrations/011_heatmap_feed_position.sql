@@ -0,0 +1,7 @@
+-- Heatmap layers track the change feed by transaction position (see 010).
+--
+-- last_change_id held a change id. The rows migration 010 marked with
+-- txid = 1 are re-read once from position 1.
+
+ALTER TABLE heatmap_layers RENAME COLUMN last_change_id TO feed_position;
+UPDATE heatmap_layers SET feed_position = 1;
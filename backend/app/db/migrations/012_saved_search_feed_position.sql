@@ -0,0 +1,7 @@
+-- Saved search groups track the change feed by transaction position (see 010).
+--
+-- last_change_id held a change id. Groups that recorded their initial
+-- matches re-read the rows migration 010 marked with txid = 1 once.
+
+ALTER TABLE saved_search_groups RENAME COLUMN last_change_id TO feed_position;
+UPDATE saved_search_groups SET feed_position = 1 WHERE feed_position IS NOT NULL;
@@ -0,0 +1,72 @@
+-- Log every current property of an owner whose holdings change.
+--
+-- The wealth layer splits an owner's net worth across the properties they
+-- currently own, so when an owner gains or loses a property the weights of
+-- all their other properties change too. The ownership trigger of 006 only
+-- logged the changed row. These statement-level triggers log, once per
+-- statement, the changed rows and every current property of their owners
+-- (before and after the change).
+--
+-- Ownerships that lapse through end_date are not written at all; the
+-- heatmap refresh picks those up from property_ownership_end_date_idx.
+
+CREATE OR REPLACE FUNCTION log_ownership_changes(changed_owners UUID[], changed_properties UUID[]) RETURNS VOID AS $$
+    INSERT INTO property_changes (property_id, operation)
+    SELECT DISTINCT affected.property_id, 'O'
+    FROM (
+        SELECT unnest(changed_properties) AS property_id
+        UNION ALL
+        SELECT po.property_id
+        FROM property_ownership po
+        WHERE po.owner_id = ANY(changed_owners)
+          AND (po.end_date IS NULL OR po.end_date > CURRENT_DATE)
+    ) affected
+    WHERE affected.property_id IS NOT NULL;
+$$ LANGUAGE sql;
+
+-- Only the transition tables of the firing trigger exist; plpgsql plans each
+-- branch on first use, so the other branches never reference missing ones
+CREATE OR REPLACE FUNCTION property_ownership_changes_trigger() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM log_ownership_changes(
+            ARRAY(SELECT DISTINCT owner_id FROM new_rows),
+            ARRAY(SELECT DISTINCT property_id FROM new_rows)
+        );
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM log_ownership_changes(
+            ARRAY(SELECT DISTINCT owner_id FROM old_rows),
+            ARRAY(SELECT DISTINCT property_id FROM old_rows)
+        );
+    ELSE
+        PERFORM log_ownership_changes(
+            ARRAY(SELECT owner_id FROM old_rows UNION SELECT owner_id FROM new_rows),
+            ARRAY(SELECT property_id FROM old_rows UNION SELECT property_id FROM new_rows)
+        );
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS property_ownership_change_feed ON property_ownership;
+
+DROP TRIGGER IF EXISTS property_ownership_insert_feed ON property_ownership;
+CREATE TRIGGER property_ownership_insert_feed
+    AFTER INSERT ON property_ownership
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION property_ownership_changes_trigger();
+
+DROP TRIGGER IF EXISTS property_ownership_update_feed ON property_ownership;
+CREATE TRIGGER property_ownership_update_feed
+    AFTER UPDATE ON property_ownership
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION property_ownership_changes_trigger();
+
+DROP TRIGGER IF EXISTS property_ownership_delete_feed ON property_ownership;
+CREATE TRIGGER property_ownership_delete_feed
+    AFTER DELETE ON property_ownership
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION property_ownership_changes_trigger();
+
+CREATE INDEX IF NOT EXISTS property_ownership_end_date_idx
+    ON property_ownership(end_date) WHERE end_date IS NOT NULL;
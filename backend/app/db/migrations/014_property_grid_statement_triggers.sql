@@ -0,0 +1,125 @@
+-- Apply property writes to property_grid_cells once per statement, in a
+-- fixed lock order.
+--
+-- The row trigger of 004 upserted zooms 0-16 for every written row. Low zoom
+-- cells are shared by most properties, so concurrent writers queued on them,
+-- and a location move locked the old and new cells in different orders in
+-- different transactions, which could deadlock. These statement-level
+-- triggers sum the deltas of all written rows per cell and upsert them in a
+-- single statement sorted by (zoom, tile_x, tile_y, property_type), so each
+-- cell is locked once per statement and always in the same order.
+-- Keep the zoom range in sync with PropertyGridService.GRID_MAX_ZOOM.
+
+CREATE OR REPLACE FUNCTION property_grid_apply_rows(
+    locations GEOGRAPHY[], ptypes TEXT[], vals NUMERIC[], signs INTEGER[]
+) RETURNS VOID AS $$
+DECLARE
+    empty_zooms SMALLINT[];
+    empty_xs INTEGER[];
+    empty_ys INTEGER[];
+    empty_types TEXT[];
+BEGIN
+    WITH upserted AS (
+        INSERT INTO property_grid_cells AS c
+            (zoom, tile_x, tile_y, property_type, property_count, value_count, value_sum,
+             value_min, value_max, lng_sum, lat_sum)
+        SELECT z, wm_tile_x(d.lng, z), wm_tile_y(d.lat, z), d.ptype,
+               sum(d.sign),
+               sum(CASE WHEN d.val IS NULL THEN 0 ELSE d.sign END),
+               sum(d.sign * COALESCE(d.val, 0)),
+               min(d.val) FILTER (WHERE d.sign > 0),
+               max(d.val) FILTER (WHERE d.sign > 0),
+               sum(d.sign * d.lng),
+               sum(d.sign * d.lat)
+        FROM (
+            SELECT ST_X(r.loc::geometry) AS lng, ST_Y(r.loc::geometry) AS lat, r.ptype, r.val, r.sign
+            FROM unnest(locations, ptypes, vals, signs) AS r(loc, ptype, val, sign)
+        ) d, generate_series(0, 16) AS z
+        GROUP BY 1, 2, 3, 4
+        ORDER BY 1, 2, 3, 4
+        ON CONFLICT (zoom, tile_x, tile_y, property_type) DO UPDATE SET
+            property_count = c.property_count + EXCLUDED.property_count,
+            value_count = c.value_count + EXCLUDED.value_count,
+            value_sum = c.value_sum + EXCLUDED.value_sum,
+            value_min = LEAST(c.value_min, EXCLUDED.value_min),
+            value_max = GREATEST(c.value_max, EXCLUDED.value_max),
+            lng_sum = c.lng_sum + EXCLUDED.lng_sum,
+            lat_sum = c.lat_sum + EXCLUDED.lat_sum
+        RETURNING c.zoom, c.tile_x, c.tile_y, c.property_type, c.property_count
+    )
+    SELECT array_agg(zoom), array_agg(tile_x), array_agg(tile_y), array_agg(property_type)
+    INTO empty_zooms, empty_xs, empty_ys, empty_types
+    FROM upserted
+    WHERE property_count <= 0;
+
+    -- Rows already locked by the upsert above
+    IF empty_zooms IS NOT NULL THEN
+        DELETE FROM property_grid_cells c
+        USING unnest(empty_zooms, empty_xs, empty_ys, empty_types) AS e(zoom, tile_x, tile_y, property_type)
+        WHERE c.zoom = e.zoom AND c.tile_x = e.tile_x AND c.tile_y = e.tile_y
+          AND c.property_type = e.property_type AND c.property_count <= 0;
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Only the transition tables of the firing trigger exist; plpgsql plans each
+-- branch on first use, so the other branches never reference missing ones
+CREATE OR REPLACE FUNCTION property_grid_statement_trigger() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM property_grid_apply_rows(
+            ARRAY(SELECT location FROM new_rows),
+            ARRAY(SELECT property_type::TEXT FROM new_rows),
+            ARRAY(SELECT current_value FROM new_rows),
+            array_fill(1, ARRAY[(SELECT count(*) FROM new_rows)::INTEGER])
+        );
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM property_grid_apply_rows(
+            ARRAY(SELECT location FROM old_rows),
+            ARRAY(SELECT property_type::TEXT FROM old_rows),
+            ARRAY(SELECT current_value FROM old_rows),
+            array_fill(-1, ARRAY[(SELECT count(*) FROM old_rows)::INTEGER])
+        );
+    ELSE
+        PERFORM property_grid_apply_rows(
+            array_agg(d.location), array_agg(d.property_type::TEXT), array_agg(d.current_value), array_agg(d.sign)
+        )
+        FROM (
+            SELECT o.location, o.property_type, o.current_value, -1 AS sign
+            FROM old_rows o JOIN new_rows n ON n.id = o.id
+            WHERE (n.location, n.property_type, n.current_value)
+                  IS DISTINCT FROM (o.location, o.property_type, o.current_value)
+            UNION ALL
+            SELECT n.location, n.property_type, n.current_value, 1
+            FROM old_rows o JOIN new_rows n ON n.id = o.id
+            WHERE (n.location, n.property_type, n.current_value)
+                  IS DISTINCT FROM (o.location, o.property_type, o.current_value)
+        ) d
+        HAVING count(*) > 0;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS properties_grid_aggregate ON properties;
+
+DROP TRIGGER IF EXISTS properties_grid_insert ON properties;
+CREATE TRIGGER properties_grid_insert
+    AFTER INSERT ON properties
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION property_grid_statement_trigger();
+
+DROP TRIGGER IF EXISTS properties_grid_update ON properties;
+CREATE TRIGGER properties_grid_update
+    AFTER UPDATE ON properties
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION property_grid_statement_trigger();
+
+DROP TRIGGER IF EXISTS properties_grid_delete ON properties;
+CREATE TRIGGER properties_grid_delete
+    AFTER DELETE ON properties
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION property_grid_statement_trigger();
+
+DROP FUNCTION IF EXISTS property_grid_trigger();
+DROP FUNCTION IF EXISTS property_grid_apply(GEOGRAPHY, TEXT, NUMERIC, INTEGER);
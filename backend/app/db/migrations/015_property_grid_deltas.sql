@@ -0,0 +1,100 @@
+-- Queue grid cell deltas on property writes and roll them up asynchronously.
+--
+-- The statement triggers of 014 still upserted zooms 0-16 inside the
+-- writer's transaction. Every property in a region shares its low zoom
+-- cells, so writers held those row locks until commit and ran one at a
+-- time. The triggers now only append the written rows to
+-- property_grid_deltas, which takes no lock another writer waits on.
+-- property_grid_rollup claims queued deltas in id order and applies them
+-- with property_grid_apply_rows from 014, one rollup at a time; run it with
+-- wealthmap-admin rollup-grid (invalidate-tiles also rolls up first).
+
+CREATE TABLE IF NOT EXISTS property_grid_deltas (
+    id BIGSERIAL PRIMARY KEY,
+    location GEOGRAPHY NOT NULL,
+    property_type VARCHAR(50) NOT NULL,
+    current_value NUMERIC(15,2),
+    sign SMALLINT NOT NULL
+);
+
+-- Only the transition tables of the firing trigger exist; plpgsql plans each
+-- branch on first use, so the other branches never reference missing ones
+CREATE OR REPLACE FUNCTION property_grid_statement_trigger() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO property_grid_deltas (location, property_type, current_value, sign)
+        SELECT location, property_type, current_value, 1 FROM new_rows;
+    ELSIF TG_OP = 'DELETE' THEN
+        INSERT INTO property_grid_deltas (location, property_type, current_value, sign)
+        SELECT location, property_type, current_value, -1 FROM old_rows;
+    ELSE
+        INSERT INTO property_grid_deltas (location, property_type, current_value, sign)
+        SELECT d.location, d.property_type, d.current_value, d.sign
+        FROM old_rows o
+        JOIN new_rows n ON n.id = o.id
+        CROSS JOIN LATERAL (VALUES
+            (o.location, o.property_type, o.current_value, -1),
+            (n.location, n.property_type, n.current_value, 1)
+        ) AS d(location, property_type, current_value, sign)
+        WHERE (n.location, n.property_type, n.current_value)
+              IS DISTINCT FROM (o.location, o.property_type, o.current_value);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Apply up to batch_size queued deltas; returns how many were applied
+CREATE OR REPLACE FUNCTION property_grid_rollup(batch_size INTEGER) RETURNS INTEGER AS $$
+DECLARE
+    applied INTEGER;
+    locations GEOGRAPHY[];
+    ptypes TEXT[];
+    vals NUMERIC[];
+    signs INTEGER[];
+BEGIN
+    -- Concurrent rollups would lock the same cells; the second one waits
+    -- here and then sees every delta the first one left behind
+    PERFORM pg_advisory_xact_lock(hashtext('property_grid_rollup'));
+
+    WITH claimed AS (
+        DELETE FROM property_grid_deltas
+        WHERE id IN (SELECT id FROM property_grid_deltas ORDER BY id LIMIT batch_size)
+        RETURNING location, property_type, current_value, sign
+    )
+    SELECT count(*), array_agg(location), array_agg(property_type::TEXT),
+           array_agg(current_value), array_agg(sign::INTEGER)
+    INTO applied, locations, ptypes, vals, signs
+    FROM claimed;
+
+    IF applied > 0 THEN
+        PERFORM property_grid_apply_rows(locations, ptypes, vals, signs);
+    END IF;
+    RETURN applied;
+END;
+$$ LANGUAGE plpgsql;
+
+-- A rebuild reads properties directly, so queued deltas are already counted.
+-- TRUNCATE blocks writers' delta inserts until the rebuild commits, and their
+-- rows are not in its snapshot, so none is counted twice or lost.
+CREATE OR REPLACE FUNCTION property_grid_rebuild() RETURNS VOID AS $$
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('property_grid_rollup'));
+    TRUNCATE property_grid_cells, property_grid_deltas;
+    INSERT INTO property_grid_cells
+        (zoom, tile_x, tile_y, property_type, property_count, value_count, value_sum,
+         value_min, value_max, lng_sum, lat_sum)
+    SELECT z,
+           wm_tile_x(ST_X(p.location::geometry), z),
+           wm_tile_y(ST_Y(p.location::geometry), z),
+           p.property_type,
+           count(*),
+           count(p.current_value),
+           COALESCE(sum(p.current_value), 0),
+           min(p.current_value),
+           max(p.current_value),
+           sum(ST_X(p.location::geometry)),
+           sum(ST_Y(p.location::geometry))
+    FROM properties p, generate_series(0, 16) AS z
+    GROUP BY 1, 2, 3, 4;
+END;
+$$ LANGUAGE plpgsql;
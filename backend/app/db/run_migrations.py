@@ -1,43 +1,94 @@
 import os
 import logging
 from pathlib import Path
+from typing import List, Set
 
-from sqlalchemy import text
+from sqlalchemy import text, inspect
 from app.db.session import engine
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def run_migrations():
-    """Run SQL migrations from the migrations directory."""
-    migrations_dir = Path(__file__).parent / "migrations"
-    
-    if not migrations_dir.exists():
-        logger.error(f"Migrations directory not found: {migrations_dir}")
-        return
-    
-    # Get all SQL files in the migrations directory
-    migration_files = sorted([f for f in migrations_dir.glob("*.sql")])
-    
+MIGRATIONS_DIR = Path(__file__).parent / "migrations"
+MIGRATIONS_TABLE = "schema_migrations"
+
+def get_migration_files() -> List[Path]:
+    """Return all SQL migration files in apply order."""
+    if not MIGRATIONS_DIR.exists():
+        logger.error(f"Migrations directory not found: {MIGRATIONS_DIR}")
+        return []
+
+    return sorted([f for f in MIGRATIONS_DIR.glob("*.sql")])
+
+def get_applied_versions(conn) -> Set[str]:
+    """Return the migration versions recorded in the schema_migrations table."""
+    if not inspect(conn).has_table(MIGRATIONS_TABLE):
+        return set()
+
+    result = conn.execute(text(f"SELECT version FROM {MIGRATIONS_TABLE}"))
+    return {row[0] for row in result}
+
+def get_pending_migrations() -> List[Path]:
+    """Return migration files that have not been applied to the database yet."""
+    with engine.connect() as conn:
+        applied = get_applied_versions(conn)
+
+    return [f for f in get_migration_files() if f.stem not in applied]
+
+def run_migrations() -> List[str]:
+    """Run pending SQL migrations from the migrations directory.
+
+    Each migration is applied in its own transaction together with its
+    schema_migrations row, so a failed migration can simply be re-run.
+    """
+    migration_files = get_migration_files()
+
     if not migration_files:
         logger.warning("No migration files found.")
-        return
-    
-    # Execute each migration file
+        return []
+
+    with engine.begin() as conn:
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} ("
+            "version VARCHAR(255) PRIMARY KEY, "
+            "applied_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP)"
+        ))
+        applied = get_applied_versions(conn)
+
+    applied_now = []
+
+    # Execute each pending migration file
     for migration_file in migration_files:
+        if migration_file.stem in applied:
+            continue
+
         logger.info(f"Running migration: {migration_file.name}")
-        
+
         # Read the SQL file
         with open(migration_file, "r") as f:
             sql = f.read()
-        
-        # Execute the SQL
+
+        # Execute the SQL and record the version atomically
         with engine.begin() as conn:
             conn.execute(text(sql))
-        
+            conn.execute(
+                text(f"INSERT INTO {MIGRATIONS_TABLE} (version) VALUES (:version)"),
+                {"version": migration_file.stem}
+            )
+
+        applied_now.append(migration_file.stem)
         logger.info(f"Migration completed: {migration_file.name}")
 
+    if not applied_now:
+        logger.info("Database schema is up to date.")
+
+    return applied_now
+
+def check_schema_version() -> List[str]:
+    """Return the names of migrations the database is missing, without applying them."""
+    return [f.stem for f in get_pending_migrations()]
+
 if __name__ == "__main__":
     logger.info("Running database migrations...")
     run_migrations()
-    logger.info("Database migrations completed.")
\ No newline at end of file
+    logger.info("Database migrations completed.")
@@ -3,13 +3,6 @@ from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import QueuePool
 import time
-import sys
-import os
-from pathlib import Path
-
-# Add the parent directory to sys.path
-backend_dir = Path(__file__).parent.parent.parent
-sys.path.insert(0, str(backend_dir))
 
 from app.core.config import settings
 
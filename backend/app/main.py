@@ -2,6 +2,7 @@ from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.responses import JSONResponse
+import asyncio
 import logging
 import time
 from starlette.middleware.base import BaseHTTPMiddleware
@@ -12,12 +13,14 @@ from typing import Dict, Callable, List, Optional
 import uuid
 from datetime import datetime, timedelta
 
-from app.db.init_db import init_db, create_initial_admin
-from app.db.run_migrations import run_migrations
-from app.db.session import SessionLocal
+from sqlalchemy import text
+
+from app.db.run_migrations import check_schema_version
+from app.db.session import engine
 from app.api.router import api_router
 from app.core.config import settings
-from app.models.token import TokenBlacklist
+from app.core.cache import cache
+from app.core.pagination import PAGINATION_HEADERS
 
 # Configure logging
 logging.basicConfig(
@@ -258,7 +261,7 @@ if settings.ENVIRONMENT == "production":
         allow_credentials=True,
         allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"],
         allow_headers=["Authorization", "Content-Type", "Accept", "Origin", "User-Agent"],
-        expose_headers=["X-Process-Time", "X-RateLimit-Limit", "X-RateLimit-Remaining", "X-RateLimit-Reset"],
+        expose_headers=["X-Process-Time", "X-RateLimit-Limit", "X-RateLimit-Remaining", "X-RateLimit-Reset"] + PAGINATION_HEADERS,
         max_age=3600,  # Cache preflight requests for 1 hour
     )
 else:
@@ -293,32 +296,133 @@ async def global_exception_handler(request: Request, exc: Exception):
         content={"detail": "An internal server error occurred"}
     )
 
+def _bootstrap_database() -> None:
+    """Run migrations and the admin bootstrap in-process (AUTO_MIGRATE only)."""
+    from app.cli import migrate, bootstrap
+
+    migrate(None)
+    bootstrap(None)
+
+def _validate_schema() -> None:
+    """Fail fast if the database is behind the migrations shipped with this build."""
+    pending = check_schema_version()
+    if not pending:
+        return
+
+    message = f"Database schema is missing migrations: {', '.join(pending)}. Run `wealthmap-admin migrate`."
+    if settings.ENVIRONMENT == "production":
+        raise RuntimeError(message)
+    logger.warning(message)
+
+async def _warm_caches() -> None:
+    """Open a pooled database connection and touch the cache backend before serving traffic."""
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    await cache.get("startup:ping")
+
+def _load_map_index() -> int:
+    """Bulk-load the in-memory map index (MAP_MEMORY_INDEX only)."""
+    from app.db.session import SessionLocal
+    from app.services.map_index import map_index
+
+    db = SessionLocal()
+    try:
+        return map_index.load(db)
+    finally:
+        db.close()
+
+async def _refresh_map_index() -> None:
+    """Apply the property change feed to the map index in the background."""
+    from app.db.session import SessionLocal
+    from app.services.map_index import map_index
+
+    loop = asyncio.get_event_loop()
+    while True:
+        await asyncio.sleep(settings.MAP_MEMORY_INDEX_REFRESH_SECONDS)
+        db = SessionLocal()
+        try:
+            await loop.run_in_executor(None, map_index.refresh, db)
+        except Exception as e:
+            logger.error(f"Map index refresh failed: {e}")
+        finally:
+            db.close()
+
+def _load_typeahead() -> int:
+    """Build the in-memory typeahead index (TYPEAHEAD_INDEX only)."""
+    from app.db.session import SessionLocal
+    from app.services.typeahead import typeahead_index
+
+    db = SessionLocal()
+    try:
+        return typeahead_index.load(db)
+    finally:
+        db.close()
+
+async def _refresh_typeahead() -> None:
+    """Apply property and owner changes to the typeahead index in the background."""
+    from app.db.session import SessionLocal
+    from app.services.typeahead import typeahead_index
+
+    loop = asyncio.get_event_loop()
+    while True:
+        await asyncio.sleep(settings.TYPEAHEAD_REFRESH_SECONDS)
+        db = SessionLocal()
+        try:
+            await loop.run_in_executor(None, typeahead_index.refresh, db)
+        except Exception as e:
+            logger.error(f"Typeahead index refresh failed: {e}")
+        finally:
+            db.close()
+
+def _load_gazetteer() -> int:
+    """Read the geocoding gazetteer into memory (GEOCODER_INDEX only)."""
+    from app.db.session import SessionLocal
+    from app.services.geocoder import gazetteer_index
+
+    db = SessionLocal()
+    try:
+        return gazetteer_index.load(db)
+    finally:
+        db.close()
+
 @app.on_event("startup")
 async def startup_event():
     logger.info("Starting application...")
+    timings = {}
+    started = time.perf_counter()
     try:
-        # Run SQL migrations
-        run_migrations()
+        if settings.AUTO_MIGRATE:
+            step = time.perf_counter()
+            _bootstrap_database()
+            timings["auto_migrate"] = time.perf_counter() - step
         
-        # Initialize database tables
-        init_db()
+        step = time.perf_counter()
+        _validate_schema()
+        timings["schema_check"] = time.perf_counter() - step
         
-        # Create initial admin user
-        db = SessionLocal()
-        try:
-            create_initial_admin(db)
-            
-            # Clean up expired tokens
-            now = datetime.utcnow()
-            db.query(TokenBlacklist).filter(
-                TokenBlacklist.expires_at < now
-            ).delete()
-            db.commit()
-            
-        finally:
-            db.close()
-            
-        logger.info("Database initialization completed successfully.")
+        step = time.perf_counter()
+        await _warm_caches()
+        timings["cache_warmup"] = time.perf_counter() - step
+        
+        if settings.MAP_MEMORY_INDEX:
+            step = time.perf_counter()
+            await asyncio.get_event_loop().run_in_executor(None, _load_map_index)
+            asyncio.ensure_future(_refresh_map_index())
+            timings["map_index"] = time.perf_counter() - step
+        
+        if settings.TYPEAHEAD_INDEX:
+            step = time.perf_counter()
+            await asyncio.get_event_loop().run_in_executor(None, _load_typeahead)
+            asyncio.ensure_future(_refresh_typeahead())
+            timings["typeahead"] = time.perf_counter() - step
+        
+        if settings.GEOCODER_INDEX:
+            step = time.perf_counter()
+            await asyncio.get_event_loop().run_in_executor(None, _load_gazetteer)
+            timings["gazetteer"] = time.perf_counter() - step
+        
+        breakdown = ", ".join(f"{name}={elapsed * 1000:.1f}ms" for name, elapsed in timings.items())
+        logger.info(f"Startup completed in {(time.perf_counter() - started) * 1000:.1f}ms ({breakdown})")
         
         # Log startup
         security_logger.info("Application started")
@@ -1,7 +1,7 @@
 import uuid
 from sqlalchemy import Boolean, Column, String, Integer, Numeric, ForeignKey, DateTime, Date
 from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, synonym
 from sqlalchemy.sql import func
 from geoalchemy2 import Geography
 
@@ -28,6 +28,11 @@ class Property(Base):
     location = Column(Geography('POINT'), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # search_vector (generated tsvector) is managed by migration 002, not the ORM;
+    # see app/services/property_search.py
+    
+    # API schemas and older code refer to the current value as estimated_value
+    estimated_value = synonym("current_value")
     
     # Relationships
     bookmarks = relationship("Bookmark", back_populates="property")
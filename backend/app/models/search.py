@@ -1,7 +1,7 @@
 import uuid
-from sqlalchemy import Column, String, ForeignKey, DateTime, JSON
+from sqlalchemy import BigInteger, Boolean, Column, String, ForeignKey, DateTime, JSON
 from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, synonym
 from sqlalchemy.sql import func
 
 from app.db.session import Base
@@ -13,6 +13,12 @@ class SavedSearch(Base):
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"))
     name = Column(String(255), nullable=False)
     search_criteria = Column(JSON, nullable=False)
+    # The API calls the criteria search_parameters
+    search_parameters = synonym("search_criteria")
+    # Change alerts (migration 008); see SavedSearchAlertService
+    alerts_enabled = Column(Boolean, nullable=False, default=True)
+    criteria_hash = Column(String, nullable=True)
+    last_notified_delta_id = Column(BigInteger, nullable=False, default=0)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
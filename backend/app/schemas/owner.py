@@ -57,4 +57,8 @@ class OwnerWealthData(OwnerWealthDataBase):
 
 # Owner with wealth data
 class OwnerWithWealthData(Owner):
-    wealth_data: Optional[OwnerWealthData] = None
\ No newline at end of file
+    wealth_data: Optional[OwnerWealthData] = None
+
+# Owner search result; match_score is set for fuzzy name searches
+class OwnerSearchResult(OwnerWithWealthData):
+    match_score: Optional[float] = None
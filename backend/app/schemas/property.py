@@ -1,4 +1,5 @@
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Union
+from uuid import UUID
 from pydantic import BaseModel
 from datetime import datetime
 
@@ -37,18 +38,53 @@ class Property(PropertyBase):
     class Config:
         orm_mode = True
 
+# Spatial search results, nearest first
+class PropertyNearby(Property):
+    distance_meters: float
+
+# Search facet counts; each facet ignores its own filter
+class FacetCount(BaseModel):
+    value: str
+    count: int
+
+class RangeFacetCount(BaseModel):
+    min: Optional[float] = None
+    max: Optional[float] = None  # exclusive
+    count: int
+
+class PropertyFacets(BaseModel):
+    total: int
+    property_type: List[FacetCount]
+    value: List[RangeFacetCount]
+    bedrooms: List[RangeFacetCount]  # properties with at least `min` bedrooms
+
 # Properties for map display
 class PropertyMap(BaseModel):
-    id: int
+    id: Union[UUID, str]
     address: str
     property_type: Optional[str] = None
     estimated_value: Optional[float] = None
     latitude: float
     longitude: float
+    # Cluster-only fields
+    count: Optional[int] = None
+    value_min: Optional[float] = None
+    value_max: Optional[float] = None
+    type_counts: Optional[Dict[str, int]] = None
     
     class Config:
         orm_mode = True
 
+# Tile-based map deltas for panning
+class PropertyMapTile(BaseModel):
+    tile: str  # z/x/y
+    features: List[PropertyMap]
+
+class PropertyMapDelta(BaseModel):
+    zoom: int
+    tiles: List[PropertyMapTile]
+    drop_tiles: List[str]
+
 # Bookmark schemas
 class BookmarkBase(BaseModel):
     property_id: int
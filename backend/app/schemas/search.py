@@ -1,24 +1,28 @@
 from typing import Optional, Dict, Any, List
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
+from uuid import UUID
 
 # Shared properties
 class SavedSearchBase(BaseModel):
     name: str
     search_parameters: Dict[str, Any]
+    alerts_enabled: bool = True  # Email new matches
 
 # Properties to receive via API on creation
 class SavedSearchCreate(SavedSearchBase):
     pass
 
-# Properties to receive via API on update
+# Properties to receive via API on update; omitted fields are left unchanged
 class SavedSearchUpdate(SavedSearchBase):
-    pass
+    name: Optional[str] = None
+    search_parameters: Optional[Dict[str, Any]] = None
+    alerts_enabled: Optional[bool] = None
 
 # Properties to return via API
 class SavedSearch(SavedSearchBase):
-    id: int
-    user_id: int
+    id: UUID
+    user_id: UUID
     created_at: datetime
     updated_at: Optional[datetime] = None
     
@@ -34,8 +38,29 @@ class SearchRequest(BaseModel):
     page: Optional[int] = 1
     page_size: Optional[int] = 20
 
+# Advanced search request; see app/services/advanced_search.py for `where`
+class AdvancedSearchRequest(BaseModel):
+    entity: Optional[str] = "property"  # property or owner
+    query: Optional[str] = None
+    where: Optional[Dict[str, Any]] = None
+    sort_by: Optional[str] = None
+    sort_order: Optional[str] = "desc"
+    skip: int = Field(0, ge=0)
+    limit: int = Field(50, ge=1, le=1000)
+    estimate_total: bool = False
+
 # Search suggestion
 class SearchSuggestion(BaseModel):
-    type: str  # property, owner, address, etc.
+    type: str  # property, address, city, zip or owner
     value: str
-    display: str
\ No newline at end of file
+    display: str
+
+# Geocoding result from the local gazetteer
+class GeocodeResult(BaseModel):
+    longitude: float
+    latitude: float
+    precision: str  # address, interpolated, street, zip or city
+    matched: str
+
+class GeocodeBatchRequest(BaseModel):
+    addresses: List[str]
@@ -0,0 +1,448 @@
+"""
+Filter expressions behind ``POST /api/search/advanced``.
+
+A request searches one entity (``property`` or ``owner``) with a ``where``
+expression tree:
+
+- ``{"and": [...]}``, ``{"or": [...]}`` and ``{"not": {...}}`` combine
+  conditions
+- ``{"field": "property.current_value", "op": "between", "value": [a, b]}``
+  is one condition; ``FIELDS`` lists the fields and ``OPERATORS`` the
+  operators each kind of field takes
+- ``property.location`` takes ``near`` (``{"lng", "lat", "radius", "unit"}``),
+  ``within_bbox`` (``[lng_min, lat_min, lng_max, lat_max]``) and
+  ``within_polygon`` (``"lng lat, lng lat, ..."``), answered by the GiST
+  indexes as in ``SpatialSearchService``
+
+The tree compiles to a single SELECT on the entity's table. Conditions on
+the other side of ``property_ownership`` (e.g. ``owner.*`` and ``wealth.*``
+for properties) become one correlated ``EXISTS`` per group of siblings, which
+joins only the tables those conditions use and never duplicates result rows;
+siblings combined with ``and`` must hold for the same current owner (or
+property). ``wealth.*`` fields read each owner's latest ``wealth_data`` row
+(``latest_wealth``), so owners are never repeated either.
+
+Compiling is keyed by the *shape* of the request (fields, operators and
+sort, with every value replaced by a bind parameter), so repeated shapes
+with different values reuse the compiled statement from a per-process LRU
+of ``SEARCH_PLAN_CACHE_SIZE`` plans.
+"""
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import and_, bindparam, exists, func, literal_column, not_, or_, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.pagination import get_total
+from app.services.spatial_search import SpatialSearchService
+from app.services.unified_search import _row_dict, latest_wealth, ownership, owners, properties
+
+logger = logging.getLogger(__name__)
+
+ENTITIES = ("property", "owner")
+# Limits on the size of an expression tree
+MAX_DEPTH = 8
+MAX_CONDITIONS = 50
+MAX_IN_VALUES = 1000
+
+class Field(NamedTuple):
+    column: Any
+    table: str  # property, ownership, owner or wealth
+    kind: str  # number, text, date or geo
+
+FIELDS: Dict[str, Field] = {
+    "property.address": Field(properties.c.address, "property", "text"),
+    "property.city": Field(properties.c.city, "property", "text"),
+    "property.state": Field(properties.c.state, "property", "text"),
+    "property.zip_code": Field(properties.c.zip_code, "property", "text"),
+    "property.property_type": Field(properties.c.property_type, "property", "text"),
+    "property.bedrooms": Field(properties.c.bedrooms, "property", "number"),
+    "property.bathrooms": Field(properties.c.bathrooms, "property", "number"),
+    "property.square_feet": Field(properties.c.square_feet, "property", "number"),
+    "property.lot_size": Field(properties.c.lot_size, "property", "number"),
+    "property.year_built": Field(properties.c.year_built, "property", "number"),
+    "property.last_sale_date": Field(properties.c.last_sale_date, "property", "date"),
+    "property.last_sale_price": Field(properties.c.last_sale_price, "property", "number"),
+    "property.current_value": Field(properties.c.current_value, "property", "number"),
+    "property.location": Field(properties.c.location, "property", "geo"),
+    "ownership.ownership_percentage": Field(ownership.c.ownership_percentage, "ownership", "number"),
+    "ownership.start_date": Field(ownership.c.start_date, "ownership", "date"),
+    "owner.name": Field(owners.c.name, "owner", "text"),
+    "owner.owner_type": Field(owners.c.owner_type, "owner", "text"),
+    "wealth.estimated_net_worth": Field(latest_wealth.c.estimated_net_worth, "wealth", "number"),
+    "wealth.confidence_level": Field(latest_wealth.c.confidence_level, "wealth", "number"),
+    "wealth.liquid_assets": Field(latest_wealth.c.liquid_assets, "wealth", "number"),
+    "wealth.real_estate_assets": Field(latest_wealth.c.real_estate_assets, "wealth", "number"),
+    "wealth.investment_assets": Field(latest_wealth.c.investment_assets, "wealth", "number"),
+    "wealth.other_assets": Field(latest_wealth.c.other_assets, "wealth", "number"),
+}
+
+_COMPARISONS = ("eq", "ne", "lt", "lte", "gt", "gte", "between", "in", "is_null")
+OPERATORS = {
+    "number": _COMPARISONS,
+    "date": _COMPARISONS,
+    "text": ("eq", "ne", "in", "contains", "prefix", "is_null"),
+    "geo": ("near", "within_bbox", "within_polygon"),
+}
+
+# Tables each entity's statement reads directly; the rest go through EXISTS
+LOCAL_TABLES = {"property": {"property"}, "owner": {"owner", "wealth"}}
+DEFAULT_SORT = {"property": "property.current_value", "owner": "wealth.estimated_net_worth"}
+
+class Plan(NamedTuple):
+    statement: Any
+    order: List[Any]
+
+_plans: "OrderedDict[str, Plan]" = OrderedDict()
+_plans_lock = threading.Lock()
+
+def clear_plans() -> None:
+    with _plans_lock:
+        _plans.clear()
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def _number(value: Any, name: str) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"{name} needs a number, got {value!r}")
+    return value
+
+def _scalar(kind: str, value: Any, name: str) -> Any:
+    if kind == "number":
+        return _number(value, name)
+    if kind == "date":
+        try:
+            return date.fromisoformat(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"{name} needs an ISO date, got {value!r}")
+    if not isinstance(value, str):
+        raise ValueError(f"{name} needs a string, got {value!r}")
+    return value
+
+def _geo_values(op: str, value: Any) -> List[Any]:
+    """Validate a location condition and return its bind values."""
+    if op == "near":
+        if not isinstance(value, dict) or not {"lng", "lat", "radius"} <= set(value):
+            raise ValueError("near needs {lng, lat, radius[, unit]}")
+        lng, lat = _number(value["lng"], "near lng"), _number(value["lat"], "near lat")
+        meters = SpatialSearchService.radius_meters(_number(value["radius"], "near radius"), value.get("unit", "km"))
+        # Validates the point
+        SpatialSearchService.center_point(lng, lat)
+        return [f"SRID=4326;POINT({lng!r} {lat!r})", meters]
+    if op == "within_bbox":
+        if not isinstance(value, list) or len(value) != 4:
+            raise ValueError("within_bbox needs [lng_min, lat_min, lng_max, lat_max]")
+        lng_min, lat_min, lng_max, lat_max = [_number(v, "within_bbox") for v in value]
+        SpatialSearchService.center_point(lng_min, lat_min)
+        SpatialSearchService.center_point(lng_max, lat_max)
+        if lng_min >= lng_max or lat_min >= lat_max:
+            raise ValueError("within_bbox minimums must be below its maximums")
+        return [lng_min, lat_min, lng_max, lat_max]
+    if not isinstance(value, str):
+        raise ValueError("within_polygon needs 'lng lat, lng lat, ...'")
+    ring = SpatialSearchService.parse_polygon(value)
+    return ["SRID=4326;POLYGON((" + ", ".join(f"{lng!r} {lat!r}" for lng, lat in ring) + "))"]
+
+class _Parser:
+    """Validates a request tree into its shape and bind parameters."""
+
+    def __init__(self):
+        self.params: Dict[str, Any] = {}
+        self.conditions = 0
+
+    def bind(self, value: Any) -> str:
+        name = f"p{len(self.params)}"
+        self.params[name] = value
+        return name
+
+    def parse(self, node: Any, depth: int = 1) -> Dict[str, Any]:
+        if depth > MAX_DEPTH:
+            raise ValueError(f"Filters may nest at most {MAX_DEPTH} levels deep")
+        if not isinstance(node, dict):
+            raise ValueError(f"A filter must be an object, got {node!r}")
+
+        for combinator in ("and", "or"):
+            if combinator in node:
+                children = node[combinator]
+                if len(node) != 1 or not isinstance(children, list) or not children:
+                    raise ValueError(f"'{combinator}' needs a non-empty list of filters")
+                return {combinator: [self.parse(child, depth + 1) for child in children]}
+        if "not" in node:
+            if len(node) != 1:
+                raise ValueError("'not' takes a single filter")
+            return {"not": self.parse(node["not"], depth + 1)}
+        return self.condition(node)
+
+    def condition(self, node: Dict[str, Any]) -> Dict[str, Any]:
+        self.conditions += 1
+        if self.conditions > MAX_CONDITIONS:
+            raise ValueError(f"At most {MAX_CONDITIONS} conditions are allowed")
+
+        name, op, value = node.get("field"), node.get("op"), node.get("value")
+        unknown = set(node) - {"field", "op", "value"}
+        if unknown:
+            raise ValueError(f"Unknown filter key(s): {', '.join(sorted(unknown))}")
+        if name not in FIELDS:
+            raise ValueError(f"Unknown field: {name!r}")
+        kind = FIELDS[name].kind
+        if op not in OPERATORS[kind]:
+            raise ValueError(f"{name} supports: {', '.join(OPERATORS[kind])}")
+
+        shape = {"field": name, "op": op}
+        label = f"{name} {op}"
+        if op == "is_null":
+            # IS NULL and IS NOT NULL are different statements
+            if not isinstance(value, bool):
+                raise ValueError(f"{label} needs true or false")
+            shape["value"] = value
+        elif kind == "geo":
+            shape["param"] = [self.bind(v) for v in _geo_values(op, value)]
+        elif op == "between":
+            if not isinstance(value, list) or len(value) != 2:
+                raise ValueError(f"{label} needs [low, high]")
+            shape["param"] = [self.bind(_scalar(kind, v, label)) for v in value]
+        elif op == "in":
+            if not isinstance(value, list) or not 0 < len(value) <= MAX_IN_VALUES:
+                raise ValueError(f"{label} needs a list of 1 to {MAX_IN_VALUES} values")
+            shape["param"] = self.bind([_scalar(kind, v, label) for v in value])
+        elif op in ("contains", "prefix"):
+            text = _escape_like(_scalar(kind, value, label))
+            shape["param"] = self.bind(f"%{text}%" if op == "contains" else f"{text}%")
+        else:
+            shape["param"] = self.bind(_scalar(kind, value, label))
+        return shape
+
+def _tables(shape: Dict[str, Any]) -> Set[str]:
+    """Tables a shape's conditions read."""
+    if "field" in shape:
+        return {FIELDS[shape["field"]].table}
+    if "not" in shape:
+        return _tables(shape["not"])
+    return set().union(*(_tables(child) for child in next(iter(shape.values()))))
+
+def _leaf(shape: Dict[str, Any]) -> Any:
+    field = FIELDS[shape["field"]]
+    column, op = field.column, shape["op"]
+    if op == "is_null":
+        return column.is_(None) if shape["value"] else column.isnot(None)
+
+    param = shape["param"]
+    if op == "between":
+        return column.between(bindparam(param[0]), bindparam(param[1]))
+    if op == "in":
+        return column.in_(bindparam(param, expanding=True))
+    if op == "near":
+        return func.ST_DWithin(column, func.ST_GeogFromText(bindparam(param[0])), bindparam(param[1]))
+    if op in ("within_bbox", "within_polygon"):
+        area = (
+            func.ST_MakeEnvelope(*[bindparam(name) for name in param], 4326) if op == "within_bbox"
+            else func.ST_GeomFromEWKT(bindparam(param[0]))
+        )
+        # Matches the properties_location_geom_idx expression index
+        return func.ST_Intersects(literal_column("properties.location::geometry"), area)
+    if op in ("contains", "prefix"):
+        return column.ilike(bindparam(param), escape="\\")
+    return {
+        "eq": column.__eq__, "ne": column.__ne__, "lt": column.__lt__,
+        "lte": column.__le__, "gt": column.__gt__, "gte": column.__ge__,
+    }[op](bindparam(param))
+
+def _related_only(shape: Dict[str, Any], entity: str) -> bool:
+    return _tables(shape).isdisjoint(LOCAL_TABLES[entity])
+
+def _inner(shape: Dict[str, Any]) -> Any:
+    """Compile a shape whose tables are all joined in."""
+    if "field" in shape:
+        return _leaf(shape)
+    if "not" in shape:
+        return not_(_inner(shape["not"]))
+    combinator, children = next(iter(shape.items()))
+    return (and_ if combinator == "and" else or_)(*[_inner(child) for child in children])
+
+def _exists(entity: str, shape: Dict[str, Any]) -> Any:
+    """EXISTS over the current ownerships, joining only the tables ``shape`` reads."""
+    tables = _tables(shape)
+    source = ownership
+    if entity == "property":
+        if "owner" in tables:
+            source = source.join(owners, owners.c.id == ownership.c.owner_id)
+        if "wealth" in tables:
+            source = source.join(latest_wealth, latest_wealth.c.owner_id == ownership.c.owner_id)
+        link = ownership.c.property_id == properties.c.id
+    else:
+        if "property" in tables:
+            source = source.join(properties, properties.c.id == ownership.c.property_id)
+        link = ownership.c.owner_id == owners.c.id
+    return exists().select_from(source).where(link, ownership.c.end_date.is_(None), _inner(shape))
+
+def _clause(shape: Dict[str, Any], entity: str) -> Any:
+    """Compile a shape against ``entity``'s statement."""
+    if _related_only(shape, entity):
+        return _exists(entity, shape)
+    if "field" in shape:
+        return _leaf(shape)
+    if "not" in shape:
+        return not_(_clause(shape["not"], entity))
+
+    combinator, children = next(iter(shape.items()))
+    clauses = [_clause(child, entity) for child in children if not _related_only(child, entity)]
+    related = [child for child in children if _related_only(child, entity)]
+    if related:
+        # One subquery for all related siblings
+        clauses.append(_exists(entity, related[0] if len(related) == 1 else {combinator: related}))
+    return (and_ if combinator == "and" else or_)(*clauses)
+
+def _columns(entity: str) -> List[Any]:
+    if entity == "property":
+        geometry = literal_column("properties.location::geometry")
+        return [
+            properties.c.id,
+            properties.c.address,
+            properties.c.city,
+            properties.c.state,
+            properties.c.zip_code,
+            properties.c.property_type,
+            properties.c.bedrooms,
+            properties.c.bathrooms,
+            properties.c.square_feet,
+            properties.c.year_built,
+            properties.c.current_value,
+            func.ST_Y(geometry).label("latitude"),
+            func.ST_X(geometry).label("longitude"),
+        ]
+    properties_count = (
+        select(func.count())
+        .where(ownership.c.owner_id == owners.c.id, ownership.c.end_date.is_(None))
+        .scalar_subquery()
+    )
+    return [
+        owners.c.id,
+        owners.c.name,
+        owners.c.owner_type,
+        latest_wealth.c.estimated_net_worth,
+        properties_count.label("properties_count"),
+    ]
+
+class AdvancedSearchService:
+    @staticmethod
+    def parse_request(
+        entity: Optional[str],
+        query: Optional[str],
+        where: Optional[Dict[str, Any]],
+        sort_by: Optional[str],
+        sort_order: Optional[str]
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Validate a request into its shape and bind parameters. Raises
+        ValueError on bad input.
+        """
+        entity = entity or "property"
+        if entity not in ENTITIES:
+            raise ValueError(f"entity must be one of: {', '.join(ENTITIES)}")
+
+        nodes = [where] if where else []
+        q = (query or "").strip()
+        if q:
+            # Free text narrows the expression like the plain search box does
+            nodes.append({"or": [
+                {"field": "property.address", "op": "contains", "value": q},
+                {"field": "property.city", "op": "contains", "value": q},
+                {"field": "property.zip_code", "op": "prefix", "value": q},
+            ]} if entity == "property" else {"field": "owner.name", "op": "contains", "value": q})
+
+        parser = _Parser()
+        shape = None
+        if nodes:
+            shape = parser.parse(nodes[0] if len(nodes) == 1 else {"and": nodes})
+
+        sort_by = sort_by or DEFAULT_SORT[entity]
+        field = FIELDS.get(sort_by)
+        if field is None or field.table not in LOCAL_TABLES[entity] or field.kind == "geo":
+            sortable = [name for name, f in FIELDS.items() if f.table in LOCAL_TABLES[entity] and f.kind != "geo"]
+            raise ValueError(f"sort_by must be one of: {', '.join(sortable)}")
+        sort_order = sort_order or "desc"
+        if sort_order not in ("asc", "desc"):
+            raise ValueError("sort_order must be asc or desc")
+
+        return {"entity": entity, "where": shape, "sort_by": sort_by, "sort_order": sort_order}, parser.params
+
+    @staticmethod
+    def compile(spec: Dict[str, Any]) -> Plan:
+        """Build the statement for a request shape."""
+        entity = spec["entity"]
+        if entity == "property":
+            statement = select(*_columns(entity))
+            key = properties.c.id
+        else:
+            statement = select(*_columns(entity)).select_from(
+                owners.outerjoin(latest_wealth, latest_wealth.c.owner_id == owners.c.id)
+            )
+            key = owners.c.id
+        if spec["where"] is not None:
+            statement = statement.where(_clause(spec["where"], entity))
+
+        column = FIELDS[spec["sort_by"]].column
+        if spec["sort_order"] == "desc":
+            order = [column.desc().nullslast(), key.desc()]
+        else:
+            order = [column.asc().nullslast(), key.asc()]
+        return Plan(statement, order)
+
+    @staticmethod
+    def plan(spec: Dict[str, Any]) -> Plan:
+        """The compiled plan for a request shape, from the LRU when possible."""
+        key = hashlib.sha1(json.dumps(spec, sort_keys=True).encode()).hexdigest()
+        with _plans_lock:
+            if key in _plans:
+                _plans.move_to_end(key)
+                return _plans[key]
+        plan = AdvancedSearchService.compile(spec)
+        with _plans_lock:
+            _plans[key] = plan
+            while len(_plans) > settings.SEARCH_PLAN_CACHE_SIZE:
+                _plans.popitem(last=False)
+        return plan
+
+    @staticmethod
+    def search(
+        db: Session,
+        spec: Dict[str, Any],
+        params: Dict[str, Any],
+        skip: int = 0,
+        limit: int = 50,
+        estimate_total: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Run a parsed request. Owners are split into ``owners`` (individuals)
+        and ``companies`` (every other owner type), as on /location.
+        """
+        plan = AdvancedSearchService.plan(spec)
+        # Binding values keeps the statement's structure, so SQLAlchemy's
+        # compiled cache is hit as well
+        statement = plan.statement.params(**params)
+        rows = [
+            _row_dict(row)
+            for row in db.execute(statement.order_by(*plan.order).offset(skip).limit(limit))
+        ]
+
+        total, is_estimate = None, False
+        if estimate_total:
+            if skip == 0 and len(rows) < limit:
+                total = len(rows)
+            else:
+                total, is_estimate = get_total(db, statement)
+
+        result = {"properties": [], "owners": [], "companies": [], "total": total, "is_estimate": is_estimate}
+        if spec["entity"] == "property":
+            result["properties"] = rows
+        else:
+            for row in rows:
+                result["owners" if row["owner_type"] == "individual" else "companies"].append(row)
+        return result
@@ -2,7 +2,8 @@ import logging
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from typing import List, Optional
+from html import escape
+from typing import Any, Dict, List, Optional
 
 from app.core.config import settings
 
@@ -208,4 +209,59 @@ class EmailService:
         </html>
         """
         
-        return await EmailService.send_email(recipient_email, subject, html_content)
\ No newline at end of file
+        return await EmailService.send_email(recipient_email, subject, html_content)
+    
+    @staticmethod
+    async def send_saved_search_alert(
+        recipient_email: str,
+        searches: List[Dict[str, Any]]
+    ) -> bool:
+        """
+        Send a digest of new matches for the recipient's saved searches.
+        Each search has ``name``, ``new_matches`` and a few ``addresses``.
+        """
+        total = sum(search["new_matches"] for search in searches)
+        subject = f"{total} new propert{'y' if total == 1 else 'ies'} match your saved searches"
+        
+        items = []
+        for search in searches:
+            addresses = "".join(f"<li>{escape(address)}</li>" for address in search["addresses"])
+            more = search["new_matches"] - len(search["addresses"])
+            if more > 0:
+                addresses += f"<li>and {more} more</li>"
+            items.append(
+                f"<p><strong>{escape(search['name'])}</strong>: {search['new_matches']} new match(es)</p>"
+                f"<ul>{addresses}</ul>"
+            )
+        
+        html_content = f"""
+        <html>
+        <head>
+            <style>
+                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
+                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
+                .header {{ background-color: #4a6cf7; color: white; padding: 20px; text-align: center; }}
+                .content {{ padding: 20px; }}
+                .footer {{ text-align: center; margin-top: 30px; font-size: 12px; color: #666; }}
+            </style>
+        </head>
+        <body>
+            <div class="container">
+                <div class="header">
+                    <h1>New Saved Search Matches</h1>
+                </div>
+                <div class="content">
+                    <p>Hello,</p>
+                    <p>These properties started matching your saved searches since our last update:</p>
+                    {"".join(items)}
+                    <p>Best regards,<br>The Wealth Map Team</p>
+                </div>
+                <div class="footer">
+                    <p>You can turn off alerts for a saved search in Wealth Map.</p>
+                </div>
+            </div>
+        </body>
+        </html>
+        """
+        
+        return await EmailService.send_email(recipient_email, subject, html_content)
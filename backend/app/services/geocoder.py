@@ -0,0 +1,574 @@
+"""
+Offline geocoding against the local gazetteer (migration 009).
+
+Addresses are parsed into normalized parts (house number, street, city,
+state, zip) and resolved from the most to the least precise source:
+
+- ``address``: an address point with the same number on the street
+- ``interpolated``: a street segment whose house number range holds the
+  number, interpolated between the segment's ends
+- ``street``: the center of the street's points and segments
+- ``zip`` and ``city``: zip code centroids, and their mean per city
+
+Streets are looked up within the given zip code and within the city, since
+zip codes on input are often wrong. A city without a state resolves to the
+state where it has the most zip codes.
+
+When ``GEOCODER_INDEX`` is enabled each API worker answers from an
+in-memory copy of the gazetteer; otherwise every lookup is an indexed
+query. Results, including misses, are cached per normalized address. Bulk
+files are loaded with ``wealthmap-admin load-gazetteer``, which COPYs the
+normalized rows in, and CSV files of addresses are geocoded offline with
+``wealthmap-admin geocode``; API workers pick up a new gazetteer on restart.
+"""
+import csv
+import io
+import logging
+import re
+import threading
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, TextIO, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.services.typeahead import normalize
+
+logger = logging.getLogger(__name__)
+
+Point = Tuple[float, float]  # (lng, lat)
+
+# Rows sent per COPY when loading a gazetteer file
+COPY_CHUNK = 50000
+
+RANGE_COLUMNS = "street, city, state, zip_code, from_number, to_number, parity, start_lng, start_lat, end_lng, end_lat"
+# A street is looked up in the given zip code and in the city
+PLACE_SQL = "(zip_code = :zip_code OR (city = :city AND state = :state))"
+# Prefer rows in the zip code over same-named streets elsewhere in the city, as _places does;
+# IS TRUE keeps rows without a zip code (a NULL comparison) from sorting first
+PLACE_ORDER_SQL = "ORDER BY (zip_code = :zip_code) IS TRUE DESC"
+
+STREET_ABBREVIATIONS = {
+    "north": "n", "south": "s", "east": "e", "west": "w",
+    "northeast": "ne", "northwest": "nw", "southeast": "se", "southwest": "sw",
+    "street": "st", "avenue": "ave", "av": "ave", "boulevard": "blvd", "road": "rd",
+    "drive": "dr", "lane": "ln", "court": "ct", "place": "pl", "terrace": "ter",
+    "parkway": "pkwy", "highway": "hwy", "circle": "cir", "square": "sq",
+    "trail": "trl", "expressway": "expy", "freeway": "fwy", "plaza": "plz",
+    "point": "pt", "crossing": "xing", "mount": "mt", "saint": "st",
+}
+STREET_SUFFIXES = {
+    "st", "ave", "blvd", "rd", "dr", "ln", "ct", "pl", "ter", "pkwy", "hwy", "cir",
+    "sq", "trl", "expy", "fwy", "plz", "xing", "way", "loop", "row", "walk",
+}
+
+STATES = {
+    "alabama": "al", "alaska": "ak", "arizona": "az", "arkansas": "ar", "california": "ca",
+    "colorado": "co", "connecticut": "ct", "delaware": "de", "district of columbia": "dc",
+    "florida": "fl", "georgia": "ga", "hawaii": "hi", "idaho": "id", "illinois": "il",
+    "indiana": "in", "iowa": "ia", "kansas": "ks", "kentucky": "ky", "louisiana": "la",
+    "maine": "me", "maryland": "md", "massachusetts": "ma", "michigan": "mi",
+    "minnesota": "mn", "mississippi": "ms", "missouri": "mo", "montana": "mt",
+    "nebraska": "ne", "nevada": "nv", "new hampshire": "nh", "new jersey": "nj",
+    "new mexico": "nm", "new york": "ny", "north carolina": "nc", "north dakota": "nd",
+    "ohio": "oh", "oklahoma": "ok", "oregon": "or", "pennsylvania": "pa",
+    "rhode island": "ri", "south carolina": "sc", "south dakota": "sd", "tennessee": "tn",
+    "texas": "tx", "utah": "ut", "vermont": "vt", "virginia": "va", "washington": "wa",
+    "west virginia": "wv", "wisconsin": "wi", "wyoming": "wy", "puerto rico": "pr",
+}
+STATES.update({code: code for code in list(STATES.values())})
+# Also street abbreviations ("Oak Ct", "Main St NE")
+_STREET_WORDS = set(STREET_ABBREVIATIONS.values()) | STREET_SUFFIXES
+
+_UNIT_RE = re.compile(r"(?:#|\b(?:apt|apartment|unit|suite|ste|rm|room|floor)\b\.?)\s*[\w-]+", re.IGNORECASE)
+_NUMBER_RE = re.compile(r"^\d+[a-z]?$")
+_ZIP_RE = re.compile(r"^\d{5}$")
+
+def normalize_street(value: Optional[str]) -> str:
+    """Normalized street name with USPS-style abbreviations ("N Main St")."""
+    return " ".join(STREET_ABBREVIATIONS.get(word, word) for word in normalize(value).split())
+
+def normalize_state(value: Optional[str]) -> str:
+    state = normalize(value)
+    return STATES.get(state, state)
+
+def normalize_zip(value: Optional[str]) -> str:
+    digits = re.sub(r"\D", "", (value or "").split("-")[0])
+    # Spreadsheets drop the leading zeros of New England zip codes
+    return digits.zfill(5) if 3 <= len(digits) <= 5 else ""
+
+def house_number(number: Optional[str]) -> Optional[int]:
+    match = re.match(r"\d+", number or "")
+    return int(match.group()) if match else None
+
+@dataclass(frozen=True)
+class ParsedAddress:
+    number: Optional[str] = None
+    street: Optional[str] = None
+    city: Optional[str] = None
+    state: Optional[str] = None
+    zip_code: Optional[str] = None
+
+    @property
+    def key(self) -> str:
+        """Cache key shared by every spelling of the address."""
+        return "|".join(part or "" for part in (self.number, self.street, self.city, self.state, self.zip_code))
+
+@dataclass(frozen=True)
+class GeocodeResult:
+    longitude: float
+    latitude: float
+    precision: str  # address, interpolated, street, zip or city
+    matched: str
+
+    def dict(self) -> Dict[str, Any]:
+        return {
+            "longitude": self.longitude,
+            "latitude": self.latitude,
+            "precision": self.precision,
+            "matched": self.matched,
+        }
+
+def parse_address(value: Optional[str]) -> ParsedAddress:
+    """
+    Split a free-form US address ("123 North Main Street Apt 4, Austin, TX
+    78701") or place ("Austin, Texas", "78701") into normalized parts.
+    """
+    parts = [normalize(part) for part in _UNIT_RE.sub(" ", value or "").split(",")]
+    parts = [part for part in parts if part]
+    if not parts:
+        return ParsedAddress()
+
+    # Zip code and state come last, alone or at the end of the last part
+    words = parts[-1].split()
+    zip_code = None
+    if len(words) > 1 and re.match(r"^\d{4}$", words[-1]) and _ZIP_RE.match(words[-2]):
+        words.pop()  # ZIP+4
+    if words and _ZIP_RE.match(words[-1]):
+        zip_code = words.pop()
+    state = None
+    for size in (3, 2, 1):
+        # A lone word is only a state when something precedes it ("Washington" is a city too)
+        if len(words) > size or (len(words) == size and len(parts) > 1):
+            candidate = " ".join(words[-size:])
+            if len(parts) == 1 and candidate in _STREET_WORDS:
+                continue
+            if candidate in STATES:
+                state = STATES[candidate]
+                del words[-size:]
+                break
+    parts[-1] = " ".join(words)
+    parts = [part for part in parts if part]
+    if not parts:
+        return ParsedAddress(state=state, zip_code=zip_code)
+
+    first = parts[0].split()
+    city = parts[1] if len(parts) > 1 else None
+    if len(first) > 1 and _NUMBER_RE.match(first[0]):
+        number, street_words = first[0], first[1:]
+        if city is None:
+            # No commas: the city follows the last street suffix ("123 Main St Austin")
+            suffixes = [i for i, word in enumerate(street_words) if normalize_street(word) in STREET_SUFFIXES]
+            if suffixes and suffixes[-1] < len(street_words) - 1:
+                end = suffixes[-1] + 1
+                city = " ".join(street_words[end:])
+                street_words = street_words[:end]
+        return ParsedAddress(number, normalize_street(" ".join(street_words)), city, state, zip_code)
+    if city is not None:
+        return ParsedAddress(None, normalize_street(parts[0]), city, state, zip_code)
+    return ParsedAddress(city=parts[0], state=state, zip_code=zip_code)
+
+class _Range(NamedTuple):
+    from_number: int
+    to_number: int
+    parity: str
+    start_lng: float
+    start_lat: float
+    end_lng: float
+    end_lat: float
+
+    def contains(self, number: int) -> bool:
+        low, high = sorted((self.from_number, self.to_number))
+        return low <= number <= high and self.parity in ("B", "E" if number % 2 == 0 else "O")
+
+    def interpolate(self, number: int) -> Point:
+        span = self.to_number - self.from_number
+        t = (number - self.from_number) / span if span else 0.5
+        return (self.start_lng + (self.end_lng - self.start_lng) * t, self.start_lat + (self.end_lat - self.start_lat) * t)
+
+    @property
+    def midpoint(self) -> Point:
+        return ((self.start_lng + self.end_lng) / 2, (self.start_lat + self.end_lat) / 2)
+
+def _places(zip_code: Optional[str], city: Optional[str], state: Optional[str]) -> List[str]:
+    places = [zip_code] if zip_code else []
+    if city and state:
+        places.append(f"{city}|{state}")
+    return places
+
+def _mean(points: Sequence[Point]) -> Optional[Point]:
+    if not points:
+        return None
+    return (sum(p[0] for p in points) / len(points), sum(p[1] for p in points) / len(points))
+
+@dataclass(frozen=True)
+class _Gazetteer:
+    points: Dict[Tuple[str, str], Dict[str, Point]]  # (street, place) -> number -> point
+    ranges: Dict[Tuple[str, str], List[_Range]]  # (street, place) -> segments
+    zips: Dict[str, Tuple[Point, str, str]]  # zip -> (centroid, city, state)
+    cities: Dict[Tuple[str, str], Point]  # (city, state) -> centroid
+    city_states: Dict[str, str]  # city -> state with the most zip codes
+
+class GazetteerIndex:
+    """In-memory gazetteer shared by the requests of one worker."""
+
+    def __init__(self):
+        self._data: Optional[_Gazetteer] = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self._data is not None
+
+    def set_rows(self, points: Iterable[Sequence[Any]], ranges: Iterable[Sequence[Any]], zips: Iterable[Sequence[Any]]) -> int:
+        """Build the index from rows in gazetteer table column order. Returns the row count."""
+        count = 0
+        point_index: Dict[Tuple[str, str], Dict[str, Point]] = defaultdict(dict)
+        for number, street, city, state, zip_code, lng, lat in points:
+            for place in _places(zip_code, city, state):
+                point_index[(street, place)].setdefault(number, (float(lng), float(lat)))
+            count += 1
+
+        range_index: Dict[Tuple[str, str], List[_Range]] = defaultdict(list)
+        for street, city, state, zip_code, *segment in ranges:
+            segment = _Range(int(segment[0]), int(segment[1]), segment[2], *map(float, segment[3:]))
+            for place in _places(zip_code, city, state):
+                range_index[(street, place)].append(segment)
+            count += 1
+
+        zip_index = {}
+        by_city: Dict[Tuple[str, str], List[Point]] = defaultdict(list)
+        for zip_code, city, state, lng, lat in zips:
+            point = (float(lng), float(lat))
+            zip_index[zip_code] = (point, city, state)
+            if city and state:
+                by_city[(city, state)].append(point)
+            count += 1
+        city_states = {}
+        for (city, state), centroids in sorted(by_city.items(), key=lambda item: len(item[1])):
+            city_states[city] = state
+
+        self._data = _Gazetteer(
+            points=dict(point_index),
+            ranges=dict(range_index),
+            zips=zip_index,
+            cities={key: _mean(centroids) for key, centroids in by_city.items()},
+            city_states=city_states,
+        )
+        clear_cache()
+        return count
+
+    def load(self, db: Session) -> int:
+        """Read the gazetteer tables into memory. Returns the number of rows."""
+        with self._lock:
+            count = self.set_rows(
+                db.execute(text("SELECT number, street, city, state, zip_code, lng, lat FROM gazetteer_points")),
+                db.execute(text(f"SELECT {RANGE_COLUMNS} FROM gazetteer_ranges")),
+                db.execute(text("SELECT zip_code, city, state, lng, lat FROM gazetteer_zips")),
+            )
+            db.rollback()
+        logger.info(f"Gazetteer index loaded {count} rows")
+        return count
+
+    # Lookups; the same interface as _DatabaseGazetteer
+
+    def address_point(self, street: str, number: str, zip_code, city, state) -> Optional[Point]:
+        for place in _places(zip_code, city, state):
+            point = self._data.points.get((street, place), {}).get(number)
+            if point is not None:
+                return point
+        return None
+
+    def interpolate(self, street: str, number: int, zip_code, city, state) -> Optional[Point]:
+        for place in _places(zip_code, city, state):
+            for segment in self._data.ranges.get((street, place), ()):
+                if segment.contains(number):
+                    return segment.interpolate(number)
+        return None
+
+    def street_center(self, street: str, zip_code, city, state) -> Optional[Point]:
+        for place in _places(zip_code, city, state):
+            points = list(self._data.points.get((street, place), {}).values())
+            points += [segment.midpoint for segment in self._data.ranges.get((street, place), ())]
+            if points:
+                return _mean(points)
+        return None
+
+    def zip_center(self, zip_code: str) -> Optional[Tuple[Point, str, str]]:
+        return self._data.zips.get(zip_code)
+
+    def city_center(self, city: str, state: Optional[str]) -> Optional[Tuple[Point, str]]:
+        state = state or self._data.city_states.get(city)
+        point = self._data.cities.get((city, state))
+        return (point, state) if point is not None else None
+
+gazetteer_index = GazetteerIndex()
+
+class _DatabaseGazetteer:
+    """Gazetteer lookups as indexed queries, used while the index is not loaded."""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _params(self, zip_code, city, state, **params) -> Dict[str, Any]:
+        return {"zip_code": zip_code, "city": city, "state": state, **params}
+
+    def address_point(self, street: str, number: str, zip_code, city, state) -> Optional[Point]:
+        row = self.db.execute(
+            text(f"""
+                SELECT lng, lat FROM gazetteer_points
+                WHERE street = :street AND number = :number AND {PLACE_SQL}
+                {PLACE_ORDER_SQL} LIMIT 1
+            """),
+            self._params(zip_code, city, state, street=street, number=number)
+        ).first()
+        return (row[0], row[1]) if row else None
+
+    def interpolate(self, street: str, number: int, zip_code, city, state) -> Optional[Point]:
+        row = self.db.execute(
+            text(f"""
+                SELECT from_number, to_number, parity, start_lng, start_lat, end_lng, end_lat
+                FROM gazetteer_ranges
+                WHERE street = :street AND {PLACE_SQL}
+                  AND :number BETWEEN least(from_number, to_number) AND greatest(from_number, to_number)
+                  AND parity IN ('B', :parity)
+                {PLACE_ORDER_SQL} LIMIT 1
+            """),
+            self._params(zip_code, city, state, street=street, number=number, parity="E" if number % 2 == 0 else "O")
+        ).first()
+        return _Range(*row).interpolate(number) if row else None
+
+    def street_center(self, street: str, zip_code, city, state) -> Optional[Point]:
+        row = self.db.execute(
+            text(f"""
+                SELECT avg(lng), avg(lat) FROM (
+                    SELECT lng, lat FROM gazetteer_points WHERE street = :street AND {PLACE_SQL}
+                    UNION ALL
+                    SELECT (start_lng + end_lng) / 2, (start_lat + end_lat) / 2
+                    FROM gazetteer_ranges WHERE street = :street AND {PLACE_SQL}
+                ) s
+            """),
+            self._params(zip_code, city, state, street=street)
+        ).first()
+        return (float(row[0]), float(row[1])) if row and row[0] is not None else None
+
+    def zip_center(self, zip_code: str) -> Optional[Tuple[Point, str, str]]:
+        row = self.db.execute(
+            text("SELECT lng, lat, city, state FROM gazetteer_zips WHERE zip_code = :zip_code"),
+            {"zip_code": zip_code}
+        ).first()
+        return ((row[0], row[1]), row[2], row[3]) if row else None
+
+    def city_center(self, city: str, state: Optional[str]) -> Optional[Tuple[Point, str]]:
+        row = self.db.execute(
+            text("""
+                SELECT avg(lng), avg(lat), state FROM gazetteer_zips
+                WHERE city = :city AND (CAST(:state AS text) IS NULL OR state = :state)
+                GROUP BY state ORDER BY count(*) DESC LIMIT 1
+            """),
+            {"city": city, "state": state}
+        ).first()
+        return ((float(row[0]), float(row[1])), row[2]) if row else None
+
+def _display(*parts: Optional[str], state: Optional[str] = None, zip_code: Optional[str] = None) -> str:
+    head = ", ".join(part.title() for part in parts if part)
+    tail = " ".join(part for part in ((state or "").upper(), zip_code or "") if part)
+    return ", ".join(part for part in (head, tail) if part)
+
+def resolve(source, address: ParsedAddress) -> Optional[GeocodeResult]:
+    """Resolve a parsed address against ``source``, most precise match first."""
+    city, state, zip_code = address.city, address.state, address.zip_code
+    if city and not state:
+        found = source.city_center(city, None)
+        state = found[1] if found else None
+
+    if address.street:
+        point, precision = None, None
+        number = house_number(address.number)
+        if address.number:
+            point, precision = source.address_point(address.street, address.number, zip_code, city, state), "address"
+        if point is None and number is not None:
+            point, precision = source.interpolate(address.street, number, zip_code, city, state), "interpolated"
+        if point is None:
+            point, precision = source.street_center(address.street, zip_code, city, state), "street"
+        if point is not None:
+            street = f"{address.number} {address.street}" if precision != "street" and address.number else address.street
+            return GeocodeResult(point[0], point[1], precision, _display(street, city, state=state, zip_code=zip_code))
+
+    if zip_code:
+        found = source.zip_center(zip_code)
+        if found is not None:
+            point, zip_city, zip_state = found
+            return GeocodeResult(point[0], point[1], "zip", _display(zip_city, state=zip_state, zip_code=zip_code))
+    if city:
+        found = source.city_center(city, state)
+        if found is not None:
+            point, city_state = found
+            return GeocodeResult(point[0], point[1], "city", _display(city, state=city_state))
+    return None
+
+# Results per normalized address; None marks an address that was not found
+_cache: "OrderedDict[str, Optional[GeocodeResult]]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+def clear_cache() -> None:
+    with _cache_lock:
+        _cache.clear()
+
+def geocode_many(db: Session, addresses: Sequence[Optional[str]]) -> List[Optional[GeocodeResult]]:
+    """Geocode ``addresses``, resolving each distinct normalized address once."""
+    source = gazetteer_index if gazetteer_index.ready else _DatabaseGazetteer(db)
+    parsed = [parse_address(address) for address in addresses]
+
+    results: Dict[str, Optional[GeocodeResult]] = {}
+    for address in parsed:
+        key = address.key
+        if key in results:
+            continue
+        with _cache_lock:
+            if key in _cache:
+                _cache.move_to_end(key)
+                results[key] = _cache[key]
+                continue
+        result = resolve(source, address) if key.strip("|") else None
+        results[key] = result
+        with _cache_lock:
+            _cache[key] = result
+            while len(_cache) > settings.GEOCODER_CACHE_SIZE:
+                _cache.popitem(last=False)
+
+    return [results[address.key] for address in parsed]
+
+def geocode(db: Session, address: Optional[str]) -> Optional[GeocodeResult]:
+    return geocode_many(db, [address])[0]
+
+# Loading bulk files
+
+GAZETTEER_FILES = {
+    # kind: (table, {column: accepted CSV headers})
+    "points": ("gazetteer_points", {
+        "number": ("number", "house_number"),
+        "street": ("street", "street_name"),
+        "city": ("city",),
+        "state": ("state", "region"),
+        "zip_code": ("zip", "zip_code", "postcode"),
+        "lng": ("lng", "lon", "longitude", "x"),
+        "lat": ("lat", "latitude", "y"),
+    }),
+    "ranges": ("gazetteer_ranges", {
+        "street": ("street", "street_name", "fullname"),
+        "city": ("city",),
+        "state": ("state", "region"),
+        "zip_code": ("zip", "zip_code", "postcode"),
+        "from_number": ("from_number", "fromhn", "from"),
+        "to_number": ("to_number", "tohn", "to"),
+        "parity": ("parity",),
+        "start_lng": ("start_lng", "start_lon"),
+        "start_lat": ("start_lat",),
+        "end_lng": ("end_lng", "end_lon"),
+        "end_lat": ("end_lat",),
+    }),
+    "zips": ("gazetteer_zips", {
+        "zip_code": ("zip", "zip_code", "postcode"),
+        "city": ("city",),
+        "state": ("state", "region"),
+        "lng": ("lng", "lon", "longitude", "x"),
+        "lat": ("lat", "latitude", "y"),
+    }),
+}
+
+PARITIES = {"e": "E", "even": "E", "o": "O", "odd": "O"}
+
+def normalize_row(kind: str, row: Dict[str, str]) -> Optional[List[Any]]:
+    """A gazetteer file row (keyed by table column) in table column order, or None when unusable."""
+    try:
+        city, state, zip_code = normalize(row.get("city")), normalize_state(row.get("state")), normalize_zip(row.get("zip_code"))
+        if kind == "zips":
+            values = [zip_code, city or None, state or None, float(row["lng"]), float(row["lat"])]
+            return values if zip_code else None
+
+        street = normalize_street(row.get("street"))
+        if not street or not (zip_code or (city and state)):
+            return None
+        if kind == "points":
+            number = normalize(row.get("number")).replace(" ", "")
+            if not number:
+                return None
+            return [number, street, city or None, state or None, zip_code or None, float(row["lng"]), float(row["lat"])]
+
+        from_number, to_number = house_number(row.get("from_number")), house_number(row.get("to_number"))
+        if from_number is None or to_number is None:
+            return None
+        return [
+            street, city or None, state or None, zip_code or None, from_number, to_number,
+            PARITIES.get(normalize(row.get("parity")), "B"),
+            float(row["start_lng"]), float(row["start_lat"]), float(row["end_lng"]), float(row["end_lat"]),
+        ]
+    except (KeyError, TypeError, ValueError):
+        return None
+
+def _copy(db: Session, table: str, columns: Sequence[str], rows: List[List[Any]]) -> None:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+    finally:
+        cursor.close()
+
+def load_gazetteer_file(db: Session, kind: str, stream: TextIO, replace: bool = False) -> Tuple[int, int]:
+    """
+    Normalize a CSV file of ``kind`` (points, ranges or zips) and COPY it into
+    its gazetteer table in one transaction. Headers are matched case-
+    insensitively against ``GAZETTEER_FILES``. Returns ``(loaded, skipped)``.
+    """
+    table, aliases = GAZETTEER_FILES[kind]
+    reader = csv.DictReader(stream)
+    headers = {name.strip().lower(): name for name in reader.fieldnames or []}
+    columns = {column: next((headers[h] for h in names if h in headers), None) for column, names in aliases.items()}
+
+    if replace:
+        db.execute(text(f"TRUNCATE {table}"))
+    target = table
+    if kind == "zips":
+        # Zip codes are unique: stage the file and upsert it
+        target = "gazetteer_zips_load"
+        db.execute(text(f"CREATE TEMP TABLE {target} (LIKE gazetteer_zips) ON COMMIT DROP"))
+    loaded = skipped = 0
+    chunk: List[List[Any]] = []
+    for raw in reader:
+        row = normalize_row(kind, {column: raw.get(name) for column, name in columns.items() if name})
+        if row is None:
+            skipped += 1
+            continue
+        chunk.append(row)
+        if len(chunk) >= COPY_CHUNK:
+            _copy(db, target, list(aliases), chunk)
+            loaded += len(chunk)
+            chunk = []
+    if chunk:
+        _copy(db, target, list(aliases), chunk)
+        loaded += len(chunk)
+    if kind == "zips":
+        db.execute(text(f"""
+            INSERT INTO gazetteer_zips (zip_code, city, state, lng, lat)
+            SELECT DISTINCT ON (zip_code) zip_code, city, state, lng, lat FROM {target}
+            ON CONFLICT (zip_code) DO UPDATE
+            SET city = EXCLUDED.city, state = EXCLUDED.state, lng = EXCLUDED.lng, lat = EXCLUDED.lat
+        """))
+    db.execute(text(f"ANALYZE {table}"))
+    db.commit()
+    return loaded, skipped
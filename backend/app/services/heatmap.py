@@ -0,0 +1,343 @@
+"""
+Precomputed heatmap layers for the map.
+
+``MapLayerSelector.vue`` offers three data layers; two are backed here:
+
+- ``property-values``: median ``current_value`` per cell, weighted by the
+  number of valued properties
+- ``wealth-heatmap``: owner ``estimated_net_worth`` density. Each owner's net
+  worth is split evenly across the properties they currently own, so the
+  weights of all cells add up to the total known wealth; the cell value is
+  the median net worth of the owners there
+
+``demographics`` has no data source in this database and is not served.
+
+Cells live in ``heatmap_cells`` (migration 006). The base zoom
+``HEATMAP_BASE_ZOOM`` is aggregated from raw rows and every coarser zoom is
+rolled up from the four child cells below it (sums of weights/counts and the
+count-weighted median of child values), so a refresh touching a few base
+cells only rewrites their ancestors. ``refresh`` recomputes the cells
+touched by ``property_changes`` since the layer's feed position (plus, for
+the wealth layer, the holdings of owners whose ownership lapsed through
+``end_date`` since the last run); ``rebuild`` recomputes a layer from
+scratch. ``invalidate_tiles`` drops the cached tiles drawing the cells a
+refresh recomputed; after a rebuild, cached tiles age out within
+``HEATMAP_TILE_CACHE_EXPIRY``.
+
+Tiles are Mapbox Vector Tiles of cell polygons with ``weight``, ``value``
+and ``count`` attributes.
+"""
+import logging
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.cache import cache
+from app.core.config import settings
+from app.core.geo import MAX_ZOOM
+from app.db.change_feed import feed_position
+from app.services.map_tiles import MVT_EXTENT
+
+logger = logging.getLogger(__name__)
+
+Cell = Tuple[int, int]
+
+HEATMAP_LAYERS = ("property-values", "wealth-heatmap")
+# Cells per tile edge are 2 ** HEATMAP_CELL_SHIFT
+HEATMAP_CELL_SHIFT = 5
+# Cached tile keys deleted per cache round trip
+INVALIDATE_BATCH_SIZE = 1000
+
+_CELL_SQL = """
+    wm_tile_x(ST_X(p.location::geometry), :base_zoom) AS tile_x,
+    wm_tile_y(ST_Y(p.location::geometry), :base_zoom) AS tile_y
+"""
+
+# Restricts raw rows to a list of dirty base cells, one index scan per cell
+_DIRTY_JOIN_SQL = """
+    JOIN unnest(CAST(:xs AS INTEGER[]), CAST(:ys AS INTEGER[])) AS dirty(x, y)
+      ON p.location::geometry && ST_Transform(ST_TileEnvelope(:base_zoom, dirty.x, dirty.y), 4326)
+     AND wm_tile_x(ST_X(p.location::geometry), :base_zoom) = dirty.x
+     AND wm_tile_y(ST_Y(p.location::geometry), :base_zoom) = dirty.y
+"""
+
+BASE_CELLS_SQL = {
+    "property-values": f"""
+        SELECT {_CELL_SQL},
+               count(*) AS sample_count,
+               count(*)::DOUBLE PRECISION AS weight,
+               percentile_cont(0.5) WITHIN GROUP (ORDER BY p.current_value) AS value
+        FROM properties p
+        {{dirty_join}}
+        WHERE p.current_value IS NOT NULL
+        GROUP BY 1, 2
+    """,
+    "wealth-heatmap": f"""
+        WITH holdings AS (
+            SELECT po.owner_id, po.property_id,
+                   count(*) OVER (PARTITION BY po.owner_id) AS owner_properties
+            FROM property_ownership po
+            WHERE po.end_date IS NULL OR po.end_date > CURRENT_DATE
+        ),
+        wealth AS (
+            SELECT DISTINCT ON (owner_id) owner_id, estimated_net_worth
+            FROM wealth_data
+            WHERE estimated_net_worth IS NOT NULL
+            ORDER BY owner_id, last_updated DESC NULLS LAST
+        )
+        SELECT {_CELL_SQL},
+               count(*) AS sample_count,
+               sum(w.estimated_net_worth / h.owner_properties)::DOUBLE PRECISION AS weight,
+               percentile_cont(0.5) WITHIN GROUP (ORDER BY w.estimated_net_worth) AS value
+        FROM properties p
+        {{dirty_join}}
+        JOIN holdings h ON h.property_id = p.id
+        JOIN wealth w ON w.owner_id = h.owner_id
+        GROUP BY 1, 2
+    """,
+}
+
+# Parent cells at :zoom from their children at :zoom + 1
+ROLLUP_SQL = """
+    INSERT INTO heatmap_cells (layer, zoom, tile_x, tile_y, sample_count, weight, value)
+    SELECT :layer, :zoom, parent_x, parent_y,
+           sum(sample_count), sum(weight),
+           min(value) FILTER (WHERE running >= total / 2.0)
+    FROM (
+        SELECT c.tile_x / 2 AS parent_x, c.tile_y / 2 AS parent_y,
+               c.sample_count, c.weight, c.value,
+               sum(c.sample_count) OVER (PARTITION BY c.tile_x / 2, c.tile_y / 2 ORDER BY c.value) AS running,
+               sum(c.sample_count) OVER (PARTITION BY c.tile_x / 2, c.tile_y / 2) AS total
+        FROM heatmap_cells c
+        {dirty_join}
+        WHERE c.layer = :layer AND c.zoom = :zoom + 1
+    ) children
+    GROUP BY parent_x, parent_y
+"""
+
+_ROLLUP_DIRTY_JOIN_SQL = """
+    JOIN unnest(CAST(:xs AS INTEGER[]), CAST(:ys AS INTEGER[])) AS dirty(x, y)
+      ON c.tile_x BETWEEN dirty.x * 2 AND dirty.x * 2 + 1
+     AND c.tile_y BETWEEN dirty.y * 2 AND dirty.y * 2 + 1
+"""
+
+_DELETE_DIRTY_SQL = """
+    DELETE FROM heatmap_cells c
+    USING unnest(CAST(:xs AS INTEGER[]), CAST(:ys AS INTEGER[])) AS dirty(x, y)
+    WHERE c.layer = :layer AND c.zoom = :zoom AND c.tile_x = dirty.x AND c.tile_y = dirty.y
+"""
+
+# Change feed operations that alter each layer
+LAYER_OPERATIONS = {
+    "property-values": ["I", "U", "D"],
+    "wealth-heatmap": ["I", "U", "D", "O", "W"],
+}
+
+# Base cells of changed properties, at their current and previous locations
+DIRTY_CELLS_SQL = """
+    SELECT DISTINCT wm_tile_x(ST_X(loc::geometry), :base_zoom) AS tile_x,
+                    wm_tile_y(ST_Y(loc::geometry), :base_zoom) AS tile_y
+    FROM (
+        SELECT p.location AS loc
+        FROM property_changes pc JOIN properties p ON p.id = pc.property_id
+        WHERE pc.txid >= :after AND pc.txid < :upto AND pc.operation = ANY(CAST(:operations AS CHAR(1)[]))
+        UNION ALL
+        SELECT pc.old_location
+        FROM property_changes pc
+        WHERE pc.txid >= :after AND pc.txid < :upto AND pc.old_location IS NOT NULL
+        {expired}
+    ) locations
+"""
+
+# Ownerships lapse through end_date without a write: every property of an
+# owner with a holding that ended since the last refresh changes weight
+_EXPIRED_OWNERSHIP_SQL = """
+        UNION ALL
+        SELECT p.location
+        FROM property_ownership ended
+        JOIN property_ownership po ON po.owner_id = ended.owner_id
+        JOIN properties p ON p.id = po.property_id
+        WHERE ended.end_date > :since AND ended.end_date <= CURRENT_DATE
+"""
+
+HEATMAP_TILE_SQL = f"""
+    WITH bounds AS (SELECT ST_TileEnvelope(:z, :x, :y) AS geom_3857),
+    features AS (
+        SELECT ST_AsMVTGeom(ST_TileEnvelope(c.zoom, c.tile_x, c.tile_y), bounds.geom_3857,
+                            {MVT_EXTENT}, 0, true) AS geom,
+               c.weight,
+               c.value::DOUBLE PRECISION AS value,
+               c.sample_count AS count
+        FROM heatmap_cells c, bounds
+        WHERE c.layer = :layer
+          AND c.zoom = :level
+          AND c.tile_x BETWEEN :x_min AND :x_max
+          AND c.tile_y BETWEEN :y_min AND :y_max
+    )
+    SELECT ST_AsMVT(features.*, 'heatmap', {MVT_EXTENT}, 'geom') FROM features
+"""
+
+def _split(cells: Set[Cell]) -> Dict[str, List[int]]:
+    ordered = sorted(cells)
+    return {"xs": [x for x, _ in ordered], "ys": [y for _, y in ordered]}
+
+class HeatmapService:
+    @staticmethod
+    def _write_level(db: Session, layer: str, zoom: int, dirty: Optional[Set[Cell]]) -> None:
+        """Recompute the cells of one level; all of them when ``dirty`` is None."""
+        params = {"layer": layer, "zoom": zoom, "base_zoom": settings.HEATMAP_BASE_ZOOM}
+        if dirty is None:
+            db.execute(text("DELETE FROM heatmap_cells WHERE layer = :layer AND zoom = :zoom"), params)
+        else:
+            params.update(_split(dirty))
+            db.execute(text(_DELETE_DIRTY_SQL), params)
+
+        if zoom == settings.HEATMAP_BASE_ZOOM:
+            cells_sql = BASE_CELLS_SQL[layer].format(dirty_join="" if dirty is None else _DIRTY_JOIN_SQL)
+            db.execute(text(f"""
+                INSERT INTO heatmap_cells (layer, zoom, tile_x, tile_y, sample_count, weight, value)
+                SELECT :layer, :zoom, tile_x, tile_y, sample_count, weight, value
+                FROM ({cells_sql}) cells
+            """), params)
+        else:
+            rollup_sql = ROLLUP_SQL.format(dirty_join="" if dirty is None else _ROLLUP_DIRTY_JOIN_SQL)
+            db.execute(text(rollup_sql), params)
+
+    @staticmethod
+    def _write_layer(db: Session, layer: str, dirty: Optional[Set[Cell]], position: int) -> None:
+        for zoom in range(settings.HEATMAP_BASE_ZOOM, -1, -1):
+            HeatmapService._write_level(db, layer, zoom, dirty)
+            if dirty is not None:
+                dirty = {(x // 2, y // 2) for x, y in dirty}
+
+        db.execute(text("""
+            INSERT INTO heatmap_layers (layer, feed_position, refreshed_at)
+            VALUES (:layer, :position, now())
+            ON CONFLICT (layer) DO UPDATE
+            SET feed_position = EXCLUDED.feed_position, refreshed_at = EXCLUDED.refreshed_at
+        """), {"layer": layer, "position": position})
+
+    @staticmethod
+    def rebuild(db: Session, layer: str) -> None:
+        """
+        Recompute every cell of a layer.
+        """
+        position = feed_position(db)
+        HeatmapService._write_layer(db, layer, None, position)
+        db.commit()
+        logger.info(f"Rebuilt heatmap layer {layer} (feed position {position})")
+
+    @staticmethod
+    def refresh(db: Session, layer: str) -> Set[Cell]:
+        """
+        Recompute the cells touched by property changes since the last run.
+        Returns the dirty base cells.
+        """
+        state = db.execute(
+            text("""
+                SELECT feed_position, COALESCE(refreshed_at, now())::date AS since, CURRENT_DATE AS today
+                FROM heatmap_layers WHERE layer = :layer
+            """),
+            {"layer": layer}
+        ).first()
+        if state is None:
+            HeatmapService.rebuild(db, layer)
+            return set()
+
+        # The wealth layer also changes when ownerships lapse with the date
+        expiring = layer == "wealth-heatmap" and state.since < state.today
+        upto = feed_position(db)
+        if upto <= state.feed_position and not expiring:
+            db.rollback()
+            return set()
+
+        dirty_sql = DIRTY_CELLS_SQL.format(expired=_EXPIRED_OWNERSHIP_SQL if expiring else "")
+        dirty = {
+            (row.tile_x, row.tile_y)
+            for row in db.execute(text(dirty_sql), {
+                "after": state.feed_position,
+                "upto": upto,
+                "operations": LAYER_OPERATIONS[layer],
+                "since": state.since,
+                "base_zoom": settings.HEATMAP_BASE_ZOOM,
+            })
+        }
+        HeatmapService._write_layer(db, layer, dirty, max(upto, state.feed_position))
+        db.commit()
+        logger.info(f"Refreshed {len(dirty)} base cells of heatmap layer {layer} (feed position {upto})")
+        return dirty
+
+    @staticmethod
+    def cache_key(layer: str, z: int, x: int, y: int) -> str:
+        shift = z - settings.HEATMAP_BASE_ZOOM
+        if shift > 0:
+            # Past the base zoom a tile is one cell drawn over its whole extent,
+            # so the tiles of a cell at one zoom are identical and share a key
+            return f"tile:heatmap:{layer}:{z}:cell:{x >> shift}:{y >> shift}"
+        return f"tile:heatmap:{layer}:{z}:{x}:{y}"
+
+    @staticmethod
+    async def invalidate_tiles(layer: str, cells: Set[Cell]) -> int:
+        """
+        Drop the cached tiles that draw any of the given base cells. Returns
+        the number of cache keys dropped.
+        """
+        base_zoom = settings.HEATMAP_BASE_ZOOM
+        keys = set()
+        for x, y in cells:
+            for z in range(MAX_ZOOM + 1):
+                shift = z - base_zoom
+                tile = (x << shift, y << shift) if shift > 0 else (x >> -shift, y >> -shift)
+                keys.add(HeatmapService.cache_key(layer, z, *tile))
+
+        keys = sorted(keys)
+        for start in range(0, len(keys), INVALIDATE_BATCH_SIZE):
+            await cache.delete_many(keys[start:start + INVALIDATE_BATCH_SIZE])
+        return len(keys)
+
+    @staticmethod
+    def cell_range(z: int, x: int, y: int) -> Tuple[int, int, int, int, int]:
+        """
+        Return the cell level and (x_min, x_max, y_min, y_max) cell range
+        drawn on tile (z, x, y).
+        """
+        level = min(z + HEATMAP_CELL_SHIFT, settings.HEATMAP_BASE_ZOOM)
+        shift = level - z
+        if shift >= 0:
+            return level, x << shift, ((x + 1) << shift) - 1, y << shift, ((y + 1) << shift) - 1
+        # Zoomed in past the base zoom: a single cell covers the tile
+        return level, x >> -shift, x >> -shift, y >> -shift, y >> -shift
+
+    @staticmethod
+    def render_tile(db: Session, layer: str, z: int, x: int, y: int) -> bytes:
+        """
+        Render a heatmap vector tile from precomputed cells.
+        """
+        level, x_min, x_max, y_min, y_max = HeatmapService.cell_range(z, x, y)
+        tile = db.execute(text(HEATMAP_TILE_SQL), {
+            "layer": layer,
+            "z": z,
+            "x": x,
+            "y": y,
+            "level": level,
+            "x_min": x_min,
+            "x_max": x_max,
+            "y_min": y_min,
+            "y_max": y_max,
+        }).scalar()
+        return bytes(tile) if tile else b""
+
+    @staticmethod
+    async def get_tile(db: Session, layer: str, z: int, x: int, y: int) -> bytes:
+        """
+        Return a heatmap vector tile, rendering and caching it on a miss.
+        """
+        key = HeatmapService.cache_key(layer, z, x, y)
+        tile = await cache.get_bytes(key)
+        if tile is not None:
+            return tile
+
+        tile = HeatmapService.render_tile(db, layer, z, x, y)
+        await cache.set_bytes(key, tile, expire=settings.HEATMAP_TILE_CACHE_EXPIRY)
+        return tile
@@ -0,0 +1,178 @@
+"""
+Grid cell aggregates for map clustering.
+
+Migration 004 maintains ``property_grid_cells``: one row per (zoom, tile_x,
+tile_y, property_type) holding counts, value sums/bounds and coordinate sums.
+Property writes only queue their rows in ``property_grid_deltas``
+(migration 015), so writers never wait on the low zoom cells they share;
+``rollup`` applies the queue in a fixed cell order (migration 014). Run
+``wealthmap-admin rollup-grid`` on a short schedule; ``invalidate-tiles``
+also rolls up before dropping tiles, so re-rendered clusters are current.
+Reading a block of cells is a primary-key range scan, so cluster cost
+depends on the number of cells on screen rather than the number of
+properties.
+
+Value filters cannot be answered from the precomputed cells, so filtered
+requests aggregate raw points onto the same cell scheme instead.
+
+``value_min``/``value_max`` only widen on incremental updates; run
+``wealthmap-admin rebuild-grid`` to tighten them after bulk deletes.
+"""
+import logging
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.geo import tile_bounds
+from app.db.features import has_table
+
+logger = logging.getLogger(__name__)
+
+GRID_TABLE = "property_grid_cells"
+GRID_DELTA_TABLE = "property_grid_deltas"
+# Queued deltas applied per transaction by rollup
+GRID_ROLLUP_BATCH_SIZE = 10000
+# Highest zoom level maintained by migrations 004 and 014
+GRID_MAX_ZOOM = 16
+
+_TYPE_FILTER_SQL = "(CAST(:property_type AS TEXT) IS NULL OR property_type = :property_type)"
+
+GRID_CELLS_SQL = f"""
+    SELECT tile_x, tile_y, property_type, property_count, value_count, value_sum,
+           value_min, value_max, lng_sum, lat_sum
+    FROM {GRID_TABLE}
+    WHERE zoom = :level
+      AND tile_x BETWEEN :x_min AND :x_max
+      AND tile_y BETWEEN :y_min AND :y_max
+      AND {_TYPE_FILTER_SQL}
+"""
+
+RAW_CELLS_SQL = f"""
+    SELECT wm_tile_x(pts.lng, :level) AS tile_x,
+           wm_tile_y(pts.lat, :level) AS tile_y,
+           pts.property_type,
+           count(*) AS property_count,
+           count(pts.current_value) AS value_count,
+           COALESCE(sum(pts.current_value), 0) AS value_sum,
+           min(pts.current_value) AS value_min,
+           max(pts.current_value) AS value_max,
+           sum(pts.lng) AS lng_sum,
+           sum(pts.lat) AS lat_sum
+    FROM (
+        SELECT p.property_type, p.current_value,
+               ST_X(p.location::geometry) AS lng,
+               ST_Y(p.location::geometry) AS lat
+        FROM properties p
+        WHERE p.location::geometry && ST_MakeEnvelope(:lng_min, :lat_min, :lng_max, :lat_max, 4326)
+          AND {_TYPE_FILTER_SQL}
+          AND (CAST(:min_value AS NUMERIC) IS NULL OR p.current_value >= :min_value)
+          AND (CAST(:max_value AS NUMERIC) IS NULL OR p.current_value <= :max_value)
+    ) pts
+    GROUP BY 1, 2, 3
+"""
+
+# Collapses per-type cell rows (from either source) into one cluster per cell
+CLUSTER_SQL = """
+    SELECT tile_x, tile_y,
+           sum(property_count) AS property_count,
+           sum(value_sum) / NULLIF(sum(value_count), 0) AS avg_value,
+           min(value_min) AS value_min,
+           max(value_max) AS value_max,
+           sum(lng_sum) / sum(property_count) AS longitude,
+           sum(lat_sum) / sum(property_count) AS latitude,
+           jsonb_object_agg(property_type, property_count) AS type_counts
+    FROM ({cells}) cells
+    GROUP BY tile_x, tile_y
+    HAVING sum(property_count) > 0
+"""
+
+def _float(value: Any) -> Optional[float]:
+    return float(value) if value is not None else None
+
+class PropertyGridService:
+    @staticmethod
+    def clusters_for_range(
+        db: Session,
+        level: int,
+        x_min: int,
+        x_max: int,
+        y_min: int,
+        y_max: int,
+        property_type: Optional[str] = None,
+        min_value: Optional[float] = None,
+        max_value: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Return one cluster per non-empty grid cell in a block of cells at ``level``.
+        """
+        params = {
+            "level": level,
+            "x_min": x_min,
+            "x_max": x_max,
+            "y_min": y_min,
+            "y_max": y_max,
+            "property_type": property_type,
+        }
+
+        if min_value is None and max_value is None and has_table(db, GRID_TABLE):
+            cells_sql = GRID_CELLS_SQL
+        else:
+            # Aggregate raw points; the envelope spans the whole block of cells
+            lng_min, lat_min, _, _ = tile_bounds(level, x_min, y_max)
+            _, _, lng_max, lat_max = tile_bounds(level, x_max, y_min)
+            params.update({
+                "lng_min": lng_min,
+                "lat_min": lat_min,
+                "lng_max": lng_max,
+                "lat_max": lat_max,
+                "min_value": min_value,
+                "max_value": max_value,
+            })
+            cells_sql = RAW_CELLS_SQL
+
+        rows = db.execute(text(CLUSTER_SQL.format(cells=cells_sql)), params).mappings().all()
+
+        return [
+            {
+                "id": f"{level}/{row['tile_x']}/{row['tile_y']}",
+                "tile_x": row["tile_x"],
+                "tile_y": row["tile_y"],
+                "count": int(row["property_count"]),
+                "avg_value": _float(row["avg_value"]),
+                "value_min": _float(row["value_min"]),
+                "value_max": _float(row["value_max"]),
+                "latitude": float(row["latitude"]),
+                "longitude": float(row["longitude"]),
+                "type_counts": dict(row["type_counts"] or {}),
+            }
+            for row in rows
+        ]
+
+    @staticmethod
+    def rollup(db: Session) -> int:
+        """
+        Apply the cell deltas queued by property writes, in batches, until
+        the queue is drained. Returns the number of deltas applied.
+        """
+        if not has_table(db, GRID_DELTA_TABLE):
+            return 0
+
+        applied = 0
+        while True:
+            count = db.execute(
+                text("SELECT property_grid_rollup(:batch)"), {"batch": GRID_ROLLUP_BATCH_SIZE}
+            ).scalar()
+            db.commit()
+            applied += count
+            if count < GRID_ROLLUP_BATCH_SIZE:
+                return applied
+
+    @staticmethod
+    def rebuild(db: Session) -> int:
+        """
+        Recompute every grid cell from the properties table.
+        """
+        db.execute(text("SELECT property_grid_rebuild()"))
+        db.commit()
+        return db.execute(text(f"SELECT count(*) FROM {GRID_TABLE}")).scalar()
@@ -0,0 +1,678 @@
+"""
+Optional in-process columnar index for map reads.
+
+When ``MAP_MEMORY_INDEX`` is enabled (and NumPy is installed) each API
+worker keeps the few columns the map needs -- id, address, longitude,
+latitude, property type, current value and bedrooms -- as NumPy arrays, and
+answers ``/properties/map`` tiles and search facet counts from memory
+instead of PostGIS:
+
+- rows are loaded at startup with a single ``COPY ... TO STDOUT``, parsed
+  in chunks straight into preallocated column arrays
+- rows are sorted by their tile at ``INDEX_ZOOM`` (a packed uniform grid),
+  so a bounding box resolves to one contiguous slice per grid column via
+  binary search
+- value filters, per-tile point ranking and grid clustering are vectorised
+  over the selected rows
+
+The index is refreshed from the ``property_changes`` feed (migration 005):
+only properties inserted, updated or deleted since the last applied feed
+position are re-read; ownership and wealth changes are skipped. The loaded
+snapshot is never rebuilt by a refresh. Changed properties are masked out
+of it and kept in a small delta snapshot that queries read alongside it,
+until the delta grows past ``MAP_MEMORY_INDEX_MAX_DELTA`` and the index is
+reloaded. Each refresh swaps in a new immutable state, so readers never see
+a half-applied update. Memory is roughly 150 bytes per property per worker
+plus addresses.
+"""
+import logging
+import re
+import threading
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.geo import MAX_LATITUDE, tile_blocks
+from app.db.change_feed import changes_between, feed_position
+
+logger = logging.getLogger(__name__)
+
+# NumPy is optional; without it the map always reads from PostGIS
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+Tile = Tuple[int, int]
+
+# Tile coordinates are stored at this zoom; any coarser zoom is a bit shift away
+TILE_ZOOM = 16
+# Rows are bucketed and sorted by their tile at this zoom
+INDEX_ZOOM = 12
+# Change feed operations that alter the indexed columns
+INDEXED_OPERATIONS = ("I", "U", "D")
+
+COLUMNS_SQL = """
+    SELECT p.id::text, p.address, p.property_type, p.current_value,
+           ST_X(p.location::geometry), ST_Y(p.location::geometry), p.bedrooms
+    FROM properties p
+"""
+
+# Planner row estimate used to size the load arrays; they grow if it is low
+ROW_ESTIMATE_SQL = "SELECT reltuples::bigint FROM pg_class WHERE oid = 'properties'::regclass"
+# COPY output parsed at a time while loading
+COPY_CHUNK_BYTES = 1 << 20
+
+# Backslash escapes of COPY's text format; \N alone is NULL
+_COPY_ESCAPES = {"b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t", "v": "\v"}
+_COPY_ESCAPE_RE = re.compile(r"\\(.)")
+
+def tile_coordinates(lng, lat, z: int):
+    """Vectorised ``lnglat_to_tile`` returning (x, y) integer arrays."""
+    n = 1 << z
+    x = np.floor((lng + 180.0) / 360.0 * n)
+    lat_rad = np.radians(np.clip(lat, -MAX_LATITUDE, MAX_LATITUDE))
+    y = np.floor((1.0 - np.log(np.tan(lat_rad) + 1.0 / np.cos(lat_rad)) / np.pi) / 2.0 * n)
+    return np.clip(x, 0, n - 1).astype(np.int64), np.clip(y, 0, n - 1).astype(np.int64)
+
+@dataclass(frozen=True)
+class _Snapshot:
+    ids: Any
+    addresses: Any
+    types: Any  # object array of distinct property types
+    type_codes: Any
+    values: Any  # NaN where current_value is NULL
+    lng: Any
+    lat: Any
+    bedrooms: Any  # NaN where bedrooms is NULL
+    tile_x: Any  # at TILE_ZOOM
+    tile_y: Any
+    keys: Any  # sorted INDEX_ZOOM cell keys
+    sorted_ids: Any  # ids as sorted S36 keys, for finding changed rows
+    id_rows: Any  # row of each sorted id
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def rows_of(self, ids: Sequence[str]):
+        """Return the rows holding any of ``ids``."""
+        if not len(self):
+            return np.empty(0, dtype=np.int64)
+        wanted = np.asarray(ids, dtype="S36")
+        found = np.minimum(np.searchsorted(self.sorted_ids, wanted), len(self) - 1)
+        return self.id_rows[found[self.sorted_ids[found] == wanted]]
+
+def _copy_text(field: str) -> Optional[str]:
+    if field == "\\N":
+        return None
+    if "\\" not in field:
+        return field
+    return _COPY_ESCAPE_RE.sub(lambda m: _COPY_ESCAPES.get(m.group(1), m.group(1)), field)
+
+def _copy_float(field: str) -> float:
+    return np.nan if field == "\\N" else float(field)
+
+class _CopyColumns:
+    """
+    File-like target for ``COPY (COLUMNS_SQL) TO STDOUT``.
+
+    The text format writes one line per row (newlines in values are
+    escaped), so complete lines are parsed a chunk at a time into column
+    arrays sized from the planner's row estimate. Only one chunk of COPY
+    output and its parsed rows are held at once.
+    """
+
+    # Load columns in COLUMNS_SQL order, with their dtypes
+    COLUMNS = (
+        ("ids", "O"), ("addresses", "O"), ("property_types", "O"),
+        ("values", "f8"), ("lng", "f8"), ("lat", "f8"), ("bedrooms", "f8"),
+    )
+
+    def __init__(self, capacity: int):
+        self.length = 0
+        self.arrays = {name: np.empty(max(capacity, 1024), dtype=dtype) for name, dtype in self.COLUMNS}
+        self._pending: List[str] = []
+        self._pending_size = 0
+        self._types: Dict[str, Optional[str]] = {}  # one string object per property type
+
+    def write(self, data) -> None:
+        if isinstance(data, bytes):
+            data = data.decode("utf-8")
+        self._pending.append(data)
+        self._pending_size += len(data)
+        if self._pending_size >= COPY_CHUNK_BYTES:
+            self._parse(final=False)
+
+    def _reserve(self, length: int) -> None:
+        capacity = len(self.arrays["ids"])
+        if length <= capacity:
+            return
+        for name, dtype in self.COLUMNS:
+            array = np.empty(max(length, 2 * capacity), dtype=dtype)
+            array[:self.length] = self.arrays[name][:self.length]
+            self.arrays[name] = array
+
+    def _parse(self, final: bool) -> None:
+        data = "".join(self._pending)
+        end = len(data) if final else data.rfind("\n") + 1
+        self._pending = [data[end:]] if end < len(data) else []
+        self._pending_size = len(data) - end
+
+        rows = [line.split("\t") for line in data[:end].split("\n") if line]
+        if not rows:
+            return
+        start, stop = self.length, self.length + len(rows)
+        self._reserve(stop)
+
+        arrays = self.arrays
+        arrays["ids"][start:stop] = [row[0] for row in rows]
+        arrays["addresses"][start:stop] = [_copy_text(row[1]) for row in rows]
+        arrays["property_types"][start:stop] = [
+            self._types.setdefault(row[2], _copy_text(row[2])) for row in rows
+        ]
+        arrays["values"][start:stop] = [_copy_float(row[3]) for row in rows]
+        arrays["lng"][start:stop] = [float(row[4]) for row in rows]
+        arrays["lat"][start:stop] = [float(row[5]) for row in rows]
+        arrays["bedrooms"][start:stop] = [_copy_float(row[6]) for row in rows]
+        self.length = stop
+
+    def columns(self) -> Tuple[Any, ...]:
+        """Parse what is left and return the filled part of each column."""
+        self._parse(final=True)
+        return tuple(self.arrays[name][:self.length] for name, _ in self.COLUMNS)
+
+def _float_column(values: Sequence[Optional[float]]):
+    """Float array of ``values`` with NULLs as NaN; float arrays pass through."""
+    if isinstance(values, np.ndarray) and values.dtype == np.float64:
+        return values
+    return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+
+def build_snapshot(
+    ids: Sequence[str],
+    addresses: Sequence[str],
+    property_types: Sequence[str],
+    values: Sequence[Optional[float]],
+    lng: Sequence[float],
+    lat: Sequence[float],
+    bedrooms: Optional[Sequence[Optional[float]]] = None
+) -> _Snapshot:
+    """Build a sorted snapshot from column sequences."""
+    lng = np.asarray(lng, dtype=np.float64)
+    lat = np.asarray(lat, dtype=np.float64)
+    values = _float_column(values)
+    if bedrooms is None:
+        bedrooms = [None] * len(lng)
+    bedrooms = _float_column(bedrooms)
+    types, type_codes = np.unique(np.asarray(property_types, dtype=object), return_inverse=True)
+    tile_x, tile_y = tile_coordinates(lng, lat, TILE_ZOOM)
+
+    shift = TILE_ZOOM - INDEX_ZOOM
+    keys = ((tile_x >> shift) << INDEX_ZOOM) | (tile_y >> shift)
+    order = np.argsort(keys, kind="stable")
+
+    ids = np.asarray(ids, dtype=object)[order]
+    id_keys = ids.astype("S36")
+    id_rows = np.argsort(id_keys)
+
+    return _Snapshot(
+        ids=ids,
+        addresses=np.asarray(addresses, dtype=object)[order],
+        types=types,
+        type_codes=type_codes.astype(np.int32)[order],
+        values=values[order],
+        lng=lng[order],
+        lat=lat[order],
+        bedrooms=bedrooms[order],
+        tile_x=tile_x[order],
+        tile_y=tile_y[order],
+        keys=keys[order],
+        sorted_ids=id_keys[id_rows],
+        id_rows=id_rows,
+    )
+
+@dataclass(frozen=True)
+class _State:
+    base: _Snapshot
+    live: Any  # False for base rows changed since the load
+    delta: _Snapshot  # current version of every property changed since the load
+    # Changed property id -> its COLUMNS_SQL row, None once deleted
+    changed: Dict[str, Optional[tuple]] = field(default_factory=dict)
+    position: int = 0  # change feed position applied up to
+
+    @property
+    def parts(self) -> Tuple[Tuple[_Snapshot, Any], ...]:
+        return (self.base, self.live), (self.delta, None)
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self.live)) + len(self.delta)
+
+@dataclass(frozen=True)
+class _Selection:
+    """Selected rows of the base and delta snapshots."""
+    parts: Tuple[Tuple[_Snapshot, Any], ...]  # (snapshot, selected rows)
+    types: Any  # sorted union of the parts' property types
+
+    def __len__(self) -> int:
+        return sum(len(rows) for _, rows in self.parts)
+
+    def column(self, name: str):
+        return np.concatenate([getattr(snapshot, name)[rows] for snapshot, rows in self.parts])
+
+    def type_codes(self):
+        """Property type codes of the selected rows in ``types``."""
+        return np.concatenate([
+            np.searchsorted(self.types, snapshot.types).astype(np.int32)[snapshot.type_codes[rows]]
+            for snapshot, rows in self.parts
+        ])
+
+def _union_types(state: _State):
+    return np.union1d(state.base.types, state.delta.types) if len(state.delta) else state.base.types
+
+def _empty_snapshot() -> _Snapshot:
+    return build_snapshot([], [], [], [], [], [])
+
+def _group_starts(sorted_keys):
+    """Return the start offset of each run of equal keys and each row's run."""
+    starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+    run_lengths = np.diff(np.r_[starts, len(sorted_keys)])
+    return starts, np.repeat(starts, run_lengths)
+
+class PropertyMapIndex:
+    """Columnar property index shared by the requests of one worker."""
+
+    def __init__(self):
+        self._state: Optional[_State] = None
+        self._lock = threading.RLock()
+
+    @property
+    def ready(self) -> bool:
+        return self._state is not None
+
+    def __len__(self) -> int:
+        return len(self._state) if self._state is not None else 0
+
+    @property
+    def position(self) -> int:
+        """Change feed position applied up to, 0 before the first load."""
+        return self._state.position if self._state is not None else 0
+
+    def set_snapshot(self, snapshot: Optional[_Snapshot], position: int = 0) -> None:
+        self._state = None if snapshot is None else _State(
+            base=snapshot,
+            live=np.ones(len(snapshot), dtype=bool),
+            delta=_empty_snapshot(),
+            position=position,
+        )
+
+    # Loading
+
+    @staticmethod
+    def _copy_columns(db: Session) -> Tuple[Any, ...]:
+        """Stream the map columns out of PostgreSQL with COPY into column arrays."""
+        estimate = db.execute(text(ROW_ESTIMATE_SQL)).scalar() or 0
+        # Rows inserted since the last ANALYZE would otherwise cost a regrowth
+        sink = _CopyColumns(int(estimate * 1.05))
+        cursor = db.connection().connection.cursor()
+        try:
+            cursor.copy_expert(f"COPY ({COLUMNS_SQL}) TO STDOUT", sink)
+        finally:
+            cursor.close()
+        return sink.columns()
+
+    @staticmethod
+    def _columns(rows: Sequence[Sequence[Any]]) -> Tuple[list, list, list, list, list, list, list]:
+        ids, addresses, types, values, lng, lat, bedrooms = [], [], [], [], [], [], []
+        for row in rows:
+            ids.append(str(row[0]))
+            addresses.append(row[1])
+            types.append(row[2])
+            values.append(float(row[3]) if row[3] not in (None, "") else None)
+            lng.append(float(row[4]))
+            lat.append(float(row[5]))
+            bedrooms.append(float(row[6]) if row[6] not in (None, "") else None)
+        return ids, addresses, types, values, lng, lat, bedrooms
+
+    def load(self, db: Session) -> int:
+        """
+        Load every property with COPY. Returns the number of rows indexed.
+        """
+        if np is None:
+            logger.warning("NumPy is not installed; the in-memory map index is disabled")
+            return 0
+
+        with self._lock:
+            # Read the feed first: anything committed later is applied by the next refresh
+            position = feed_position(db)
+            columns = self._copy_columns(db)
+            db.rollback()
+            self.set_snapshot(build_snapshot(*columns), position=position)
+
+        logger.info(f"Map index loaded {len(self._state)} properties (feed position {position})")
+        return len(self._state)
+
+    def refresh(self, db: Session) -> int:
+        """
+        Apply changes from the property_changes feed. Returns the number of
+        properties re-read.
+        """
+        if self._state is None:
+            return self.load(db)
+
+        with self._lock:
+            state = self._state
+            position = feed_position(db)
+            changed_ids = sorted({
+                change[1] for change in changes_between(db, state.position, position)
+                if change[2] in INDEXED_OPERATIONS
+            })
+            if not changed_ids:
+                db.rollback()
+                if position != state.position:
+                    self._state = replace(state, position=position)
+                return 0
+
+            if len(state.changed.keys() | set(changed_ids)) > settings.MAP_MEMORY_INDEX_MAX_DELTA:
+                db.rollback()
+                return self.load(db)
+
+            rows = db.execute(
+                text(COLUMNS_SQL + " WHERE p.id = ANY(CAST(:ids AS uuid[]))"),
+                {"ids": changed_ids}
+            ).fetchall()
+            db.rollback()
+
+            # Properties that are no longer returned were deleted
+            changed = dict(state.changed)
+            changed.update({property_id: None for property_id in changed_ids})
+            changed.update({str(row[0]): tuple(row) for row in rows})
+
+            live = state.live
+            stale = state.base.rows_of(changed_ids)
+            if live[stale].any():
+                live = live.copy()
+                live[stale] = False
+
+            current = [row for row in changed.values() if row is not None]
+            self._state = _State(
+                base=state.base,
+                live=live,
+                delta=build_snapshot(*self._columns(current)) if current else _empty_snapshot(),
+                changed=changed,
+                position=position,
+            )
+
+        logger.info(f"Map index refreshed {len(changed_ids)} properties (feed position {position})")
+        return len(changed_ids)
+
+    # Queries
+
+    @staticmethod
+    def _select_rows(
+        snapshot: _Snapshot,
+        live,
+        z: int,
+        x_min: int,
+        x_max: int,
+        y_min: int,
+        y_max: int,
+        property_type: Optional[str],
+        min_value: Optional[float],
+        max_value: Optional[float]
+    ):
+        empty = np.empty(0, dtype=np.int64)
+        if not len(snapshot):
+            return empty
+
+        shift = z - INDEX_ZOOM
+        if shift >= 0:
+            col_min, col_max = x_min >> shift, x_max >> shift
+            row_min, row_max = y_min >> shift, y_max >> shift
+        else:
+            col_min, col_max = x_min << -shift, ((x_max + 1) << -shift) - 1
+            row_min, row_max = y_min << -shift, ((y_max + 1) << -shift) - 1
+
+        # One contiguous slice of the sorted keys per grid column
+        columns = np.arange(col_min, col_max + 1, dtype=np.int64) << INDEX_ZOOM
+        starts = np.searchsorted(snapshot.keys, columns | row_min, side="left")
+        ends = np.searchsorted(snapshot.keys, columns | row_max, side="right")
+        if not (ends > starts).any():
+            return empty
+        rows = np.concatenate([np.arange(s, e) for s, e in zip(starts, ends) if e > s])
+
+        tile_shift = TILE_ZOOM - z
+        tx = snapshot.tile_x[rows] >> tile_shift
+        ty = snapshot.tile_y[rows] >> tile_shift
+        mask = (tx >= x_min) & (tx <= x_max) & (ty >= y_min) & (ty <= y_max)
+        if live is not None:
+            mask &= live[rows]
+
+        if property_type:
+            codes = np.flatnonzero(snapshot.types == property_type)
+            if not len(codes):
+                return empty
+            mask &= snapshot.type_codes[rows] == codes[0]
+        # NaN comparisons are False, matching SQL NULL semantics
+        if min_value is not None:
+            mask &= snapshot.values[rows] >= min_value
+        if max_value is not None:
+            mask &= snapshot.values[rows] <= max_value
+
+        return rows[mask]
+
+    def select(
+        self,
+        z: int,
+        x_min: int,
+        x_max: int,
+        y_min: int,
+        y_max: int,
+        property_type: Optional[str] = None,
+        min_value: Optional[float] = None,
+        max_value: Optional[float] = None
+    ) -> _Selection:
+        """
+        Return the rows inside a block of tiles at zoom ``z`` (``z`` <=
+        TILE_ZOOM) that match the filters.
+        """
+        state = self._state
+        return _Selection(
+            parts=tuple(
+                (snapshot, self._select_rows(
+                    snapshot, live, z, x_min, x_max, y_min, y_max, property_type, min_value, max_value
+                ))
+                for snapshot, live in state.parts
+            ),
+            types=_union_types(state),
+        )
+
+    def points_for_tiles(
+        self,
+        z: int,
+        tiles: List[Tile],
+        limit: int,
+        property_type: Optional[str] = None,
+        min_value: Optional[float] = None,
+        max_value: Optional[float] = None
+    ) -> Dict[Tile, List[Dict[str, Any]]]:
+        """
+        Return up to ``limit`` properties per tile, most valuable first.
+        """
+        result: Dict[Tile, List[Dict[str, Any]]] = {tile: [] for tile in tiles}
+        if not tiles:
+            return result
+
+        for x_min, x_max, y_min, y_max in tile_blocks(tiles):
+            self._points_for_block(result, z, x_min, x_max, y_min, y_max, limit, property_type, min_value, max_value)
+        return result
+
+    def _points_for_block(
+        self,
+        result: Dict[Tile, List[Dict[str, Any]]],
+        z: int,
+        x_min: int,
+        x_max: int,
+        y_min: int,
+        y_max: int,
+        limit: int,
+        property_type: Optional[str],
+        min_value: Optional[float],
+        max_value: Optional[float]
+    ) -> None:
+        selection = self.select(z, x_min, x_max, y_min, y_max, property_type, min_value, max_value)
+
+        tile_shift = TILE_ZOOM - z
+        tile_keys = ((selection.column("tile_x") >> tile_shift) << z) | (selection.column("tile_y") >> tile_shift)
+
+        # Sort by tile, then value descending with NULLs last, and keep the top rows
+        values = selection.column("values")
+        order = np.lexsort((np.where(np.isnan(values), np.inf, -values), tile_keys))
+        rows, tile_keys, values = order, tile_keys[order], values[order]
+        _, run_start = _group_starts(tile_keys)
+        top = (np.arange(len(rows)) - run_start) < limit
+        rows, tile_keys, values = rows[top], tile_keys[top], values[top]
+
+        ids = selection.column("ids")[rows]
+        addresses = selection.column("addresses")[rows]
+        types = selection.types[selection.type_codes()[rows]]
+        lat = selection.column("lat")[rows]
+        lng = selection.column("lng")[rows]
+
+        mask = (1 << z) - 1
+        for i, key in enumerate(tile_keys.tolist()):
+            result[(key >> z, key & mask)].append({
+                "id": ids[i],
+                "address": addresses[i],
+                "property_type": types[i],
+                "estimated_value": None if np.isnan(values[i]) else float(values[i]),
+                "latitude": float(lat[i]),
+                "longitude": float(lng[i]),
+            })
+
+    def clusters_for_range(
+        self,
+        level: int,
+        x_min: int,
+        x_max: int,
+        y_min: int,
+        y_max: int,
+        property_type: Optional[str] = None,
+        min_value: Optional[float] = None,
+        max_value: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Same contract as ``PropertyGridService.clusters_for_range``, from memory.
+        """
+        selection = self.select(level, x_min, x_max, y_min, y_max, property_type, min_value, max_value)
+        if not len(selection):
+            return []
+
+        tile_shift = TILE_ZOOM - level
+        cell_keys = ((selection.column("tile_x") >> tile_shift) << level) | (selection.column("tile_y") >> tile_shift)
+        cells, inverse = np.unique(cell_keys, return_inverse=True)
+        n_cells = len(cells)
+
+        values = selection.column("values")
+        has_value = ~np.isnan(values)
+        counts = np.bincount(inverse, minlength=n_cells)
+        value_counts = np.bincount(inverse, weights=has_value, minlength=n_cells)
+        value_sums = np.bincount(inverse, weights=np.where(has_value, values, 0.0), minlength=n_cells)
+        value_mins = np.full(n_cells, np.inf)
+        value_maxs = np.full(n_cells, -np.inf)
+        np.minimum.at(value_mins, inverse[has_value], values[has_value])
+        np.maximum.at(value_maxs, inverse[has_value], values[has_value])
+        lng = np.bincount(inverse, weights=selection.column("lng"), minlength=n_cells) / counts
+        lat = np.bincount(inverse, weights=selection.column("lat"), minlength=n_cells) / counts
+
+        n_types = len(selection.types)
+        type_counts = np.bincount(
+            inverse * n_types + selection.type_codes(), minlength=n_cells * n_types
+        ).reshape(n_cells, n_types)
+
+        mask = (1 << level) - 1
+        clusters = []
+        for i, key in enumerate(cells.tolist()):
+            tile_x, tile_y = key >> level, key & mask
+            has_values = value_counts[i] > 0
+            clusters.append({
+                "id": f"{level}/{tile_x}/{tile_y}",
+                "tile_x": tile_x,
+                "tile_y": tile_y,
+                "count": int(counts[i]),
+                "avg_value": float(value_sums[i] / value_counts[i]) if has_values else None,
+                "value_min": float(value_mins[i]) if has_values else None,
+                "value_max": float(value_maxs[i]) if has_values else None,
+                "latitude": float(lat[i]),
+                "longitude": float(lng[i]),
+                "type_counts": {
+                    str(selection.types[t]): int(type_counts[i, t])
+                    for t in np.flatnonzero(type_counts[i])
+                },
+            })
+        return clusters
+
+    def facet_counts(
+        self,
+        value_edges: Sequence[float],
+        bedroom_levels: Sequence[int],
+        property_type: Optional[str] = None,
+        min_value: Optional[float] = None,
+        max_value: Optional[float] = None,
+        min_bedrooms: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Same contract as ``PropertyFacetService.counts_from_database``: each
+        facet is counted under every filter except its own.
+        """
+        state = self._state
+        types = _union_types(state)
+        total = 0
+        type_counts = np.zeros(len(types), dtype=np.int64)
+        value_counts = np.zeros(len(value_edges) + 1, dtype=np.int64)
+        bedroom_counts = np.zeros(len(bedroom_levels), dtype=np.int64)
+
+        for snapshot, live in state.parts:
+            n = len(snapshot)
+            if not n:
+                continue
+            if live is None:
+                live = np.ones(n, dtype=bool)
+
+            type_mask = live.copy()
+            if property_type:
+                codes = np.flatnonzero(snapshot.types == property_type)
+                type_mask &= snapshot.type_codes == codes[0] if len(codes) else False
+            value_mask = live.copy()
+            if min_value is not None:
+                value_mask &= snapshot.values >= min_value
+            if max_value is not None:
+                value_mask &= snapshot.values <= max_value
+            bedroom_mask = live.copy()
+            if min_bedrooms is not None:
+                bedroom_mask &= snapshot.bedrooms >= min_bedrooms
+
+            codes = np.searchsorted(types, snapshot.types)[snapshot.type_codes[value_mask & bedroom_mask]]
+            type_counts += np.bincount(codes, minlength=len(types))
+
+            rows = type_mask & bedroom_mask & ~np.isnan(snapshot.values)
+            buckets = np.searchsorted(np.asarray(value_edges, dtype=np.float64), snapshot.values[rows], side="right")
+            value_counts += np.bincount(buckets, minlength=len(value_edges) + 1)
+
+            rows = type_mask & value_mask
+            bedroom_counts += [np.count_nonzero(rows & (snapshot.bedrooms >= level)) for level in bedroom_levels]
+
+            total += int(np.count_nonzero(type_mask & value_mask & bedroom_mask))
+
+        return {
+            "total": total,
+            "property_type": {
+                str(types[t]): int(type_counts[t]) for t in np.flatnonzero(type_counts)
+            },
+            "value": [int(count) for count in value_counts],
+            "bedrooms": [int(count) for count in bedroom_counts],
+        }
+
+# Process-wide index; empty unless MAP_MEMORY_INDEX is enabled
+map_index = PropertyMapIndex()
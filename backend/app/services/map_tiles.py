@@ -0,0 +1,115 @@
+"""
+Mapbox Vector Tile generation for the property map.
+
+Tiles are rendered in PostGIS with ST_AsMVT / ST_AsMVTGeom:
+
+- from ``MAP_TILE_POINT_MIN_ZOOM`` upwards every property is a point feature
+  with ``id``, ``type`` and ``value_bucket`` attributes
+- below that, properties are aggregated onto a ``MAP_TILE_CLUSTER_GRID`` x
+  ``MAP_TILE_CLUSTER_GRID`` grid per tile and each cell becomes one feature
+  with ``count``, the most common ``type`` and the ``value_bucket`` of its
+  average value, so tile size stays bounded however dense the area is
+
+Rendered tiles are kept in the tile store (see ``app.services.tile_store``)
+per (z, x, y, filters) for ``MAP_TILE_CACHE_EXPIRY`` seconds, or until a
+property inside the tile changes.
+"""
+import logging
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.geo import tile_size_meters
+from app.services.tile_store import tile_store
+
+logger = logging.getLogger(__name__)
+
+MVT_CONTENT_TYPE = "application/vnd.mapbox-vector-tile"
+MVT_EXTENT = 4096
+MVT_BUFFER = 64
+PROPERTY_LAYER = "properties"
+
+def value_bucket_sql(column: str) -> str:
+    """SQL expression mapping a value column onto MAP_VALUE_BUCKETS (0 = lowest)."""
+    thresholds = ",".join(str(int(t)) for t in settings.MAP_VALUE_BUCKETS)
+    return f"width_bucket({column}, ARRAY[{thresholds}]::numeric[])"
+
+_BOUNDS_CTE = """
+    bounds AS (
+        SELECT ST_TileEnvelope(:z, :x, :y) AS geom_3857,
+               ST_Transform(ST_TileEnvelope(:z, :x, :y), 4326) AS geom_4326
+    )
+"""
+
+_FILTER_SQL = "(CAST(:property_type AS TEXT) IS NULL OR p.property_type = :property_type)"
+
+POINT_TILE_SQL = f"""
+    WITH {_BOUNDS_CTE},
+    features AS (
+        SELECT ST_AsMVTGeom(ST_Transform(p.location::geometry, 3857), bounds.geom_3857,
+                            {MVT_EXTENT}, {MVT_BUFFER}, true) AS geom,
+               p.id::text AS id,
+               p.property_type AS type,
+               {value_bucket_sql("p.current_value")} AS value_bucket
+        FROM properties p, bounds
+        WHERE p.location::geometry && bounds.geom_4326
+          AND {_FILTER_SQL}
+    )
+    SELECT ST_AsMVT(features.*, '{PROPERTY_LAYER}', {MVT_EXTENT}, 'geom') FROM features
+"""
+
+CLUSTER_TILE_SQL = f"""
+    WITH {_BOUNDS_CTE},
+    cells AS (
+        SELECT ST_SnapToGrid(ST_Transform(p.location::geometry, 3857), :cell_size) AS cell,
+               count(*) AS count,
+               avg(p.current_value) AS avg_value,
+               mode() WITHIN GROUP (ORDER BY p.property_type) AS type
+        FROM properties p, bounds
+        WHERE p.location::geometry && bounds.geom_4326
+          AND {_FILTER_SQL}
+        GROUP BY cell
+    ),
+    features AS (
+        SELECT ST_AsMVTGeom(cells.cell, bounds.geom_3857, {MVT_EXTENT}, {MVT_BUFFER}, true) AS geom,
+               cells.count,
+               cells.type,
+               {value_bucket_sql("cells.avg_value")} AS value_bucket
+        FROM cells, bounds
+    )
+    SELECT ST_AsMVT(features.*, '{PROPERTY_LAYER}', {MVT_EXTENT}, 'geom') FROM features
+"""
+
+class MapTileService:
+    @staticmethod
+    def render_property_tile(db: Session, z: int, x: int, y: int, property_type: Optional[str] = None) -> bytes:
+        """
+        Render a property vector tile in PostGIS.
+        """
+        params = {"z": z, "x": x, "y": y, "property_type": property_type}
+
+        if z >= settings.MAP_TILE_POINT_MIN_ZOOM:
+            sql = POINT_TILE_SQL
+        else:
+            sql = CLUSTER_TILE_SQL
+            params["cell_size"] = tile_size_meters(z) / settings.MAP_TILE_CLUSTER_GRID
+
+        tile = db.execute(text(sql), params).scalar()
+        return bytes(tile) if tile else b""
+
+    @staticmethod
+    async def get_property_tile(db: Session, z: int, x: int, y: int, property_type: Optional[str] = None) -> bytes:
+        """
+        Return a property vector tile, rendering and caching it on a miss.
+        """
+        variant = property_type or "*"
+        tile = await tile_store.get(PROPERTY_LAYER, z, x, y, variant)
+        if tile is not None:
+            return tile
+
+        state = await tile_store.invalidation_state()
+        tile = MapTileService.render_property_tile(db, z, x, y, property_type)
+        await tile_store.put(PROPERTY_LAYER, z, x, y, variant, tile, state)
+        return tile
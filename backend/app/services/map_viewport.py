@@ -0,0 +1,304 @@
+"""
+Tile-assembled responses for the ``/properties/map`` endpoint.
+
+Raw viewports almost never repeat, so caching by bounding box hardly ever
+hits. Instead each viewport is snapped to the XYZ tile grid at the zoom where
+it spans at least ``MAP_VIEWPORT_TILES_ACROSS`` tiles, and the response is built
+from per-tile feature lists:
+
+- below ``MAP_TILE_POINT_MIN_ZOOM`` a tile holds grid clusters, one per cell
+  of the finer grid level that gives ``MAP_CLUSTER_CELLS_ACROSS`` cells across
+  the viewport (see ``PropertyGridService``)
+- from that zoom on a tile holds up to ``MAP_TILE_FEATURE_LIMIT`` properties,
+  most valuable first
+
+Tiles are kept in the tile store per (zoom, x, y, filters) and only the
+missing ones are read from PostGIS (or from the in-memory map index when
+``MAP_MEMORY_INDEX`` is enabled): points in a single query over the list
+of missing tiles, clusters per contiguous block of them. Overlapping viewports therefore share
+almost all of their tiles. Tiles rendered from a map index that lags behind
+the last tile invalidation are served but not stored.
+
+While panning, clients can ask for a delta instead: given the ``z/x/y`` ids
+of the tiles they already hold, only the newly covered tiles are returned,
+along with the ids of held tiles that left the viewport.
+"""
+import json
+import logging
+import math
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.geo import is_valid_tile, tile_blocks, tiles_for_bbox, zoom_for_bbox
+from app.services.map_grid import GRID_MAX_ZOOM, PropertyGridService
+from app.services.map_index import map_index
+from app.services.tile_store import tile_store
+
+logger = logging.getLogger(__name__)
+
+Tile = Tuple[int, int]
+
+# Tile store layer holding the JSON feature lists of /map tiles
+MAP_LAYER = "map"
+
+POINT_FEATURES_SQL = """
+    SELECT id, address, property_type, estimated_value, longitude, latitude, tile_x, tile_y
+    FROM (
+        SELECT pts.*,
+               row_number() OVER (
+                   PARTITION BY pts.tile_x, pts.tile_y
+                   ORDER BY pts.estimated_value DESC NULLS LAST, pts.id
+               ) AS tile_rank
+        FROM (
+            SELECT p.id::text AS id,
+                   p.address,
+                   p.property_type,
+                   p.current_value AS estimated_value,
+                   ST_X(p.location::geometry) AS longitude,
+                   ST_Y(p.location::geometry) AS latitude,
+                   missing.x AS tile_x,
+                   missing.y AS tile_y
+            FROM unnest(CAST(:xs AS INTEGER[]), CAST(:ys AS INTEGER[])) AS missing(x, y)
+            JOIN properties p
+              ON p.location::geometry && ST_Transform(ST_TileEnvelope(:z, missing.x, missing.y), 4326)
+             AND wm_tile_x(ST_X(p.location::geometry), :z) = missing.x
+             AND wm_tile_y(ST_Y(p.location::geometry), :z) = missing.y
+            WHERE (CAST(:property_type AS TEXT) IS NULL OR p.property_type = :property_type)
+              AND (CAST(:min_value AS NUMERIC) IS NULL OR p.current_value >= :min_value)
+              AND (CAST(:max_value AS NUMERIC) IS NULL OR p.current_value <= :max_value)
+        ) pts
+    ) ranked
+    WHERE tile_rank <= :tile_limit
+"""
+
+def format_tile_id(z: int, x: int, y: int) -> str:
+    return f"{z}/{x}/{y}"
+
+def parse_tile_id(tile_id: str) -> Tuple[int, int, int]:
+    """Parse a ``z/x/y`` tile id, raising ValueError if it is malformed."""
+    parts = tile_id.strip().split("/")
+    if len(parts) != 3:
+        raise ValueError(f"Invalid tile id: {tile_id}")
+    z, x, y = (int(part) for part in parts)
+    if not is_valid_tile(z, x, y):
+        raise ValueError(f"Invalid tile id: {tile_id}")
+    return z, x, y
+
+class MapViewportService:
+    @staticmethod
+    def snap_viewport(lat_min: float, lat_max: float, lng_min: float, lng_max: float) -> Tuple[int, List[Tile]]:
+        """
+        Return the zoom and covering tiles for a viewport.
+        """
+        zoom = zoom_for_bbox(lat_min, lat_max, lng_min, lng_max, settings.MAP_VIEWPORT_TILES_ACROSS, GRID_MAX_ZOOM)
+        tiles = tiles_for_bbox(zoom, lat_min, lat_max, lng_min, lng_max)
+        # Tall viewports at high latitudes cover more Mercator rows than expected
+        while len(tiles) > settings.MAP_VIEWPORT_MAX_TILES and zoom > 0:
+            zoom -= 1
+            tiles = tiles_for_bbox(zoom, lat_min, lat_max, lng_min, lng_max)
+        return zoom, tiles
+
+    @staticmethod
+    def is_clustered(z: int) -> bool:
+        return z < settings.MAP_TILE_POINT_MIN_ZOOM
+
+    @staticmethod
+    def cluster_level(z: int) -> int:
+        """
+        Grid level whose cells split each tile at zoom ``z`` into clusters.
+        """
+        cells_per_tile = max(settings.MAP_CLUSTER_CELLS_ACROSS / settings.MAP_VIEWPORT_TILES_ACROSS, 1)
+        return min(z + int(round(math.log2(cells_per_tile))), GRID_MAX_ZOOM)
+
+    @staticmethod
+    def tile_variant(
+        property_type: Optional[str] = None,
+        min_value: Optional[float] = None,
+        max_value: Optional[float] = None
+    ) -> Optional[str]:
+        """
+        Tile store variant of a filter combination, or None if its tiles are
+        not stored. Value ranges are free-form, so storing them would add
+        files under every tile for each distinct range a client sends.
+        """
+        if min_value is not None or max_value is not None:
+            return None
+        return property_type or "*"
+
+    @staticmethod
+    def _point_feature(row: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "id": row["id"],
+            "address": row["address"],
+            "property_type": row["property_type"],
+            "estimated_value": float(row["estimated_value"]) if row["estimated_value"] is not None else None,
+            "latitude": row["latitude"],
+            "longitude": row["longitude"],
+        }
+
+    @staticmethod
+    def _cluster_feature(cluster: Dict[str, Any]) -> Dict[str, Any]:
+        count = cluster["count"]
+        return {
+            "id": cluster["id"],
+            "address": f"{count} {'property' if count == 1 else 'properties'}",
+            "property_type": "cluster",
+            "estimated_value": cluster["avg_value"],
+            "latitude": cluster["latitude"],
+            "longitude": cluster["longitude"],
+            "count": count,
+            "value_min": cluster["value_min"],
+            "value_max": cluster["value_max"],
+            "type_counts": cluster["type_counts"],
+        }
+
+    @staticmethod
+    def render_tiles(
+        db: Session,
+        z: int,
+        tiles: List[Tile],
+        property_type: Optional[str] = None,
+        min_value: Optional[float] = None,
+        max_value: Optional[float] = None
+    ) -> Dict[Tile, List[Dict[str, Any]]]:
+        """
+        Compute the features of several tiles, reading only those tiles.
+        """
+        result: Dict[Tile, List[Dict[str, Any]]] = {tile: [] for tile in tiles}
+        if not tiles:
+            return result
+
+        if MapViewportService.is_clustered(z):
+            level = MapViewportService.cluster_level(z)
+            shift = level - z
+            # One block of cells per contiguous block of missing tiles
+            for x_min, x_max, y_min, y_max in tile_blocks(tiles):
+                cell_range = (
+                    x_min << shift, ((x_max + 1) << shift) - 1,
+                    y_min << shift, ((y_max + 1) << shift) - 1,
+                )
+                if map_index.ready:
+                    clusters = map_index.clusters_for_range(
+                        level, *cell_range,
+                        property_type=property_type, min_value=min_value, max_value=max_value
+                    )
+                else:
+                    clusters = PropertyGridService.clusters_for_range(
+                        db, level, *cell_range,
+                        property_type=property_type, min_value=min_value, max_value=max_value
+                    )
+                for cluster in clusters:
+                    tile = (cluster["tile_x"] >> shift, cluster["tile_y"] >> shift)
+                    # Raw points on a block edge can fall in the neighbouring tile
+                    if tile in result:
+                        result[tile].append(MapViewportService._cluster_feature(cluster))
+            return result
+
+        if map_index.ready:
+            return map_index.points_for_tiles(
+                z, tiles, settings.MAP_TILE_FEATURE_LIMIT,
+                property_type=property_type, min_value=min_value, max_value=max_value
+            )
+
+        xs, ys = zip(*tiles)
+        rows = db.execute(text(POINT_FEATURES_SQL), {
+            "z": z,
+            "xs": list(xs),
+            "ys": list(ys),
+            "property_type": property_type,
+            "min_value": min_value,
+            "max_value": max_value,
+            "tile_limit": settings.MAP_TILE_FEATURE_LIMIT,
+        }).mappings().all()
+
+        for row in rows:
+            tile = (row["tile_x"], row["tile_y"])
+            if tile in result:
+                result[tile].append(MapViewportService._point_feature(row))
+        return result
+
+    @staticmethod
+    async def get_tiles(
+        db: Session,
+        z: int,
+        tiles: List[Tile],
+        property_type: Optional[str] = None,
+        min_value: Optional[float] = None,
+        max_value: Optional[float] = None
+    ) -> Dict[Tile, List[Dict[str, Any]]]:
+        """
+        Return the features of each tile, rendering and caching only the missing ones.
+        Value-filtered tiles are always rendered (see ``tile_variant``).
+        """
+        variant = MapViewportService.tile_variant(property_type, min_value, max_value)
+        stored = await tile_store.get_many(MAP_LAYER, z, tiles, variant) if variant is not None else {}
+
+        result = {tile: json.loads(data) for tile, data in stored.items()}
+        missing = [tile for tile in tiles if tile not in result]
+        logger.debug(f"Map viewport z={z}: {len(result)} stored tile(s), {len(missing)} to render")
+
+        if missing:
+            state = await tile_store.invalidation_state() if variant is not None else None
+            rendered = MapViewportService.render_tiles(db, z, missing, property_type, min_value, max_value)
+            # An index that has not applied changes the store was already
+            # invalidated for renders stale tiles: serve them, but don't keep them
+            if state is not None and (not map_index.ready or map_index.position >= state.get("position", 0)):
+                for tile, features in rendered.items():
+                    await tile_store.put(MAP_LAYER, z, *tile, variant, json.dumps(features).encode(), state)
+            result.update(rendered)
+
+        return result
+
+    @staticmethod
+    async def get_viewport(
+        db: Session,
+        lat_min: float,
+        lat_max: float,
+        lng_min: float,
+        lng_max: float,
+        property_type: Optional[str] = None,
+        min_value: Optional[float] = None,
+        max_value: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Return the map features of every tile covering a viewport.
+        """
+        z, tiles = MapViewportService.snap_viewport(lat_min, lat_max, lng_min, lng_max)
+        features = await MapViewportService.get_tiles(db, z, tiles, property_type, min_value, max_value)
+        return [feature for tile in tiles for feature in features[tile]]
+
+    @staticmethod
+    async def get_viewport_delta(
+        db: Session,
+        lat_min: float,
+        lat_max: float,
+        lng_min: float,
+        lng_max: float,
+        loaded_tiles: Iterable[str],
+        property_type: Optional[str] = None,
+        min_value: Optional[float] = None,
+        max_value: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Return only the tiles a client is missing for a viewport, plus the
+        ids of loaded tiles it can drop. ``loaded_tiles`` must have been
+        fetched with the same filters.
+        """
+        loaded = {format_tile_id(*parse_tile_id(tile_id)) for tile_id in loaded_tiles}
+        z, tiles = MapViewportService.snap_viewport(lat_min, lat_max, lng_min, lng_max)
+        current = {format_tile_id(z, *tile): tile for tile in tiles}
+
+        added = [tile for tile_id, tile in current.items() if tile_id not in loaded]
+        features = await MapViewportService.get_tiles(db, z, added, property_type, min_value, max_value)
+
+        return {
+            "zoom": z,
+            "tiles": [
+                {"tile": format_tile_id(z, *tile), "features": features[tile]}
+                for tile in added
+            ],
+            "drop_tiles": sorted(loaded - current.keys()),
+        }
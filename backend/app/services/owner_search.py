@@ -0,0 +1,82 @@
+"""
+Owner name search.
+
+Two matching modes:
+
+- substring: ``ILIKE '%q%'`` on the raw name, served by
+  ``owners_name_trgm_idx`` (migration 007)
+- fuzzy: ``pg_trgm`` similarity between the normalized query and
+  ``owners.normalized_name``, so "Jon Smith LLC" finds "John Smith, L.L.C.".
+  Names match when either the whole name (``%``) or a run of its words
+  (``%>``) is similar enough, both served by
+  ``owners_normalized_name_trgm_idx``; results are ranked by similarity.
+
+Without migration 007 fuzzy searches fall back to substring matching.
+"""
+import logging
+import re
+from typing import Any, Optional, Tuple
+
+from sqlalchemy import func, literal_column, or_
+from sqlalchemy.orm import Query, Session
+
+from app.db.features import has_column, has_extension, has_index
+from app.models.owner import Owner
+
+logger = logging.getLogger(__name__)
+
+ENTITY_SUFFIXES = (
+    "llc", "lllp", "llp", "lp", "pllc", "plc", "pc", "inc", "incorporated",
+    "corp", "corporation", "co", "company", "ltd", "limited",
+)
+
+_NON_WORD_RE = re.compile(r"[^a-z0-9]+")
+_SUFFIX_RE = re.compile(r"\b(?:" + "|".join(ENTITY_SUFFIXES) + r")\b")
+_SPACE_RE = re.compile(r"\s+")
+
+# Refers to the generated column, which the ORM model does not map
+normalized_name = literal_column("owners.normalized_name")
+
+class OwnerSearchService:
+    @staticmethod
+    def normalize_name(name: Optional[str]) -> str:
+        """
+        Python twin of the ``normalize_owner_name`` SQL function, e.g.
+        "John Smith, L.L.C." -> "john smith".
+        """
+        value = _NON_WORD_RE.sub(" ", (name or "").replace(".", "").lower())
+        return _SPACE_RE.sub(" ", _SUFFIX_RE.sub(" ", value)).strip()
+
+    @staticmethod
+    def has_fuzzy_search(db: Session) -> bool:
+        return (
+            has_extension(db, "pg_trgm")
+            and has_column(db, "owners", "normalized_name")
+            and has_index(db, "owners", "owners_normalized_name_trgm_idx")
+        )
+
+    @staticmethod
+    def fuzzy_match(q: str) -> Tuple[Any, Any]:
+        """
+        Return ``(condition, score)`` for a fuzzy match of ``q`` against the
+        normalized owner names; the score is in 0..1.
+        """
+        name = OwnerSearchService.normalize_name(q)
+        # normalized_name %> name: some word run of the name is similar to the query
+        condition = or_(normalized_name.op("%")(name), normalized_name.op("%>")(name))
+        score = func.greatest(func.similarity(normalized_name, name), func.word_similarity(name, normalized_name))
+        return condition, score
+
+    @staticmethod
+    def apply_name_filter(query: Query, db: Session, q: str, fuzzy: bool = False) -> Tuple[Query, Optional[Any]]:
+        """
+        Filter an Owner query by name. Returns the query and, for fuzzy
+        matches, the similarity score expression to rank by.
+        """
+        if fuzzy and OwnerSearchService.normalize_name(q):
+            if OwnerSearchService.has_fuzzy_search(db):
+                condition, score = OwnerSearchService.fuzzy_match(q)
+                return query.filter(condition), score
+            logger.debug("Fuzzy owner search unavailable; falling back to substring matching")
+
+        return query.filter(Owner.name.ilike(f"%{q}%")), None
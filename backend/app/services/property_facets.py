@@ -0,0 +1,202 @@
+"""
+Facet counts for property search.
+
+For a set of ``/properties/search`` filters, returns how many properties
+each facet value would yield: per property type, per value bucket
+(``MAP_VALUE_BUCKETS``) and per minimum bedroom count. Each facet is counted
+under every filter except its own, so the UI can show the alternatives to
+the current selection; ``total`` applies all filters.
+
+All facets come from one ``GROUPING SETS`` query with a ``FILTER``ed count
+per facet, or from the in-memory map index when it is loaded and the
+filters are ones it holds (no text query, bathroom or floor-area filter).
+Results are cached per normalized filter set.
+"""
+import hashlib
+import json
+import logging
+from typing import Any, Dict, Optional
+
+from sqlalchemy import and_, case, func, literal_column, select, true, tuple_
+from sqlalchemy.orm import Session
+
+from app.core.cache import cache
+from app.core.config import settings
+from app.models.property import Property
+from app.services.map_index import map_index
+from app.services.property_search import PropertySearchService
+from app.services.unified_search import normalize_text
+
+logger = logging.getLogger(__name__)
+
+# Bedroom facet levels: properties with at least this many bedrooms
+BEDROOM_LEVELS = (1, 2, 3, 4, 5)
+
+properties = Property.__table__
+
+# Bits of GROUPING(property_type, value_bucket, bedroom_level) per grouping set
+_TYPE_SET, _VALUE_SET, _BEDROOM_SET, _TOTAL_SET = 0b011, 0b101, 0b110, 0b111
+
+class PropertyFacetService:
+    @staticmethod
+    def normalize_filters(
+        q: Optional[str] = None,
+        property_type: Optional[str] = None,
+        min_value: Optional[float] = None,
+        max_value: Optional[float] = None,
+        min_bedrooms: Optional[int] = None,
+        min_bathrooms: Optional[float] = None,
+        min_square_feet: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Canonical filter set, so equivalent requests share a cache entry."""
+        return {
+            "q": normalize_text(q) or None,
+            "property_type": property_type or None,
+            "min_value": float(min_value) if min_value is not None else None,
+            "max_value": float(max_value) if max_value is not None else None,
+            "min_bedrooms": min_bedrooms,
+            "min_bathrooms": float(min_bathrooms) if min_bathrooms is not None else None,
+            "min_square_feet": min_square_feet,
+        }
+
+    @staticmethod
+    def cache_key(filters: Dict[str, Any]) -> str:
+        # Bucket edges are part of the result shape
+        payload = json.dumps([filters, settings.MAP_VALUE_BUCKETS], sort_keys=True)
+        return f"facets:properties:{hashlib.sha1(payload.encode()).hexdigest()}"
+
+    @staticmethod
+    def statement(db: Session, filters: Dict[str, Any]):
+        """
+        One grouped query over the rows matching the shared filters, with a
+        count per facet that leaves out the facet's own filter.
+        """
+        common = []
+        if filters["q"]:
+            common.append(PropertySearchService.text_condition(db, filters["q"]))
+        if filters["min_bathrooms"] is not None:
+            common.append(properties.c.bathrooms >= filters["min_bathrooms"])
+        if filters["min_square_feet"] is not None:
+            common.append(properties.c.square_feet >= filters["min_square_feet"])
+
+        type_filter = true()
+        if filters["property_type"]:
+            type_filter = properties.c.property_type == filters["property_type"]
+        value_filters = []
+        if filters["min_value"] is not None:
+            value_filters.append(properties.c.current_value >= filters["min_value"])
+        if filters["max_value"] is not None:
+            value_filters.append(properties.c.current_value <= filters["max_value"])
+        value_filter = and_(true(), *value_filters)
+        bedroom_filter = true()
+        if filters["min_bedrooms"] is not None:
+            bedroom_filter = properties.c.bedrooms >= filters["min_bedrooms"]
+
+        # Constants are inlined so the grouping expressions match the selected ones textually
+        edges = settings.MAP_VALUE_BUCKETS
+        value = properties.c.current_value
+        value_bucket = case(
+            *[(value < literal_column(repr(edge)), literal_column(str(i))) for i, edge in enumerate(edges)],
+            else_=case((value.isnot(None), literal_column(str(len(edges)))))
+        )
+        bedroom_level = func.least(properties.c.bedrooms, literal_column(str(BEDROOM_LEVELS[-1])))
+        property_type = properties.c.property_type
+
+        return select(
+            func.grouping(property_type, value_bucket, bedroom_level).label("grouping"),
+            property_type,
+            value_bucket.label("value_bucket"),
+            bedroom_level.label("bedroom_level"),
+            func.count().filter(and_(value_filter, bedroom_filter)).label("type_count"),
+            func.count().filter(and_(type_filter, bedroom_filter)).label("value_count"),
+            func.count().filter(and_(type_filter, value_filter)).label("bedroom_count"),
+            func.count().filter(and_(type_filter, value_filter, bedroom_filter)).label("total"),
+        ).where(and_(true(), *common)).group_by(
+            func.grouping_sets(
+                tuple_(property_type), tuple_(value_bucket), tuple_(bedroom_level), tuple_()
+            )
+        )
+
+    @staticmethod
+    def counts_from_rows(rows) -> Dict[str, Any]:
+        """Fold the grouping-set rows into per-facet counts."""
+        counts = {
+            "total": 0,
+            "property_type": {},
+            "value": [0] * (len(settings.MAP_VALUE_BUCKETS) + 1),
+            "bedrooms": [0] * len(BEDROOM_LEVELS),
+        }
+        per_level = {}
+        for grouping, property_type, value_bucket, bedroom_level, type_count, value_count, bedroom_count, total in rows:
+            if grouping == _TOTAL_SET:
+                counts["total"] = total
+            elif grouping == _TYPE_SET and property_type is not None and type_count:
+                counts["property_type"][property_type] = type_count
+            elif grouping == _VALUE_SET and value_bucket is not None:
+                counts["value"][value_bucket] = value_count
+            elif grouping == _BEDROOM_SET and bedroom_level is not None:
+                per_level[bedroom_level] = bedroom_count
+
+        # "At least n bedrooms" is the sum over the levels from n up
+        for i, level in enumerate(BEDROOM_LEVELS):
+            counts["bedrooms"][i] = sum(count for bedrooms, count in per_level.items() if bedrooms >= level)
+        return counts
+
+    @staticmethod
+    def counts_from_database(db: Session, filters: Dict[str, Any]) -> Dict[str, Any]:
+        rows = db.execute(PropertyFacetService.statement(db, filters)).fetchall()
+        return PropertyFacetService.counts_from_rows(rows)
+
+    @staticmethod
+    def can_use_index(filters: Dict[str, Any]) -> bool:
+        return (
+            map_index.ready
+            and not filters["q"]
+            and filters["min_bathrooms"] is None
+            and filters["min_square_feet"] is None
+        )
+
+    @staticmethod
+    def format(counts: Dict[str, Any]) -> Dict[str, Any]:
+        """Shape raw counts into the ``PropertyFacets`` response."""
+        edges = settings.MAP_VALUE_BUCKETS
+        bounds = [None] + list(edges) + [None]
+        return {
+            "total": counts["total"],
+            "property_type": [
+                {"value": value, "count": count}
+                for value, count in sorted(counts["property_type"].items(), key=lambda item: (-item[1], item[0]))
+            ],
+            "value": [
+                {"min": bounds[i], "max": bounds[i + 1], "count": count}
+                for i, count in enumerate(counts["value"])
+            ],
+            "bedrooms": [
+                {"min": level, "count": count}
+                for level, count in zip(BEDROOM_LEVELS, counts["bedrooms"])
+            ],
+        }
+
+    @staticmethod
+    async def get_facets(db: Session, filters: Dict[str, Any]) -> Dict[str, Any]:
+        """Facet counts for normalized ``filters``, cached for FACET_CACHE_EXPIRY."""
+        key = PropertyFacetService.cache_key(filters)
+        cached = await cache.get(key)
+        if cached is not None:
+            return cached
+
+        if PropertyFacetService.can_use_index(filters):
+            counts = map_index.facet_counts(
+                settings.MAP_VALUE_BUCKETS,
+                BEDROOM_LEVELS,
+                property_type=filters["property_type"],
+                min_value=filters["min_value"],
+                max_value=filters["max_value"],
+                min_bedrooms=filters["min_bedrooms"],
+            )
+        else:
+            counts = PropertyFacetService.counts_from_database(db, filters)
+
+        facets = PropertyFacetService.format(counts)
+        await cache.set(key, facets, expire=settings.FACET_CACHE_EXPIRY)
+        return facets
@@ -0,0 +1,124 @@
+"""
+Property search query building.
+
+Chooses the fastest text-matching strategy the database supports:
+
+- ``search_vector`` (generated tsvector + GIN index, migration 002) for
+  prefix full-text matching on address, city, state and zip code
+- ``pg_trgm`` trigram similarity on the address for typo-tolerant matching
+- plain ``ILIKE`` scans when neither is available (e.g. SQLite in tests)
+"""
+import logging
+import re
+from typing import Optional
+
+from sqlalchemy import func, literal_column, or_
+from sqlalchemy.orm import Query, Session
+
+from app.db.features import has_column, has_extension, has_index
+from app.models.property import Property
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"[0-9a-z]+")
+
+class PropertySearchService:
+    @staticmethod
+    def build_prefix_tsquery(q: str) -> Optional[str]:
+        """
+        Turn free text into a prefix tsquery string, e.g. "Main St" -> "main:* & st:*"
+        """
+        tokens = _TOKEN_RE.findall(q.lower())
+        if not tokens:
+            return None
+        return " & ".join(f"{token}:*" for token in tokens)
+
+    @staticmethod
+    def has_full_text_search(db: Session) -> bool:
+        return has_column(db, "properties", "search_vector")
+
+    @staticmethod
+    def has_trigram_search(db: Session) -> bool:
+        return (
+            has_extension(db, "pg_trgm")
+            and has_index(db, "properties", "properties_address_trgm_idx")
+        )
+
+    @staticmethod
+    def build_query(
+        db: Session,
+        q: Optional[str] = None,
+        property_type: Optional[str] = None,
+        min_value: Optional[float] = None,
+        max_value: Optional[float] = None,
+        min_bedrooms: Optional[int] = None,
+        min_bathrooms: Optional[float] = None,
+        min_square_feet: Optional[int] = None
+    ) -> Query:
+        """
+        Build the filtered (unordered, unpaginated) Property query for a search.
+        """
+        query = db.query(Property)
+        
+        # Apply filters
+        if q:
+            # Uses the full-text / trigram indexes when the search migration has been applied
+            query = PropertySearchService.apply_text_filter(query, db, q)
+        
+        if property_type:
+            query = query.filter(Property.property_type == property_type)
+        
+        if min_value is not None:
+            query = query.filter(Property.current_value >= min_value)
+        
+        if max_value is not None:
+            query = query.filter(Property.current_value <= max_value)
+        
+        if min_bedrooms is not None:
+            query = query.filter(Property.bedrooms >= min_bedrooms)
+        
+        if min_bathrooms is not None:
+            query = query.filter(Property.bathrooms >= min_bathrooms)
+        
+        if min_square_feet is not None:
+            query = query.filter(Property.square_feet >= min_square_feet)
+        
+        return query
+
+    @staticmethod
+    def apply_text_filter(query: Query, db: Session, q: str) -> Query:
+        """
+        Filter a Property query by free text using the best available index.
+        """
+        return query.filter(PropertySearchService.text_condition(db, q))
+
+    @staticmethod
+    def text_condition(db: Session, q: str):
+        """
+        Free-text match on the address fields, for ORM queries and Core selects alike.
+        """
+        conditions = []
+
+        if PropertySearchService.has_full_text_search(db):
+            tsquery = PropertySearchService.build_prefix_tsquery(q)
+            if tsquery:
+                conditions.append(
+                    literal_column("properties.search_vector").op("@@")(
+                        func.to_tsquery("simple", tsquery)
+                    )
+                )
+
+        if PropertySearchService.has_trigram_search(db):
+            # Catches misspelled street names the tsquery prefix match misses
+            conditions.append(Property.address.op("%")(q))
+
+        if conditions:
+            return or_(*conditions)
+
+        # Fall back to ILIKE for text search
+        return (
+            Property.address.ilike(f"%{q}%") |
+            Property.city.ilike(f"%{q}%") |
+            Property.state.ilike(f"%{q}%") |
+            Property.zip_code.ilike(f"%{q}%")
+        )
@@ -0,0 +1,126 @@
+"""
+Result cache for ``/properties/search``.
+
+Requests are canonicalized before they reach the cache, so ``q="Main St"``
+and ``q=" main  st"`` share an entry (see
+``PropertyFacetService.normalize_filters``). The value range is widened to
+two significant figures ("min_value=505000" is cached as 500000), so nearby
+ranges share the entry as well.
+
+An entry holds the ordered ``[id, current_value]`` pairs of the first
+``SEARCH_MAX_RESULTS`` matches of the widened filters rather than full rows.
+The exact value range is re-applied to those pairs, every ``skip``/``limit``
+page is cut from them, and only the page's rows are loaded by primary key.
+Pages past the cached list are read from the database.
+"""
+import hashlib
+import json
+import logging
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Query, Session
+
+from app.core.cache import cache
+from app.core.config import settings
+from app.core.pagination import get_total
+from app.models.property import Property
+from app.services.property_search import PropertySearchService
+
+logger = logging.getLogger(__name__)
+
+# Same order as the uncached listing
+SEARCH_ORDER = (Property.updated_at.desc(), Property.id.desc())
+
+def bucket_value(value: Optional[float], up: bool) -> Optional[float]:
+    """Round ``value`` down (or up) to two significant figures."""
+    if value is None or value <= 0:
+        return value
+    step = 10 ** (math.floor(math.log10(value)) - 1)
+    return float((math.ceil if up else math.floor)(value / step) * step)
+
+class PropertySearchCache:
+    @staticmethod
+    def cache_filters(filters: Dict[str, Any]) -> Dict[str, Any]:
+        """The widened filters an entry is cached under."""
+        return {
+            **filters,
+            "min_value": bucket_value(filters["min_value"], up=False),
+            "max_value": bucket_value(filters["max_value"], up=True),
+        }
+
+    @staticmethod
+    def cache_key(filters: Dict[str, Any]) -> str:
+        payload = json.dumps(PropertySearchCache.cache_filters(filters), sort_keys=True)
+        return f"search:properties:{hashlib.sha1(payload.encode()).hexdigest()}"
+
+    @staticmethod
+    def build_query(db: Session, filters: Dict[str, Any]) -> Query:
+        return PropertySearchService.build_query(db, **filters)
+
+    @staticmethod
+    def read_entry(db: Session, filters: Dict[str, Any]) -> Dict[str, Any]:
+        """Ids and values of the first SEARCH_MAX_RESULTS matches of the widened filters."""
+        query = PropertySearchCache.build_query(db, PropertySearchCache.cache_filters(filters))
+        rows = query.with_entities(Property.id, Property.current_value).order_by(
+            *SEARCH_ORDER
+        ).limit(settings.SEARCH_MAX_RESULTS + 1).all()
+        return {
+            "rows": [
+                [str(property_id), float(value) if value is not None else None]
+                for property_id, value in rows[:settings.SEARCH_MAX_RESULTS]
+            ],
+            "complete": len(rows) <= settings.SEARCH_MAX_RESULTS,
+        }
+
+    @staticmethod
+    def matching_ids(entry: Dict[str, Any], filters: Dict[str, Any]) -> List[str]:
+        """Re-apply the exact value range to a cached entry."""
+        low, high = filters["min_value"], filters["max_value"]
+        if low is None and high is None:
+            return [property_id for property_id, _ in entry["rows"]]
+        return [
+            property_id for property_id, value in entry["rows"]
+            if value is not None and (low is None or value >= low) and (high is None or value <= high)
+        ]
+
+    @staticmethod
+    def load(db: Session, ids: List[str]) -> List[Property]:
+        """Rows for ``ids`` in that order; rows deleted since caching are dropped."""
+        if not ids:
+            return []
+        found = {str(prop.id): prop for prop in db.query(Property).filter(Property.id.in_(ids)).all()}
+        return [found[property_id] for property_id in ids if property_id in found]
+
+    @staticmethod
+    async def search(
+        db: Session,
+        filters: Dict[str, Any],
+        skip: int,
+        limit: int,
+        estimate_total: bool = False
+    ) -> Tuple[List[Property], Optional[int], bool]:
+        """
+        One offset page of the search for normalized ``filters``. Returns
+        ``(properties, total, is_estimate)``; total is only computed when
+        asked for, and is exact when every match is cached.
+        """
+        key = PropertySearchCache.cache_key(filters)
+        entry = await cache.get(key)
+        if entry is None:
+            entry = PropertySearchCache.read_entry(db, filters)
+            await cache.set(key, entry, expire=settings.SEARCH_CACHE_EXPIRY)
+
+        ids = PropertySearchCache.matching_ids(entry, filters)
+        if entry["complete"] or skip + limit <= len(ids):
+            total, is_estimate = None, False
+            if estimate_total:
+                total, is_estimate = (len(ids), False) if entry["complete"] else get_total(
+                    db, PropertySearchCache.build_query(db, filters)
+                )
+            return PropertySearchCache.load(db, ids[skip:skip + limit]), total, is_estimate
+
+        # Deeper than the cached matches
+        query = PropertySearchCache.build_query(db, filters)
+        total, is_estimate = get_total(db, query) if estimate_total else (None, False)
+        return query.order_by(*SEARCH_ORDER).offset(skip).limit(limit).all(), total, is_estimate
@@ -0,0 +1,296 @@
+"""
+Change alerts for saved searches.
+
+Saved searches are grouped by their normalized property criteria (the query
+and property filters of ``POST /api/search``), so criteria saved by many
+users are evaluated once per run. Each group keeps its current matches in
+``saved_search_results`` (migration 008):
+
+- a new group records its initial matches with one ``INSERT ... SELECT``
+  and raises no alerts for them
+- afterwards, a run re-evaluates only the properties inserted or updated in
+  the ``property_changes`` feed since the group's ``feed_position``, in
+  batches of ids, and records what started or stopped matching as deltas
+- deleted properties drop out of the results through the foreign key
+
+``notify`` emails each user one digest of the new matches of their saved
+searches since the last alert. Deltas are kept for
+``SAVED_SEARCH_DELTA_RETENTION_DAYS``.
+"""
+import hashlib
+import json
+import logging
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import column, literal, select, table, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.change_feed import feed_position
+from app.services.unified_search import PROPERTY_FILTERS, UnifiedSearchService, properties
+
+logger = logging.getLogger(__name__)
+
+# Changed properties are matched against a group this many ids at a time
+BATCH_SIZE = 5000
+# Addresses listed per saved search in an alert
+ALERT_ADDRESSES = 5
+
+saved_search_results = table("saved_search_results", column("criteria_hash"), column("property_id"))
+
+SAVED_SEARCHES_SQL = """
+    SELECT id::text, search_criteria, criteria_hash FROM saved_searches WHERE alerts_enabled
+"""
+
+CHANGED_PROPERTIES_SQL = """
+    SELECT DISTINCT property_id::text FROM property_changes
+    WHERE txid >= :after AND txid < :upto AND operation IN ('I', 'U')
+"""
+
+PENDING_ALERTS_SQL = rf"""
+    SELECT s.id::text AS id, s.name, u.email, max(d.id) AS last_delta_id,
+           count(DISTINCT d.property_id) AS new_matches,
+           (array_agg(DISTINCT p.address))[1\:{ALERT_ADDRESSES}] AS addresses
+    FROM saved_searches s
+    JOIN users u ON u.id = s.user_id
+    JOIN saved_search_deltas d
+      ON d.criteria_hash = s.criteria_hash
+     AND d.id > s.last_notified_delta_id
+     AND d.change = 'A'
+     AND d.detected_at > s.created_at
+    -- Only properties that still match
+    JOIN saved_search_results r ON r.criteria_hash = d.criteria_hash AND r.property_id = d.property_id
+    JOIN properties p ON p.id = d.property_id
+    WHERE s.alerts_enabled AND u.is_active
+    GROUP BY s.id, s.name, u.email
+"""
+
+class SavedSearchAlertService:
+    @staticmethod
+    def normalize_criteria(search_criteria: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        Return the property criteria of a saved search, or None when it does
+        not search properties. Accepts a ``SearchRequest`` body (``query`` and
+        ``filters``) or flat ``/properties/search`` parameters (``q`` and the
+        filters). Raises ValueError on invalid criteria.
+        """
+        criteria = dict(search_criteria or {})
+        query = criteria.get("query", criteria.get("q"))
+        filters = criteria.get("filters")
+        if filters is None:
+            filters = {key: criteria[key] for key in PROPERTY_FILTERS if key in criteria}
+
+        request = UnifiedSearchService.parse_request(query, filters, None, None, None, None)
+        if "property" not in request["types"]:
+            return None
+        return {
+            "q": request["q"],
+            "filters": {key: value for key, value in request["filters"].items() if key in PROPERTY_FILTERS},
+        }
+
+    @staticmethod
+    def criteria_hash(criteria: Dict[str, Any]) -> str:
+        return hashlib.sha1(json.dumps(criteria, sort_keys=True, default=str).encode()).hexdigest()
+
+    @staticmethod
+    def match_statement(db: Session, criteria: Dict[str, Any]):
+        """Select the ids of the properties matching ``criteria``."""
+        statement, _ = UnifiedSearchService.property_statement(
+            db, {**criteria, "sort_by": "relevance", "sort_order": "desc"}
+        )
+        return statement.with_only_columns([properties.c.id])
+
+    @staticmethod
+    def sync_groups(db: Session) -> Dict[str, Dict[str, Any]]:
+        """
+        Group the saved searches with alerts by criteria, creating new groups
+        and dropping abandoned ones. Returns ``{criteria hash: criteria}``.
+        """
+        groups: Dict[str, Dict[str, Any]] = {}
+        moved: Dict[Optional[str], List[str]] = defaultdict(list)
+        for search_id, search_criteria, current_hash in db.execute(text(SAVED_SEARCHES_SQL)):
+            try:
+                criteria = SavedSearchAlertService.normalize_criteria(search_criteria)
+            except ValueError as e:
+                logger.warning(f"Saved search {search_id} has no alerts: {e}")
+                criteria = None
+            key = SavedSearchAlertService.criteria_hash(criteria) if criteria is not None else None
+            if key is not None:
+                groups[key] = criteria
+            if key != current_hash:
+                moved[key].append(search_id)
+
+        for key, search_ids in moved.items():
+            db.execute(
+                text("UPDATE saved_searches SET criteria_hash = :hash WHERE id = ANY(CAST(:ids AS uuid[]))"),
+                {"hash": key, "ids": search_ids}
+            )
+        if groups:
+            db.execute(
+                text("""
+                    INSERT INTO saved_search_groups (criteria_hash, criteria)
+                    VALUES (:hash, CAST(:criteria AS JSONB))
+                    ON CONFLICT (criteria_hash) DO NOTHING
+                """),
+                [{"hash": key, "criteria": json.dumps(criteria)} for key, criteria in groups.items()]
+            )
+        # Results and deltas go with the group
+        db.execute(text("""
+            DELETE FROM saved_search_groups g
+            WHERE NOT EXISTS (
+                SELECT 1 FROM saved_searches s WHERE s.criteria_hash = g.criteria_hash AND s.alerts_enabled
+            )
+        """))
+        db.commit()
+        return groups
+
+    @staticmethod
+    def record_initial_matches(db: Session, key: str, criteria: Dict[str, Any]) -> int:
+        matches = SavedSearchAlertService.match_statement(db, criteria).subquery()
+        statement = insert(saved_search_results).from_select(
+            ["criteria_hash", "property_id"],
+            select(literal(key), matches.c.id)
+        ).on_conflict_do_nothing()
+        return db.execute(statement).rowcount
+
+    @staticmethod
+    def _record_delta(db: Session, key: str, property_ids: Sequence[str], change: str) -> None:
+        params = {"hash": key, "ids": list(property_ids), "change": change}
+        if change == "A":
+            db.execute(text("""
+                INSERT INTO saved_search_results (criteria_hash, property_id)
+                SELECT :hash, unnest(CAST(:ids AS uuid[]))
+                ON CONFLICT DO NOTHING
+            """), params)
+        else:
+            db.execute(text("""
+                DELETE FROM saved_search_results
+                WHERE criteria_hash = :hash AND property_id = ANY(CAST(:ids AS uuid[]))
+            """), params)
+        db.execute(text("""
+            INSERT INTO saved_search_deltas (criteria_hash, property_id, change)
+            SELECT :hash, unnest(CAST(:ids AS uuid[])), :change
+        """), params)
+
+    @staticmethod
+    def evaluate(db: Session, key: str, criteria: Dict[str, Any], property_ids: Sequence[str]) -> Tuple[int, int]:
+        """
+        Re-match the given (changed) properties against a group and record
+        the difference. Returns ``(started matching, stopped matching)``.
+        """
+        statement = SavedSearchAlertService.match_statement(db, criteria)
+        added = removed = 0
+        for start in range(0, len(property_ids), BATCH_SIZE):
+            batch = list(property_ids[start:start + BATCH_SIZE])
+            matched = {str(row[0]) for row in db.execute(statement.where(properties.c.id.in_(batch)))}
+            previous = {
+                row[0] for row in db.execute(
+                    text("""
+                        SELECT property_id::text FROM saved_search_results
+                        WHERE criteria_hash = :hash AND property_id = ANY(CAST(:ids AS uuid[]))
+                    """),
+                    {"hash": key, "ids": batch}
+                )
+            }
+            if matched - previous:
+                SavedSearchAlertService._record_delta(db, key, sorted(matched - previous), "A")
+            if previous - matched:
+                SavedSearchAlertService._record_delta(db, key, sorted(previous - matched), "R")
+            added += len(matched - previous)
+            removed += len(previous - matched)
+        return added, removed
+
+    @staticmethod
+    def _mark_run(db: Session, key: str, upto: int) -> None:
+        db.execute(
+            text("UPDATE saved_search_groups SET feed_position = :upto, last_run_at = now() WHERE criteria_hash = :hash"),
+            {"upto": upto, "hash": key}
+        )
+
+    @staticmethod
+    def run(db: Session) -> Dict[str, int]:
+        """
+        Bring every saved search group up to date with the change feed.
+        Returns counts of groups, new groups and recorded deltas.
+        """
+        groups = SavedSearchAlertService.sync_groups(db)
+        # Read first: changes committed during the run are read by the next run
+        upto = feed_position(db)
+        positions = dict(db.execute(text("SELECT criteria_hash, feed_position FROM saved_search_groups")).fetchall())
+        stats = {"groups": len(groups), "new_groups": 0, "added": 0, "removed": 0}
+
+        existing = {}
+        for key, criteria in groups.items():
+            if positions.get(key) is None:
+                SavedSearchAlertService.record_initial_matches(db, key, criteria)
+                SavedSearchAlertService._mark_run(db, key, upto)
+                db.commit()
+                stats["new_groups"] += 1
+            else:
+                existing[key] = criteria
+
+        if existing:
+            # One read of the feed serves every group; re-matching is idempotent
+            after = min(positions[key] for key in existing)
+            changed = [row[0] for row in db.execute(text(CHANGED_PROPERTIES_SQL), {"after": after, "upto": upto})]
+            for key, criteria in existing.items():
+                if changed:
+                    added, removed = SavedSearchAlertService.evaluate(db, key, criteria, changed)
+                    stats["added"] += added
+                    stats["removed"] += removed
+                SavedSearchAlertService._mark_run(db, key, upto)
+                db.commit()
+
+        db.execute(
+            text("DELETE FROM saved_search_deltas WHERE detected_at < now() - CAST(:days AS integer) * INTERVAL '1 day'"),
+            {"days": settings.SAVED_SEARCH_DELTA_RETENTION_DAYS}
+        )
+        db.commit()
+
+        logger.info(
+            f"Saved searches: {stats['groups']} group(s), {stats['new_groups']} new, "
+            f"{stats['added']} new match(es), {stats['removed']} dropped (feed position {upto})"
+        )
+        return stats
+
+    @staticmethod
+    def latest_delta_id(db: Session) -> int:
+        """
+        The newest recorded delta. A search whose alerts are turned back on or
+        whose criteria change is alerted only of matches after it.
+        """
+        return db.execute(text("SELECT COALESCE(max(id), 0) FROM saved_search_deltas")).scalar()
+
+    @staticmethod
+    async def notify(db: Session) -> int:
+        """
+        Email every user a digest of their saved searches' new matches.
+        Returns the number of emails sent; failed sends are retried next run.
+        """
+        pending = defaultdict(list)
+        for row in db.execute(text(PENDING_ALERTS_SQL)):
+            pending[row.email].append(row)
+        db.rollback()
+
+        # Imported here so SMTP/MIME modules are only loaded when alerts are sent
+        from app.services.email import EmailService
+
+        sent = 0
+        for email, searches in pending.items():
+            delivered = await EmailService.send_saved_search_alert(email, [
+                {"name": search.name, "new_matches": search.new_matches, "addresses": list(search.addresses or [])}
+                for search in searches
+            ])
+            if not delivered:
+                continue
+            db.execute(
+                text("UPDATE saved_searches SET last_notified_delta_id = :last WHERE id = CAST(:id AS uuid)"),
+                [{"last": search.last_delta_id, "id": search.id} for search in searches]
+            )
+            db.commit()
+            sent += 1
+
+        logger.info(f"Sent {sent} saved search alert(s)")
+        return sent
@@ -0,0 +1,137 @@
+"""
+Radius, polygon and nearest-neighbour property search.
+
+All predicates are written so a GiST index can answer them:
+
+- radius: ``ST_DWithin(location, center, meters)`` on the GEOGRAPHY column,
+  backed by ``properties_location_idx`` (migration 001)
+- polygon: ``ST_Intersects(location::geometry, polygon)``, backed by the
+  ``properties_location_geom_idx`` expression index (migration 003)
+- ordering: ``location <-> center``, which PostgreSQL answers with a
+  k-nearest-neighbour index scan instead of sorting every match
+
+Results are paged by a (distance, id) cursor, so deep pages never re-sort or
+skip rows with OFFSET.
+"""
+import logging
+from typing import Any, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Float, func, literal_column
+from sqlalchemy.orm import Query
+
+from app.core.config import settings
+from app.core.pagination import paginate_keyset
+from app.models.property import Property
+
+logger = logging.getLogger(__name__)
+
+CURSOR_SCOPE = "properties-nearby"
+
+RADIUS_UNITS = {"m": 1.0, "km": 1000.0, "mi": 1609.344}
+
+# (longitude, latitude)
+Point = Tuple[float, float]
+
+def _check_point(lng: float, lat: float) -> None:
+    if not (-180 <= lng <= 180 and -90 <= lat <= 90):
+        raise ValueError(f"Coordinate out of range: {lng} {lat}")
+
+class SpatialSearchService:
+    @staticmethod
+    def radius_meters(radius: float, unit: str = "km") -> float:
+        """Convert a radius to meters, raising ValueError if it is out of bounds."""
+        if unit not in RADIUS_UNITS:
+            raise ValueError(f"Unknown radius unit: {unit}")
+        meters = radius * RADIUS_UNITS[unit]
+        if meters <= 0 or meters > settings.SPATIAL_SEARCH_MAX_RADIUS:
+            raise ValueError(f"Radius must be between 0 and {settings.SPATIAL_SEARCH_MAX_RADIUS} meters")
+        return meters
+
+    @staticmethod
+    def parse_polygon(polygon: str) -> List[Point]:
+        """
+        Parse ``"lng lat, lng lat, ..."`` into a closed ring of (lng, lat) points.
+
+        Raises ValueError for malformed input, out-of-range coordinates and
+        rings with fewer than three or more than ``SPATIAL_SEARCH_MAX_VERTICES``
+        distinct vertices.
+        """
+        ring = []
+        for vertex in polygon.split(","):
+            parts = vertex.split()
+            if len(parts) != 2:
+                raise ValueError(f"Invalid polygon vertex: {vertex.strip()!r}")
+            lng, lat = float(parts[0]), float(parts[1])
+            _check_point(lng, lat)
+            ring.append((lng, lat))
+
+        if ring and ring[0] == ring[-1]:
+            ring.pop()
+        if len(set(ring)) < 3:
+            raise ValueError("A polygon needs at least three distinct vertices")
+        if len(ring) > settings.SPATIAL_SEARCH_MAX_VERTICES:
+            raise ValueError(f"A polygon may have at most {settings.SPATIAL_SEARCH_MAX_VERTICES} vertices")
+        return ring + [ring[0]]
+
+    @staticmethod
+    def ring_center(ring: Sequence[Point]) -> Point:
+        """Vertex average of a closed ring; the default origin for polygon results."""
+        vertices = ring[:-1]
+        return (
+            sum(lng for lng, _ in vertices) / len(vertices),
+            sum(lat for _, lat in vertices) / len(vertices),
+        )
+
+    @staticmethod
+    def center_point(lng: float, lat: float):
+        _check_point(lng, lat)
+        return func.ST_GeogFromText(f"SRID=4326;POINT({lng!r} {lat!r})")
+
+    @staticmethod
+    def distance(center) -> Any:
+        """KNN distance in meters between each property and ``center``."""
+        return Property.location.op("<->", return_type=Float)(center)
+
+    @staticmethod
+    def within_radius(center, meters: float) -> Any:
+        return func.ST_DWithin(Property.location, center, meters)
+
+    @staticmethod
+    def within_polygon(ring: Sequence[Point]) -> Any:
+        wkt = "POLYGON((" + ", ".join(f"{lng!r} {lat!r}" for lng, lat in ring) + "))"
+        return func.ST_Intersects(
+            literal_column("properties.location::geometry"),
+            func.ST_GeomFromText(wkt, 4326)
+        )
+
+    @staticmethod
+    def search(
+        query: Query,
+        center: Point,
+        radius_meters: Optional[float] = None,
+        polygon: Optional[Sequence[Point]] = None,
+        cursor: Optional[str] = None,
+        limit: int = 100
+    ) -> Tuple[List[Tuple[Any, float]], Optional[str]]:
+        """
+        Return ``([(property, distance in meters), ...], next cursor)`` for the
+        properties of ``query`` (e.g. from ``PropertySearchService.build_query``)
+        inside the radius and/or polygon, nearest to ``center`` first.
+        """
+        lng, lat = center
+        origin = SpatialSearchService.center_point(lng, lat)
+        distance = SpatialSearchService.distance(origin)
+
+        if radius_meters is not None:
+            query = query.filter(SpatialSearchService.within_radius(origin, radius_meters))
+        if polygon is not None:
+            query = query.filter(SpatialSearchService.within_polygon(polygon))
+
+        query = query.add_columns(distance.label("distance_meters"))
+        order = [(distance, False), (Property.id, False)]
+        # Distances are only comparable for the same origin
+        scope = f"{CURSOR_SCOPE}:{lng!r}:{lat!r}"
+        return paginate_keyset(
+            query, scope, order, cursor, limit,
+            key=lambda row: [row.distance_meters, row[0].id]
+        )
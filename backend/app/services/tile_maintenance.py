@@ -0,0 +1,139 @@
+"""
+Keeping the tile store warm and current.
+
+``invalidate_changes`` reads the ``property_changes`` feed and drops, at
+every stored zoom, only the tiles that contain an inserted, updated or
+deleted property (at its new and old location), including the neighbouring
+tiles whose vector tile buffer reaches the point. Ownership and wealth
+changes are ignored: they do not alter property tiles. The map grid is
+rolled up first, so cluster tiles re-rendered after the drop include the
+changes.
+
+``prerender`` renders the unfiltered vector and ``/map`` tiles of the
+``MAP_PRERENDER_REGIONS`` metros over a zoom range, skipping tiles that are
+still fresh, so the first requests of the day hit stored tiles.
+
+The change feed position is kept in the cache next to the tile index: if
+the cache is lost, so is the index, and every tile is re-rendered anyway.
+"""
+import logging
+import math
+from typing import Dict, Iterable, Sequence, Set, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.cache import cache
+from app.core.config import settings
+from app.core.geo import lnglat_to_tile_fraction, tiles_for_bbox
+from app.db.change_feed import feed_position
+from app.services.map_grid import GRID_MAX_ZOOM, PropertyGridService
+from app.services.map_tiles import MVT_BUFFER, MVT_EXTENT, PROPERTY_LAYER, MapTileService
+from app.services.map_viewport import MAP_LAYER, MapViewportService
+from app.services.tile_store import CHANGE_STATE_KEY, TileAddress, tile_store
+
+logger = logging.getLogger(__name__)
+
+# Kept in the cache for much longer than tiles; losing it only triggers a resync
+CHANGE_STATE_EXPIRY = 30 * 86400
+
+CHANGED_LOCATIONS_SQL = """
+    SELECT c.id, ST_X(l.location::geometry) AS lng, ST_Y(l.location::geometry) AS lat
+    FROM property_changes c
+    LEFT JOIN properties p ON p.id = c.property_id
+    CROSS JOIN LATERAL (VALUES (p.location), (c.old_location)) AS l(location)
+    WHERE c.txid >= :after AND c.txid < :upto
+      AND c.operation IN ('I', 'U', 'D')
+      AND l.location IS NOT NULL
+"""
+
+def touched_tiles(points: Iterable[Tuple[float, float]], max_zoom: int) -> Set[TileAddress]:
+    """
+    Return every (z, x, y) up to ``max_zoom`` that renders one of the points,
+    counting the ``MVT_BUFFER`` margin vector tiles draw around their edges.
+    """
+    margin = MVT_BUFFER / MVT_EXTENT
+    tiles = set()
+    for lng, lat in points:
+        for z in range(max_zoom + 1):
+            n = 1 << z
+            fx, fy = lnglat_to_tile_fraction(lng, lat, z)
+            xs = {min(max(math.floor(fx + d), 0), n - 1) for d in (-margin, 0, margin)}
+            ys = {min(max(math.floor(fy + d), 0), n - 1) for d in (-margin, 0, margin)}
+            tiles.update((z, x, y) for x in xs for y in ys)
+    return tiles
+
+class TileMaintenanceService:
+    @staticmethod
+    async def invalidate_changes(db: Session) -> int:
+        """
+        Drop the stored tiles touched by property changes since the last
+        pass. Returns the number of (z, x, y) tiles invalidated.
+        """
+        upto = feed_position(db)
+        state = await cache.get(CHANGE_STATE_KEY)
+        if state is None or "position" not in state:
+            # Nothing was stored against an older feed position
+            await cache.set(CHANGE_STATE_KEY, {"position": upto}, expire=CHANGE_STATE_EXPIRY)
+            logger.info(f"Tile store change tracking starts at feed position {upto}")
+            return 0
+
+        after = state["position"]
+        rows = []
+        if upto > after:
+            # Every change below upto has queued its grid deltas by now
+            PropertyGridService.rollup(db)
+            rows = db.execute(text(CHANGED_LOCATIONS_SQL), {"after": after, "upto": upto}).fetchall()
+
+        tiles = touched_tiles(((row[1], row[2]) for row in rows), settings.MAP_TILE_STORE_MAX_ZOOM)
+        if tiles:
+            # Tiles rendered before this point are not stored from now on
+            # (see TileStore.put), so none outlives the drop below
+            await cache.set(CHANGE_STATE_KEY, {"position": after, "invalidating": upto}, expire=CHANGE_STATE_EXPIRY)
+            await tile_store.invalidate(PROPERTY_LAYER, tiles)
+            await tile_store.invalidate(MAP_LAYER, (tile for tile in tiles if tile[0] <= GRID_MAX_ZOOM))
+
+        await cache.set(CHANGE_STATE_KEY, {"position": max(upto, after)}, expire=CHANGE_STATE_EXPIRY)
+
+        logger.info(f"Invalidated {len(tiles)} tile(s) for {len({row[0] for row in rows})} change(s)")
+        return len(tiles)
+
+    @staticmethod
+    async def prerender(
+        db: Session,
+        regions: Dict[str, Sequence[float]],
+        min_zoom: int,
+        max_zoom: int,
+        force: bool = False
+    ) -> int:
+        """
+        Render and store the unfiltered tiles of each region over
+        ``min_zoom``..``max_zoom``. Returns the number of tiles rendered.
+        """
+        rendered = 0
+        for name, (lng_min, lat_min, lng_max, lat_max) in regions.items():
+            region_rendered = 0
+            for z in range(min_zoom, min(max_zoom, settings.MAP_TILE_STORE_MAX_ZOOM) + 1):
+                tiles = tiles_for_bbox(z, lat_min, lat_max, lng_min, lng_max)
+                if force:
+                    await tile_store.invalidate(PROPERTY_LAYER, [(z, *tile) for tile in tiles])
+                    await tile_store.invalidate(MAP_LAYER, [(z, *tile) for tile in tiles])
+
+                fresh = await tile_store.fresh_tiles(PROPERTY_LAYER, z, tiles, "*")
+                for tile in tiles:
+                    if tile not in fresh:
+                        await MapTileService.get_property_tile(db, z, *tile)
+                        region_rendered += 1
+
+                if z <= GRID_MAX_ZOOM:
+                    variant = MapViewportService.tile_variant()
+                    fresh = await tile_store.fresh_tiles(MAP_LAYER, z, tiles, variant)
+                    missing = [tile for tile in tiles if tile not in fresh]
+                    # One query per block of tiles, like a large viewport
+                    for start in range(0, len(missing), settings.MAP_VIEWPORT_MAX_TILES):
+                        await MapViewportService.get_tiles(db, z, missing[start:start + settings.MAP_VIEWPORT_MAX_TILES])
+                    region_rendered += len(missing)
+
+            logger.info(f"Pre-rendered {region_rendered} tile(s) for {name}")
+            rendered += region_rendered
+        return rendered
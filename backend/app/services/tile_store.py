@@ -0,0 +1,235 @@
+"""
+Server-side store for rendered map tiles.
+
+Every stored tile is recorded in a small index entry per (layer, z, x, y) in
+the cache (Redis): a map of filter variant -> render time. A tile is served
+only while its index entry is younger than ``MAP_TILE_CACHE_EXPIRY``, and
+invalidating a tile deletes its index entry, which drops every filter variant
+of that tile at once.
+
+The tile bytes live either
+
+- on disk under ``MAP_TILE_STORE_DIR`` (``<layer>/<z>/<x>/<y>/<variant>.bin``),
+  which keeps large tile sets out of Redis memory and lets reads come from
+  the OS page cache, or
+- in the cache itself, next to the index, when no directory is configured.
+
+Tiles above ``MAP_TILE_STORE_MAX_ZOOM`` are cheap to render and numerous, so
+they are never stored. Renderers pass the ``invalidation_state`` they read
+before rendering to ``put``, which drops the tile if a change feed
+invalidation pass (``wealthmap-admin invalidate-tiles``) started meanwhile.
+
+On disk, files whose index entry expired stay behind until ``sweep`` removes
+them (``wealthmap-admin sweep-tiles``).
+"""
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from app.core.cache import cache
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+Tile = Tuple[int, int]
+# (z, x, y)
+TileAddress = Tuple[int, int, int]
+
+INDEX_PREFIX = "tilestore"
+DATA_PREFIX = "tile"
+# Change feed position stored tiles were last invalidated up to, and the one a
+# running pass invalidates up to (see tile_maintenance)
+CHANGE_STATE_KEY = "tilestore:changes"
+# Keys per cache round trip when invalidating
+INVALIDATE_BATCH = 1000
+
+def _variant_name(variant: str) -> str:
+    return hashlib.md5(variant.encode()).hexdigest()[:16]
+
+class TileStore:
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or None
+
+    @property
+    def on_disk(self) -> bool:
+        return self.root is not None
+
+    @staticmethod
+    def storable(z: int) -> bool:
+        return z <= settings.MAP_TILE_STORE_MAX_ZOOM
+
+    @staticmethod
+    def index_key(layer: str, z: int, x: int, y: int) -> str:
+        return f"{INDEX_PREFIX}:{layer}:{z}:{x}:{y}"
+
+    @staticmethod
+    def data_key(layer: str, z: int, x: int, y: int, variant: str) -> str:
+        return f"{DATA_PREFIX}:{layer}:{z}:{x}:{y}:{variant}"
+
+    def tile_dir(self, layer: str, z: int, x: int, y: int) -> str:
+        return os.path.join(self.root, layer, str(z), str(x), str(y))
+
+    def tile_path(self, layer: str, z: int, x: int, y: int, variant: str) -> str:
+        return os.path.join(self.tile_dir(layer, z, x, y), _variant_name(variant) + ".bin")
+
+    @staticmethod
+    def _is_fresh(entry: Optional[Dict[str, float]], variant: str, now: float) -> bool:
+        rendered_at = (entry or {}).get(variant)
+        return rendered_at is not None and now - rendered_at < settings.MAP_TILE_CACHE_EXPIRY
+
+    async def fresh_tiles(self, layer: str, z: int, tiles: List[Tile], variant: str) -> Set[Tile]:
+        """Return the tiles whose ``variant`` is stored and not expired."""
+        if not tiles or not self.storable(z):
+            return set()
+        keys = {tile: self.index_key(layer, z, *tile) for tile in tiles}
+        index = await cache.get_many(list(keys.values()))
+        now = time.time()
+        return {tile for tile, key in keys.items() if self._is_fresh(index.get(key), variant, now)}
+
+    def _read(self, path: str) -> Optional[bytes]:
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    async def get_many(self, layer: str, z: int, tiles: List[Tile], variant: str) -> Dict[Tile, bytes]:
+        """Return the stored bytes of every fresh tile; missing tiles are omitted."""
+        fresh = await self.fresh_tiles(layer, z, tiles, variant)
+        if not fresh:
+            return {}
+
+        if self.on_disk:
+            result = {tile: self._read(self.tile_path(layer, z, *tile, variant)) for tile in fresh}
+            return {tile: data for tile, data in result.items() if data is not None}
+
+        keys = {tile: self.data_key(layer, z, *tile, variant) for tile in fresh}
+        data = await cache.get_many_bytes(list(keys.values()))
+        return {tile: data[key] for tile, key in keys.items() if key in data}
+
+    async def get(self, layer: str, z: int, x: int, y: int, variant: str) -> Optional[bytes]:
+        return (await self.get_many(layer, z, [(x, y)], variant)).get((x, y))
+
+    def _write(self, path: str, data: bytes) -> None:
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        # Write then rename, so readers never see a partial tile
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    async def put(
+        self,
+        layer: str,
+        z: int,
+        x: int,
+        y: int,
+        variant: str,
+        data: bytes,
+        state: Optional[Dict[str, int]] = None
+    ) -> None:
+        """
+        Store a rendered tile and mark it fresh. ``state`` is the
+        ``invalidation_state`` taken before rendering: the tile is not kept if
+        an invalidation pass has started since, as it may predate the changes
+        that pass drops.
+        """
+        if not self.storable(z):
+            return
+        if state is not None and await self.invalidation_state() != state:
+            return
+
+        if self.on_disk:
+            try:
+                self._write(self.tile_path(layer, z, x, y, variant), data)
+            except OSError as e:
+                logger.error(f"Could not store tile {layer}/{z}/{x}/{y}: {e}")
+                return
+        else:
+            await cache.set_bytes(self.data_key(layer, z, x, y, variant), data, expire=settings.MAP_TILE_CACHE_EXPIRY)
+
+        key = self.index_key(layer, z, x, y)
+        now = time.time()
+        entry = {
+            name: rendered_at
+            for name, rendered_at in ((await cache.get(key)) or {}).items()
+            if now - rendered_at < settings.MAP_TILE_CACHE_EXPIRY
+        }
+        entry[variant] = now
+        await cache.set(key, entry, expire=settings.MAP_TILE_CACHE_EXPIRY)
+
+        if state is not None and await self.invalidation_state() != state:
+            # A pass started while storing and may have dropped this tile
+            # before its index entry was written
+            await self.invalidate(layer, [(z, x, y)])
+
+    def sweep(self, max_age: Optional[float] = None) -> int:
+        """
+        Delete tile files older than ``max_age`` seconds (default
+        ``MAP_TILE_CACHE_EXPIRY``), which are never served again, and the
+        directories left empty. Returns the number of files removed.
+        """
+        if not self.on_disk:
+            return 0
+
+        cutoff = time.time() - (settings.MAP_TILE_CACHE_EXPIRY if max_age is None else max_age)
+        removed = 0
+        for directory, _, files in os.walk(self.root, topdown=False):
+            for name in files:
+                path = os.path.join(directory, name)
+                try:
+                    if os.stat(path).st_mtime < cutoff:
+                        os.unlink(path)
+                        removed += 1
+                except FileNotFoundError:
+                    # Invalidated or replaced meanwhile
+                    continue
+            if directory != self.root:
+                try:
+                    os.rmdir(directory)
+                except OSError:
+                    # Not empty
+                    pass
+        return removed
+
+    @staticmethod
+    async def invalidation_state() -> Dict[str, int]:
+        """
+        Return the state of the change feed invalidation passes: ``position``
+        is the feed position the stored tiles reflect (absent if unknown), and
+        ``invalidating`` is set while a pass drops tiles.
+        """
+        return (await cache.get(CHANGE_STATE_KEY)) or {}
+
+    async def invalidate(self, layer: str, tiles: Iterable[TileAddress]) -> int:
+        """Drop every variant of the given tiles. Returns the number of tiles."""
+        tiles = [tile for tile in tiles if self.storable(tile[0])]
+        for start in range(0, len(tiles), INVALIDATE_BATCH):
+            batch = tiles[start:start + INVALIDATE_BATCH]
+            index_keys = [self.index_key(layer, *tile) for tile in batch]
+
+            if self.on_disk:
+                for tile in batch:
+                    shutil.rmtree(self.tile_dir(layer, *tile), ignore_errors=True)
+            else:
+                index = await cache.get_many(index_keys)
+                data_keys = [
+                    self.data_key(layer, *tile, variant)
+                    for tile, key in zip(batch, index_keys)
+                    for variant in index.get(key, {})
+                ]
+                await cache.delete_many(data_keys)
+
+            await cache.delete_many(index_keys)
+        return len(tiles)
+
+tile_store = TileStore(settings.MAP_TILE_STORE_DIR)
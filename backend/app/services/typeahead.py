@@ -0,0 +1,357 @@
+"""
+In-memory typeahead index for ``/api/search/suggestions``.
+
+Suggestions fire on every keystroke, so when ``TYPEAHEAD_INDEX`` is enabled
+each API worker answers them from memory instead of PostgreSQL. The index
+holds five kinds of entries, each with a popularity weight:
+
+- ``property``: full addresses (weight 1, nudged up by value)
+- ``address``: street names, weighted by the number of properties on them
+- ``city`` and ``zip``: weighted by their number of properties
+- ``owner``: owner names, weighted by the number of properties owned
+
+Entries are reachable by their normalized text and, for multi-word names,
+by each later word ("smith" finds "John Smith"). The keys form one sorted
+array, so a prefix is a contiguous range found by binary search. The best
+entries of every prefix of up to ``PRECOMPUTED_PREFIX`` characters are
+computed at load time, because those ranges are the largest; longer
+prefixes are ranked on demand and memoized.
+
+Refreshes are incremental: properties from the ``property_changes`` feed and
+owners by ``updated_at`` are re-read into a small overlay that shadows the
+loaded entries. Its keys are sorted too, so they are searched the same way. The overlay is folded into a full reload once it grows past
+``TYPEAHEAD_MAX_DELTA`` entries or after ``TYPEAHEAD_REBUILD_SECONDS``.
+"""
+import heapq
+import logging
+import re
+import threading
+import time
+from bisect import bisect_left
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.change_feed import changes_between, feed_position
+
+logger = logging.getLogger(__name__)
+
+# Best entries are precomputed for every prefix up to this length
+PRECOMPUTED_PREFIX = 3
+# Entries kept per precomputed or memoized prefix
+TOP_K = 20
+# Extra keys per entry, one for each later word
+MAX_WORD_KEYS = 3
+MEMO_SIZE = 10000
+
+_NON_WORD_RE = re.compile(r"[^0-9a-z]+")
+
+PROPERTY_ENTRIES_SQL = """
+    SELECT p.id::text, p.address, p.city, p.state, p.zip_code, p.current_value
+    FROM properties p
+"""
+
+STREET_ENTRIES_SQL = r"""
+    SELECT s.street, s.city, s.state, count(*)
+    FROM (
+        SELECT regexp_replace(p.address, '^[0-9]+[A-Za-z]?(-[0-9]+)?\s+', '') AS street, p.city, p.state
+        FROM properties p
+    ) s
+    GROUP BY s.street, s.city, s.state
+"""
+
+CITY_ENTRIES_SQL = """
+    SELECT p.city, p.state, count(*) FROM properties p GROUP BY p.city, p.state
+"""
+
+ZIP_ENTRIES_SQL = """
+    SELECT p.zip_code, min(p.city), min(p.state), count(*) FROM properties p GROUP BY p.zip_code
+"""
+
+OWNER_ENTRIES_SQL = """
+    SELECT o.id::text, o.name, count(po.id)
+    FROM owners o
+    LEFT JOIN property_ownership po ON po.owner_id = o.id AND po.end_date IS NULL
+    {where}
+    GROUP BY o.id, o.name
+"""
+
+def normalize(value: Optional[str]) -> str:
+    """Lower-case, drop punctuation and collapse whitespace."""
+    return _NON_WORD_RE.sub(" ", (value or "").lower()).strip()
+
+@dataclass(frozen=True)
+class Entry:
+    kind: str
+    ident: str  # stable identity, e.g. "owner:<uuid>" or "city:austin|tx"
+    value: str
+    display: str
+    weight: float
+
+def index_keys(entry: Entry) -> List[str]:
+    """Normalized keys under which an entry can be found."""
+    key = normalize(entry.value)
+    if not key:
+        return []
+    keys = [key]
+    if entry.kind != "zip":
+        words = key.split(" ")
+        keys.extend(" ".join(words[i:]) for i in range(1, min(len(words), MAX_WORD_KEYS + 1)))
+    return keys
+
+def property_entry(row: Sequence[Any]) -> Entry:
+    property_id, address, city, state, zip_code, value = row
+    # Keeps single addresses below every aggregate while ranking pricier ones first
+    weight = 1.0 + min(float(value or 0), 1e9) / 1e9
+    return Entry("property", f"property:{property_id}", address, f"{address}, {city}, {state} {zip_code}", weight)
+
+def street_entry(street: str, city: str, state: str, count: int) -> Entry:
+    ident = f"street:{normalize(street)}|{normalize(city)}|{normalize(state)}"
+    return Entry("address", ident, street, f"{street}, {city}, {state}", float(count))
+
+def city_entry(city: str, state: str, count: int) -> Entry:
+    return Entry("city", f"city:{normalize(city)}|{normalize(state)}", city, f"{city}, {state}", float(count))
+
+def zip_entry(zip_code: str, city: str, state: str, count: int) -> Entry:
+    return Entry("zip", f"zip:{normalize(zip_code)}", zip_code, f"{zip_code} ({city}, {state})", float(count))
+
+def owner_entry(owner_id: str, name: str, count: int) -> Entry:
+    noun = "property" if count == 1 else "properties"
+    return Entry("owner", f"owner:{owner_id}", name, f"{name} ({count} {noun})", 1.0 + count)
+
+def derived_entries(row: Sequence[Any]) -> List[Entry]:
+    """Street, city and zip entries implied by one property row."""
+    _, address, city, state, zip_code, _ = row
+    street = re.sub(r"^[0-9]+[A-Za-z]?(-[0-9]+)?\s+", "", address or "")
+    return [street_entry(street, city, state, 1), city_entry(city, state, 1), zip_entry(zip_code, city, state, 1)]
+
+@dataclass(frozen=True)
+class _Snapshot:
+    keys: List[str]  # sorted normalized keys
+    positions: List[int]  # entry index of each key
+    entries: List[Entry]
+    top: Dict[str, Tuple[int, ...]]  # best entry indexes per short prefix
+    aggregates: FrozenSet[str]  # idents of street, city and zip entries
+
+def build_snapshot(entries: Sequence[Entry]) -> _Snapshot:
+    """Sort the keys of ``entries`` and precompute the best entries of short prefixes."""
+    entries = list(entries)
+    pairs = sorted((key, i) for i, entry in enumerate(entries) for key in index_keys(entry))
+    keys = [key for key, _ in pairs]
+    positions = [i for _, i in pairs]
+
+    def best(candidates: Iterable[int]) -> Tuple[int, ...]:
+        return tuple(heapq.nlargest(TOP_K, set(candidates), key=lambda i: entries[i].weight))
+
+    top: Dict[str, Tuple[int, ...]] = {}
+    for length in range(1, PRECOMPUTED_PREFIX + 1):
+        start = 0
+        while start < len(keys):
+            prefix = keys[start][:length]
+            end = bisect_left(keys, prefix + "￿", start)
+            top[prefix] = best(positions[start:end])
+            start = end
+
+    aggregates = frozenset(entry.ident for entry in entries if entry.kind in ("address", "city", "zip"))
+    return _Snapshot(keys=keys, positions=positions, entries=entries, top=top, aggregates=aggregates)
+
+@dataclass(frozen=True)
+class _State:
+    snapshot: _Snapshot
+    # Entries re-read since the snapshot was built; None marks a deleted entry
+    delta: Dict[str, Optional[Entry]] = field(default_factory=dict)
+    delta_keys: Tuple[str, ...] = ()  # sorted normalized keys of the live delta entries
+    delta_entries: Tuple[Entry, ...] = ()  # entry of each delta key
+    position: int = 0  # change feed position applied up to
+    owners_since: Any = None  # database time of the last owner scan
+    loaded_at: float = 0.0
+    memo: Dict[str, Tuple[int, ...]] = field(default_factory=dict)
+
+def _delta_keys(delta: Dict[str, Optional[Entry]]) -> Tuple[Tuple[str, ...], Tuple[Entry, ...]]:
+    """Sort the keys of the live delta entries, like ``build_snapshot`` does."""
+    pairs = sorted(
+        ((key, entry) for entry in delta.values() if entry is not None for key in index_keys(entry)),
+        key=lambda pair: pair[0]
+    )
+    return tuple(key for key, _ in pairs), tuple(entry for _, entry in pairs)
+
+class TypeaheadIndex:
+    """Prefix index shared by the requests of one worker."""
+
+    def __init__(self):
+        self._state: Optional[_State] = None
+        self._lock = threading.RLock()
+
+    @property
+    def ready(self) -> bool:
+        return self._state is not None
+
+    def set_entries(self, entries: Sequence[Entry], **state: Any) -> None:
+        self._state = _State(snapshot=build_snapshot(entries), loaded_at=time.time(), **state)
+
+    # Loading
+
+    @staticmethod
+    def _read_entries(db: Session) -> List[Entry]:
+        entries = [property_entry(row) for row in db.execute(text(PROPERTY_ENTRIES_SQL))]
+        entries += [street_entry(*row) for row in db.execute(text(STREET_ENTRIES_SQL)) if row[0]]
+        entries += [city_entry(*row) for row in db.execute(text(CITY_ENTRIES_SQL))]
+        entries += [zip_entry(*row) for row in db.execute(text(ZIP_ENTRIES_SQL))]
+        entries += [owner_entry(*row) for row in db.execute(text(OWNER_ENTRIES_SQL.format(where="")))]
+        return entries
+
+    def load(self, db: Session) -> int:
+        """Build the index from the database. Returns the number of entries."""
+        with self._lock:
+            # Read the positions first: later changes are picked up by the next refresh
+            position = feed_position(db)
+            owners_since = db.execute(text("SELECT now()")).scalar()
+            entries = self._read_entries(db)
+            db.rollback()
+            self.set_entries(
+                entries,
+                position=position,
+                owners_since=owners_since,
+            )
+
+        logger.info(f"Typeahead index loaded {len(entries)} entries")
+        return len(entries)
+
+    def refresh(self, db: Session) -> int:
+        """
+        Re-read properties and owners changed since the last refresh. Returns
+        the number of entries updated.
+        """
+        state = self._state
+        if state is None or time.time() - state.loaded_at > settings.TYPEAHEAD_REBUILD_SECONDS:
+            return self.load(db)
+
+        with self._lock:
+            position = feed_position(db)
+            # Ownership and wealth changes do not alter property entries
+            changes = [
+                change for change in changes_between(db, state.position, position) if change[2] in ("I", "U", "D")
+            ]
+
+            owners_since = db.execute(text("SELECT now()")).scalar()
+            owner_rows = db.execute(
+                text(OWNER_ENTRIES_SQL.format(where="WHERE COALESCE(o.updated_at, o.created_at) > :since")),
+                {"since": state.owners_since}
+            ).fetchall()
+
+            changed_ids = sorted({change[1] for change in changes})
+            property_rows = []
+            if changed_ids:
+                property_rows = db.execute(
+                    text(PROPERTY_ENTRIES_SQL + " WHERE p.id = ANY(CAST(:ids AS uuid[]))"),
+                    {"ids": changed_ids}
+                ).fetchall()
+            db.rollback()
+
+            delta = dict(state.delta)
+            # Properties that are no longer returned were deleted
+            delta.update({f"property:{property_id}": None for property_id in changed_ids})
+            for row in property_rows:
+                delta[f"property:{row[0]}"] = property_entry(row)
+                for entry in derived_entries(row):
+                    # New streets, cities and zips appear until the next full load recounts them
+                    if entry.ident not in state.snapshot.aggregates and entry.ident not in delta:
+                        delta[entry.ident] = entry
+            for row in owner_rows:
+                delta[f"owner:{row[0]}"] = owner_entry(*row)
+
+            if len(delta) > settings.TYPEAHEAD_MAX_DELTA:
+                return self.load(db)
+
+            updated = len(changed_ids) + len(owner_rows)
+            delta_keys, delta_entries = (
+                _delta_keys(delta) if updated else (state.delta_keys, state.delta_entries)
+            )
+            self._state = replace(
+                state,
+                delta=delta,
+                delta_keys=delta_keys,
+                delta_entries=delta_entries,
+                position=position,
+                owners_since=owners_since,
+                memo=state.memo if not updated else {},
+            )
+
+        if updated:
+            logger.info(f"Typeahead index refreshed {updated} entries")
+        return updated
+
+    # Queries
+
+    def _candidates(self, state: _State, prefix: str) -> Tuple[int, ...]:
+        snapshot = state.snapshot
+        if len(prefix) <= PRECOMPUTED_PREFIX:
+            return snapshot.top.get(prefix, ())
+
+        cached = state.memo.get(prefix)
+        if cached is not None:
+            return cached
+
+        start = bisect_left(snapshot.keys, prefix)
+        end = bisect_left(snapshot.keys, prefix + "￿", start)
+        entries = snapshot.entries
+        best = tuple(heapq.nlargest(TOP_K, set(snapshot.positions[start:end]), key=lambda i: entries[i].weight))
+        if len(state.memo) >= MEMO_SIZE:
+            state.memo.clear()
+        state.memo[prefix] = best
+        return best
+
+    def suggest(self, q: str, limit: int = 10) -> List[Entry]:
+        """Return the ``limit`` heaviest entries with a key starting with ``q``."""
+        state = self._state
+        prefix = normalize(q)
+        if state is None or not prefix:
+            return []
+
+        entries = state.snapshot.entries
+        found: Dict[str, Entry] = {}
+        for i in self._candidates(state, prefix):
+            entry = entries[i]
+            if entry.ident not in state.delta:
+                found[entry.ident] = entry
+        start = bisect_left(state.delta_keys, prefix)
+        end = bisect_left(state.delta_keys, prefix + "￿", start)
+        for entry in state.delta_entries[start:end]:
+            found[entry.ident] = entry
+
+        return heapq.nlargest(min(limit, TOP_K), found.values(), key=lambda entry: entry.weight)
+
+typeahead_index = TypeaheadIndex()
+
+SUGGEST_SQL = {
+    "city": """
+        SELECT p.city, p.state, count(*) FROM properties p
+        WHERE p.city ILIKE :prefix GROUP BY p.city, p.state ORDER BY count(*) DESC LIMIT :limit
+    """,
+    "owner": """
+        SELECT o.id::text, o.name, count(po.id) FROM owners o
+        LEFT JOIN property_ownership po ON po.owner_id = o.id AND po.end_date IS NULL
+        WHERE o.name ILIKE :prefix GROUP BY o.id, o.name ORDER BY count(po.id) DESC LIMIT :limit
+    """,
+    "property": PROPERTY_ENTRIES_SQL + """
+        WHERE p.address ILIKE :prefix ORDER BY p.current_value DESC NULLS LAST LIMIT :limit
+    """,
+}
+
+def suggest_from_db(db: Session, q: str, limit: int = 10) -> List[Entry]:
+    """
+    Prefix suggestions straight from PostgreSQL, used while the in-memory
+    index is disabled or loading. The address, city and owner name prefixes
+    use their trigram indexes.
+    """
+    prefix = normalize(q)
+    if not prefix:
+        return []
+    params = {"prefix": f"{q.strip()}%", "limit": limit}
+    entries = [city_entry(*row) for row in db.execute(text(SUGGEST_SQL["city"]), params)]
+    entries += [owner_entry(*row) for row in db.execute(text(SUGGEST_SQL["owner"]), params)]
+    entries += [property_entry(row) for row in db.execute(text(SUGGEST_SQL["property"]), params)]
+    return heapq.nlargest(limit, entries, key=lambda entry: entry.weight)
@@ -0,0 +1,395 @@
+"""
+Cross-entity search behind ``POST /api/search``.
+
+One request searches three entity types:
+
+- ``property``: properties matched by the address full-text / trigram
+  indexes (see ``PropertySearchService``), ranked by ``ts_rank_cd`` and
+  trigram similarity
+- ``owner``: owners matched by name (fuzzily, see ``OwnerSearchService``),
+  ranked by trigram similarity
+- ``address``: localities (city, state) with their property counts
+
+Each entity query runs in its own worker thread and database session so the
+three round trips overlap, and fetches only the top ``page * page_size``
+rows by the requested sort. The per-entity lists are then merged by score
+(normalized to 0..1 and weighted per entity) or by the sort field and cut
+to the requested page. Results are cached per normalized request.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import re
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import Float, and_, case, func, literal, literal_column, or_, select, true
+from sqlalchemy.orm import Session
+
+from app.core.cache import cache
+from app.core.config import settings
+from app.core.pagination import get_total
+from app.db.features import has_extension
+from app.models.owner import Owner, PropertyOwnership, WealthData
+from app.models.property import Property
+from app.services.owner_search import OwnerSearchService
+from app.services.property_search import PropertySearchService
+
+logger = logging.getLogger(__name__)
+
+ENTITY_TYPES = ("property", "owner", "address")
+# Relative weight of each entity's relevance score when results are merged
+ENTITY_WEIGHTS = {"property": 1.0, "owner": 1.0, "address": 0.9}
+SORT_FIELDS = ("relevance", "value", "name")
+
+PROPERTY_FILTERS = (
+    "property_type", "min_value", "max_value", "min_bedrooms", "min_bathrooms", "min_square_feet"
+)
+OWNER_FILTERS = ("owner_type", "min_net_worth")
+# Filters compared with a string; the others take a number
+TEXT_FILTERS = ("property_type", "owner_type")
+
+properties = Property.__table__
+owners = Owner.__table__
+ownership = PropertyOwnership.__table__
+wealth = WealthData.__table__
+# One wealth_data row per owner, the most recently updated (as in heatmap.py),
+# so joining it never repeats an owner
+latest_wealth = (
+    select(wealth)
+    .distinct(wealth.c.owner_id)
+    .order_by(wealth.c.owner_id, wealth.c.last_updated.desc().nullslast())
+    .subquery("latest_wealth")
+)
+
+_SPACE_RE = re.compile(r"\s+")
+
+def normalize_text(q: Optional[str]) -> str:
+    """Lower-case and collapse whitespace, so equivalent queries share a cache entry."""
+    return _SPACE_RE.sub(" ", (q or "").strip().lower())
+
+def _json_value(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return float(value)
+    if value is not None and not isinstance(value, (str, int, float, bool)):
+        return str(value)
+    return value
+
+def _row_dict(row) -> Dict[str, Any]:
+    return {key: _json_value(value) for key, value in row._mapping.items()}
+
+def _ilike_score(column, q: str):
+    """Portable relevance: exact > prefix > substring."""
+    return case(
+        (func.lower(column) == q, 1.0),
+        (column.ilike(f"{q}%"), 0.8),
+        else_=0.5
+    )
+
+def _filter_value(key: str, value: Any) -> Any:
+    """Validate a filter value; numeric strings (saved query string parameters) become numbers."""
+    if key in TEXT_FILTERS:
+        if not isinstance(value, str):
+            raise ValueError(f"{key} needs a string, got {value!r}")
+        return value
+    if isinstance(value, str):
+        try:
+            number = float(value)
+        except ValueError:
+            number = math.nan
+        if not math.isfinite(number):
+            raise ValueError(f"{key} needs a number, got {value!r}")
+        return int(number) if number.is_integer() else number
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"{key} needs a number, got {value!r}")
+    return value
+
+class UnifiedSearchService:
+    @staticmethod
+    def parse_request(
+        query: Optional[str],
+        filters: Optional[Dict[str, Any]],
+        sort_by: Optional[str],
+        sort_order: Optional[str],
+        page: Optional[int],
+        page_size: Optional[int]
+    ) -> Dict[str, Any]:
+        """
+        Validate and normalize a search request. Raises ValueError on bad input.
+        """
+        filters = dict(filters or {})
+        types = filters.pop("types", None) or list(ENTITY_TYPES)
+        if isinstance(types, str):
+            types = [types]
+        if not isinstance(types, list) or not all(isinstance(t, str) for t in types):
+            raise ValueError(f"types needs an entity type or a list of them, got {types!r}")
+        unknown = set(types) - set(ENTITY_TYPES)
+        if unknown:
+            raise ValueError(f"Unknown entity type(s): {', '.join(sorted(unknown))}")
+
+        unknown = set(filters) - set(PROPERTY_FILTERS) - set(OWNER_FILTERS)
+        if unknown:
+            raise ValueError(f"Unknown filter(s): {', '.join(sorted(unknown))}")
+        for key, value in filters.items():
+            if value is not None:
+                filters[key] = _filter_value(key, value)
+
+        sort_by = sort_by or "relevance"
+        if sort_by not in SORT_FIELDS:
+            raise ValueError(f"sort_by must be one of: {', '.join(SORT_FIELDS)}")
+        sort_order = (sort_order or ("desc" if sort_by != "name" else "asc")).lower()
+        if sort_order not in ("asc", "desc"):
+            raise ValueError("sort_order must be 'asc' or 'desc'")
+
+        page = 1 if page is None else page
+        page_size = 20 if page_size is None else page_size
+        if page < 1 or not 1 <= page_size <= 100:
+            raise ValueError("page must be >= 1 and page_size between 1 and 100")
+        if page * page_size > settings.SEARCH_MAX_RESULTS:
+            raise ValueError(f"Only the first {settings.SEARCH_MAX_RESULTS} results can be paged through")
+
+        return {
+            "q": normalize_text(query),
+            "types": sorted(set(types), key=ENTITY_TYPES.index),
+            "filters": {key: filters[key] for key in sorted(filters) if filters[key] is not None},
+            "sort_by": sort_by,
+            "sort_order": sort_order,
+            "page": page,
+            "page_size": page_size,
+        }
+
+    @staticmethod
+    def cache_key(request: Dict[str, Any]) -> str:
+        digest = hashlib.sha1(json.dumps(request, sort_keys=True, default=str).encode()).hexdigest()
+        return f"search:unified:{digest}"
+
+    @staticmethod
+    def _order(request: Dict[str, Any], score, value, name) -> list:
+        descending = request["sort_order"] == "desc"
+        column = {"relevance": score, "value": value, "name": name}[request["sort_by"]]
+        primary = column.desc().nullslast() if descending else column.asc().nullslast()
+        return [primary, name.asc()]
+
+    @staticmethod
+    def property_statement(db: Session, request: Dict[str, Any]):
+        q = request["q"]
+        filters = request["filters"]
+        conditions = []
+        score = literal(0.0, Float)
+
+        if q:
+            text_conditions, scores = [], []
+            if PropertySearchService.has_full_text_search(db):
+                tsquery = PropertySearchService.build_prefix_tsquery(q)
+                if tsquery:
+                    vector = literal_column("properties.search_vector")
+                    ts = func.to_tsquery("simple", tsquery)
+                    text_conditions.append(vector.op("@@")(ts))
+                    # Normalization 32 maps the rank onto 0..1
+                    scores.append(func.ts_rank_cd(vector, ts, 32))
+            if PropertySearchService.has_trigram_search(db):
+                text_conditions.append(properties.c.address.op("%")(q))
+                scores.append(func.similarity(properties.c.address, q))
+            if text_conditions:
+                conditions.append(or_(*text_conditions))
+                score = func.greatest(*scores) if len(scores) > 1 else scores[0]
+            else:
+                conditions.append(or_(
+                    properties.c.address.ilike(f"%{q}%"),
+                    properties.c.city.ilike(f"%{q}%"),
+                    properties.c.zip_code.ilike(f"{q}%"),
+                ))
+                score = _ilike_score(properties.c.address, q)
+
+        if filters.get("property_type"):
+            conditions.append(properties.c.property_type == filters["property_type"])
+        if filters.get("min_value") is not None:
+            conditions.append(properties.c.current_value >= filters["min_value"])
+        if filters.get("max_value") is not None:
+            conditions.append(properties.c.current_value <= filters["max_value"])
+        if filters.get("min_bedrooms") is not None:
+            conditions.append(properties.c.bedrooms >= filters["min_bedrooms"])
+        if filters.get("min_bathrooms") is not None:
+            conditions.append(properties.c.bathrooms >= filters["min_bathrooms"])
+        if filters.get("min_square_feet") is not None:
+            conditions.append(properties.c.square_feet >= filters["min_square_feet"])
+
+        statement = select(
+            properties.c.id,
+            properties.c.address,
+            properties.c.city,
+            properties.c.state,
+            properties.c.zip_code,
+            properties.c.property_type,
+            properties.c.current_value.label("estimated_value"),
+            score.label("score"),
+        ).where(and_(true(), *conditions))
+        order = UnifiedSearchService._order(request, score, properties.c.current_value, properties.c.address)
+        return statement, order
+
+    @staticmethod
+    def owner_statement(db: Session, request: Dict[str, Any]):
+        q = request["q"]
+        filters = request["filters"]
+        conditions = []
+        score = literal(0.0, Float)
+
+        if q:
+            if OwnerSearchService.has_fuzzy_search(db) and OwnerSearchService.normalize_name(q):
+                condition, score = OwnerSearchService.fuzzy_match(q)
+                conditions.append(condition)
+            else:
+                conditions.append(owners.c.name.ilike(f"%{q}%"))
+                if has_extension(db, "pg_trgm"):
+                    score = func.similarity(owners.c.name, q)
+                else:
+                    score = _ilike_score(owners.c.name, q)
+
+        if filters.get("owner_type"):
+            conditions.append(owners.c.owner_type == filters["owner_type"])
+        if filters.get("min_net_worth") is not None:
+            conditions.append(latest_wealth.c.estimated_net_worth >= filters["min_net_worth"])
+
+        properties_count = (
+            select(func.count())
+            .where(ownership.c.owner_id == owners.c.id, ownership.c.end_date.is_(None))
+            .scalar_subquery()
+        )
+        statement = select(
+            owners.c.id,
+            owners.c.name,
+            owners.c.owner_type,
+            latest_wealth.c.estimated_net_worth,
+            properties_count.label("properties_count"),
+            score.label("score"),
+        ).select_from(
+            owners.outerjoin(latest_wealth, latest_wealth.c.owner_id == owners.c.id)
+        ).where(and_(true(), *conditions))
+        order = UnifiedSearchService._order(request, score, latest_wealth.c.estimated_net_worth, owners.c.name)
+        return statement, order
+
+    @staticmethod
+    def address_statement(db: Session, request: Dict[str, Any]):
+        q = request["q"]
+        conditions = []
+        score = literal(0.0, Float)
+
+        if q:
+            # Prefix matches on the city can use properties_city_trgm_idx
+            conditions.append(properties.c.city.ilike(f"{q}%"))
+            if has_extension(db, "pg_trgm"):
+                score = func.max(func.similarity(properties.c.city, q))
+            else:
+                score = func.max(_ilike_score(properties.c.city, q))
+
+        count = func.count()
+        name = (properties.c.city + ", " + properties.c.state)
+        statement = select(
+            name.label("id"),
+            properties.c.city,
+            properties.c.state,
+            count.label("properties_count"),
+            score.label("score"),
+        ).where(and_(true(), *conditions)).group_by(properties.c.city, properties.c.state)
+        order = UnifiedSearchService._order(request, score, count, name)
+        return statement, order
+
+    @staticmethod
+    def run_entity(db: Session, entity: str, request: Dict[str, Any], limit: int) -> Tuple[List[Dict[str, Any]], int, bool]:
+        """
+        Run one entity's search. Returns ``(top rows, total, total is an estimate)``.
+        """
+        if entity == "address" and not request["q"]:
+            # Listing every locality means grouping the whole table
+            return [], 0, False
+
+        build: Callable = {
+            "property": UnifiedSearchService.property_statement,
+            "owner": UnifiedSearchService.owner_statement,
+            "address": UnifiedSearchService.address_statement,
+        }[entity]
+        statement, order = build(db, request)
+
+        rows = [_row_dict(row) for row in db.execute(statement.order_by(*order).limit(limit))]
+        for row in rows:
+            row["type"] = entity
+            row["score"] = round(float(row["score"] or 0.0) * ENTITY_WEIGHTS[entity], 6)
+
+        if len(rows) < limit:
+            total, is_estimate = len(rows), False
+        else:
+            total, is_estimate = get_total(db, statement)
+            total = max(total, len(rows))
+        return rows, total, is_estimate
+
+    @staticmethod
+    def merge(request: Dict[str, Any], results: Dict[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Merge per-entity result lists into one ranked page."""
+        rows = [row for entity in request["types"] for row in results.get(entity, [])]
+        sort_by = request["sort_by"]
+        descending = request["sort_order"] == "desc"
+
+        def label(row):
+            return (row.get("name") or row.get("address") or row.get("id") or "").lower()
+
+        if sort_by == "name":
+            rows.sort(key=label, reverse=descending)
+        else:
+            field = {
+                "relevance": lambda row: row["score"],
+                "value": lambda row: row.get("estimated_value", row.get("estimated_net_worth")),
+            }[sort_by]
+            present = [row for row in rows if field(row) is not None]
+            missing = [row for row in rows if field(row) is None]
+            # Secondary key first: Python's sort is stable
+            present.sort(key=label)
+            present.sort(key=field, reverse=descending)
+            rows = present + missing
+
+        start = (request["page"] - 1) * request["page_size"]
+        return rows[start:start + request["page_size"]]
+
+    @staticmethod
+    async def search(db: Session, request: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Search all requested entity types concurrently and return one page of
+        merged results, served from cache when the same normalized request
+        was answered recently.
+        """
+        key = UnifiedSearchService.cache_key(request)
+        cached = await cache.get(key)
+        if cached:
+            return cached
+
+        limit = request["page"] * request["page_size"]
+        bind = db.get_bind()
+
+        def run(entity: str):
+            # Sessions are not thread-safe: each entity gets its own
+            session = Session(bind=bind)
+            try:
+                return UnifiedSearchService.run_entity(session, entity, request, limit)
+            finally:
+                session.close()
+
+        loop = asyncio.get_event_loop()
+        outcomes = await asyncio.gather(*(loop.run_in_executor(None, run, entity) for entity in request["types"]))
+
+        results, counts, is_estimate = {}, {}, False
+        for entity, (rows, total, estimated) in zip(request["types"], outcomes):
+            results[entity] = rows
+            counts[entity] = total
+            is_estimate = is_estimate or estimated
+
+        response = {
+            "total": sum(counts.values()),
+            "is_estimate": is_estimate,
+            "counts": counts,
+            "page": request["page"],
+            "page_size": request["page_size"],
+            "results": UnifiedSearchService.merge(request, results),
+        }
+        await cache.set(key, response, settings.SEARCH_CACHE_EXPIRY)
+        return response
@@ -0,0 +1,81 @@
+"""
+Tests for the saved search endpoints.
+"""
+from datetime import datetime
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from unittest.mock import patch, MagicMock
+
+from app.api.endpoints.search import router, update_saved_search
+from app.core.dependencies import get_current_user, get_db
+from app.schemas.search import SavedSearchUpdate
+
+def saved_search_db(saved_search):
+    db = MagicMock()
+    db.query.return_value.filter.return_value.first.return_value = saved_search
+    return db
+
+@pytest.mark.unit
+@pytest.mark.search
+class TestSavedSearchEndpoints:
+
+    def test_update_toggles_alerts_and_keeps_omitted_fields(self):
+        """Test that turning alerts back on or changing criteria skips the matches recorded before."""
+        saved_search = SimpleNamespace(
+            name="Austin", search_parameters={"q": "austin"}, alerts_enabled=False, last_notified_delta_id=3
+        )
+        db = saved_search_db(saved_search)
+        user = SimpleNamespace(id=1)
+
+        with patch("app.api.endpoints.search.SavedSearchAlertService.latest_delta_id", return_value=42):
+            result = update_saved_search(
+                db=db, search_id=uuid4(), search_in=SavedSearchUpdate(alerts_enabled=True), current_user=user
+            )
+            assert (result.name, result.alerts_enabled, result.last_notified_delta_id) == ("Austin", True, 42)
+
+            update_saved_search(db=db, search_id=uuid4(), search_in=SavedSearchUpdate(alerts_enabled=False), current_user=user)
+            update_saved_search(db=db, search_id=uuid4(), search_in=SavedSearchUpdate(name="Austin TX"), current_user=user)
+            assert (saved_search.alerts_enabled, saved_search.name) == (False, "Austin TX")
+
+            saved_search.last_notified_delta_id = 0
+            update_saved_search(
+                db=db, search_id=uuid4(), search_in=SavedSearchUpdate(search_parameters={"q": "dallas"}), current_user=user
+            )
+            assert (saved_search.search_parameters, saved_search.last_notified_delta_id) == ({"q": "dallas"}, 42)
+
+        assert db.commit.call_count == 4
+
+    def test_update_unknown_search_is_not_found(self):
+        """Test that another user's or a missing saved search returns 404."""
+        with pytest.raises(HTTPException) as error:
+            update_saved_search(
+                db=saved_search_db(None), search_id=uuid4(), search_in=SavedSearchUpdate(name="x"),
+                current_user=SimpleNamespace(id=1)
+            )
+        assert error.value.status_code == 404
+
+    def test_update_through_router_takes_uuid_ids(self):
+        """Test that PUT /api/search/{search_id} accepts and returns the UUID ids of saved searches."""
+        user = SimpleNamespace(id=uuid4())
+        saved_search = SimpleNamespace(
+            id=uuid4(), user_id=user.id, name="Austin", search_parameters={"q": "austin"},
+            alerts_enabled=True, last_notified_delta_id=3, created_at=datetime(2024, 1, 1), updated_at=None
+        )
+        app = FastAPI()
+        app.include_router(router, prefix="/api/search")
+        app.dependency_overrides[get_db] = lambda: saved_search_db(saved_search)
+        app.dependency_overrides[get_current_user] = lambda: user
+        client = TestClient(app)
+
+        response = client.put(f"/api/search/{saved_search.id}", json={"alerts_enabled": False})
+        assert response.status_code == 200
+        body = response.json()
+        assert (body["id"], body["user_id"], body["alerts_enabled"]) == (
+            str(saved_search.id), str(user.id), False
+        )
+
+        assert client.put("/api/search/7", json={"alerts_enabled": True}).status_code == 422
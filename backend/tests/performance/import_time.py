@@ -0,0 +1,121 @@
+"""
+Cold-start import-time benchmark for the Wealth Map backend.
+
+Runs ``python -X importtime -c "import app.main"`` in a fresh interpreter,
+totals the cumulative import time per module and fails when the total goes
+over the import-time budget. Run it from the backend directory:
+
+    python tests/performance/import_time.py
+    python tests/performance/import_time.py --budget-ms 1500 --top 30 --json importtime.json
+
+The budget defaults to the IMPORT_TIME_BUDGET_MS environment variable
+(2000ms if unset), so CI can tighten it without code changes.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+BACKEND_DIR = Path(__file__).parent.parent.parent
+DEFAULT_BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", "2000"))
+
+class ImportRecord(NamedTuple):
+    module: str
+    depth: int
+    self_us: int
+    cumulative_us: int
+
+def parse_importtime(output: str) -> List[ImportRecord]:
+    """Parse the stderr produced by ``python -X importtime``."""
+    records = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+
+        self_us, cumulative_us, name = parts
+        if not self_us.strip().isdigit():
+            # Header line: "self [us] | cumulative | imported package"
+            continue
+
+        # Nested imports are indented by two spaces per level after the leading space
+        stripped = name.lstrip(" ")
+        depth = (len(name) - len(stripped) - 1) // 2
+        records.append(ImportRecord(stripped, depth, int(self_us), int(cumulative_us)))
+
+    return records
+
+def summarize(records: List[ImportRecord]) -> Dict[str, float]:
+    """Return cumulative milliseconds per top-level package, plus the overall total."""
+    per_package: Dict[str, float] = defaultdict(float)
+    for record in records:
+        if record.depth == 0:
+            per_package[record.module.split(".")[0]] += record.cumulative_us / 1000
+
+    summary = dict(sorted(per_package.items(), key=lambda item: item[1], reverse=True))
+    summary["total"] = sum(per_package.values())
+    return summary
+
+def app_modules(records: List[ImportRecord]) -> Dict[str, float]:
+    """Return cumulative milliseconds for every ``app.*`` module."""
+    modules = {
+        record.module: record.cumulative_us / 1000
+        for record in records
+        if record.module == "app" or record.module.startswith("app.")
+    }
+    return dict(sorted(modules.items(), key=lambda item: item[1], reverse=True))
+
+def measure(module: str = "app.main") -> List[ImportRecord]:
+    """Import ``module`` in a fresh interpreter and return its import-time records."""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=str(BACKEND_DIR),
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{completed.stderr[-2000:]}")
+
+    return parse_importtime(completed.stderr)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Measure backend cold-start import time")
+    parser.add_argument("--module", default="app.main", help="Module to import")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="Fail above this total")
+    parser.add_argument("--top", type=int, default=20, help="Number of app modules to print")
+    parser.add_argument("--json", dest="json_path", help="Write the full report to this file")
+    args = parser.parse_args(argv)
+
+    records = measure(args.module)
+    summary = summarize(records)
+    modules = app_modules(records)
+    total = summary["total"]
+
+    print(f"Import of {args.module}: {total:.1f}ms (budget {args.budget_ms:.0f}ms)")
+    print("\nBy top-level package:")
+    for package, elapsed in summary.items():
+        if package != "total":
+            print(f"  {elapsed:10.1f}ms  {package}")
+    print(f"\nSlowest app modules (cumulative):")
+    for name, elapsed in list(modules.items())[:args.top]:
+        print(f"  {elapsed:10.1f}ms  {name}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"module": args.module, "budget_ms": args.budget_ms,
+                       "packages": summary, "app_modules": modules}, f, indent=2)
+
+    if total > args.budget_ms:
+        print(f"\nFAILED: import time {total:.1f}ms exceeds budget of {args.budget_ms:.0f}ms")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,46 +1,78 @@
 """
 Performance testing script using Locust.
 Run with: locust -f tests/performance/locustfile.py
+
+Search parameters match the synthetic dataset of synthetic_data.py; for
+repeatable latency percentiles without a running server, use
+search_benchmark.py.
 """
-import json
 import random
-import time
 from locust import HttpUser, task, between, tag
 
-class WealthMapUser(HttpUser):
+CITIES = ["New York", "Los Angeles", "Chicago", "Houston", "Phoenix", "Austin", "Seattle", "Miami"]
+STREETS = ["Main St", "Oak Ave", "Pine", "Maple Dr", "Washington", "Lake", "Sunset Blvd", "Park Ave"]
+PROPERTY_TYPES = ["residential", "condo", "multi_family", "commercial", "land"]
+OWNER_NAMES = ["Smith", "Garcia", "Johnson", "Holdings", "Capital", "Family Trust", "Realty"]
+# Viewport centers (lat, lng)
+MAP_CENTERS = [(40.70, -73.94), (34.05, -118.30), (41.84, -87.68), (29.76, -95.37), (30.27, -97.74)]
+
+def random_value_range():
+    low = random.choice([100000, 250000, 400000, 600000])
+    return {"min_value": low, "max_value": low * random.choice([2, 3, 5])}
+
+class AuthenticatedUser(HttpUser):
     """
-    Simulates a user of the Wealth Map platform.
+    Base class for users that log in before running their tasks.
     """
-    # Wait between 1 and 5 seconds between tasks
-    wait_time = between(1, 5)
-    
+    abstract = True
+    username = "user@example.com"
+    password = "userpassword"
+
     def on_start(self):
         """
         Initialize the user by logging in and storing the token.
         """
-        # Login to get authentication token
         response = self.client.post(
             "/api/auth/login",
             data={
-                "username": "user@example.com",
-                "password": "userpassword"
+                "username": self.username,
+                "password": self.password
             }
         )
-        
+
         if response.status_code == 200:
-            data = response.json()
-            self.token = data["access_token"]
-            self.headers = {"Authorization": f"Bearer {self.token}"}
-            self.user_id = None
-            
-            # Get user profile to store user ID
+            self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+            self.is_admin = False
+
+            # Get user profile to know whether admin tasks apply
             user_response = self.client.get("/api/users/me", headers=self.headers)
             if user_response.status_code == 200:
-                self.user_id = user_response.json()["id"]
+                self.is_admin = bool(user_response.json().get("is_admin"))
         else:
             # If login fails, stop the user
             self.environment.runner.quit()
-    
+
+    def random_property_id(self, name="/api/properties/"):
+        """
+        Pick a property from the first page of the property list.
+        """
+        response = self.client.get(
+            "/api/properties/",
+            params={"limit": 20, "skip": random.randint(0, 500)},
+            headers=self.headers,
+            name=name
+        )
+        if response.status_code == 200 and response.json():
+            return random.choice(response.json())["id"]
+        return None
+
+class WealthMapUser(AuthenticatedUser):
+    """
+    Simulates a user of the Wealth Map platform.
+    """
+    # Wait between 1 and 5 seconds between tasks
+    wait_time = between(1, 5)
+
     @tag("auth")
     @task(1)
     def get_user_profile(self):
@@ -48,364 +80,263 @@ class WealthMapUser(HttpUser):
         Get the current user's profile.
         """
         self.client.get("/api/users/me", headers=self.headers, name="/api/users/me")
-    
+
     @tag("search")
     @task(5)
     def search_properties(self):
         """
         Search for properties with random criteria.
         """
-        # Generate random search parameters
-        cities = ["New York", "Los Angeles", "Chicago", "Houston", "Phoenix"]
-        property_types = ["Single Family", "Condo", "Townhouse", "Multi-Family"]
-        
         params = {
-            "city": random.choice(cities),
-            "property_type": random.choice(property_types),
-            "min_price": random.randint(100000, 500000),
-            "max_price": random.randint(500001, 2000000),
-            "page": 1,
-            "limit": 10
+            "q": random.choice(CITIES + STREETS),
+            "property_type": random.choice(PROPERTY_TYPES),
+            "limit": 10,
+            **random_value_range()
         }
-        
+
         self.client.get(
             "/api/properties/search",
             params=params,
             headers=self.headers,
             name="/api/properties/search"
         )
-    
-    @tag("property")
+
+    @tag("search")
     @task(3)
-    def get_property_details(self):
+    def unified_search(self):
         """
-        Get details for a specific property.
+        Search properties, owners and addresses at once.
         """
-        # First, get a list of properties
-        response = self.client.get(
-            "/api/properties/",
-            params={"limit": 20},
+        self.client.post(
+            "/api/search/",
+            json={"query": random.choice(CITIES + STREETS + OWNER_NAMES), "page_size": 20},
             headers=self.headers,
-            name="/api/properties/"
+            name="/api/search/"
         )
-        
-        if response.status_code == 200:
-            data = response.json()
-            if data["items"]:
-                # Select a random property
-                property_id = random.choice(data["items"])["id"]
-                
-                # Get property details
-                self.client.get(
-                    f"/api/properties/{property_id}",
-                    headers=self.headers,
-                    name="/api/properties/{id}"
-                )
-    
-    @tag("report")
-    @task(2)
-    def generate_report(self):
+
+    @tag("search")
+    @task(5)
+    def search_suggestions(self):
         """
-        Generate a property report.
+        Type-ahead suggestions for a partially typed query.
         """
-        # First, get a list of properties
-        response = self.client.get(
-            "/api/properties/",
-            params={"limit": 20},
+        text = random.choice(CITIES + STREETS)
+        self.client.get(
+            "/api/search/suggestions",
+            params={"q": text[:random.randint(2, len(text))]},
             headers=self.headers,
-            name="/api/properties/"
+            name="/api/search/suggestions"
         )
-        
-        if response.status_code == 200:
-            data = response.json()
-            if data["items"]:
-                # Select a random property
-                property_id = random.choice(data["items"])["id"]
-                
-                # Generate a report
-                report_data = {
-                    "property_id": property_id,
-                    "report_type": random.choice(["basic", "standard", "premium"]),
-                    "include_comparables": random.choice([True, False]),
-                    "include_market_trends": random.choice([True, False])
-                }
-                
-                self.client.post(
-                    "/api/reports/",
-                    json=report_data,
-                    headers=self.headers,
-                    name="/api/reports/"
-                )
-    
-    @tag("dashboard")
-    @task(1)
-    def get_dashboard_stats(self):
+
+    @tag("map")
+    @task(3)
+    def browse_map(self):
         """
-        Get dashboard statistics.
+        Load the properties of a map viewport.
         """
+        lat, lng = random.choice(MAP_CENTERS)
+        half = random.choice([0.01, 0.05, 0.2])
         self.client.get(
-            "/api/dashboard/stats",
+            "/api/properties/map",
+            params={"lat_min": lat - half, "lat_max": lat + half, "lng_min": lng - half, "lng_max": lng + half},
+            headers=self.headers,
+            name="/api/properties/map"
+        )
+
+    @tag("property")
+    @task(3)
+    def get_property_details(self):
+        """
+        Get details for a specific property.
+        """
+        property_id = self.random_property_id()
+        if property_id:
+            self.client.get(
+                f"/api/properties/{property_id}",
+                headers=self.headers,
+                name="/api/properties/{id}"
+            )
+
+    @tag("report")
+    @task(1)
+    def generate_report(self):
+        """
+        Generate a property report.
+        """
+        self.client.post(
+            "/api/reports/",
+            json={
+                "name": "Load test report",
+                "report_type": random.choice(["property", "wealth"]),
+                "parameters": {"location": random.choice(CITIES), "radius": random.choice([1, 5, 10])}
+            },
             headers=self.headers,
-            name="/api/dashboard/stats"
+            name="/api/reports/"
         )
-    
+
     @tag("wealth")
     @task(2)
     def get_wealth_analysis(self):
         """
-        Get wealth analysis for a property owner.
+        Find an owner and get their wealth data.
         """
-        # First, get a list of properties
         response = self.client.get(
-            "/api/properties/",
-            params={"limit": 20},
+            "/api/owners/search",
+            params={"q": random.choice(OWNER_NAMES), "limit": 20},
             headers=self.headers,
-            name="/api/properties/"
+            name="/api/owners/search"
         )
-        
-        if response.status_code == 200:
-            data = response.json()
-            if data["items"]:
-                # Select a random property
-                property = random.choice(data["items"])
-                if property.get("owner_id"):
-                    # Get wealth analysis for the owner
-                    self.client.get(
-                        f"/api/wealth/owner/{property['owner_id']}",
-                        headers=self.headers,
-                        name="/api/wealth/owner/{id}"
-                    )
-    
+
+        if response.status_code == 200 and response.json():
+            owner_id = random.choice(response.json())["id"]
+            # Owners without wealth data answer 404
+            with self.client.get(
+                f"/api/owners/{owner_id}/wealth",
+                headers=self.headers,
+                name="/api/owners/{id}/wealth",
+                catch_response=True
+            ) as wealth_response:
+                if wealth_response.status_code == 404:
+                    wealth_response.success()
+
     @tag("admin")
     @task(1)
     def admin_tasks(self):
         """
         Perform admin tasks if the user is an admin.
         """
-        # Check if user is admin
-        if hasattr(self, "user_id"):
-            user_response = self.client.get(f"/api/users/{self.user_id}", headers=self.headers)
-            if user_response.status_code == 200 and user_response.json().get("role") == "admin":
-                # Get list of users
-                self.client.get(
-                    "/api/admin/users",
-                    params={"page": 1, "limit": 20},
-                    headers=self.headers,
-                    name="/api/admin/users"
-                )
-                
-                # Get system stats
-                self.client.get(
-                    "/api/admin/stats",
-                    headers=self.headers,
-                    name="/api/admin/stats"
-                )
-
-
-class DatabaseBenchmarkUser(HttpUser):
+        if self.is_admin:
+            self.client.get(
+                "/api/admin/users",
+                params={"skip": 0, "limit": 20},
+                headers=self.headers,
+                name="/api/admin/users"
+            )
+            self.client.get(
+                "/api/admin/stats",
+                headers=self.headers,
+                name="/api/admin/stats"
+            )
+
+
+class DatabaseBenchmarkUser(AuthenticatedUser):
     """
     User class specifically for benchmarking database performance.
     """
     wait_time = between(1, 3)
-    
-    def on_start(self):
-        """
-        Initialize the user by logging in as an admin.
-        """
-        # Login to get authentication token
-        response = self.client.post(
-            "/api/auth/login",
-            data={
-                "username": "admin@example.com",
-                "password": "adminpassword"
-            }
-        )
-        
-        if response.status_code == 200:
-            data = response.json()
-            self.token = data["access_token"]
-            self.headers = {"Authorization": f"Bearer {self.token}"}
-        else:
-            # If login fails, stop the user
-            self.environment.runner.quit()
-    
+    username = "admin@example.com"
+    password = "adminpassword"
+
     @tag("db_benchmark")
-    @task(1)
+    @task(2)
     def complex_property_query(self):
         """
-        Perform a complex property query with multiple filters and joins.
+        Perform a property search with several filters and a total count.
         """
-        # Generate random query parameters
         params = {
-            "min_price": random.randint(100000, 500000),
-            "max_price": random.randint(500001, 2000000),
+            "q": random.choice(CITIES),
+            "property_type": random.choice(PROPERTY_TYPES[:3]),
             "min_bedrooms": random.randint(1, 3),
             "min_bathrooms": random.randint(1, 3),
-            "property_types": random.sample(["Single Family", "Condo", "Townhouse", "Multi-Family"], 2),
-            "cities": random.sample(["New York", "Los Angeles", "Chicago", "Houston", "Phoenix"], 2),
-            "include_owner_details": True,
-            "include_transaction_history": True,
-            "sort_by": random.choice(["price", "date_listed", "square_feet"]),
-            "sort_order": random.choice(["asc", "desc"]),
-            "page": 1,
-            "limit": 20
+            "min_square_feet": random.choice([800, 1500, 2500]),
+            "estimate_total": True,
+            "skip": random.choice([0, 100, 1000]),
+            "limit": 20,
+            **random_value_range()
         }
-        
-        start_time = time.time()
-        response = self.client.get(
-            "/api/properties/advanced-search",
+
+        self.client.get(
+            "/api/properties/search",
             params=params,
             headers=self.headers,
-            name="/api/properties/advanced-search"
+            name="/api/properties/search (filtered)"
         )
-        query_time = time.time() - start_time
-        
-        # Log the query time
-        if response.status_code == 200:
-            self.environment.events.request_success.fire(
-                request_type="GET",
-                name="DB Query Time",
-                response_time=query_time * 1000,  # Convert to milliseconds
-                response_length=len(response.content)
-            )
-    
+
+    @tag("db_benchmark")
+    @task(1)
+    def property_facets(self):
+        """
+        Count search results per facet.
+        """
+        self.client.get(
+            "/api/properties/search/facets",
+            params={"q": random.choice(CITIES), **random_value_range()},
+            headers=self.headers,
+            name="/api/properties/search/facets"
+        )
+
     @tag("db_benchmark")
     @task(1)
-    def aggregate_wealth_data(self):
+    def wealthy_owner_search(self):
         """
-        Perform aggregation queries on wealth data.
+        Search owners by name and net worth.
         """
-        # Generate random query parameters
         params = {
-            "min_net_worth": random.randint(100000, 1000000),
-            "group_by": random.choice(["city", "age_range", "income_bracket"]),
-            "include_properties": random.choice([True, False]),
-            "include_investments": random.choice([True, False])
+            "q": random.choice(OWNER_NAMES),
+            "fuzzy": random.choice([True, False]),
+            "min_net_worth": random.randint(100000, 10000000),
+            "owner_type": random.choice(["individual", "company", "trust"]),
+            "estimate_total": True,
+            "limit": 20
         }
-        
-        start_time = time.time()
-        response = self.client.get(
-            "/api/wealth/aggregate",
+
+        self.client.get(
+            "/api/owners/search",
             params=params,
             headers=self.headers,
-            name="/api/wealth/aggregate"
+            name="/api/owners/search (filtered)"
         )
-        query_time = time.time() - start_time
-        
-        # Log the query time
-        if response.status_code == 200:
-            self.environment.events.request_success.fire(
-                request_type="GET",
-                name="Wealth Aggregation Time",
-                response_time=query_time * 1000,  # Convert to milliseconds
-                response_length=len(response.content)
-            )
 
 
-class APIResponseTimeUser(HttpUser):
+class APIResponseTimeUser(AuthenticatedUser):
     """
     User class specifically for measuring API response times.
     """
     wait_time = between(0.1, 1)  # Shorter wait times for more intensive testing
-    
-    def on_start(self):
-        """
-        Initialize the user by logging in.
-        """
-        # Login to get authentication token
-        response = self.client.post(
-            "/api/auth/login",
-            data={
-                "username": "user@example.com",
-                "password": "userpassword"
-            }
-        )
-        
-        if response.status_code == 200:
-            data = response.json()
-            self.token = data["access_token"]
-            self.headers = {"Authorization": f"Bearer {self.token}"}
-        else:
-            # If login fails, stop the user
-            self.environment.runner.quit()
-    
+
     @tag("api_response")
     @task(10)
     def measure_search_response(self):
         """
         Measure response time for property search API.
         """
-        # Generate random search parameters
         params = {
-            "query": random.choice(["house", "apartment", "condo", "townhouse"]),
-            "city": random.choice(["New York", "Los Angeles", "Chicago", "Houston", "Phoenix"]),
-            "page": random.randint(1, 5),
+            "q": random.choice(STREETS),
+            "skip": random.randint(0, 4) * 10,
             "limit": 10
         }
-        
+
         self.client.get(
             "/api/properties/search",
             params=params,
             headers=self.headers,
             name="/api/properties/search (Response Time)"
         )
-    
+
     @tag("api_response")
     @task(5)
     def measure_property_detail_response(self):
         """
         Measure response time for property detail API.
         """
-        # First, get a list of properties
-        response = self.client.get(
-            "/api/properties/",
-            params={"limit": 20},
-            headers=self.headers
-        )
-        
-        if response.status_code == 200:
-            data = response.json()
-            if data["items"]:
-                # Select a random property
-                property_id = random.choice(data["items"])["id"]
-                
-                # Measure response time for property details
-                self.client.get(
-                    f"/api/properties/{property_id}",
-                    headers=self.headers,
-                    name="/api/properties/{id} (Response Time)"
-                )
-    
+        property_id = self.random_property_id(name="/api/properties/ (Response Time)")
+        if property_id:
+            self.client.get(
+                f"/api/properties/{property_id}",
+                headers=self.headers,
+                name="/api/properties/{id} (Response Time)"
+            )
+
     @tag("api_response")
     @task(3)
-    def measure_report_generation_response(self):
+    def measure_suggestion_response(self):
         """
-        Measure response time for report generation API.
+        Measure response time for search suggestions.
         """
-        # First, get a list of properties
-        response = self.client.get(
-            "/api/properties/",
-            params={"limit": 20},
-            headers=self.headers
+        text = random.choice(CITIES + STREETS)
+        self.client.get(
+            "/api/search/suggestions",
+            params={"q": text[:3]},
+            headers=self.headers,
+            name="/api/search/suggestions (Response Time)"
         )
-        
-        if response.status_code == 200:
-            data = response.json()
-            if data["items"]:
-                # Select a random property
-                property_id = random.choice(data["items"])["id"]
-                
-                # Measure response time for report generation
-                report_data = {
-                    "property_id": property_id,
-                    "report_type": "basic",
-                    "include_comparables": False,
-                    "include_market_trends": False
-                }
-                
-                self.client.post(
-                    "/api/reports/",
-                    json=report_data,
-                    headers=self.headers,
-                    name="/api/reports/ (Response Time)"
-                )
\ No newline at end of file
@@ -0,0 +1,288 @@
+"""
+Search latency and relevance benchmark.
+
+Runs the search, suggestion, map and owner endpoints in-process (FastAPI
+TestClient, app startup included) against the database at DATABASE_URL,
+which should hold the synthetic dataset of ``synthetic_data.py``. Request
+parameters are drawn from a sample of that data with a fixed seed, so runs
+are comparable. For every scenario the p50/p95/p99 latencies are reported;
+relevance is measured as recall@10 and mean reciprocal rank of known
+properties when searching their address exactly, in lower case without the
+street suffix, and with a typo.
+
+The run fails when a scenario's p95 or the relevance goes past the budgets
+in ``benchmark_budgets.json``. Run it from the backend directory:
+
+    python tests/performance/search_benchmark.py
+    python tests/performance/search_benchmark.py --requests 500 --scenario map --json bench.json
+    python tests/performance/search_benchmark.py --cold
+
+``--cold`` bypasses the result cache, to measure the queries themselves.
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence
+
+BACKEND_DIR = Path(__file__).parent.parent.parent
+DEFAULT_BUDGETS = Path(__file__).parent / "benchmark_budgets.json"
+PERCENTILES = (50, 95, 99)
+# Properties and owners the request parameters are drawn from
+SAMPLE_SIZE = 500
+
+SAMPLE_PROPERTIES_SQL = """
+    SELECT id::text, address, city, state, zip_code, property_type,
+           ST_X(location::geometry) AS lng, ST_Y(location::geometry) AS lat
+    FROM properties
+    WHERE location IS NOT NULL
+    ORDER BY md5(id::text || CAST(:seed AS text))
+    LIMIT :limit
+"""
+
+SAMPLE_OWNERS_SQL = """
+    SELECT id::text, name FROM owners ORDER BY md5(id::text || CAST(:seed AS text)) LIMIT :limit
+"""
+
+class Request(NamedTuple):
+    method: str
+    path: str
+    params: Optional[Dict[str, Any]] = None
+    body: Optional[Dict[str, Any]] = None
+
+class Scenario(NamedTuple):
+    name: str
+    # Builds one request from the rng and the data sample
+    build: Callable[[random.Random, Dict[str, list]], Request]
+
+def _value_range(rng: random.Random) -> Dict[str, float]:
+    low = rng.choice((100000, 250000, 400000, 600000))
+    return {"min_value": low, "max_value": low * rng.choice((2, 3, 5))}
+
+def _street(address: str) -> str:
+    """'1295 Sheridan Blvd' -> 'Sheridan Blvd'"""
+    return address.split(" ", 1)[-1]
+
+def _viewport(rng: random.Random, prop: Dict[str, Any]) -> Dict[str, float]:
+    # Neighborhood to metro sized
+    half = rng.choice((0.01, 0.03, 0.1, 0.3))
+    return {
+        "lat_min": prop["lat"] - half, "lat_max": prop["lat"] + half,
+        "lng_min": prop["lng"] - half, "lng_max": prop["lng"] + half,
+    }
+
+SCENARIOS = [
+    Scenario("property_search_text", lambda rng, data: Request(
+        "GET", "/api/properties/search",
+        {"q": _street(rng.choice(data["properties"])["address"]), "limit": 20}
+    )),
+    Scenario("property_search_filters", lambda rng, data: Request(
+        "GET", "/api/properties/search",
+        {
+            "property_type": rng.choice(data["properties"])["property_type"],
+            "min_bedrooms": rng.randint(1, 4),
+            "limit": 20,
+            **_value_range(rng),
+        }
+    )),
+    Scenario("property_facets", lambda rng, data: Request(
+        "GET", "/api/properties/search/facets",
+        {"q": rng.choice(data["properties"])["city"], **_value_range(rng)}
+    )),
+    Scenario("unified_search", lambda rng, data: Request(
+        "POST", "/api/search/",
+        body={"query": rng.choice(data["properties"])["address"], "page_size": 20}
+    )),
+    Scenario("suggestions", lambda rng, data: Request(
+        "GET", "/api/search/suggestions",
+        # What a user has typed so far
+        {"q": (lambda text: text[:rng.randint(2, len(text))])(_street(rng.choice(data["properties"])["address"])),
+         "limit": 10}
+    )),
+    Scenario("map", lambda rng, data: Request(
+        "GET", "/api/properties/map", _viewport(rng, rng.choice(data["properties"]))
+    )),
+    Scenario("owner_search", lambda rng, data: Request(
+        "GET", "/api/owners/search",
+        {"q": rng.choice(data["owners"])["name"].split(" ")[-1], "fuzzy": rng.random() < 0.5, "limit": 20}
+    )),
+    Scenario("owner_wealth", lambda rng, data: Request(
+        "GET", f"/api/owners/{rng.choice(data['owners'])['id']}/wealth"
+    )),
+]
+
+def percentile(samples: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile of ``samples``."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+def summarize(samples: Sequence[float], errors: int = 0) -> Dict[str, float]:
+    summary = {f"p{pct}_ms": round(percentile(samples, pct), 2) for pct in PERCENTILES}
+    summary["requests"] = len(samples)
+    summary["errors"] = errors
+    return summary
+
+def query_variants(address: str, rng: random.Random) -> Dict[str, str]:
+    """The ways a user might type a known address."""
+    words = address.split(" ")
+    # Street without its suffix, as typed in a hurry
+    loose = " ".join(words[:-1] if len(words) > 2 else words).lower()
+    name = words[1] if len(words) > 1 else words[0]
+    position = rng.randrange(1, len(name)) if len(name) > 1 else 0
+    typo = address.replace(name, name[:position] + name[position + 1:], 1)
+    return {"exact": address, "loose": loose, "typo": typo}
+
+def relevance(ranks: Sequence[Optional[int]], k: int = 10) -> Dict[str, float]:
+    """recall@k and mean reciprocal rank of 1-based ``ranks`` (None when not found)."""
+    if not ranks:
+        return {f"recall_at_{k}": 0.0, "mrr": 0.0}
+    return {
+        f"recall_at_{k}": round(sum(1 for rank in ranks if rank is not None and rank <= k) / len(ranks), 4),
+        "mrr": round(sum(1 / rank for rank in ranks if rank is not None) / len(ranks), 4),
+    }
+
+def check_budgets(report: Dict[str, Any], budgets: Dict[str, Any]) -> List[str]:
+    """Describe every budget the report exceeds."""
+    failures = []
+    for name, budget in budgets.get("scenarios", {}).items():
+        result = report["scenarios"].get(name)
+        if result is None:
+            continue
+        for metric, limit in budget.items():
+            if result.get(metric, 0) > limit:
+                failures.append(f"{name}: {metric} {result[metric]} > {limit}")
+        if result["errors"]:
+            failures.append(f"{name}: {result['errors']} failed request(s)")
+    for variant, floors in budgets.get("relevance", {}).items():
+        result = report.get("relevance", {}).get(variant)
+        if result is None:
+            continue
+        for metric, floor in floors.items():
+            if result.get(metric, floor) < floor:
+                failures.append(f"relevance {variant}: {metric} {result[metric]} < {floor}")
+    return failures
+
+def sample_data(db, seed: int) -> Dict[str, list]:
+    from sqlalchemy import text
+
+    params = {"seed": seed, "limit": SAMPLE_SIZE}
+    data = {
+        "properties": [dict(row._mapping) for row in db.execute(text(SAMPLE_PROPERTIES_SQL), params)],
+        "owners": [dict(row._mapping) for row in db.execute(text(SAMPLE_OWNERS_SQL), params)],
+    }
+    if not data["properties"] or not data["owners"]:
+        raise SystemExit("No properties or owners to sample; load tests/performance/synthetic_data.py first")
+    return data
+
+def send(client, request: Request):
+    if request.method == "POST":
+        return client.post(request.path, json=request.body)
+    return client.get(request.path, params=request.params)
+
+def run_scenario(client, scenario: Scenario, data: Dict[str, list], rng: random.Random,
+                 requests: int, warmup: int) -> Dict[str, float]:
+    samples, errors = [], 0
+    for i in range(warmup + requests):
+        request = scenario.build(rng, data)
+        started = time.perf_counter()
+        response = send(client, request)
+        elapsed = (time.perf_counter() - started) * 1000
+        if i < warmup:
+            continue
+        if response.status_code >= 400:
+            errors += 1
+        else:
+            samples.append(elapsed)
+    return summarize(samples, errors)
+
+def run_relevance(client, data: Dict[str, list], rng: random.Random, queries: int) -> Dict[str, Dict[str, float]]:
+    ranks: Dict[str, List[Optional[int]]] = {}
+    for prop in rng.sample(data["properties"], min(queries, len(data["properties"]))):
+        for variant, query in query_variants(prop["address"], rng).items():
+            response = client.post("/api/search/", json={
+                "query": query, "filters": {"types": ["property"]}, "page_size": 10
+            })
+            ids = [row.get("id") for row in response.json().get("results", [])] if response.status_code < 400 else []
+            ranks.setdefault(variant, []).append(ids.index(prop["id"]) + 1 if prop["id"] in ids else None)
+    return {variant: relevance(found) for variant, found in ranks.items()}
+
+def _bypass_cache() -> None:
+    from app.core.cache import cache
+
+    async def miss(*args, **kwargs):
+        return None
+
+    async def miss_many(keys):
+        return {}
+
+    cache.get = cache.get_bytes = miss
+    cache.get_many = miss_many
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Search latency and relevance benchmark")
+    parser.add_argument("--requests", type=int, default=200, help="Measured requests per scenario")
+    parser.add_argument("--warmup", type=int, default=20, help="Unmeasured requests per scenario")
+    parser.add_argument("--relevance-queries", type=int, default=100, help="Known properties searched for")
+    parser.add_argument("--seed", type=int, default=42, help="Seed for sampling and request parameters")
+    parser.add_argument("--scenario", action="append", choices=[s.name for s in SCENARIOS],
+                        help="Only run this scenario (repeatable)")
+    parser.add_argument("--cold", action="store_true", help="Bypass the result cache")
+    parser.add_argument("--budgets", default=str(DEFAULT_BUDGETS), help="JSON file of budgets")
+    parser.add_argument("--json", dest="json_path", help="Write the report to this file")
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, str(BACKEND_DIR))
+    from fastapi.testclient import TestClient
+
+    from app.core.dependencies import get_current_active_user, get_current_user
+    from app.db.session import SessionLocal
+    from app.main import app
+
+    if args.cold:
+        _bypass_cache()
+    user = SimpleNamespace(id=None, email="benchmark@example.com", is_active=True, is_admin=False)
+    app.dependency_overrides[get_current_user] = lambda: user
+    app.dependency_overrides[get_current_active_user] = lambda: user
+
+    db = SessionLocal()
+    try:
+        data = sample_data(db, args.seed)
+    finally:
+        db.close()
+
+    rng = random.Random(args.seed)
+    selected = [s for s in SCENARIOS if not args.scenario or s.name in args.scenario]
+    report: Dict[str, Any] = {"seed": args.seed, "cold": args.cold, "scenarios": {}}
+    with TestClient(app) as client:
+        for scenario in selected:
+            report["scenarios"][scenario.name] = result = run_scenario(
+                client, scenario, data, rng, args.requests, args.warmup
+            )
+            print(
+                f"{scenario.name:<26}" + "".join(f"{result[f'p{pct}_ms']:>10.1f}" for pct in PERCENTILES)
+                + (f"  ({result['errors']} errors)" if result["errors"] else "")
+            )
+        if args.relevance_queries:
+            report["relevance"] = run_relevance(client, data, rng, args.relevance_queries)
+            for variant, result in report["relevance"].items():
+                print(f"relevance {variant:<16}" + "".join(f"  {k} {v:.3f}" for k, v in result.items()))
+
+    budgets = json.loads(Path(args.budgets).read_text())
+    failures = check_budgets(report, budgets)
+    report["failures"] = failures
+
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(report, indent=2))
+
+    for failure in failures:
+        print(f"FAIL {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
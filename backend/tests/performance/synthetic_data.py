@@ -0,0 +1,345 @@
+"""
+Deterministic synthetic national dataset for search benchmarks.
+
+Generates owners, properties, their ownership and owner wealth data with
+realistic shapes, and loads them into the database at DATABASE_URL with
+COPY. The same ``--seed`` always produces the same rows, ids included, so
+benchmark runs on different machines search the same data:
+
+- properties are spread over major metros by population, in a handful of
+  zip codes per metro, on a shared vocabulary of street names; points are
+  scattered around each zip code's center
+- values are log-normal around the metro's median, scaled by property type
+  and size; bedrooms and bathrooms follow floor area
+- most owners are individuals holding one property; a few companies and
+  trusts hold many (a skewed pick), as in real parcel data
+
+Run it from the backend directory against a migrated database:
+
+    python tests/performance/synthetic_data.py --properties 1000000
+    python tests/performance/synthetic_data.py --properties 5000000 --seed 7 --truncate
+
+then rebuild the derived map data (``wealthmap-admin rebuild-grid`` and
+``wealthmap-admin refresh-heatmaps --full``) before benchmarking.
+"""
+import argparse
+import csv
+import io
+import math
+import random
+import sys
+import time
+import uuid
+from datetime import date, timedelta
+from itertools import islice
+from pathlib import Path
+from typing import Iterator, List, NamedTuple, Optional, Sequence
+
+BACKEND_DIR = Path(__file__).parent.parent.parent
+
+# Rows per COPY round trip
+CHUNK_ROWS = 100000
+
+class Metro(NamedTuple):
+    city: str
+    state: str
+    lng: float
+    lat: float
+    weight: float  # share of properties
+    median_value: float
+    zip_prefix: str
+
+METROS = [
+    Metro("New York", "NY", -73.94, 40.70, 8.3, 720000, "100"),
+    Metro("Los Angeles", "CA", -118.30, 34.05, 4.0, 910000, "900"),
+    Metro("Chicago", "IL", -87.68, 41.84, 2.7, 330000, "606"),
+    Metro("Houston", "TX", -95.37, 29.76, 2.3, 280000, "770"),
+    Metro("Phoenix", "AZ", -112.07, 33.45, 1.6, 420000, "850"),
+    Metro("Philadelphia", "PA", -75.16, 39.95, 1.6, 260000, "191"),
+    Metro("San Antonio", "TX", -98.49, 29.42, 1.5, 270000, "782"),
+    Metro("San Diego", "CA", -117.16, 32.72, 1.4, 880000, "921"),
+    Metro("Dallas", "TX", -96.80, 32.78, 1.3, 360000, "752"),
+    Metro("Austin", "TX", -97.74, 30.27, 1.0, 520000, "787"),
+    Metro("Jacksonville", "FL", -81.66, 30.33, 0.95, 300000, "322"),
+    Metro("San Jose", "CA", -121.89, 37.34, 0.95, 1350000, "951"),
+    Metro("Columbus", "OH", -82.99, 39.96, 0.9, 250000, "432"),
+    Metro("Charlotte", "NC", -80.84, 35.23, 0.9, 370000, "282"),
+    Metro("Seattle", "WA", -122.33, 47.61, 0.75, 830000, "981"),
+    Metro("Denver", "CO", -104.99, 39.74, 0.7, 590000, "802"),
+    Metro("Boston", "MA", -71.06, 42.36, 0.65, 750000, "021"),
+    Metro("Nashville", "TN", -86.78, 36.16, 0.7, 440000, "372"),
+    Metro("Miami", "FL", -80.19, 25.76, 0.45, 580000, "331"),
+    Metro("Atlanta", "GA", -84.39, 33.75, 0.5, 400000, "303"),
+    Metro("San Francisco", "CA", -122.42, 37.77, 0.8, 1250000, "941"),
+    Metro("Minneapolis", "MN", -93.27, 44.98, 0.43, 320000, "554"),
+    Metro("Las Vegas", "NV", -115.14, 36.17, 0.64, 410000, "891"),
+    Metro("Portland", "OR", -122.68, 45.52, 0.65, 520000, "972"),
+    Metro("Detroit", "MI", -83.05, 42.33, 0.63, 90000, "482"),
+]
+ZIPS_PER_METRO = 40
+# Degrees between a metro's center and its outermost zip codes
+METRO_RADIUS = 0.25
+
+STREET_NAMES = [
+    "Main", "Oak", "Pine", "Maple", "Cedar", "Elm", "Washington", "Lake", "Hill", "Park",
+    "Walnut", "Sunset", "Lincoln", "Jackson", "Church", "Highland", "Spring", "River", "Forest",
+    "Madison", "Jefferson", "Franklin", "Chestnut", "Willow", "Meadow", "Ridge", "Valley",
+    "Center", "Mill", "Broad", "Market", "Union", "Adams", "Cherry", "Dogwood", "Magnolia",
+    "Laurel", "Hickory", "Sycamore", "Birch", "Poplar", "Spruce", "Aspen", "Juniper", "Holly",
+    "Harbor", "Bay", "Ocean", "Prospect", "Grand", "Liberty", "Summit", "Fairview", "Woodland",
+    "Orchard", "Greenwood", "Kingston", "Hamilton", "Monroe", "Wilson", "Grant", "Sheridan",
+    "Colonial", "Heritage", "Vista", "Canyon", "Mesa", "Alamo", "Rosewood", "Bluebonnet",
+]
+STREET_SUFFIXES = ["St", "Ave", "Blvd", "Rd", "Dr", "Ln", "Ct", "Pl", "Way", "Ter"]
+STREETS_PER_ZIP = 60
+
+FIRST_NAMES = [
+    "James", "Mary", "Robert", "Patricia", "John", "Jennifer", "Michael", "Linda", "David",
+    "Elizabeth", "William", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas", "Sarah",
+    "Charles", "Karen", "Daniel", "Lisa", "Matthew", "Nancy", "Anthony", "Betty", "Mark", "Sandra",
+    "Steven", "Ashley", "Andrew", "Emily", "Joshua", "Michelle", "Kevin", "Amanda", "Brian", "Melissa",
+    "Wei", "Priya", "Carlos", "Sofia", "Ahmed", "Fatima", "Hiroshi", "Yuki", "Olga", "Ivan",
+]
+LAST_NAMES = [
+    "Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez",
+    "Martinez", "Hernandez", "Lopez", "Gonzalez", "Wilson", "Anderson", "Thomas", "Taylor", "Moore",
+    "Jackson", "Martin", "Lee", "Perez", "Thompson", "White", "Harris", "Sanchez", "Clark",
+    "Ramirez", "Lewis", "Robinson", "Walker", "Young", "Allen", "King", "Wright", "Scott", "Torres",
+    "Nguyen", "Hill", "Flores", "Green", "Adams", "Nelson", "Baker", "Hall", "Rivera", "Campbell",
+    "Mitchell", "Carter", "Roberts", "Chen", "Patel", "Kim", "Cohen", "O'Brien", "Schmidt",
+]
+ENTITY_WORDS = [
+    "Capital", "Holdings", "Properties", "Realty", "Investments", "Partners", "Equity", "Ventures",
+    "Land", "Estates", "Group", "Asset Management", "Development", "Residential",
+]
+ENTITY_SUFFIXES = ["LLC", "L.L.C.", "Inc.", "LP", "Corp.", "Ltd."]
+
+# (type, share, value multiplier, median square feet)
+PROPERTY_TYPES = [
+    ("residential", 0.68, 1.0, 1900),
+    ("condo", 0.16, 0.7, 1100),
+    ("multi_family", 0.07, 1.6, 3600),
+    ("commercial", 0.06, 2.8, 9000),
+    ("land", 0.03, 0.35, 0),
+]
+
+# Share of owners that are companies or trusts, and of properties they hold
+ENTITY_OWNER_SHARE = 0.04
+ENTITY_PROPERTY_SHARE = 0.2
+VALUE_SIGMA = 0.55
+VALUE_DATE = date(2024, 6, 1)
+
+PROPERTY_COLUMNS = [
+    "id", "address", "city", "state", "zip_code", "property_type", "bedrooms", "bathrooms",
+    "square_feet", "lot_size", "year_built", "last_sale_date", "last_sale_price", "current_value",
+    "value_estimate_date", "location",
+]
+OWNER_COLUMNS = ["id", "name", "owner_type"]
+OWNERSHIP_COLUMNS = ["id", "property_id", "owner_id", "ownership_percentage", "start_date"]
+WEALTH_COLUMNS = [
+    "id", "owner_id", "estimated_net_worth", "confidence_level", "liquid_assets",
+    "real_estate_assets", "investment_assets", "other_assets", "data_source", "last_updated",
+]
+
+def make_uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+class Zip(NamedTuple):
+    code: str
+    metro: Metro
+    lng: float
+    lat: float
+    value_factor: float  # neighborhood premium
+    streets: Sequence[str]
+
+def build_zips(rng: random.Random) -> List[Zip]:
+    """Zip codes of every metro, with their centers, premiums and streets."""
+    streets = [f"{name} {suffix}" for name in STREET_NAMES for suffix in STREET_SUFFIXES]
+    zips = []
+    for metro in METROS:
+        for i in range(ZIPS_PER_METRO):
+            angle = rng.uniform(0, 2 * math.pi)
+            distance = METRO_RADIUS * math.sqrt(rng.random())
+            # Closer-in zip codes are pricier
+            premium = math.exp(rng.gauss(0, 0.25)) * (1.4 - distance / METRO_RADIUS * 0.6)
+            zips.append(Zip(
+                code=f"{metro.zip_prefix}{i:02d}",
+                metro=metro,
+                lng=metro.lng + distance * math.cos(angle) / math.cos(math.radians(metro.lat)),
+                lat=metro.lat + distance * math.sin(angle),
+                value_factor=premium,
+                streets=rng.sample(streets, STREETS_PER_ZIP),
+            ))
+    return zips
+
+def owner_name(rng: random.Random, entity: bool) -> str:
+    if not entity:
+        # Common surnames are much more common
+        return f"{rng.choice(FIRST_NAMES)} {LAST_NAMES[int(len(LAST_NAMES) * rng.random() ** 2)]}"
+    if rng.random() < 0.3:
+        return f"{rng.choice(LAST_NAMES)} Family Trust"
+    words = " ".join(rng.sample(ENTITY_WORDS, rng.choice((1, 1, 2))))
+    return f"{rng.choice(STREET_NAMES + LAST_NAMES)} {words} {rng.choice(ENTITY_SUFFIXES)}"
+
+def generate_owners(rng: random.Random, count: int) -> Iterator[list]:
+    """Owner rows; the first ENTITY_OWNER_SHARE of them are companies and trusts."""
+    entities = max(1, int(count * ENTITY_OWNER_SHARE))
+    for i in range(count):
+        entity = i < entities
+        name = owner_name(rng, entity)
+        owner_type = "individual" if not entity else ("trust" if name.endswith("Trust") else "company")
+        yield [make_uuid(rng), name, owner_type]
+
+def generate_wealth(rng: random.Random, owners: Sequence[list]) -> Iterator[list]:
+    for owner_id, _, owner_type in owners:
+        net_worth = math.exp(rng.gauss(13.8 if owner_type == "individual" else 16.5, 1.2))
+        shares = [rng.random() for _ in range(4)]
+        total = sum(shares)
+        yield [
+            make_uuid(rng), owner_id, round(net_worth, 2), rng.randint(40, 95),
+            *[round(net_worth * share / total, 2) for share in shares],
+            "synthetic", f"{VALUE_DATE.isoformat()} 00:00:00+00",
+        ]
+
+def generate_properties(rng: random.Random, zips: Sequence[Zip], count: int) -> Iterator[list]:
+    """Property rows, spread over the metros by population."""
+    weights = [zip_code.metro.weight for zip_code in zips]
+    cumulative = []
+    running = 0.0
+    for weight in weights:
+        running += weight
+        cumulative.append(running)
+    type_weights = [share for _, share, _, _ in PROPERTY_TYPES]
+
+    for _ in range(count):
+        zip_code = rng.choices(zips, cum_weights=cumulative)[0]
+        metro = zip_code.metro
+        property_type, _, multiplier, median_sqft = rng.choices(PROPERTY_TYPES, weights=type_weights)[0]
+
+        square_feet = int(median_sqft * math.exp(rng.gauss(0, 0.35))) if median_sqft else None
+        bedrooms = bathrooms = None
+        if property_type in ("residential", "condo", "multi_family"):
+            bedrooms = max(1, min(8, round(square_feet / 650 + rng.gauss(0, 0.6))))
+            bathrooms = max(1.0, min(6.0, round((bedrooms * 0.7 + rng.gauss(0, 0.4)) * 2) / 2))
+        size_factor = (square_feet / median_sqft) ** 0.6 if square_feet else 1.0
+        value = metro.median_value * zip_code.value_factor * multiplier * size_factor * math.exp(rng.gauss(0, VALUE_SIGMA))
+        sale_date = VALUE_DATE - timedelta(days=rng.randint(30, 365 * 25))
+        # Prices grew ~4% a year
+        sale_price = value / 1.04 ** ((VALUE_DATE - sale_date).days / 365)
+
+        number = int(math.exp(rng.uniform(0, math.log(20000))))
+        lng = zip_code.lng + rng.gauss(0, 0.012)
+        lat = zip_code.lat + rng.gauss(0, 0.012)
+        yield [
+            make_uuid(rng),
+            f"{number} {rng.choice(zip_code.streets)}",
+            metro.city,
+            metro.state,
+            zip_code.code,
+            property_type,
+            bedrooms,
+            bathrooms,
+            square_feet,
+            round(math.exp(rng.gauss(8.9, 0.8)), 2),
+            rng.randint(1900, 2023) if property_type != "land" else None,
+            sale_date.isoformat(),
+            round(sale_price, -2),
+            round(value, -2),
+            VALUE_DATE.isoformat(),
+            f"SRID=4326;POINT({lng:.6f} {lat:.6f})",
+        ]
+
+def assign_owner(rng: random.Random, owner_count: int) -> int:
+    """Index of a property's owner: few entities hold many properties."""
+    entities = max(1, int(owner_count * ENTITY_OWNER_SHARE))
+    if rng.random() < ENTITY_PROPERTY_SHARE:
+        return int(entities * rng.random() ** 3)
+    return entities + rng.randrange(owner_count - entities) if owner_count > entities else 0
+
+def copy_rows(connection, table: str, columns: Sequence[str], rows: Iterator[list]) -> int:
+    """COPY ``rows`` into ``table`` in chunks. Returns the number of rows."""
+    total = 0
+    cursor = connection.cursor()
+    try:
+        while True:
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            written = 0
+            for row in rows:
+                writer.writerow(["" if value is None else value for value in row])
+                written += 1
+                if written >= CHUNK_ROWS:
+                    break
+            if not written:
+                break
+            buffer.seek(0)
+            cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+            total += written
+            if written < CHUNK_ROWS:
+                break
+    finally:
+        cursor.close()
+    return total
+
+def load(database_url: str, properties: int, seed: int, truncate: bool = False) -> dict:
+    """Generate the dataset and COPY it in one transaction. Returns row counts per table."""
+    import psycopg2
+
+    rng = random.Random(seed)
+    zips = build_zips(rng)
+    owners = list(generate_owners(rng, max(1, int(properties * 0.6))))
+
+    connection = psycopg2.connect(database_url)
+    try:
+        with connection:
+            if truncate:
+                with connection.cursor() as cursor:
+                    cursor.execute("TRUNCATE properties, owners CASCADE")
+            counts = {"owners": copy_rows(connection, "owners", OWNER_COLUMNS, iter(owners))}
+            counts["wealth_data"] = copy_rows(connection, "wealth_data", WEALTH_COLUMNS, generate_wealth(rng, owners))
+
+            # Ownership rows follow each chunk of the properties they reference
+            counts["properties"] = counts["property_ownership"] = 0
+            rows = generate_properties(rng, zips, properties)
+            while True:
+                chunk = list(islice(rows, CHUNK_ROWS))
+                if not chunk:
+                    break
+                ownership = [
+                    [make_uuid(rng), row[0], owners[assign_owner(rng, len(owners))][0], 100, row[11]]
+                    for row in chunk
+                ]
+                counts["properties"] += copy_rows(connection, "properties", PROPERTY_COLUMNS, iter(chunk))
+                counts["property_ownership"] += copy_rows(
+                    connection, "property_ownership", OWNERSHIP_COLUMNS, iter(ownership)
+                )
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE properties, owners, property_ownership, wealth_data")
+    finally:
+        connection.close()
+    return counts
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load a deterministic synthetic dataset for benchmarks")
+    parser.add_argument("--properties", type=int, default=1000000, help="Number of properties")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed; the same seed yields the same rows")
+    parser.add_argument("--truncate", action="store_true", help="Empty properties and owners first")
+    parser.add_argument("--database-url", help="Defaults to the app's DATABASE_URL")
+    args = parser.parse_args(argv)
+
+    database_url = args.database_url
+    if not database_url:
+        sys.path.insert(0, str(BACKEND_DIR))
+        from app.core.config import settings
+        database_url = settings.DATABASE_URL
+
+    started = time.perf_counter()
+    counts = load(database_url, args.properties, args.seed, truncate=args.truncate)
+    elapsed = time.perf_counter() - started
+    print(f"Loaded in {elapsed:.1f}s (seed {args.seed}):")
+    for table, count in counts.items():
+        print(f"  {count:>10}  {table}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
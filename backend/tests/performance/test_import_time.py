@@ -0,0 +1,45 @@
+"""
+Tests for the cold-start import-time benchmark.
+"""
+import pytest
+
+from import_time import DEFAULT_BUDGET_MS, measure, parse_importtime, summarize
+
+SAMPLE_IMPORTTIME = """\
+import time: self [us] | cumulative | imported package
+import time:       240 |        240 |   _io
+import time:       900 |       1140 | _frozen_importlib_external
+import time:       300 |        300 |     app.core.config
+import time:       500 |        800 |   app.core
+import time:      1200 |       2000 | app
+"""
+
+@pytest.mark.unit
+def test_parse_importtime_depth_and_timings():
+    """Test that nesting depth and timings are read from -X importtime output."""
+    records = parse_importtime(SAMPLE_IMPORTTIME)
+
+    assert [r.module for r in records] == [
+        "_io", "_frozen_importlib_external", "app.core.config", "app.core", "app"
+    ]
+    assert [r.depth for r in records] == [1, 0, 2, 1, 0]
+    assert records[-1].cumulative_us == 2000
+
+@pytest.mark.unit
+def test_summarize_counts_only_top_level_imports():
+    """Test that nested imports are not double counted in the total."""
+    summary = summarize(parse_importtime(SAMPLE_IMPORTTIME))
+
+    assert summary["app"] == pytest.approx(2.0)
+    assert summary["total"] == pytest.approx(3.14)
+
+@pytest.mark.slow
+def test_app_main_import_within_budget():
+    """Test that importing app.main stays within the cold-start budget."""
+    summary = summarize(measure("app.main"))
+    assert summary["total"] <= DEFAULT_BUDGET_MS
+
+@pytest.mark.slow
+def test_app_main_does_not_import_pyarrow():
+    """Test that pyarrow is only imported once a client asks for an Arrow map payload."""
+    assert "pyarrow" not in {record.module for record in measure("app.main")}
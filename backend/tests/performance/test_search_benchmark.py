@@ -0,0 +1,117 @@
+"""
+Tests for the synthetic dataset generator and the search benchmark.
+"""
+import json
+import random
+
+import pytest
+
+from search_benchmark import (
+    DEFAULT_BUDGETS, SCENARIOS, check_budgets, percentile, query_variants, relevance, summarize
+)
+from synthetic_data import (
+    PROPERTY_COLUMNS, assign_owner, build_zips, generate_owners, generate_properties
+)
+
+def _properties(seed, count=200):
+    rng = random.Random(seed)
+    return list(generate_properties(rng, build_zips(rng), count))
+
+@pytest.mark.unit
+class TestSyntheticData:
+    def test_same_seed_same_rows(self):
+        """Test that a seed always generates the same rows, ids included."""
+        assert _properties(7) == _properties(7)
+        assert _properties(7) != _properties(8)
+
+    def test_property_rows_match_copy_columns(self):
+        """Test that property rows line up with the COPY column list and hold PostGIS points."""
+        for row in _properties(1):
+            record = dict(zip(PROPERTY_COLUMNS, row))
+            assert len(row) == len(PROPERTY_COLUMNS)
+            assert record["location"].startswith("SRID=4326;POINT(")
+            assert record["current_value"] > 0
+            assert record["zip_code"].isdigit() and len(record["zip_code"]) == 5
+            if record["property_type"] == "land":
+                assert record["bedrooms"] is None and record["year_built"] is None
+
+    def test_entities_hold_more_properties(self):
+        """Test that the few company and trust owners hold a large share of properties."""
+        rng = random.Random(3)
+        owners = list(generate_owners(rng, 1000))
+        held = [assign_owner(rng, len(owners)) for _ in range(10000)]
+        entities = sum(1 for owner in owners if owner[2] != "individual")
+
+        assert entities == 40
+        assert all(owner[2] != "individual" for owner in owners[:entities])
+        assert sum(1 for index in held if index < entities) > 1500
+
+@pytest.mark.unit
+class TestSearchBenchmark:
+    def test_percentile_nearest_rank(self):
+        """Test that percentiles use the nearest rank."""
+        samples = list(range(1, 101))
+        assert percentile(samples, 50) == 50
+        assert percentile(samples, 95) == 95
+        assert percentile(samples, 99) == 99
+        assert percentile([5.0], 99) == 5.0
+        assert percentile([], 50) == 0.0
+
+    def test_summarize(self):
+        """Test that a summary holds p50/p95/p99, the request count and errors."""
+        assert summarize([10.0, 20.0, 30.0, 40.0], errors=1) == {
+            "p50_ms": 20.0, "p95_ms": 40.0, "p99_ms": 40.0, "requests": 4, "errors": 1
+        }
+
+    def test_query_variants(self):
+        """Test the exact, loose and misspelled forms of an address."""
+        variants = query_variants("1295 Sheridan Blvd", random.Random(0))
+        assert variants["exact"] == "1295 Sheridan Blvd"
+        assert variants["loose"] == "1295 sheridan"
+        assert len(variants["typo"]) == len("1295 Sheridan Blvd") - 1
+        assert variants["typo"].startswith("1295 S") and variants["typo"].endswith(" Blvd")
+
+    def test_relevance(self):
+        """Test recall@10 and mean reciprocal rank."""
+        assert relevance([1, 2, None, 11]) == {"recall_at_10": 0.5, "mrr": round((1 + 0.5 + 1 / 11) / 4, 4)}
+        assert relevance([]) == {"recall_at_10": 0.0, "mrr": 0.0}
+
+    def test_check_budgets(self):
+        """Test that slow scenarios, failed requests and poor relevance are reported."""
+        report = {
+            "scenarios": {
+                "map": {"p95_ms": 120.0, "errors": 0},
+                "suggestions": {"p95_ms": 80.0, "errors": 2},
+            },
+            "relevance": {"exact": {"recall_at_10": 0.9, "mrr": 0.85}},
+        }
+        budgets = {
+            "scenarios": {"map": {"p95_ms": 300}, "suggestions": {"p95_ms": 50}, "owner_search": {"p95_ms": 1}},
+            "relevance": {"exact": {"recall_at_10": 0.95, "mrr": 0.8}, "typo": {"mrr": 0.5}},
+        }
+
+        assert check_budgets(report, budgets) == [
+            "suggestions: p95_ms 80.0 > 50",
+            "suggestions: 2 failed request(s)",
+            "relevance exact: recall_at_10 0.9 < 0.95",
+        ]
+
+    def test_budgets_cover_every_scenario(self):
+        """Test that the shipped budgets name every scenario."""
+        budgets = json.loads(DEFAULT_BUDGETS.read_text())
+        assert set(budgets["scenarios"]) == {scenario.name for scenario in SCENARIOS}
+
+    def test_scenarios_build_requests(self):
+        """Test that every scenario builds a request from a data sample."""
+        data = {
+            "properties": [{
+                "id": "p1", "address": "12 Oak St", "city": "Austin", "state": "TX",
+                "zip_code": "78701", "property_type": "condo", "lng": -97.7, "lat": 30.3,
+            }],
+            "owners": [{"id": "o1", "name": "Oak Capital LLC"}],
+        }
+        rng = random.Random(0)
+        for scenario in SCENARIOS:
+            request = scenario.build(rng, data)
+            assert request.path.startswith("/api/")
+            assert request.method in ("GET", "POST")
@@ -0,0 +1,13 @@
+"""
+Fixtures shared by the service tests.
+"""
+import pytest
+from sqlalchemy.dialects import postgresql
+
+@pytest.fixture
+def compile_sql():
+    """Render a statement or clause as PostgreSQL SQL, optionally with its values inlined."""
+    def compile_sql(statement, literal_binds: bool = False) -> str:
+        compile_kwargs = {"literal_binds": True} if literal_binds else {}
+        return str(statement.compile(dialect=postgresql.dialect(), compile_kwargs=compile_kwargs))
+    return compile_sql
@@ -0,0 +1,212 @@
+"""
+Tests for the filter expressions behind POST /api/search/advanced.
+"""
+from datetime import date
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.services import advanced_search
+from app.services.advanced_search import AdvancedSearchService, MAX_CONDITIONS, MAX_DEPTH
+
+def parse(where=None, entity="property", query=None, sort_by=None, sort_order=None):
+    return AdvancedSearchService.parse_request(entity, query, where, sort_by, sort_order)
+
+def build_statement(where=None, entity="property", **kwargs):
+    spec, _ = parse(where, entity, **kwargs)
+    return AdvancedSearchService.compile(spec).statement
+
+def condition(field, op, value):
+    return {"field": field, "op": op, "value": value}
+
+@pytest.mark.unit
+class TestAdvancedSearchService:
+
+    def setup_method(self):
+        advanced_search.clear_plans()
+
+    def test_values_become_bind_parameters(self):
+        """Test that the shape holds parameter names and the values are returned separately."""
+        spec, params = parse({"and": [
+            condition("property.current_value", "between", [100000, 500000]),
+            condition("property.last_sale_date", "gte", "2020-01-01"),
+            condition("property.city", "contains", "50%_off"),
+        ]})
+
+        assert spec["where"] == {"and": [
+            {"field": "property.current_value", "op": "between", "param": ["p0", "p1"]},
+            {"field": "property.last_sale_date", "op": "gte", "param": "p2"},
+            {"field": "property.city", "op": "contains", "param": "p3"},
+        ]}
+        assert params == {"p0": 100000, "p1": 500000, "p2": date(2020, 1, 1), "p3": "%50\\%\\_off%"}
+        assert spec["sort_by"] == "property.current_value" and spec["sort_order"] == "desc"
+
+    def test_same_shape_reuses_the_plan(self):
+        """Test that requests differing only in values share one compiled plan."""
+        first, _ = parse(condition("property.bedrooms", "gte", 2))
+        second, _ = parse(condition("property.bedrooms", "gte", 4))
+        other, _ = parse(condition("property.bedrooms", "lte", 4))
+
+        with patch.object(AdvancedSearchService, "compile", wraps=AdvancedSearchService.compile) as compile:
+            plan = AdvancedSearchService.plan(first)
+            assert AdvancedSearchService.plan(second) is plan
+            assert AdvancedSearchService.plan(other) is not plan
+        assert compile.call_count == 2
+
+    def test_plan_cache_is_bounded(self):
+        """Test that the least recently used plans are evicted."""
+        with patch.object(advanced_search.settings, "SEARCH_PLAN_CACHE_SIZE", 2):
+            for field in ("property.bedrooms", "property.bathrooms", "property.square_feet"):
+                AdvancedSearchService.plan(parse(condition(field, "gte", 1))[0])
+        assert len(advanced_search._plans) == 2
+
+    @pytest.mark.parametrize("where", [
+        condition("property.colour", "eq", "red"),
+        condition("property.city", "gt", "Austin"),
+        condition("property.bedrooms", "gte", "three"),
+        condition("property.bedrooms", "gte", True),
+        condition("property.bedrooms", "between", [1]),
+        condition("property.city", "in", []),
+        condition("property.last_sale_date", "lt", "yesterday"),
+        condition("property.bedrooms", "is_null", "yes"),
+        condition("property.location", "near", {"lng": -97.7, "lat": 30.2}),
+        condition("property.location", "near", {"lng": -97.7, "lat": 30.2, "radius": 10000, "unit": "mi"}),
+        condition("property.location", "within_bbox", [-97, 31, -98, 30]),
+        condition("property.location", "within_polygon", "0 0, 1 1"),
+        {"field": "property.city", "op": "eq", "value": "Austin", "extra": 1},
+        {"and": []},
+        {"and": [condition("property.bedrooms", "gte", 1)], "or": []},
+        ["property.city"],
+    ])
+    def test_invalid_filters_are_rejected(self, where):
+        """Test that unknown fields, wrong operators and malformed values raise ValueError."""
+        with pytest.raises(ValueError):
+            parse(where)
+
+    def test_size_limits(self):
+        """Test that overly deep or large expressions are rejected."""
+        deep = condition("property.bedrooms", "gte", 1)
+        for _ in range(MAX_DEPTH):
+            deep = {"not": deep}
+        with pytest.raises(ValueError):
+            parse(deep)
+        with pytest.raises(ValueError):
+            parse({"or": [condition("property.bedrooms", "eq", i) for i in range(MAX_CONDITIONS + 1)]})
+
+    @pytest.mark.parametrize("kwargs", [
+        {"entity": "parcel"},
+        {"sort_by": "owner.name"},
+        {"sort_by": "property.location"},
+        {"sort_order": "sideways"},
+    ])
+    def test_invalid_requests_are_rejected(self, kwargs):
+        """Test that unknown entities and sorts raise ValueError."""
+        with pytest.raises(ValueError):
+            parse(condition("property.bedrooms", "gte", 1), **kwargs)
+
+    def test_property_filters_need_no_joins(self, compile_sql):
+        """Test that property-only filters read the properties table alone."""
+        sql = compile_sql(build_statement({"and": [
+            condition("property.property_type", "in", ["condo", "residential"]),
+            {"not": condition("property.year_built", "is_null", True)},
+        ]}))
+
+        assert "FROM properties \nWHERE" in sql
+        assert "property_ownership" not in sql and "owners" not in sql
+        assert "properties.property_type IN (__[POSTCOMPILE_p0])" in sql
+        assert "properties.year_built IS NOT NULL" in sql
+
+    def test_owner_filters_share_one_exists(self, compile_sql):
+        """Test that owner and wealth siblings become one EXISTS joining only what they use."""
+        sql = compile_sql(build_statement({"and": [
+            condition("property.current_value", "gte", 1000000),
+            condition("owner.owner_type", "eq", "company"),
+            condition("wealth.estimated_net_worth", "gte", 5000000),
+        ]}))
+
+        assert sql.count("EXISTS") == 1
+        assert (
+            "FROM property_ownership JOIN owners ON owners.id = property_ownership.owner_id "
+            "JOIN (SELECT DISTINCT ON (wealth_data.owner_id)"
+        ) in sql
+        assert "property_ownership.property_id = properties.id AND property_ownership.end_date IS NULL" in sql
+        assert "owners.owner_type = %(p1)s AND latest_wealth.estimated_net_worth >= %(p2)s" in sql
+
+        # Wealth alone does not need the owners table
+        sql = compile_sql(build_statement(condition("wealth.estimated_net_worth", "gte", 5000000)))
+        assert "JOIN owners" not in sql and "latest_wealth.owner_id = property_ownership.owner_id" in sql
+
+    def test_mixed_or_keeps_related_conditions_apart(self, compile_sql):
+        """Test that an or of property and owner conditions puts only the owner side in EXISTS."""
+        sql = compile_sql(build_statement({"or": [
+            condition("property.city", "eq", "Austin"),
+            condition("owner.name", "prefix", "Smith"),
+        ]}))
+
+        assert "properties.city = %(p0)s OR (EXISTS (SELECT *" in sql
+        assert "owners.name ILIKE %(p1)s" in sql
+
+    def test_geo_conditions_use_spatial_indexes(self, compile_sql):
+        """Test that location conditions use ST_DWithin and ST_Intersects on the indexed expressions."""
+        spec, params = parse({"and": [
+            condition("property.location", "near", {"lng": -97.7, "lat": 30.2, "radius": 2, "unit": "mi"}),
+            condition("property.location", "within_bbox", [-98, 30, -97, 31]),
+            condition("property.location", "within_polygon", "-98 30, -97 30, -97 31"),
+        ]})
+        sql = compile_sql(AdvancedSearchService.compile(spec).statement)
+
+        assert "ST_DWithin(properties.location, ST_GeogFromText(%(p0)s), %(p1)s)" in sql
+        assert "ST_Intersects(properties.location::geometry, ST_MakeEnvelope(%(p2)s, %(p3)s, %(p4)s, %(p5)s" in sql
+        assert "ST_Intersects(properties.location::geometry, ST_GeomFromEWKT(%(p6)s))" in sql
+        assert params["p0"] == "SRID=4326;POINT(-97.7 30.2)"
+        assert params["p1"] == pytest.approx(3218.688)
+        assert params["p6"] == "SRID=4326;POLYGON((-98.0 30.0, -97.0 30.0, -97.0 31.0, -98.0 30.0))"
+
+    def test_owner_entity_searches_through_properties(self, compile_sql):
+        """Test that owners are found by their current properties and sorted by net worth."""
+        sql = compile_sql(build_statement(condition("property.city", "eq", "Austin"), entity="owner", query="smith"))
+
+        assert "FROM owners LEFT OUTER JOIN (SELECT DISTINCT ON (wealth_data.owner_id)" in sql
+        assert "ORDER BY wealth_data.owner_id, wealth_data.last_updated DESC NULLS LAST) AS latest_wealth" in sql
+        assert "ON latest_wealth.owner_id = owners.id" in sql
+        assert "JOIN properties ON properties.id = property_ownership.property_id" in sql
+        assert "property_ownership.owner_id = owners.id" in sql
+        assert "owners.name ILIKE %(p1)s" in sql
+
+        spec, _ = parse(entity="owner")
+        plan = AdvancedSearchService.compile(spec)
+        assert [str(clause) for clause in plan.order] == [
+            "latest_wealth.estimated_net_worth DESC NULLS LAST", "owners.id DESC"
+        ]
+
+    def test_query_adds_text_conditions(self):
+        """Test that free text matches the address, city or zip code."""
+        spec, params = parse(condition("property.bedrooms", "gte", 3), query=" austin ")
+
+        assert spec["where"]["and"][1] == {"or": [
+            {"field": "property.address", "op": "contains", "param": "p1"},
+            {"field": "property.city", "op": "contains", "param": "p2"},
+            {"field": "property.zip_code", "op": "prefix", "param": "p3"},
+        ]}
+        assert params["p3"] == "austin%"
+
+    def test_search_binds_values_and_groups_owners(self):
+        """Test that a search executes the bound plan and splits individuals from companies."""
+        spec, params = parse(condition("owner.owner_type", "ne", "estate"), entity="owner")
+        rows = [
+            SimpleNamespace(_mapping={"id": "1", "name": "Jane Doe", "owner_type": "individual"}),
+            SimpleNamespace(_mapping={"id": "2", "name": "Oak Capital LLC", "owner_type": "company"}),
+        ]
+        db = MagicMock()
+        db.execute.return_value = rows
+
+        result = AdvancedSearchService.search(db, spec, params, limit=10, estimate_total=True)
+
+        assert [row["id"] for row in result["owners"]] == ["1"]
+        assert [row["id"] for row in result["companies"]] == ["2"]
+        assert result["properties"] == []
+        assert (result["total"], result["is_estimate"]) == (2, False)
+        statement = db.execute.call_args[0][0]
+        assert statement.compile(dialect=postgresql.dialect()).params["p0"] == "estate"
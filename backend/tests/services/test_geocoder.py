@@ -0,0 +1,175 @@
+"""
+Tests for offline geocoding from the local gazetteer.
+"""
+import io
+
+import pytest
+from sqlalchemy import create_engine, text
+from unittest.mock import patch, MagicMock
+
+from app.core.config import settings
+from app.services import geocoder
+from app.services.geocoder import (
+    GazetteerIndex,
+    ParsedAddress,
+    gazetteer_index,
+    geocode_many,
+    load_gazetteer_file,
+    parse_address,
+    resolve,
+)
+
+POINTS = [
+    ("100", "n main st", "austin", "tx", "78701", -97.7400, 30.2700),
+]
+RANGES = [
+    # Even numbers 200-298 along one block
+    ("n main st", "austin", "tx", "78701", 200, 298, "E", -97.7400, 30.2710, -97.7400, 30.2720),
+]
+ZIPS = [
+    ("78701", "austin", "tx", -97.7420, 30.2710),
+    ("78702", "austin", "tx", -97.7140, 30.2630),
+    ("04401", "bangor", "me", -68.7900, 44.8000),
+]
+
+@pytest.fixture
+def index():
+    index = GazetteerIndex()
+    index.set_rows(POINTS, RANGES, ZIPS)
+    return index
+
+@pytest.mark.unit
+class TestParseAddress:
+
+    @pytest.mark.parametrize("value, expected", [
+        ("100 North Main Street Apt 4, Austin, TX 78701-1234", ParsedAddress("100", "n main st", "austin", "tx", "78701")),
+        ("100 N. Main St Austin Texas", ParsedAddress("100", "n main st", "austin", "tx")),
+        ("12 Oak Ct", ParsedAddress("12", "oak ct")),
+        ("Main Street, Austin", ParsedAddress(None, "main st", "austin")),
+        ("Austin, Texas", ParsedAddress(city="austin", state="tx")),
+        ("Washington", ParsedAddress(city="washington")),
+        ("78701", ParsedAddress(zip_code="78701")),
+    ])
+    def test_parse_address(self, value, expected):
+        """Test that addresses and places are split into normalized parts."""
+        assert parse_address(value) == expected
+
+    def test_spellings_share_a_key(self):
+        """Test that differently written addresses share a cache key."""
+        assert parse_address("100 North Main Street, Austin, Texas").key == parse_address("100 n main st, AUSTIN, tx").key
+
+@pytest.mark.unit
+class TestResolve:
+
+    def test_most_precise_match_wins(self, index):
+        """Test that address points beat ranges, which beat street, zip and city centroids."""
+        point = resolve(index, parse_address("100 N Main St, Austin, TX 78701"))
+        assert (point.precision, point.longitude, point.latitude) == ("address", -97.74, 30.27)
+        assert point.matched == "100 N Main St, Austin, TX 78701"
+
+        # Odd number, even-only range
+        assert resolve(index, parse_address("249 N Main St 78701")).precision == "street"
+
+        interpolated = resolve(index, parse_address("250 N Main St, Austin, TX"))
+        assert interpolated.precision == "interpolated"
+        assert interpolated.latitude == pytest.approx(30.2710 + 0.001 * 50 / 98)
+
+    def test_falls_back_to_zip_and_city(self, index):
+        """Test that unknown streets resolve to the zip code, then the city."""
+        assert resolve(index, parse_address("5 Nowhere Ln, Austin, TX 78702")).precision == "zip"
+        city = resolve(index, parse_address("Austin"))
+        assert (city.precision, city.matched) == ("city", "Austin, TX")
+        assert city.longitude == pytest.approx((-97.742 - 97.714) / 2)
+        assert resolve(index, parse_address("Springfield")) is None
+
+    def test_database_lookups_interpolate_like_the_index(self):
+        """Test that the SQL fallback prefers the zip code and interpolates the range row it finds."""
+        db = MagicMock()
+        db.execute.return_value.first.return_value = RANGES[0][4:]
+        gazetteer = geocoder._DatabaseGazetteer(db)
+        point = gazetteer.interpolate("n main st", 250, "78701", "austin", "tx")
+        assert point == pytest.approx((-97.74, 30.2710 + 0.001 * 50 / 98))
+        assert db.execute.call_args[0][1]["parity"] == "E"
+        # A match in the zip code wins over the same street elsewhere in the city
+        assert "ORDER BY (zip_code = :zip_code) IS TRUE DESC LIMIT 1" in str(db.execute.call_args[0][0])
+
+        db.execute.return_value.first.return_value = (-97.74, 30.27)
+        assert gazetteer.address_point("n main st", "250", "78701", "austin", "tx") == (-97.74, 30.27)
+        assert "ORDER BY (zip_code = :zip_code) IS TRUE DESC LIMIT 1" in str(db.execute.call_args[0][0])
+
+@pytest.mark.unit
+class TestGeocodeMany:
+
+    def test_distinct_addresses_resolved_once_and_cached(self, index):
+        """Test that a batch resolves each normalized address once and caches misses too."""
+        geocoder.clear_cache()
+        with patch.object(geocoder, "gazetteer_index", index), \
+             patch.object(geocoder, "resolve", wraps=resolve) as mock_resolve:
+            results = geocode_many(MagicMock(), ["100 N Main St, Austin, TX", "100 North Main Street, Austin, Texas", "Nowhere", ""])
+            assert results[0] == results[1]
+            assert results[2] is None and results[3] is None
+            assert mock_resolve.call_count == 2
+
+            geocode_many(MagicMock(), ["Nowhere", "100 n main st austin tx"])
+            assert mock_resolve.call_count == 2
+
+    def test_uses_database_until_index_loads(self):
+        """Test that lookups go to the gazetteer tables when the index is not loaded."""
+        geocoder.clear_cache()
+        db = MagicMock()
+        db.execute.return_value.first.return_value = None
+        assert not gazetteer_index.ready
+        assert geocode_many(db, ["Austin, TX"]) == [None]
+        assert "gazetteer_zips" in str(db.execute.call_args[0][0])
+
+@pytest.mark.unit
+class TestLoadGazetteerFile:
+
+    def test_rows_are_normalized_and_copied(self):
+        """Test that file headers are mapped, values normalized and bad rows skipped."""
+        stream = io.StringIO(
+            "LON,LAT,NUMBER,STREET,CITY,REGION,POSTCODE\n"
+            "-97.74,30.27,100,North Main Street,Austin,Texas,78701\n"
+            "-97.74,30.27,,Main St,Austin,TX,78701\n"
+            "x,30.27,5,Main St,Austin,TX,78701\n"
+            "-71.06,42.36,1,Beacon Street,Boston,MA,2108\n"
+        )
+        db = MagicMock()
+        with patch.object(geocoder, "_copy") as mock_copy:
+            assert load_gazetteer_file(db, "points", stream, replace=True) == (2, 2)
+
+        table, columns, rows = mock_copy.call_args[0][1:]
+        assert table == "gazetteer_points"
+        assert columns == ["number", "street", "city", "state", "zip_code", "lng", "lat"]
+        assert rows == [
+            ["100", "n main st", "austin", "tx", "78701", -97.74, 30.27],
+            ["1", "beacon st", "boston", "ma", "02108", -71.06, 42.36],
+        ]
+        assert "TRUNCATE gazetteer_points" in str(db.execute.call_args_list[0][0][0])
+        db.commit.assert_called_once()
+
+@pytest.fixture(scope="module")
+def pg():
+    try:
+        engine = create_engine(settings.DATABASE_URL, connect_args={"connect_timeout": 3})
+        connection = engine.connect()
+    except Exception as e:
+        pytest.skip(f"PostgreSQL not available: {e}")
+
+    try:
+        yield connection
+    finally:
+        connection.close()
+        engine.dispose()
+
+@pytest.mark.integration
+class TestPlaceOrderInDatabase:
+
+    def test_rows_without_a_zip_code_sort_after_the_requested_zip(self, pg):
+        """Test that a same-named street with a NULL zip code does not beat the requested zip code."""
+        row = pg.execute(text(f"""
+            SELECT label FROM (VALUES (NULL, 'no zip'), ('78702', 'other zip'), ('78701', 'requested zip'))
+                AS places(zip_code, label)
+            {geocoder.PLACE_ORDER_SQL} LIMIT 1
+        """), {"zip_code": "78701"}).scalar()
+        assert row == "requested zip"
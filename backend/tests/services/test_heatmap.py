@@ -0,0 +1,108 @@
+"""
+Tests for precomputed heatmap layers.
+"""
+from datetime import date
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch, MagicMock
+
+import pytest
+
+from app.core.geo import MAX_ZOOM
+from app.services.heatmap import BASE_CELLS_SQL, HEATMAP_CELL_SHIFT, HeatmapService
+
+@pytest.mark.unit
+class TestHeatmapService:
+
+    def test_cell_range_below_base_zoom(self):
+        """Test that a tile is drawn with 2**HEATMAP_CELL_SHIFT cells per edge."""
+        with patch("app.services.heatmap.settings") as mock_settings:
+            mock_settings.HEATMAP_BASE_ZOOM = 14
+            level, x_min, x_max, y_min, y_max = HeatmapService.cell_range(3, 2, 5)
+
+        cells = 1 << HEATMAP_CELL_SHIFT
+        assert level == 3 + HEATMAP_CELL_SHIFT
+        assert (x_min, x_max) == (2 * cells, 3 * cells - 1)
+        assert (y_min, y_max) == (5 * cells, 6 * cells - 1)
+
+    def test_cell_range_past_base_zoom(self):
+        """Test that zooming past the base zoom reuses the covering base cell."""
+        with patch("app.services.heatmap.settings") as mock_settings:
+            mock_settings.HEATMAP_BASE_ZOOM = 14
+            assert HeatmapService.cell_range(16, 1000, 2003) == (14, 250, 250, 500, 500)
+
+    def test_refresh_recomputes_dirty_cells_and_ancestors(self):
+        """Test that dirty base cells propagate to their parents level by level."""
+        db = MagicMock()
+        db.execute.return_value.first.return_value = SimpleNamespace(
+            feed_position=5, since=date(2024, 5, 1), today=date(2024, 5, 1)
+        )
+        db.execute.return_value.__iter__.return_value = iter([
+            SimpleNamespace(tile_x=8, tile_y=12),
+            SimpleNamespace(tile_x=9, tile_y=13),
+        ])
+
+        with patch("app.services.heatmap.settings") as mock_settings, \
+             patch("app.services.heatmap.feed_position", return_value=7), \
+             patch.object(HeatmapService, "_write_level") as mock_write:
+            mock_settings.HEATMAP_BASE_ZOOM = 4
+            assert HeatmapService.refresh(db, "property-values") == {(8, 12), (9, 13)}
+
+        levels = [(c[0][2], c[0][3]) for c in mock_write.call_args_list]
+        assert levels[0] == (4, {(8, 12), (9, 13)})
+        assert levels[1] == (3, {(4, 6)})
+        assert levels[-1] == (0, {(0, 0)})
+        db.commit.assert_called_once()
+
+        sql, params = str(db.execute.call_args_list[1][0][0]), db.execute.call_args_list[1][0][1]
+        assert "property_ownership" not in sql
+        assert params["operations"] == ["I", "U", "D"]
+
+    def test_refresh_skips_when_feed_is_unchanged(self):
+        """Test that nothing is recomputed without new changes."""
+        db = MagicMock()
+        db.execute.return_value.first.return_value = SimpleNamespace(
+            feed_position=7, since=date(2024, 5, 1), today=date(2024, 5, 1)
+        )
+        with patch("app.services.heatmap.feed_position", return_value=7), \
+             patch.object(HeatmapService, "_write_level") as mock_write:
+            assert HeatmapService.refresh(db, "wealth-heatmap") == set()
+        mock_write.assert_not_called()
+
+    def test_wealth_refresh_includes_lapsed_ownerships(self):
+        """Test that a new day re-reads the owners whose ownership ended since the last run."""
+        db = MagicMock()
+        db.execute.return_value.first.return_value = SimpleNamespace(
+            feed_position=7, since=date(2024, 5, 1), today=date(2024, 5, 3)
+        )
+        db.execute.return_value.__iter__.return_value = iter([SimpleNamespace(tile_x=1, tile_y=1)])
+
+        with patch("app.services.heatmap.feed_position", return_value=7), \
+             patch.object(HeatmapService, "_write_level"):
+            assert HeatmapService.refresh(db, "wealth-heatmap") == {(1, 1)}
+
+        sql, params = str(db.execute.call_args_list[1][0][0]), db.execute.call_args_list[1][0][1]
+        assert "ended.end_date > :since AND ended.end_date <= CURRENT_DATE" in sql
+        assert params["since"] == date(2024, 5, 1)
+        assert "O" in params["operations"] and "W" in params["operations"]
+
+    @pytest.mark.asyncio
+    async def test_invalidate_tiles_drops_every_zoom(self):
+        """Test that the cached tiles drawing a base cell are dropped at every zoom."""
+        with patch("app.services.heatmap.settings") as mock_settings, \
+             patch("app.services.heatmap.cache") as mock_cache:
+            mock_settings.HEATMAP_BASE_ZOOM = 14
+            mock_cache.delete_many = AsyncMock()
+            assert await HeatmapService.invalidate_tiles("wealth-heatmap", {(1000, 2000)}) == MAX_ZOOM + 1
+
+            keys = {key for call in mock_cache.delete_many.await_args_list for key in call[0][0]}
+            assert "tile:heatmap:wealth-heatmap:0:0:0" in keys
+            assert "tile:heatmap:wealth-heatmap:14:1000:2000" in keys
+            assert "tile:heatmap:wealth-heatmap:12:250:500" in keys
+            # Deeper tiles are cached by the base cell they draw
+            assert HeatmapService.cache_key("wealth-heatmap", 16, 4001, 8003) in keys
+            assert HeatmapService.cache_key("wealth-heatmap", 16, 4001, 8003) == "tile:heatmap:wealth-heatmap:16:cell:1000:2000"
+
+    def test_base_sql_supports_dirty_join(self):
+        """Test that base queries can be restricted to dirty cells."""
+        for sql in BASE_CELLS_SQL.values():
+            assert "{dirty_join}" in sql
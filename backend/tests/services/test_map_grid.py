@@ -0,0 +1,89 @@
+"""
+Tests for the map cluster grid.
+"""
+import pytest
+from decimal import Decimal
+from unittest.mock import patch, MagicMock
+
+from app.services.map_grid import GRID_ROLLUP_BATCH_SIZE, PropertyGridService
+
+CELL_ROW = {
+    "tile_x": 10,
+    "tile_y": 20,
+    "property_count": 3,
+    "avg_value": Decimal("500000.00"),
+    "value_min": Decimal("250000.00"),
+    "value_max": None,
+    "latitude": 37.75,
+    "longitude": -122.45,
+    "type_counts": {"residential": 2, "commercial": 1},
+}
+
+def mock_db(rows):
+    db = MagicMock()
+    db.execute.return_value.mappings.return_value.all.return_value = rows
+    return db
+
+@pytest.mark.unit
+class TestPropertyGridService:
+
+    def test_reads_precomputed_cells_without_value_filters(self):
+        """Test that unfiltered requests read property_grid_cells and convert rows."""
+        db = mock_db([CELL_ROW])
+        with patch("app.services.map_grid.has_table", return_value=True):
+            clusters = PropertyGridService.clusters_for_range(db, 12, 8, 11, 16, 23, property_type="residential")
+
+        sql = str(db.execute.call_args[0][0])
+        params = db.execute.call_args[0][1]
+        assert "FROM property_grid_cells" in sql
+        assert (params["level"], params["x_min"], params["x_max"], params["y_min"], params["y_max"]) == (12, 8, 11, 16, 23)
+        assert params["property_type"] == "residential"
+
+        assert clusters == [{
+            "id": "12/10/20",
+            "tile_x": 10,
+            "tile_y": 20,
+            "count": 3,
+            "avg_value": 500000.0,
+            "value_min": 250000.0,
+            "value_max": None,
+            "latitude": 37.75,
+            "longitude": -122.45,
+            "type_counts": {"residential": 2, "commercial": 1},
+        }]
+
+    def test_value_filters_aggregate_raw_points(self):
+        """Test that value filters bypass the precomputed cells."""
+        db = mock_db([])
+        with patch("app.services.map_grid.has_table", return_value=True):
+            PropertyGridService.clusters_for_range(db, 2, 0, 3, 0, 3, min_value=100000)
+
+        sql = str(db.execute.call_args[0][0])
+        params = db.execute.call_args[0][1]
+        assert "property_grid_cells" not in sql
+        assert "ST_MakeEnvelope" in sql
+        assert params["min_value"] == 100000
+        # The envelope covers the whole block of cells
+        assert params["lng_min"] == -180.0 and params["lng_max"] == 180.0
+        assert params["lat_max"] == pytest.approx(85.0511, abs=1e-4)
+
+    def test_missing_grid_table_falls_back_to_raw_points(self):
+        """Test the fallback when migration 004 has not been applied."""
+        db = mock_db([])
+        with patch("app.services.map_grid.has_table", return_value=False):
+            PropertyGridService.clusters_for_range(db, 2, 0, 3, 0, 3)
+
+        assert "property_grid_cells" not in str(db.execute.call_args[0][0])
+
+    def test_rollup_applies_batches_until_the_queue_is_drained(self):
+        """Test that rollup commits each batch of queued deltas and stops after a short one."""
+        db = MagicMock()
+        db.execute.return_value.scalar.side_effect = [GRID_ROLLUP_BATCH_SIZE, 3]
+        with patch("app.services.map_grid.has_table", return_value=True):
+            assert PropertyGridService.rollup(db) == GRID_ROLLUP_BATCH_SIZE + 3
+
+        assert "property_grid_rollup" in str(db.execute.call_args[0][0])
+        assert db.commit.call_count == 2
+
+        with patch("app.services.map_grid.has_table", return_value=False):
+            assert PropertyGridService.rollup(MagicMock()) == 0
@@ -0,0 +1,163 @@
+"""
+Tests for the in-memory columnar map index.
+"""
+import pytest
+from unittest.mock import patch, MagicMock
+
+np = pytest.importorskip("numpy")
+
+from app.core.geo import lnglat_to_tile
+from app.services.map_index import PropertyMapIndex, build_snapshot
+
+# Two properties in San Francisco, one in Oakland, one in Los Angeles
+COLUMNS = (
+    ["sf-1", "sf-2", "oak-1", "la-1"],
+    ["1 Market St", "2 Market St", "1 Broadway", "1 Sunset Blvd"],
+    ["residential", "commercial", "residential", "residential"],
+    [1500000.0, None, 800000.0, 2000000.0],
+    [-122.3950, -122.3951, -122.2711, -118.2437],
+    [37.7940, 37.7941, 37.8044, 34.0522],
+)
+
+def make_index(columns=COLUMNS, position=0):
+    index = PropertyMapIndex()
+    index.set_snapshot(build_snapshot(*columns), position=position)
+    return index
+
+@pytest.mark.unit
+class TestPropertyMapIndex:
+
+    def test_points_for_tiles_filters_and_ranks(self):
+        """Test per-tile selection, value ordering and the per-tile limit."""
+        index = make_index()
+        z = 14
+        sf_tile = lnglat_to_tile(-122.3950, 37.7940, z)
+
+        result = index.points_for_tiles(z, [sf_tile], limit=10)
+        assert [p["id"] for p in result[sf_tile]] == ["sf-1", "sf-2"]
+        assert result[sf_tile][1]["estimated_value"] is None
+
+        assert [p["id"] for p in index.points_for_tiles(z, [sf_tile], limit=1)[sf_tile]] == ["sf-1"]
+        # NULL values never match a value filter
+        assert index.points_for_tiles(z, [sf_tile], limit=10, min_value=1)[sf_tile][0]["id"] == "sf-1"
+        assert len(index.points_for_tiles(z, [sf_tile], limit=10, min_value=1)[sf_tile]) == 1
+        assert index.points_for_tiles(z, [sf_tile], limit=10, property_type="industrial")[sf_tile] == []
+
+    def test_load_parses_copy_output_in_chunks(self):
+        """Test that load parses COPY text rows a chunk at a time and grows past a low row estimate."""
+        lines = [
+            f"sf-{i}\t{i} Market St\\tUnit \\\\2\tresidential\t{i}.5\t-122.395\t37.794\t\\N\n"
+            for i in range(1500)
+        ] + ["oak-1\t\\N\tcommercial\t\\N\t-122.2711\t37.8044\t2\n"]
+
+        def copy_expert(sql, sink):
+            assert sql.endswith("TO STDOUT")
+            for line in lines:
+                sink.write(line.encode())
+
+        db = MagicMock()
+        db.execute.return_value.scalar.return_value = 10  # stale planner estimate
+        db.connection.return_value.connection.cursor.return_value.copy_expert.side_effect = copy_expert
+        index = PropertyMapIndex()
+        with patch("app.services.map_index.feed_position", return_value=5), \
+             patch("app.services.map_index.COPY_CHUNK_BYTES", 256):
+            assert index.load(db) == 1501
+        assert index.position == 5
+
+        z = 14
+        sf_tile = lnglat_to_tile(-122.395, 37.794, z)
+        top = index.points_for_tiles(z, [sf_tile], limit=1)[sf_tile][0]
+        assert (top["id"], top["address"], top["estimated_value"]) == ("sf-1499", "1499 Market St\tUnit \\2", 1499.5)
+        oak_tile = lnglat_to_tile(-122.2711, 37.8044, z)
+        oak = index.points_for_tiles(z, [oak_tile], limit=1)[oak_tile][0]
+        assert (oak["address"], oak["property_type"], oak["estimated_value"]) == (None, "commercial", None)
+
+    def test_clusters_for_range_aggregates_cells(self):
+        """Test that clusters match the grid service's contract."""
+        index = make_index()
+        level = 6
+        x, y = lnglat_to_tile(-122.3950, 37.7940, level)
+
+        clusters = index.clusters_for_range(level, 0, (1 << level) - 1, 0, (1 << level) - 1)
+        by_id = {c["id"]: c for c in clusters}
+
+        bay_area = by_id[f"{level}/{x}/{y}"]
+        assert bay_area["count"] == 3
+        assert bay_area["avg_value"] == pytest.approx(1150000.0)
+        assert (bay_area["value_min"], bay_area["value_max"]) == (800000.0, 1500000.0)
+        assert bay_area["type_counts"] == {"residential": 2, "commercial": 1}
+        assert bay_area["longitude"] == pytest.approx((-122.3950 - 122.3951 - 122.2711) / 3)
+        assert sum(c["count"] for c in clusters) == 4
+
+    def test_select_respects_tile_range(self):
+        """Test that rows outside the requested block of tiles are excluded."""
+        index = make_index()
+        x, y = lnglat_to_tile(-118.2437, 34.0522, 10)
+        assert list(index.select(10, x, x, y, y).column("ids")) == ["la-1"]
+
+    def test_refresh_merges_changed_properties(self):
+        """Test that changed properties are overlaid on the loaded snapshot without rebuilding it."""
+        index = make_index(position=10)
+        base = index._state.base
+        db = MagicMock()
+        db.execute.return_value.fetchall.return_value = [
+            ("sf-2", "2 Market St", "land", 3000000.0, -122.3951, 37.7941, None),
+        ]
+        # Ownership changes do not alter the map and are not re-read
+        changes = [(11, "sf-2", "U"), (12, "la-1", "D"), (13, "oak-1", "O")]
+
+        with patch("app.services.map_index.feed_position", return_value=14), \
+             patch("app.services.map_index.changes_between", return_value=changes) as between:
+            assert index.refresh(db) == 2
+        between.assert_called_once_with(db, 10, 14)
+        assert db.execute.call_args[0][1] == {"ids": ["la-1", "sf-2"]}
+
+        state = index._state
+        assert state.position == 14 and state.base is base
+        # la-1 was deleted: it is no longer returned by the database
+        assert len(index) == 3
+        assert sorted(base.ids[~state.live]) == ["la-1", "sf-2"]
+        assert list(state.delta.ids) == ["sf-2"]
+
+        z = 14
+        sf_tile = lnglat_to_tile(-122.3950, 37.7940, z)
+        points = index.points_for_tiles(z, [sf_tile], limit=10)[sf_tile]
+        assert [(p["id"], p["property_type"], p["estimated_value"]) for p in points] == [
+            ("sf-2", "land", 3000000.0), ("sf-1", "residential", 1500000.0)
+        ]
+        clusters = index.clusters_for_range(6, 0, 63, 0, 63)
+        assert [c["type_counts"] for c in clusters] == [{"land": 1, "residential": 2}]
+        counts = index.facet_counts([1000000.0], [1])
+        assert counts["total"] == 3
+        assert counts["property_type"] == {"land": 1, "residential": 2}
+
+        with patch("app.services.map_index.feed_position", return_value=12), \
+             patch("app.services.map_index.changes_between", return_value=[]):
+            assert index.refresh(db) == 0
+
+    def test_large_delta_triggers_full_reload(self):
+        """Test that a refresh past MAP_MEMORY_INDEX_MAX_DELTA reloads the whole index."""
+        index = make_index(position=10)
+        db = MagicMock()
+        changes = [(11, "sf-1", "U"), (12, "sf-2", "U")]
+
+        with patch("app.services.map_index.feed_position", return_value=13), \
+             patch("app.services.map_index.changes_between", return_value=changes), \
+             patch("app.services.map_index.settings") as mock_settings, \
+             patch.object(PropertyMapIndex, "load", return_value=4) as load:
+            mock_settings.MAP_MEMORY_INDEX_MAX_DELTA = 1
+            assert index.refresh(db) == 4
+        load.assert_called_once_with(db)
+
+    def test_facet_counts_ignore_own_filter(self):
+        """Test that each facet is counted under the other facets' filters."""
+        columns = COLUMNS + ([3, None, 2, 5],)
+        index = make_index(columns)
+
+        counts = index.facet_counts([1000000.0], [1, 3], property_type="residential", min_bedrooms=3)
+        assert counts["total"] == 2
+        # sf-2 has no bedrooms, so only the residential rows with 3+ count
+        assert counts["property_type"] == {"residential": 2}
+        # NULL values are not bucketed
+        assert counts["value"] == [0, 2]
+        assert counts["bedrooms"] == [3, 2]
@@ -0,0 +1,137 @@
+"""
+Tests for tile-assembled map viewports.
+"""
+import pytest
+from unittest.mock import AsyncMock, patch, MagicMock
+
+from app.core.geo import lnglat_to_tile
+from app.services.map_viewport import MapViewportService, format_tile_id, parse_tile_id
+
+@pytest.mark.unit
+class TestMapViewportService:
+
+    def test_nearby_viewports_snap_to_the_same_tiles(self):
+        """Test that slightly different viewports share their tile set."""
+        first = MapViewportService.snap_viewport(37.7701, 37.7999, -122.4499, -122.4101)
+        second = MapViewportService.snap_viewport(37.7703, 37.7997, -122.4497, -122.4103)
+        assert first == second
+        assert 1 <= len(first[1]) <= 16
+
+    def test_large_viewports_are_clustered(self):
+        """Test that zoomed-out viewports use grid clusters."""
+        z, _ = MapViewportService.snap_viewport(30.0, 45.0, -125.0, -110.0)
+        assert MapViewportService.is_clustered(z)
+        assert MapViewportService.cluster_level(z) > z
+
+    def test_render_point_tiles_groups_rows_by_tile(self):
+        """Test that point rows are assigned to their tile and foreign tiles dropped."""
+        z = 14
+        tile = lnglat_to_tile(-122.42, 37.78, z)
+        other = (tile[0] + 5, tile[1])
+        db = MagicMock()
+        db.execute.return_value.mappings.return_value.all.return_value = [
+            {"id": "a", "address": "1 Main St", "property_type": "residential", "estimated_value": 1,
+             "latitude": 37.78, "longitude": -122.42, "tile_x": tile[0], "tile_y": tile[1]},
+            {"id": "b", "address": "2 Main St", "property_type": "residential", "estimated_value": None,
+             "latitude": 37.78, "longitude": -122.0, "tile_x": other[0], "tile_y": other[1]},
+        ]
+
+        result = MapViewportService.render_tiles(db, z, [tile])
+
+        assert list(result) == [tile]
+        assert [f["id"] for f in result[tile]] == ["a"]
+        params = db.execute.call_args[0][1]
+        assert (params["z"], params["xs"], params["ys"]) == (z, [tile[0]], [tile[1]])
+
+    def test_render_cluster_tiles_reads_only_missing_blocks(self):
+        """Test that an L of missing tiles is read as two blocks of grid cells, not their bounding box."""
+        z = 4
+        missing = [(3, 0), (3, 1), (0, 2), (1, 2), (2, 2), (3, 2)]
+        shift = MapViewportService.cluster_level(z) - z
+        with patch("app.services.map_viewport.map_index") as mock_index, \
+             patch("app.services.map_viewport.PropertyGridService.clusters_for_range", return_value=[]) as mock_range:
+            mock_index.ready = False
+            result = MapViewportService.render_tiles(MagicMock(), z, missing)
+
+        assert sorted(result) == sorted(missing)
+        assert [c[0][2:6] for c in mock_range.call_args_list] == [
+            (3 << shift, (4 << shift) - 1, 0, (2 << shift) - 1),
+            (0, (4 << shift) - 1, 2 << shift, (3 << shift) - 1),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_get_tiles_renders_only_missing_tiles(self):
+        """Test that cached tiles are reused and the rest fetched in one query."""
+        tiles = [(1, 1), (1, 2)]
+        with patch("app.services.map_viewport.tile_store") as mock_store, \
+             patch.object(MapViewportService, "render_tiles", return_value={(1, 2): [{"id": "b"}]}) as mock_render:
+            mock_store.get_many = AsyncMock(return_value={(1, 1): b'[{"id": "a"}]'})
+            mock_store.invalidation_state = AsyncMock(return_value={"position": 12})
+            mock_store.put = AsyncMock()
+
+            result = await MapViewportService.get_tiles(MagicMock(), 14, tiles)
+
+        assert result == {(1, 1): [{"id": "a"}], (1, 2): [{"id": "b"}]}
+        assert mock_render.call_args[0][2] == [(1, 2)]
+        mock_store.put.assert_awaited_once_with("map", 14, 1, 2, "*", b'[{"id": "b"}]', {"position": 12})
+
+    @pytest.mark.asyncio
+    async def test_value_filtered_tiles_are_not_stored(self):
+        """Test that tiles filtered by a value range are rendered without touching the store."""
+        with patch("app.services.map_viewport.tile_store") as mock_store, \
+             patch.object(MapViewportService, "render_tiles", return_value={(1, 2): []}) as mock_render:
+            mock_store.get_many = AsyncMock()
+            mock_store.put = AsyncMock()
+
+            assert await MapViewportService.get_tiles(MagicMock(), 14, [(1, 2)], "residential", 500000) == {(1, 2): []}
+
+        assert MapViewportService.tile_variant("residential") == "residential"
+        assert MapViewportService.tile_variant(max_value=1) is None
+        assert mock_render.call_args[0][2] == [(1, 2)]
+        mock_store.get_many.assert_not_awaited()
+        mock_store.put.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_tiles_from_a_lagging_index_are_not_stored(self):
+        """Test that tiles rendered from a map index behind the last invalidation are served but not stored."""
+        with patch("app.services.map_viewport.tile_store") as mock_store, \
+             patch("app.services.map_viewport.map_index") as mock_index, \
+             patch.object(MapViewportService, "render_tiles", return_value={(1, 2): [{"id": "b"}]}):
+            mock_store.get_many = AsyncMock(return_value={})
+            mock_store.put = AsyncMock()
+            mock_store.invalidation_state = AsyncMock(return_value={"position": 12})
+            mock_index.ready = True
+            mock_index.position = 10
+
+            assert await MapViewportService.get_tiles(MagicMock(), 14, [(1, 2)]) == {(1, 2): [{"id": "b"}]}
+            mock_store.put.assert_not_awaited()
+
+            # Caught up: stored again
+            mock_index.position = 12
+            await MapViewportService.get_tiles(MagicMock(), 14, [(1, 2)])
+            mock_store.put.assert_awaited_once()
+
+    def test_parse_tile_id(self):
+        """Test tile id parsing and validation."""
+        assert parse_tile_id(" 3/1/2") == (3, 1, 2)
+        for bad in ("3/1", "a/b/c", "3/8/0"):
+            with pytest.raises(ValueError):
+                parse_tile_id(bad)
+
+    @pytest.mark.asyncio
+    async def test_viewport_delta_returns_only_new_tiles(self):
+        """Test that loaded tiles are skipped and tiles outside the viewport dropped."""
+        bbox = (37.7701, 37.7999, -122.4499, -122.4101)
+        z, tiles = MapViewportService.snap_viewport(*bbox)
+        kept = format_tile_id(z, *tiles[0])
+        stale = format_tile_id(z, tiles[0][0] - 10, tiles[0][1])
+
+        async def fake_get_tiles(db, zoom, added, *filters):
+            return {tile: [{"id": str(tile)}] for tile in added}
+
+        with patch.object(MapViewportService, "get_tiles", side_effect=fake_get_tiles):
+            delta = await MapViewportService.get_viewport_delta(MagicMock(), *bbox, [kept, stale])
+
+        assert delta["zoom"] == z
+        assert [t["tile"] for t in delta["tiles"]] == [format_tile_id(z, *tile) for tile in tiles[1:]]
+        assert delta["drop_tiles"] == [stale]
@@ -0,0 +1,113 @@
+"""
+Tests for owner name search.
+"""
+import pytest
+from unittest.mock import patch, MagicMock
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.dialects import postgresql
+
+from app.api.endpoints.owners import search_owners
+from app.core.config import settings
+from app.models.owner import Owner
+from app.services.owner_search import OwnerSearchService
+from app.services.unified_search import UnifiedSearchService, latest_wealth
+
+NAMES = [
+    ("John Smith, L.L.C.", "john smith"),
+    ("Jon Smith LLC", "jon smith"),
+    ("SMITH & CO., INC.", "smith"),
+    ("O'Brien Family Trust", "o brien family trust"),
+    ("  Acme   Holdings Ltd. ", "acme holdings"),
+    ("Colony Capital", "colony capital"),
+]
+
+owners = Owner.__table__
+
+@pytest.mark.unit
+class TestOwnerSearchService:
+
+    @pytest.mark.parametrize("name, expected", NAMES)
+    def test_normalize_name(self, name, expected):
+        """Test that case, punctuation and entity suffixes are dropped."""
+        assert OwnerSearchService.normalize_name(name) == expected
+
+    def test_fuzzy_match_uses_trigram_operators(self, compile_sql):
+        """Test that fuzzy matching compares the normalized column with the normalized query."""
+        condition, score = OwnerSearchService.fuzzy_match("Jon Smith, LLC")
+        sql = compile_sql(select(owners.c.id, score.label("score")).where(condition))
+        assert "owners.normalized_name %% %(" in sql
+        assert "owners.normalized_name %%> %(" in sql
+        assert "greatest(similarity(owners.normalized_name" in sql
+        params = select(owners.c.id).where(condition).compile(dialect=postgresql.dialect()).params
+        assert set(params.values()) == {"jon smith"}
+
+    def test_fuzzy_falls_back_without_migration(self, compile_sql):
+        """Test that fuzzy searches use ILIKE when the trigram index is missing."""
+        query = MagicMock()
+        with patch.object(OwnerSearchService, "has_fuzzy_search", return_value=False):
+            _, score = OwnerSearchService.apply_name_filter(query, MagicMock(), "Smith", fuzzy=True)
+        assert score is None
+        assert "ILIKE" in compile_sql(query.filter.call_args[0][0]).upper()
+
+        # Nothing distinctive left to compare: plain substring match
+        with patch.object(OwnerSearchService, "has_fuzzy_search", return_value=True):
+            _, score = OwnerSearchService.apply_name_filter(query, MagicMock(), "LLC", fuzzy=True)
+        assert score is None
+
+    def test_unified_owner_statement_uses_fuzzy_index(self, compile_sql):
+        """Test that POST /api/search matches owners on the normalized name when available."""
+        request = UnifiedSearchService.parse_request("jon smith llc", None, None, None, None, None)
+        with patch.object(OwnerSearchService, "has_fuzzy_search", return_value=True):
+            statement, order = UnifiedSearchService.owner_statement(MagicMock(), request)
+        sql = compile_sql(statement.order_by(*order))
+        assert "owners.normalized_name %%" in sql
+        assert "ILIKE" not in sql.upper()
+
+    def test_owner_search_endpoint_joins_latest_wealth(self, compile_sql):
+        """Test that GET /api/owners/search filters on one wealth row per owner, so owners are not repeated."""
+        db = MagicMock()
+        query = db.query.return_value
+        query.join.return_value = query.filter.return_value = query.order_by.return_value = query
+        query.offset.return_value.limit.return_value.all.return_value = []
+
+        search_owners(MagicMock(), db=db, q=None, fuzzy=False, owner_type=None,
+                      min_net_worth=1000000, wealth_tier=None, skip=0, limit=10,
+                      cursor=None, estimate_total=False, current_user=MagicMock())
+
+        query.outerjoin.assert_not_called()
+        assert query.join.call_args[0][0] is latest_wealth
+        assert "latest_wealth.estimated_net_worth >=" in compile_sql(query.filter.call_args[0][0])
+
+        # Without a wealth filter no wealth row is joined at all
+        query.join.reset_mock()
+        search_owners(MagicMock(), db=db, q=None, fuzzy=False, owner_type=None,
+                      min_net_worth=None, wealth_tier=None, skip=0, limit=10,
+                      cursor=None, estimate_total=False, current_user=MagicMock())
+        query.join.assert_not_called()
+
+@pytest.fixture(scope="module")
+def pg():
+    try:
+        engine = create_engine(settings.DATABASE_URL, connect_args={"connect_timeout": 3})
+        connection = engine.connect()
+    except Exception as e:
+        pytest.skip(f"PostgreSQL not available: {e}")
+
+    try:
+        has_function = connection.execute(
+            text("SELECT 1 FROM pg_proc WHERE proname = 'normalize_owner_name'")
+        ).first()
+        if not has_function:
+            pytest.skip("Database is not migrated (run wealthmap-admin migrate)")
+        yield connection
+    finally:
+        connection.close()
+        engine.dispose()
+
+@pytest.mark.integration
+class TestOwnerNameNormalizationInDatabase:
+
+    @pytest.mark.parametrize("name, expected", NAMES)
+    def test_sql_function_matches_python(self, pg, name, expected):
+        """Test that normalize_owner_name agrees with OwnerSearchService.normalize_name."""
+        assert pg.execute(text("SELECT normalize_owner_name(:name)"), {"name": name}).scalar() == expected
@@ -0,0 +1,75 @@
+"""
+Tests for property search facet counts.
+"""
+import pytest
+from unittest.mock import AsyncMock, patch, MagicMock
+
+from app.services.property_facets import PropertyFacetService
+
+@pytest.mark.unit
+class TestPropertyFacetService:
+
+    def test_equivalent_filters_share_a_cache_key(self):
+        """Test that text case and numeric types do not change the cache key."""
+        a = PropertyFacetService.normalize_filters(q="  Main  St ", min_value=100000)
+        b = PropertyFacetService.normalize_filters(q="main st", min_value=100000.0, property_type="")
+        assert a == b
+        assert PropertyFacetService.cache_key(a) == PropertyFacetService.cache_key(b)
+
+    def test_statement_counts_each_facet_without_its_own_filter(self, compile_sql):
+        """Test that one grouped query yields every facet, each ignoring its own filter."""
+        filters = PropertyFacetService.normalize_filters(
+            property_type="residential", min_value=500000, min_bedrooms=3, min_square_feet=1000
+        )
+        sql = compile_sql(PropertyFacetService.statement(MagicMock(), filters), literal_binds=True)
+
+        assert sql.count("GROUPING SETS") == 1
+        assert "count(*) FILTER (WHERE properties.current_value >= 500000.0 AND properties.bedrooms >= 3) AS type_count" in sql
+        assert "count(*) FILTER (WHERE properties.property_type = 'residential' AND properties.bedrooms >= 3) AS value_count" in sql
+        assert "count(*) FILTER (WHERE properties.property_type = 'residential' AND properties.current_value >= 500000.0) AS bedroom_count" in sql
+        # Shared filters narrow every facet
+        assert "WHERE properties.square_feet >= 1000 GROUP BY" in sql
+
+    def test_rows_fold_into_facets(self):
+        """Test that grouping-set rows become per-facet counts with cumulative bedrooms."""
+        rows = [
+            (0b111, None, None, None, 9, 9, 9, 4),
+            (0b011, "residential", None, None, 6, 0, 0, 0),
+            (0b011, "commercial", None, None, 3, 0, 0, 0),
+            (0b011, None, None, None, 2, 0, 0, 0),
+            (0b101, None, 0, None, 0, 5, 0, 0),
+            (0b101, None, 6, None, 0, 1, 0, 0),
+            (0b110, None, None, 2, 0, 0, 3, 0),
+            (0b110, None, None, 5, 0, 0, 2, 0),
+        ]
+        facets = PropertyFacetService.format(PropertyFacetService.counts_from_rows(rows))
+
+        assert facets["total"] == 4
+        assert facets["property_type"] == [
+            {"value": "residential", "count": 6}, {"value": "commercial", "count": 3}
+        ]
+        assert facets["value"][0] == {"min": None, "max": 250000, "count": 5}
+        assert facets["value"][-1] == {"min": 10000000, "max": None, "count": 1}
+        assert [b["count"] for b in facets["bedrooms"]] == [5, 5, 2, 2, 2]
+
+    @pytest.mark.asyncio
+    async def test_get_facets_uses_index_and_cache(self):
+        """Test that index-answerable filters skip the database and results are cached."""
+        filters = PropertyFacetService.normalize_filters(property_type="residential")
+        counts = {"total": 1, "property_type": {"residential": 1}, "value": [1, 0, 0, 0, 0, 0, 0], "bedrooms": [1, 0, 0, 0, 0]}
+        db = MagicMock()
+
+        with patch("app.services.property_facets.cache") as mock_cache, \
+             patch("app.services.property_facets.map_index") as index:
+            mock_cache.get = AsyncMock(return_value=None)
+            mock_cache.set = AsyncMock()
+            index.ready = True
+            index.facet_counts.return_value = counts
+            facets = await PropertyFacetService.get_facets(db, filters)
+
+        assert facets["total"] == 1
+        db.execute.assert_not_called()
+        mock_cache.set.assert_awaited_once()
+
+        # A text query needs the database
+        assert not PropertyFacetService.can_use_index(PropertyFacetService.normalize_filters(q="main"))
@@ -0,0 +1,47 @@
+"""
+Tests for the property search query builder.
+"""
+import pytest
+from unittest.mock import patch, MagicMock
+from sqlalchemy import select
+
+from app.models.property import Property
+from app.services.property_search import PropertySearchService
+
+properties = Property.__table__
+
+@pytest.mark.unit
+@pytest.mark.search
+class TestPropertySearchService:
+
+    def test_build_prefix_tsquery(self):
+        """Test that free text becomes an AND of prefix terms."""
+        assert PropertySearchService.build_prefix_tsquery("123 Main St.") == "123:* & main:* & st:*"
+
+    def test_build_prefix_tsquery_strips_operators(self):
+        """Test that tsquery operators in user input are discarded."""
+        assert PropertySearchService.build_prefix_tsquery("main & !st | (x)") == "main:* & st:* & x:*"
+        assert PropertySearchService.build_prefix_tsquery("&|!") is None
+
+    def test_uses_search_vector_and_trigram_when_available(self, compile_sql):
+        """Test that the indexed path is used when the migration has been applied."""
+        db = MagicMock()
+        with patch.object(PropertySearchService, "has_full_text_search", return_value=True), \
+             patch.object(PropertySearchService, "has_trigram_search", return_value=True):
+            condition = PropertySearchService.text_condition(db, "Main St")
+
+        sql = compile_sql(select(properties.c.id).where(condition))
+        assert "properties.search_vector @@ to_tsquery" in sql
+        assert "properties.address %" in sql
+        assert "ILIKE" not in sql.upper()
+
+    def test_falls_back_to_ilike(self, compile_sql):
+        """Test that ILIKE scans are used when no search indexes exist."""
+        db = MagicMock()
+        with patch.object(PropertySearchService, "has_full_text_search", return_value=False), \
+             patch.object(PropertySearchService, "has_trigram_search", return_value=False):
+            condition = PropertySearchService.text_condition(db, "Main St")
+
+        sql = compile_sql(select(properties.c.id).where(condition))
+        assert "search_vector" not in sql
+        assert sql.upper().count("ILIKE") == 4
@@ -0,0 +1,75 @@
+"""
+Tests for the property search result cache.
+"""
+import pytest
+from unittest.mock import AsyncMock, patch, MagicMock
+
+from app.services.property_facets import PropertyFacetService
+from app.services.property_search_cache import PropertySearchCache, bucket_value
+
+ENTRY = {
+    "rows": [["a", 450000.0], ["b", 505000.0], ["c", None], ["d", 520000.0], ["e", 590000.0]],
+    "complete": True,
+}
+
+@pytest.mark.unit
+class TestPropertySearchCache:
+
+    def test_equivalent_requests_share_a_key(self):
+        """Test that text spelling and nearby value bounds map to one cache key."""
+        a = PropertyFacetService.normalize_filters(q="Main St", min_value=505000, max_value=741000)
+        b = PropertyFacetService.normalize_filters(q=" main  st ", min_value=500000.0, max_value=750000)
+        assert PropertySearchCache.cache_key(a) == PropertySearchCache.cache_key(b)
+
+        c = PropertyFacetService.normalize_filters(q="main st", min_value=505000, min_bedrooms=2)
+        assert PropertySearchCache.cache_key(a) != PropertySearchCache.cache_key(c)
+
+    @pytest.mark.parametrize("value, up, expected", [
+        (505000, False, 500000.0),
+        (505000, True, 510000.0),
+        (1234567, False, 1200000.0),
+        (99, True, 99.0),
+        (0, False, 0),
+        (None, True, None),
+    ])
+    def test_bucket_value(self, value, up, expected):
+        """Test that bounds are rounded outwards to two significant figures."""
+        assert bucket_value(value, up) == expected
+
+    def test_exact_range_is_reapplied(self):
+        """Test that a widened entry is narrowed back to the requested value range."""
+        filters = PropertyFacetService.normalize_filters(min_value=505000, max_value=590000)
+        assert PropertySearchCache.matching_ids(ENTRY, filters) == ["b", "d", "e"]
+        assert PropertySearchCache.matching_ids(ENTRY, PropertyFacetService.normalize_filters()) == ["a", "b", "c", "d", "e"]
+
+    @pytest.mark.asyncio
+    async def test_page_sizes_share_one_entry(self):
+        """Test that pages are cut from one cached id list and only their rows are loaded."""
+        filters = PropertyFacetService.normalize_filters(min_value=500000)
+        db = MagicMock()
+        with patch("app.services.property_search_cache.cache") as mock_cache, \
+             patch.object(PropertySearchCache, "read_entry", return_value=ENTRY) as read_entry, \
+             patch.object(PropertySearchCache, "load", side_effect=lambda db, ids: ids) as load:
+            stored = {}
+            mock_cache.get = AsyncMock(side_effect=lambda key: stored.get(key))
+            mock_cache.set = AsyncMock(side_effect=lambda key, value, expire: stored.update({key: value}))
+
+            assert await PropertySearchCache.search(db, filters, 0, 2, estimate_total=True) == (["b", "d"], 3, False)
+            assert await PropertySearchCache.search(db, filters, 1, 10) == (["d", "e"], None, False)
+
+        read_entry.assert_called_once()
+        assert load.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_pages_past_an_incomplete_entry_use_the_database(self):
+        """Test that a page beyond the cached matches is queried directly."""
+        filters = PropertyFacetService.normalize_filters()
+        query = MagicMock()
+        query.order_by.return_value.offset.return_value.limit.return_value.all.return_value = ["z"]
+        with patch("app.services.property_search_cache.cache") as mock_cache, \
+             patch.object(PropertySearchCache, "build_query", return_value=query):
+            mock_cache.get = AsyncMock(return_value={**ENTRY, "complete": False})
+            mock_cache.set = AsyncMock()
+            assert await PropertySearchCache.search(MagicMock(), filters, 4, 2) == (["z"], None, False)
+
+        query.order_by.return_value.offset.assert_called_once_with(4)
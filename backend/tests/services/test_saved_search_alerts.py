@@ -0,0 +1,103 @@
+"""
+Tests for saved search change alerts.
+"""
+from types import SimpleNamespace
+
+import pytest
+from unittest.mock import AsyncMock, patch, MagicMock
+
+from app.services.saved_search_alerts import SavedSearchAlertService
+
+def result(rows):
+    return MagicMock(__iter__=lambda self: iter(rows), fetchall=lambda: rows)
+
+@pytest.mark.unit
+class TestSavedSearchAlertService:
+
+    def test_equivalent_criteria_share_a_group(self):
+        """Test that request bodies and flat filters with the same meaning hash alike."""
+        body = SavedSearchAlertService.normalize_criteria(
+            {"query": " Main  St", "filters": {"min_value": 500000, "max_value": None}, "page": 3}
+        )
+        flat = SavedSearchAlertService.normalize_criteria(
+            {"q": "main st", "min_value": 500000, "sort_by": "value"}
+        )
+        assert body == flat == {"q": "main st", "filters": {"min_value": 500000}}
+        assert SavedSearchAlertService.criteria_hash(body) == SavedSearchAlertService.criteria_hash(flat)
+
+    def test_owner_only_and_invalid_criteria(self):
+        """Test that owner searches have no property alerts and bad filters raise."""
+        assert SavedSearchAlertService.normalize_criteria({"filters": {"types": ["owner"]}}) is None
+        # Owner filters do not narrow property matches
+        assert SavedSearchAlertService.normalize_criteria({"filters": {"owner_type": "trust"}})["filters"] == {}
+        with pytest.raises(ValueError):
+            SavedSearchAlertService.normalize_criteria({"filters": {"colour": "red"}})
+
+    def test_match_statement_selects_ids_with_search_filters(self, compile_sql):
+        """Test that matching uses the same conditions as POST /api/search."""
+        criteria = {"q": "", "filters": {"property_type": "residential", "min_bedrooms": 3}}
+        sql = compile_sql(SavedSearchAlertService.match_statement(MagicMock(), criteria))
+        assert sql.startswith("SELECT properties.id \nFROM properties")
+        assert "properties.property_type = " in sql
+        assert "properties.bedrooms >= " in sql
+
+    def test_evaluate_records_started_and_stopped_matches(self):
+        """Test that only the difference between new and stored matches becomes deltas."""
+        db = MagicMock()
+        db.execute.side_effect = [
+            result([("p1",), ("p2",)]),  # changed properties that match now
+            result([("p2",), ("p3",)]),  # changed properties matched before
+            MagicMock(), MagicMock(),    # p1 added
+            MagicMock(), MagicMock(),    # p3 removed
+        ]
+        criteria = {"q": "", "filters": {}}
+        assert SavedSearchAlertService.evaluate(db, "abc", criteria, ["p1", "p2", "p3", "p4"]) == (1, 1)
+
+        params = [call[0][1] for call in db.execute.call_args_list[2:]]
+        assert params[0] == {"hash": "abc", "ids": ["p1"], "change": "A"}
+        assert params[2] == {"hash": "abc", "ids": ["p3"], "change": "R"}
+
+    def test_run_records_new_groups_and_reads_the_feed_once(self):
+        """Test that new groups are initialized and existing ones re-match changed properties."""
+        db = MagicMock()
+        db.execute.return_value.fetchall.side_effect = [
+            [("old", 90), ("new", None)],  # group positions
+        ]
+        db.execute.return_value.__iter__ = lambda self: iter([("p1",)])
+        groups = {"old": {"q": "", "filters": {}}, "new": {"q": "", "filters": {}}}
+
+        with patch.object(SavedSearchAlertService, "sync_groups", return_value=groups), \
+             patch.object(SavedSearchAlertService, "record_initial_matches") as initial, \
+             patch.object(SavedSearchAlertService, "evaluate", return_value=(2, 0)) as evaluate, \
+             patch("app.services.saved_search_alerts.feed_position", return_value=100):
+            stats = SavedSearchAlertService.run(db)
+
+        assert stats == {"groups": 2, "new_groups": 1, "added": 2, "removed": 0}
+        initial.assert_called_once_with(db, "new", groups["new"])
+        evaluate.assert_called_once_with(db, "old", groups["old"], ["p1"])
+        assert {"after": 90, "upto": 100} in [call[0][1] for call in db.execute.call_args_list if len(call[0]) > 1]
+
+    @pytest.mark.asyncio
+    async def test_notify_sends_one_digest_per_user(self):
+        """Test that alerts are grouped by email and only delivered ones are marked."""
+        row = lambda id, name, email, last: SimpleNamespace(
+            id=id, name=name, email=email, last_delta_id=last, new_matches=2, addresses=["1 Main St"]
+        )
+        db = MagicMock()
+        db.execute.return_value = result([
+            row("s1", "Homes", "a@example.com", 10),
+            row("s2", "Condos", "a@example.com", 12),
+            row("s3", "Lots", "b@example.com", 11),
+        ])
+
+        async def send(email, searches):
+            return email == "a@example.com"
+
+        with patch("app.services.email.EmailService.send_saved_search_alert",
+                   new=AsyncMock(side_effect=send)) as mock_send:
+            assert await SavedSearchAlertService.notify(db) == 1
+
+        assert mock_send.await_count == 2
+        assert [s["name"] for s in mock_send.await_args_list[0][0][1]] == ["Homes", "Condos"]
+        marked = db.execute.call_args_list[-1][0][1]
+        assert marked == [{"last": 10, "id": "s1"}, {"last": 12, "id": "s2"}]
@@ -0,0 +1,83 @@
+"""
+Tests for radius, polygon and nearest-neighbour property search.
+"""
+import pytest
+from unittest.mock import patch, MagicMock
+
+from app.services.spatial_search import SpatialSearchService
+
+@pytest.mark.unit
+class TestSpatialSearchService:
+
+    def test_parse_polygon_closes_ring(self):
+        """Test that a polygon string becomes a closed ring of (lng, lat) points."""
+        ring = SpatialSearchService.parse_polygon("-122.5 37.7, -122.3 37.7, -122.3 37.8")
+        assert ring == [(-122.5, 37.7), (-122.3, 37.7), (-122.3, 37.8), (-122.5, 37.7)]
+        # An explicitly closed ring is not closed twice
+        assert SpatialSearchService.parse_polygon("0 0, 1 0, 1 1, 0 0") == [(0, 0), (1, 0), (1, 1), (0, 0)]
+
+    @pytest.mark.parametrize("polygon", [
+        "0 0, 1 0",             # too few vertices
+        "0 0, 1 0, 0 0, 1 0",   # too few distinct vertices
+        "0 0, 1, 1 1",          # malformed vertex
+        "0 0, 1 0, 1 north",    # not a number
+        "0 0, 200 0, 1 1",      # longitude out of range
+    ])
+    def test_parse_polygon_rejects_invalid_rings(self, polygon):
+        """Test that malformed or degenerate polygons raise ValueError."""
+        with pytest.raises(ValueError):
+            SpatialSearchService.parse_polygon(polygon)
+
+    def test_parse_polygon_limits_vertices(self):
+        """Test that rings above SPATIAL_SEARCH_MAX_VERTICES are rejected."""
+        polygon = ", ".join(f"{i / 100} {(i % 2) / 100}" for i in range(20))
+        with patch("app.services.spatial_search.settings") as settings:
+            settings.SPATIAL_SEARCH_MAX_VERTICES = 10
+            with pytest.raises(ValueError):
+                SpatialSearchService.parse_polygon(polygon)
+
+    def test_radius_units_and_bounds(self):
+        """Test radius unit conversion and the maximum radius."""
+        assert SpatialSearchService.radius_meters(0.5) == 500
+        assert SpatialSearchService.radius_meters(1, "mi") == pytest.approx(1609.344)
+        with pytest.raises(ValueError):
+            SpatialSearchService.radius_meters(10000, "km")
+        with pytest.raises(ValueError):
+            SpatialSearchService.radius_meters(1, "ft")
+
+    def test_predicates_are_index_friendly(self, compile_sql):
+        """Test that the generated SQL uses the indexable spatial operators."""
+        origin = SpatialSearchService.center_point(-122.4, 37.7)
+        ring = SpatialSearchService.parse_polygon("0 0, 1 0, 1 1")
+
+        assert compile_sql(SpatialSearchService.distance(origin), literal_binds=True).startswith("properties.location <-> ST_GeogFromText(")
+        assert compile_sql(SpatialSearchService.within_radius(origin, 500), literal_binds=True).startswith("ST_DWithin(properties.location, ")
+        assert compile_sql(SpatialSearchService.within_polygon(ring), literal_binds=True) == (
+            "ST_Intersects(properties.location::geometry, "
+            "ST_GeomFromText('POLYGON((0.0 0.0, 1.0 0.0, 1.0 1.0, 0.0 0.0))', 4326))"
+        )
+
+    def test_search_filters_and_orders_by_distance(self, compile_sql):
+        """Test that search applies both filters and pages by (distance, id)."""
+        query = MagicMock()
+        query.filter.return_value = query
+        query.add_columns.return_value = query
+        ring = SpatialSearchService.parse_polygon("0 0, 1 0, 1 1")
+
+        with patch("app.services.spatial_search.paginate_keyset", return_value=([], None)) as paginate:
+            SpatialSearchService.search(query, (0.5, 0.25), radius_meters=1000, polygon=ring, limit=20)
+
+        filters = [compile_sql(call[0][0], literal_binds=True) for call in query.filter.call_args_list]
+        assert filters[0].startswith("ST_DWithin(")
+        assert filters[1].startswith("ST_Intersects(")
+
+        _, scope, order, cursor, limit = paginate.call_args[0]
+        assert compile_sql(order[0][0], literal_binds=True).startswith("properties.location <->")
+        assert [descending for _, descending in order] == [False, False]
+        assert scope.endswith(":0.5:0.25")
+        assert (cursor, limit) == (None, 20)
+
+    def test_center_point_rejects_out_of_range(self):
+        """Test that an invalid search origin raises ValueError."""
+        with pytest.raises(ValueError):
+            SpatialSearchService.center_point(0, 95)
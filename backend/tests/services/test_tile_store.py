@@ -0,0 +1,170 @@
+"""
+Tests for the rendered tile store and its maintenance jobs.
+"""
+import os
+
+import pytest
+from unittest.mock import AsyncMock, patch, MagicMock
+
+from app.core.cache import Cache
+from app.core.geo import lnglat_to_tile
+from app.services.tile_maintenance import TileMaintenanceService, touched_tiles
+from app.services.tile_store import CHANGE_STATE_KEY, TileStore
+
+@pytest.fixture
+def local_cache():
+    local = Cache()
+    local.enabled = False
+    with patch("app.services.tile_store.cache", local), \
+         patch("app.services.tile_maintenance.cache", local):
+        yield local
+
+@pytest.mark.unit
+class TestTileStore:
+
+    @pytest.mark.asyncio
+    async def test_round_trip_in_cache(self, local_cache):
+        """Test that tiles are stored per variant and invalidated together."""
+        store = TileStore()
+        await store.put("properties", 14, 1, 2, "*", b"all")
+        await store.put("properties", 14, 1, 2, "residential", b"homes")
+
+        assert await store.get("properties", 14, 1, 2, "*") == b"all"
+        assert await store.get_many("properties", 14, [(1, 2), (1, 3)], "residential") == {(1, 2): b"homes"}
+
+        assert await store.invalidate("properties", [(14, 1, 2)]) == 1
+        assert await store.get("properties", 14, 1, 2, "*") is None
+        assert await store.get("properties", 14, 1, 2, "residential") is None
+        assert local_cache.local_cache == {}
+
+    @pytest.mark.asyncio
+    async def test_round_trip_on_disk(self, local_cache, tmp_path):
+        """Test that tile bytes go to disk and invalidation removes the files."""
+        store = TileStore(str(tmp_path))
+        await store.put("map", 12, 5, 6, "*", b"[]")
+
+        assert await store.get("map", 12, 5, 6, "*") == b"[]"
+        assert len(list(tmp_path.rglob("*.bin"))) == 1
+        # Only the index lives in the cache
+        assert list(local_cache.local_cache) == [TileStore.index_key("map", 12, 5, 6)]
+
+        await store.invalidate("map", [(12, 5, 6)])
+        assert list(tmp_path.rglob("*.bin")) == []
+        assert await store.get("map", 12, 5, 6, "*") is None
+
+    @pytest.mark.asyncio
+    async def test_sweep_removes_expired_files(self, local_cache, tmp_path):
+        """Test that sweep deletes tile files past MAP_TILE_CACHE_EXPIRY and their empty directories."""
+        store = TileStore(str(tmp_path))
+        await store.put("map", 12, 5, 6, "*", b"old")
+        await store.put("map", 12, 5, 7, "*", b"new")
+        old = store.tile_path("map", 12, 5, 6, "*")
+        os.utime(old, (0, 0))
+
+        assert store.sweep() == 1
+        assert not os.path.exists(store.tile_dir("map", 12, 5, 6))
+        assert await store.get("map", 12, 5, 7, "*") == b"new"
+        assert TileStore().sweep() == 0
+
+    @pytest.mark.asyncio
+    async def test_expired_and_deep_tiles_are_not_served(self, local_cache):
+        """Test MAP_TILE_CACHE_EXPIRY and MAP_TILE_STORE_MAX_ZOOM."""
+        store = TileStore()
+        with patch("app.services.tile_store.time.time", return_value=1000.0):
+            await store.put("properties", 10, 1, 1, "*", b"old")
+        with patch("app.services.tile_store.time.time", return_value=1000.0 + 10 ** 7):
+            assert await store.get("properties", 10, 1, 1, "*") is None
+
+        await store.put("properties", 22, 1, 1, "*", b"deep")
+        assert await store.get("properties", 22, 1, 1, "*") is None
+
+    @pytest.mark.asyncio
+    async def test_tiles_rendered_before_an_invalidation_pass_are_not_stored(self, local_cache):
+        """Test that put skips or drops a tile when an invalidation pass started after its render."""
+        store = TileStore()
+        state = await store.invalidation_state()
+        await local_cache.set(CHANGE_STATE_KEY, {"position": 10, "invalidating": 12})
+        await store.put("properties", 14, 1, 2, "*", b"stale", state)
+        assert await store.get("properties", 14, 1, 2, "*") is None
+
+        # The pass starts while the tile is being stored
+        state = await store.invalidation_state()
+        set_bytes = local_cache.set_bytes
+
+        async def start_pass(*args, **kwargs):
+            await set_bytes(*args, **kwargs)
+            await local_cache.set(CHANGE_STATE_KEY, {"position": 12})
+
+        with patch.object(local_cache, "set_bytes", side_effect=start_pass):
+            await store.put("properties", 14, 1, 2, "*", b"stale", state)
+        assert await store.get("properties", 14, 1, 2, "*") is None
+
+        await store.put("properties", 14, 1, 2, "*", b"fresh", await store.invalidation_state())
+        assert await store.get("properties", 14, 1, 2, "*") == b"fresh"
+
+@pytest.mark.unit
+class TestTileMaintenance:
+
+    def test_touched_tiles_include_buffer_neighbours(self):
+        """Test that a point renders in its own tile plus neighbours within the buffer."""
+        z = 14
+        x, y = lnglat_to_tile(-122.4194, 37.7749, z)
+        tiles = touched_tiles([(-122.4194, 37.7749)], z)
+        assert (z, x, y) in tiles
+        assert {t for t in tiles if t[0] == 0} == {(0, 0, 0)}
+        assert all(abs(tx - x) <= 1 and abs(ty - y) <= 1 for tz, tx, ty in tiles if tz == z)
+
+        # Exactly on a tile corner: all four tiles draw the point
+        corner = {t for t in touched_tiles([(0.0, 0.0)], 1) if t[0] == 1}
+        assert corner == {(1, 0, 0), (1, 0, 1), (1, 1, 0), (1, 1, 1)}
+
+    @pytest.mark.asyncio
+    async def test_invalidate_changes_tracks_feed_position(self, local_cache):
+        """Test that the first pass only records the position and later passes read each window once."""
+        db = MagicMock()
+        db.execute.return_value.fetchall.return_value = [(11, -122.4194, 37.7749), (12, -122.4194, 37.7749)]
+
+        with patch("app.services.tile_maintenance.feed_position", return_value=10), \
+             patch("app.services.tile_maintenance.tile_store") as store:
+            store.invalidate = AsyncMock()
+            assert await TileMaintenanceService.invalidate_changes(db) == 0
+            db.execute.assert_not_called()
+
+        with patch("app.services.tile_maintenance.feed_position", return_value=12), \
+             patch("app.services.tile_maintenance.PropertyGridService.rollup") as rollup, \
+             patch("app.services.tile_maintenance.tile_store") as store:
+            states = []
+
+            async def record_state(*args):
+                states.append(await local_cache.get(CHANGE_STATE_KEY))
+
+            store.invalidate = AsyncMock(side_effect=record_state)
+            assert await TileMaintenanceService.invalidate_changes(db) > 0
+            # Cluster tiles re-rendered after the drop read a rolled-up grid
+            rollup.assert_called_once_with(db)
+            assert [call[0][0] for call in store.invalidate.await_args_list] == ["properties", "map"]
+            # Tiles were dropped while the pass was marked as running
+            assert states == [{"position": 10, "invalidating": 12}] * 2
+            assert await local_cache.get(CHANGE_STATE_KEY) == {"position": 12}
+            assert db.execute.call_args[0][1] == {"after": 10, "upto": 12}
+
+            # The feed has not moved: nothing is read again
+            store.invalidate.reset_mock()
+            db.execute.reset_mock()
+            assert await TileMaintenanceService.invalidate_changes(db) == 0
+            store.invalidate.assert_not_awaited()
+            db.execute.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_prerender_skips_fresh_tiles(self):
+        """Test that pre-rendering only renders tiles missing from the store."""
+        region = {"sf": [-122.52, 37.70, -122.35, 37.83]}
+        with patch("app.services.tile_maintenance.tile_store") as store, \
+             patch("app.services.tile_maintenance.MapTileService.get_property_tile", new=AsyncMock()) as get_tile, \
+             patch("app.services.tile_maintenance.MapViewportService.get_tiles", new=AsyncMock()) as get_tiles:
+            store.fresh_tiles = AsyncMock(side_effect=lambda layer, z, tiles, variant: set(tiles[1:]))
+            rendered = await TileMaintenanceService.prerender(MagicMock(), region, 10, 10)
+
+        assert rendered == 2
+        get_tile.assert_awaited_once()
+        assert len(get_tiles.await_args[0][2]) == 1
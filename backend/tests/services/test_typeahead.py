@@ -0,0 +1,111 @@
+"""
+Tests for the in-memory typeahead index behind /api/search/suggestions.
+"""
+import pytest
+from unittest.mock import patch, MagicMock
+
+from app.services.typeahead import (
+    PRECOMPUTED_PREFIX,
+    TypeaheadIndex,
+    city_entry,
+    index_keys,
+    normalize,
+    owner_entry,
+    property_entry,
+    street_entry,
+    zip_entry,
+)
+
+def sample_index() -> TypeaheadIndex:
+    index = TypeaheadIndex()
+    index.set_entries([
+        property_entry(("p1", "123 Main St", "San Francisco", "CA", "94103", 900000)),
+        property_entry(("p2", "125 Main St", "San Francisco", "CA", "94103", 2000000)),
+        street_entry("Main St", "San Francisco", "CA", 40),
+        street_entry("Market St", "San Francisco", "CA", 300),
+        city_entry("San Francisco", "CA", 5000),
+        city_entry("San Jose", "CA", 3000),
+        zip_entry("94103", "San Francisco", "CA", 800),
+        owner_entry("o1", "John Smith", 3),
+        owner_entry("o2", "Smithfield Holdings LLC", 12),
+    ], position=10)
+    return index
+
+@pytest.mark.unit
+class TestTypeahead:
+
+    def test_keys_are_normalized_and_include_later_words(self):
+        """Test that entries are found by their normalized text and each later word."""
+        assert normalize("  O'Brien,  St. ") == "o brien st"
+        assert index_keys(owner_entry("o1", "John Smith", 1)) == ["john smith", "smith"]
+        assert index_keys(zip_entry("94103", "SF", "CA", 1)) == ["94103"]
+
+    def test_short_and_long_prefixes_rank_by_weight(self):
+        """Test that precomputed and on-demand prefixes return the heaviest matches first."""
+        index = sample_index()
+        assert [e.value for e in index.suggest("sa", 2)] == ["San Francisco", "San Jose"]
+        assert [e.value for e in index.suggest("San F")] == ["San Francisco"]
+
+        long_prefix = "main s"
+        assert len(normalize(long_prefix)) > PRECOMPUTED_PREFIX
+        # The street outranks the addresses on it
+        assert [e.kind for e in index.suggest(long_prefix)] == ["address", "property", "property"]
+        assert [e.ident for e in index.suggest("12")] == ["property:p2", "property:p1"]
+
+    def test_owners_match_on_any_word(self):
+        """Test that owner names match from their first and later words."""
+        index = sample_index()
+        assert [e.ident for e in index.suggest("smith")] == ["owner:o2", "owner:o1"]
+        assert index.suggest("john")[0].display == "John Smith (3 properties)"
+        assert index.suggest("zzz") == []
+        assert index.suggest("  ") == []
+
+    def test_refresh_overlays_changed_entries(self):
+        """Test that refreshed properties and owners shadow loaded entries and deletions hide them."""
+        index = sample_index()
+        db = MagicMock()
+        db.execute.return_value.fetchall.side_effect = [
+            [("o1", "Jane Smith", 4)],
+            [("p3", "9 Mission St", "Oakland", "CA", "94607", 500000)],
+        ]
+
+        # The ownership change of p2 does not re-read it
+        changes = [(11, "p1", "D"), (12, "p3", "I"), (13, "p2", "O")]
+        with patch("app.services.typeahead.feed_position", return_value=14), \
+             patch("app.services.typeahead.changes_between", return_value=changes) as between:
+            assert index.refresh(db) == 3
+        between.assert_called_once_with(db, 10, 14)
+        # Overlay keys are sorted, so a prefix is found by binary search like the loaded keys
+        delta_keys = index._state.delta_keys
+        assert list(delta_keys) == sorted(delta_keys) and "oakland" in delta_keys
+
+        assert [e.ident for e in index.suggest("12")] == ["property:p2"]
+        assert index.suggest("jane")[0].display == "Jane Smith (4 properties)"
+        assert index.suggest("john") == []
+        # The new property brings its street and city with it
+        assert {e.kind for e in index.suggest("oakland")} == {"city"}
+        assert {e.kind for e in index.suggest("9 miss")} == {"property"}
+        # A newly seen street starts at weight 1, below the properties on it
+        assert [e.kind for e in index.suggest("mission")] == ["property", "address"]
+
+        # The next pass starts at the new position
+        db.execute.return_value.fetchall.side_effect = [[]]
+        with patch("app.services.typeahead.feed_position", return_value=14), \
+             patch("app.services.typeahead.changes_between", return_value=[]) as between:
+            assert index.refresh(db) == 0
+        between.assert_called_once_with(db, 14, 14)
+
+    def test_large_overlay_triggers_full_reload(self):
+        """Test that a refresh past TYPEAHEAD_MAX_DELTA reloads the whole index."""
+        index = sample_index()
+        db = MagicMock()
+        db.execute.return_value.fetchall.side_effect = [[], []]
+
+        with patch("app.services.typeahead.feed_position", return_value=13), \
+             patch("app.services.typeahead.changes_between", return_value=[(11, "p1", "U"), (12, "p2", "U")]), \
+             patch("app.services.typeahead.settings") as mock_settings, \
+             patch.object(TypeaheadIndex, "load", return_value=9) as load:
+            mock_settings.TYPEAHEAD_REBUILD_SECONDS = 86400
+            mock_settings.TYPEAHEAD_MAX_DELTA = 1
+            assert index.refresh(db) == 9
+        load.assert_called_once_with(db)
@@ -0,0 +1,124 @@
+"""
+Tests for the cross-entity search behind POST /api/search.
+"""
+import pytest
+from unittest.mock import AsyncMock, patch, MagicMock
+
+from app.services.unified_search import UnifiedSearchService
+
+def parse(query=None, filters=None, sort_by=None, sort_order=None, page=None, page_size=None):
+    return UnifiedSearchService.parse_request(query, filters, sort_by, sort_order, page, page_size)
+
+@pytest.mark.unit
+class TestUnifiedSearchService:
+
+    def test_equivalent_requests_share_a_cache_key(self):
+        """Test that case, spacing and filter order do not change the cache key."""
+        a = parse("  Main   St", {"min_value": 1, "property_type": "residential"})
+        b = parse("main st", {"property_type": "residential", "min_value": 1, "max_value": None})
+        assert a == b
+        assert UnifiedSearchService.cache_key(a) == UnifiedSearchService.cache_key(b)
+        assert a["sort_order"] == "desc"
+
+        # Numbers saved from query string parameters
+        assert parse("main st", {"min_value": "1", "property_type": "residential"}) == a
+        assert parse(filters={"min_bathrooms": " 1.5"})["filters"] == {"min_bathrooms": 1.5}
+
+    @pytest.mark.parametrize("kwargs", [
+        {"filters": {"types": ["parcel"]}},
+        {"filters": {"colour": "red"}},
+        {"filters": {"types": 5}},
+        {"filters": {"types": [["owner"]]}},
+        {"filters": {"min_value": "abc"}},
+        {"filters": {"max_value": "inf"}},
+        {"filters": {"min_bedrooms": True}},
+        {"filters": {"property_type": ["residential"]}},
+        {"sort_by": "distance"},
+        {"sort_order": "sideways"},
+        {"page": 0},
+        {"page": 1000, "page_size": 100},
+    ])
+    def test_invalid_requests_are_rejected(self, kwargs):
+        """Test that unknown or mistyped types and filters, sorts and deep pages raise ValueError."""
+        with pytest.raises(ValueError):
+            parse("main", **kwargs)
+
+    def test_property_statement_uses_text_indexes(self, compile_sql):
+        """Test that property matching and ranking use the full-text and trigram indexes."""
+        request = parse("Main St", {"min_value": 100000})
+        with patch("app.services.property_search.has_column", return_value=True), \
+             patch("app.services.property_search.has_extension", return_value=True), \
+             patch("app.services.property_search.has_index", return_value=True):
+            statement, order = UnifiedSearchService.property_statement(MagicMock(), request)
+
+        sql = compile_sql(statement.order_by(*order))
+        assert "properties.search_vector @@ to_tsquery" in sql
+        assert "properties.address %%" in sql
+        assert "greatest(ts_rank_cd(" in sql
+        assert "properties.current_value >=" in sql
+        assert "DESC NULLS LAST" in sql
+
+    def test_owner_statement_joins_latest_wealth_row(self, compile_sql):
+        """Test that owners are joined to one wealth row each and an empty filter set compiles."""
+        request = parse(None, {"min_net_worth": 1000000})
+        statement, order = UnifiedSearchService.owner_statement(MagicMock(), request)
+
+        sql = compile_sql(statement.order_by(*order))
+        assert "SELECT DISTINCT ON (wealth_data.owner_id)" in sql
+        assert "ORDER BY wealth_data.owner_id, wealth_data.last_updated DESC NULLS LAST" in sql
+        assert "LEFT OUTER JOIN (SELECT DISTINCT ON" in sql
+        assert "latest_wealth.estimated_net_worth >=" in sql
+
+        statement, _ = UnifiedSearchService.address_statement(MagicMock(), parse())
+        assert "WHERE true GROUP BY" in " ".join(compile_sql(statement).split())
+
+    def test_merge_ranks_across_entities(self):
+        """Test that results are interleaved by score and cut to the requested page."""
+        request = parse("smith", page=1, page_size=3)
+        merged = UnifiedSearchService.merge(request, {
+            "property": [{"type": "property", "id": "p1", "address": "1 Smith St", "score": 0.9},
+                         {"type": "property", "id": "p2", "address": "2 Smith St", "score": 0.2}],
+            "owner": [{"type": "owner", "id": "o1", "name": "Smith LLC", "score": 0.95}],
+            "address": [{"type": "address", "id": "Smithtown, NY", "score": 0.5}],
+        })
+        assert [row["id"] for row in merged] == ["o1", "p1", "Smithtown, NY"]
+
+        page_two = UnifiedSearchService.merge(parse("smith", page=2, page_size=3), {
+            "property": [{"type": "property", "id": "p1", "address": "a", "score": 0.9},
+                         {"type": "property", "id": "p2", "address": "b", "score": 0.2}],
+            "owner": [{"type": "owner", "id": "o1", "name": "c", "score": 0.95},
+                      {"type": "owner", "id": "o2", "name": "d", "score": 0.1}],
+        })
+        assert [row["id"] for row in page_two] == ["o2"]
+
+    def test_merge_by_value_puts_missing_values_last(self):
+        """Test that value sorting compares property values and owner net worth."""
+        request = parse("smith", sort_by="value")
+        merged = UnifiedSearchService.merge(request, {
+            "property": [{"id": "p1", "address": "a", "score": 0, "estimated_value": 500.0}],
+            "owner": [{"id": "o1", "name": "b", "score": 0, "estimated_net_worth": 900.0},
+                      {"id": "o2", "name": "c", "score": 0, "estimated_net_worth": None}],
+        })
+        assert [row["id"] for row in merged] == ["o1", "p1", "o2"]
+
+    @pytest.mark.asyncio
+    async def test_search_runs_entities_and_caches(self):
+        """Test that every requested entity is searched and the response is cached."""
+        request = parse("smith", {"types": ["owner", "property"]})
+
+        def fake_run(db, entity, req, limit):
+            return [{"type": entity, "id": entity, "name": entity, "score": 0.5}], 7, entity == "property"
+
+        db = MagicMock()
+        with patch("app.services.unified_search.cache") as mock_cache, \
+             patch("app.services.unified_search.Session"), \
+             patch.object(UnifiedSearchService, "run_entity", side_effect=fake_run):
+            mock_cache.get = AsyncMock(return_value=None)
+            mock_cache.set = AsyncMock()
+            response = await UnifiedSearchService.search(db, request)
+
+        assert response["counts"] == {"property": 7, "owner": 7}
+        assert response["total"] == 14
+        assert response["is_estimate"] is True
+        assert {row["type"] for row in response["results"]} == {"property", "owner"}
+        mock_cache.set.assert_awaited_once()
@@ -0,0 +1,137 @@
+"""
+Tests for the wealthmap-admin command line interface.
+"""
+import pytest
+from unittest.mock import AsyncMock, patch, MagicMock
+
+from app.cli import build_parser, main
+
+@pytest.mark.unit
+class TestAdminCLI:
+
+    def test_parser_requires_command(self):
+        """Test that running without a subcommand is rejected."""
+        with pytest.raises(SystemExit):
+            build_parser().parse_args([])
+
+    def test_migrate_runs_pending_migrations(self):
+        """Test that `migrate` delegates to run_migrations."""
+        with patch("app.db.run_migrations.run_migrations", return_value=["001_initial_schema"]) as mock_run:
+            assert main(["migrate"]) == 0
+            mock_run.assert_called_once()
+
+    def test_cleanup_uses_token_service(self):
+        """Test that `cleanup` purges expired tokens and closes the session."""
+        mock_db = MagicMock()
+        with patch("app.db.session.SessionLocal", return_value=mock_db), \
+             patch("app.services.token.TokenService.cleanup_expired_tokens", return_value=3) as mock_cleanup:
+            assert main(["cleanup"]) == 0
+            mock_cleanup.assert_called_once_with(mock_db)
+            mock_db.close.assert_called_once()
+
+    def test_failed_command_returns_nonzero(self):
+        """Test that a failing command reports an error exit code."""
+        with patch("app.db.run_migrations.run_migrations", side_effect=RuntimeError("boom")):
+            assert main(["migrate"]) == 1
+
+    def test_rebuild_grid_uses_grid_service(self):
+        """Test that `rebuild-grid` recomputes the map grid and closes the session."""
+        mock_db = MagicMock()
+        with patch("app.db.session.SessionLocal", return_value=mock_db), \
+             patch("app.services.map_grid.PropertyGridService.rebuild", return_value=42) as mock_rebuild:
+            assert main(["rebuild-grid"]) == 0
+            mock_rebuild.assert_called_once_with(mock_db)
+            mock_db.close.assert_called_once()
+
+    def test_rollup_grid_uses_grid_service(self):
+        """Test that `rollup-grid` applies the queued grid deltas and closes the session."""
+        mock_db = MagicMock()
+        with patch("app.db.session.SessionLocal", return_value=mock_db), \
+             patch("app.services.map_grid.PropertyGridService.rollup", return_value=7) as mock_rollup:
+            assert main(["rollup-grid"]) == 0
+            mock_rollup.assert_called_once_with(mock_db)
+            mock_db.close.assert_called_once()
+
+    def test_refresh_heatmaps_defaults_to_incremental(self):
+        """Test that `refresh-heatmaps` refreshes every layer incrementally and drops their changed tiles."""
+        mock_db = MagicMock()
+        with patch("app.db.session.SessionLocal", return_value=mock_db), \
+             patch("app.services.heatmap.HeatmapService.refresh", return_value={(1, 2)}) as mock_refresh, \
+             patch("app.services.heatmap.HeatmapService.invalidate_tiles", new=AsyncMock()) as mock_invalidate, \
+             patch("app.services.heatmap.HeatmapService.rebuild") as mock_rebuild:
+            assert main(["refresh-heatmaps"]) == 0
+            assert mock_refresh.call_count == 2
+            mock_invalidate.assert_awaited_with("wealth-heatmap", {(1, 2)})
+            mock_rebuild.assert_not_called()
+            assert main(["refresh-heatmaps", "--layer", "wealth-heatmap", "--full"]) == 0
+            mock_rebuild.assert_called_once_with(mock_db, "wealth-heatmap")
+
+    def test_prerender_tiles_selects_region_and_zooms(self):
+        """Test that `prerender-tiles` invalidates changes first and honours its options."""
+        mock_db = MagicMock()
+        with patch("app.db.session.SessionLocal", return_value=mock_db), \
+             patch("app.services.tile_maintenance.TileMaintenanceService.invalidate_changes", return_value=0) as mock_invalidate, \
+             patch("app.services.tile_maintenance.TileMaintenanceService.prerender", return_value=5) as mock_prerender:
+            assert main(["prerender-tiles", "--region", "miami", "--max-zoom", "12"]) == 0
+            mock_invalidate.assert_called_once_with(mock_db)
+            db, regions, min_zoom, max_zoom = mock_prerender.call_args[0]
+            assert list(regions) == ["miami"]
+            assert max_zoom == 12
+            assert main(["prerender-tiles", "--region", "atlantis"]) == 1
+
+    def test_sweep_tiles_uses_tile_store(self):
+        """Test that `sweep-tiles` sweeps the on-disk store and is a no-op without one."""
+        with patch("app.services.tile_store.tile_store") as mock_store:
+            mock_store.on_disk = True
+            mock_store.sweep.return_value = 3
+            assert main(["sweep-tiles"]) == 0
+            mock_store.sweep.assert_called_once_with()
+
+            mock_store.on_disk = False
+            assert main(["sweep-tiles"]) == 0
+            mock_store.sweep.assert_called_once_with()
+
+    def test_run_saved_searches_notifies_unless_disabled(self):
+        """Test that `run-saved-searches` records matches and only emails without --no-notify."""
+        mock_db = MagicMock()
+        with patch("app.db.session.SessionLocal", return_value=mock_db), \
+             patch("app.services.saved_search_alerts.SavedSearchAlertService.run") as mock_run, \
+             patch("app.services.saved_search_alerts.SavedSearchAlertService.notify", return_value=1) as mock_notify:
+            assert main(["run-saved-searches", "--no-notify"]) == 0
+            mock_run.assert_called_once_with(mock_db)
+            mock_notify.assert_not_called()
+
+            assert main(["run-saved-searches"]) == 0
+            mock_notify.assert_called_once_with(mock_db)
+
+    def test_prune_changes_uses_retention(self):
+        """Test that `prune-changes` defaults to CHANGE_FEED_RETENTION_DAYS and honours --days."""
+        mock_db = MagicMock()
+        with patch("app.db.session.SessionLocal", return_value=mock_db), \
+             patch("app.core.config.settings.CHANGE_FEED_RETENTION_DAYS", 7), \
+             patch("app.db.change_feed.prune_changes", return_value=12) as mock_prune:
+            assert main(["prune-changes"]) == 0
+            mock_prune.assert_called_once_with(mock_db, 7)
+            assert main(["prune-changes", "--days", "2"]) == 0
+            mock_prune.assert_called_with(mock_db, 2)
+            assert mock_db.close.call_count == 2
+
+    def test_geocode_adds_coordinates_to_csv(self, tmp_path):
+        """Test that `geocode` writes each row back with its coordinates."""
+        from app.services.geocoder import GeocodeResult
+
+        source = tmp_path / "in.csv"
+        source.write_text("id,address\n1,100 Main St Austin TX\n2,Nowhere\n")
+        target = tmp_path / "out.csv"
+        with patch("app.db.session.SessionLocal", return_value=MagicMock()), \
+             patch("app.services.geocoder.gazetteer_index.load") as mock_load, \
+             patch("app.services.geocoder.geocode_many",
+                   return_value=[GeocodeResult(-97.74, 30.27, "address", "100 Main St, Austin, TX"), None]):
+            assert main(["geocode", str(source), str(target)]) == 0
+            mock_load.assert_called_once()
+
+        assert target.read_text().splitlines() == [
+            "id,address,longitude,latitude,geocode_precision",
+            "1,100 Main St Austin TX,-97.74,30.27,address",
+            "2,Nowhere,,,",
+        ]
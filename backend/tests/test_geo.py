@@ -0,0 +1,78 @@
+"""
+Tests for Web Mercator tile math.
+"""
+import pytest
+
+from app.core.geo import (
+    is_valid_tile,
+    lnglat_to_tile,
+    tile_blocks,
+    tile_bounds,
+    tile_size_meters,
+    tiles_for_bbox,
+    zoom_for_bbox,
+)
+
+@pytest.mark.unit
+class TestTileMath:
+
+    def test_world_tile(self):
+        """Test that zoom 0 is a single tile covering the Mercator world."""
+        lng_min, lat_min, lng_max, lat_max = tile_bounds(0, 0, 0)
+        assert (lng_min, lng_max) == (-180.0, 180.0)
+        assert lat_max == pytest.approx(85.0511, abs=1e-4)
+        assert lat_min == pytest.approx(-85.0511, abs=1e-4)
+
+    def test_point_falls_inside_its_tile(self):
+        """Test that a point's tile bounds contain the point."""
+        lng, lat = -122.4194, 37.7749  # San Francisco
+        for z in (0, 5, 10, 15):
+            x, y = lnglat_to_tile(lng, lat, z)
+            lng_min, lat_min, lng_max, lat_max = tile_bounds(z, x, y)
+            assert lng_min <= lng < lng_max
+            assert lat_min <= lat < lat_max
+
+    def test_known_tile(self):
+        """Test a well-known tile index."""
+        assert lnglat_to_tile(-122.4194, 37.7749, 12) == (655, 1583)
+
+    def test_out_of_range_points_are_clamped(self):
+        """Test that polar and antimeridian points map to edge tiles."""
+        assert lnglat_to_tile(180.0, 90.0, 3) == (7, 0)
+        assert lnglat_to_tile(-180.0, -90.0, 3) == (0, 7)
+
+    def test_is_valid_tile(self):
+        """Test tile address validation."""
+        assert is_valid_tile(3, 7, 7)
+        assert not is_valid_tile(3, 8, 0)
+        assert not is_valid_tile(-1, 0, 0)
+        assert not is_valid_tile(30, 0, 0)
+
+    def test_tile_size_halves_per_zoom(self):
+        """Test that tile width halves with each zoom level."""
+        assert tile_size_meters(1) == pytest.approx(tile_size_meters(0) / 2)
+
+    def test_zoom_for_bbox(self):
+        """Test that the chosen zoom spans about the requested number of tiles."""
+        assert zoom_for_bbox(-85.0, 85.0, -180.0, 180.0, 4) == 2
+        assert zoom_for_bbox(37.0, 37.0, -122.0, -122.0, 4, max_zoom=16) == 16
+
+    def test_tiles_for_bbox(self):
+        """Test that the covering tiles contain every corner of the box."""
+        tiles = tiles_for_bbox(10, 37.7, 37.9, -122.6, -122.3)
+        for lng, lat in ((-122.6, 37.7), (-122.6, 37.9), (-122.3, 37.7), (-122.3, 37.9)):
+            assert lnglat_to_tile(lng, lat, 10) in tiles
+        assert tiles_for_bbox(10, 38.0, 37.0, -122.0, -121.0) == []
+
+    def test_tile_blocks_split_a_diagonal_pan(self):
+        """Test that the L of tiles uncovered by a diagonal pan becomes two blocks."""
+        held = set(tiles_for_bbox(14, 37.7, 37.8, -122.6, -122.5))
+        viewport = tiles_for_bbox(14, 37.75, 37.85, -122.55, -122.45)
+        missing = [tile for tile in viewport if tile not in held]
+
+        blocks = tile_blocks(missing)
+
+        assert len(blocks) == 2
+        covered = [(x, y) for x0, x1, y0, y1 in blocks for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+        assert sorted(covered) == sorted(missing)
+        assert tile_blocks([(0, 0), (2, 0), (0, 1)]) == [(0, 0, 0, 1), (2, 2, 0, 0)]
@@ -0,0 +1,76 @@
+"""
+Tests for compact map payload encodings.
+"""
+import json
+
+import pytest
+
+from app.core.map_encoding import (
+    ARROW_CONTENT_TYPE,
+    COLUMNAR_CONTENT_TYPE,
+    decode_columnar,
+    encode_arrow,
+    encode_columnar,
+    negotiate_map_format,
+    value_bucket,
+)
+
+FEATURES = [
+    {"id": "a", "address": "1 Market St", "property_type": "residential",
+     "estimated_value": 300000.0, "latitude": 37.79401, "longitude": -122.39501},
+    {"id": "b", "address": "2 Market St", "property_type": "commercial",
+     "estimated_value": None, "latitude": 37.79412, "longitude": -122.39498},
+    {"id": "c", "address": "3 Market St", "property_type": "residential",
+     "estimated_value": 20000000.0, "latitude": 37.79399, "longitude": -122.39530},
+]
+
+@pytest.mark.unit
+class TestMapEncoding:
+
+    def test_negotiation(self):
+        """Test that the format parameter wins over the Accept header."""
+        assert negotiate_map_format(None, None) == "json"
+        assert negotiate_map_format(None, f"{COLUMNAR_CONTENT_TYPE}, application/json") == "columnar"
+        assert negotiate_map_format(None, ARROW_CONTENT_TYPE) == "arrow"
+        assert negotiate_map_format("json", ARROW_CONTENT_TYPE) == "json"
+
+    def test_value_bucket_matches_width_bucket(self):
+        """Test bucket boundaries against SQL width_bucket semantics."""
+        assert value_bucket(None) is None
+        assert value_bucket(100000) == 0
+        assert value_bucket(250000) == 1
+        assert value_bucket(20000000) == 6
+
+    def test_columnar_round_trip(self):
+        """Test that columnar JSON decodes back to the quantized features."""
+        payload = encode_columnar(FEATURES)
+
+        assert payload["property_types"] == ["residential", "commercial"]
+        assert payload["property_type"] == [0, 1, 0]
+        assert payload["value_bucket"] == [1, None, 6]
+        # Coordinates after the first are small deltas
+        assert all(abs(d) < 100 for d in payload["x"][1:])
+
+        decoded = decode_columnar(json.loads(json.dumps(payload)))
+        for original, feature in zip(FEATURES, decoded):
+            assert feature["id"] == original["id"]
+            assert feature["property_type"] == original["property_type"]
+            assert feature["latitude"] == pytest.approx(original["latitude"], abs=1e-5)
+            assert feature["longitude"] == pytest.approx(original["longitude"], abs=1e-5)
+
+    def test_columnar_is_smaller_than_json(self):
+        """Test that the columnar payload beats the object encoding."""
+        features = [dict(f, id=f"{f['id']}{i}") for i in range(100) for f in FEATURES]
+        assert len(json.dumps(encode_columnar(features))) < 0.7 * len(json.dumps(features))
+
+    def test_arrow_stream(self):
+        """Test that the Arrow stream carries dictionary-encoded columns."""
+        pyarrow = pytest.importorskip("pyarrow")
+        import pyarrow.ipc
+
+        table = pyarrow.ipc.open_stream(encode_arrow(FEATURES)).read_all()
+
+        assert table.num_rows == 3
+        assert table.column("property_type").to_pylist() == ["residential", "commercial", "residential"]
+        assert table.column("value_bucket").to_pylist() == [1, None, 6]
+        assert table.schema.metadata[b"scale"] == b"100000"
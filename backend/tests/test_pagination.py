@@ -0,0 +1,142 @@
+"""
+Tests for keyset pagination helpers.
+"""
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+from unittest.mock import patch, MagicMock
+from fastapi import HTTPException
+from sqlalchemy import literal_column, select
+from sqlalchemy.dialects import postgresql
+
+from app.core import pagination
+from app.core.pagination import decode_cursor, encode_cursor, get_total, keyset_filter, round_estimate, sample_count
+from app.models.owner import Owner
+from app.models.property import Property
+
+def compile_clause(clause):
+    return str(clause.compile(dialect=postgresql.dialect()))
+
+@pytest.mark.unit
+class TestCursorEncoding:
+
+    def test_round_trip_preserves_types(self):
+        """Test that datetimes, UUIDs and decimals survive encoding."""
+        values = [
+            datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc),
+            uuid.UUID("22222222-2222-2222-2222-222222222222"),
+            Decimal("450000.50"),
+            "Smith",
+        ]
+        cursor = encode_cursor("properties", values)
+
+        assert "=" not in cursor
+        assert decode_cursor("properties", cursor) == values
+
+    def test_cursor_from_other_listing_is_rejected(self):
+        """Test that a cursor can't be replayed against a different listing."""
+        cursor = encode_cursor("owners", ["Smith", 1])
+
+        with pytest.raises(HTTPException) as exc_info:
+            decode_cursor("properties", cursor)
+        assert exc_info.value.status_code == 400
+
+    def test_garbage_cursor_is_rejected(self):
+        """Test that malformed cursors produce a 400 rather than a 500."""
+        with pytest.raises(HTTPException) as exc_info:
+            decode_cursor("properties", "not-a-cursor")
+        assert exc_info.value.status_code == 400
+
+@pytest.mark.unit
+class TestKeysetFilter:
+
+    def test_uniform_direction_uses_row_comparison(self):
+        """Test that a single sort direction compiles to a row comparison."""
+        order = [(Property.updated_at, True), (Property.id, True)]
+        sql = compile_clause(keyset_filter(order, [datetime(2024, 1, 1), uuid.uuid4()]))
+
+        assert sql.startswith("(properties.updated_at, properties.id) <")
+
+    def test_mixed_direction_expands_to_or(self):
+        """Test that mixed sort directions expand into OR terms."""
+        order = [(Owner.name, False), (Owner.id, True)]
+        sql = compile_clause(keyset_filter(order, ["Smith", uuid.uuid4()]))
+
+        assert "owners.name >" in sql
+        assert "owners.name =" in sql
+        assert "owners.id <" in sql
+        assert " OR " in sql
+
+def postgres_session():
+    db = MagicMock()
+    db.get_bind.return_value.dialect.name = "postgresql"
+    return db
+
+@pytest.mark.unit
+class TestTotals:
+
+    @pytest.mark.parametrize("value, expected", [(42, 42), (1234, 1200), (1249999, 1200000), (1250001, 1300000)])
+    def test_round_estimate(self, value, expected):
+        """Test that estimates keep two significant figures."""
+        assert round_estimate(value) == expected
+
+    def test_sample_count_scales_a_tablesample(self):
+        """Test that a single-table select is counted over a TABLESAMPLE aliased as the table."""
+        properties = Property.__table__
+        statement = select(properties).where(
+            properties.c.current_value >= 500000,
+            literal_column("properties.search_vector").op("@@")("main")
+        )
+        db = postgres_session()
+        db.execute.return_value.scalar.return_value = 123
+
+        assert sample_count(db, statement, 0.5) == 24600
+        sql = compile_clause(db.execute.call_args[0][0])
+        assert "FROM properties AS properties TABLESAMPLE system(%(system_1)s)" in sql
+        assert "WHERE properties.current_value >= " in sql
+
+        joined = select(properties).join(Owner.__table__, literal_column("true"))
+        assert sample_count(db, joined, 0.5) is None
+
+    def test_small_results_are_counted_exactly(self):
+        """Test that a small planner estimate leads to a bounded exact count."""
+        with patch.object(pagination, "estimate_count", return_value=40), \
+             patch.object(pagination, "bounded_count", return_value=37) as bounded, \
+             patch.object(pagination, "sample_count") as sampled:
+            assert get_total(postgres_session(), MagicMock()) == (37, False)
+        assert bounded.call_args[0][2] == pagination.settings.COUNT_EXACT_THRESHOLD
+        sampled.assert_not_called()
+
+    def test_large_results_are_sampled_or_planned(self):
+        """Test that large results are estimated from a sample, else from the plan."""
+        threshold = pagination.settings.COUNT_EXACT_THRESHOLD
+        with patch.object(pagination, "estimate_count", return_value=5000000), \
+             patch.object(pagination, "bounded_count") as bounded, \
+             patch.object(pagination, "sample_count", return_value=1234567):
+            assert get_total(postgres_session(), MagicMock()) == (1200000, True)
+        bounded.assert_not_called()
+
+        # The planner underestimated and the query can't be sampled
+        with patch.object(pagination, "estimate_count", return_value=10), \
+             patch.object(pagination, "bounded_count", return_value=threshold + 1), \
+             patch.object(pagination, "sample_count", return_value=None):
+            total, is_estimate = get_total(postgres_session(), MagicMock())
+        assert is_estimate and total >= threshold
+
+    @pytest.mark.parametrize("sampled", [0, 200])
+    def test_small_samples_are_counted_exactly(self, sampled):
+        """Test that a sample at or below the threshold overrides a large planner estimate."""
+        threshold = pagination.settings.COUNT_EXACT_THRESHOLD
+        with patch.object(pagination, "estimate_count", return_value=5000000), \
+             patch.object(pagination, "bounded_count", return_value=37) as bounded, \
+             patch.object(pagination, "sample_count", return_value=sampled):
+            assert get_total(postgres_session(), MagicMock()) == (37, False)
+        assert bounded.call_args[0][2] == threshold
+
+        # The sample missed rows: fall back to the planner's estimate
+        with patch.object(pagination, "estimate_count", return_value=5000000), \
+             patch.object(pagination, "bounded_count", return_value=threshold + 1), \
+             patch.object(pagination, "sample_count", return_value=sampled):
+            assert get_total(postgres_session(), MagicMock()) == (5000000, True)
@@ -0,0 +1,149 @@
+"""
+Query plan checks for the spatial map queries.
+
+``properties.location`` is GEOGRAPHY, but bounding boxes and tiles are planar
+lat/lng rectangles, so the map queries filter on ``location::geometry && <envelope>``
+and rely on the expression index from migration 003. Any other form (a bare
+geography column, ``ST_Contains`` against an implicitly cast column) silently
+falls back to a sequential scan.
+
+The static checks always run; the EXPLAIN checks need a migrated PostGIS
+database at ``DATABASE_URL`` and are skipped otherwise.
+"""
+import json
+import re
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.core.config import settings
+from app.core.geo import lnglat_to_tile, tiles_for_bbox
+from app.services.map_grid import GRID_CELLS_SQL, RAW_CELLS_SQL
+from app.services.map_tiles import CLUSTER_TILE_SQL, POINT_TILE_SQL
+from app.services.map_viewport import POINT_FEATURES_SQL
+
+GEOMETRY_INDEX = "properties_location_geom_idx"
+
+BBOX_QUERIES = {
+    "viewport points": POINT_FEATURES_SQL,
+    "raw grid cells": RAW_CELLS_SQL,
+    "point tile": POINT_TILE_SQL,
+    "cluster tile": CLUSTER_TILE_SQL,
+}
+
+# San Francisco
+BBOX = {"lng_min": -122.52, "lat_min": 37.70, "lng_max": -122.35, "lat_max": 37.83}
+FILTERS = {"property_type": None, "min_value": None, "max_value": None}
+
+def plan_nodes(node):
+    yield node
+    for child in node.get("Plans", []):
+        yield from plan_nodes(child)
+
+def plan_indexes(plan) -> set:
+    """Names of all indexes scanned anywhere in an EXPLAIN (FORMAT JSON) plan."""
+    return {node["Index Name"] for node in plan_nodes(plan) if "Index Name" in node}
+
+@pytest.mark.unit
+class TestSpatialPredicates:
+
+    @pytest.mark.parametrize("name", sorted(BBOX_QUERIES))
+    def test_bbox_filters_use_geometry_overlap(self, name):
+        """Test that map queries filter with the indexable geometry && operator."""
+        sql = BBOX_QUERIES[name]
+        assert "p.location::geometry &&" in sql
+        assert "ST_Contains" not in sql
+        # Every reference to the column goes through the indexed expression
+        assert not re.search(r"p\.location(?!::geometry)", sql)
+
+    def test_plan_indexes_walks_nested_plans(self):
+        """Test that index names are collected from every level of a plan."""
+        plan = {
+            "Node Type": "Hash Join",
+            "Plans": [
+                {"Node Type": "Bitmap Heap Scan", "Plans": [
+                    {"Node Type": "Bitmap Index Scan", "Index Name": GEOMETRY_INDEX},
+                ]},
+                {"Node Type": "Index Scan", "Index Name": "properties_pkey"},
+            ],
+        }
+        assert plan_indexes(plan) == {GEOMETRY_INDEX, "properties_pkey"}
+
+@pytest.fixture(scope="module")
+def pg():
+    try:
+        engine = create_engine(settings.DATABASE_URL, connect_args={"connect_timeout": 3})
+        connection = engine.connect()
+    except Exception as e:
+        pytest.skip(f"PostgreSQL not available: {e}")
+
+    try:
+        has_index = connection.execute(
+            text("SELECT 1 FROM pg_indexes WHERE tablename = 'properties' AND indexname = :name"),
+            {"name": GEOMETRY_INDEX}
+        ).first()
+        if not has_index:
+            pytest.skip("Database is not migrated (run wealthmap-admin migrate)")
+        yield connection
+    finally:
+        connection.close()
+        engine.dispose()
+
+def explain(connection, sql, params) -> dict:
+    """
+    Plan ``sql`` with sequential scans discouraged, so the result shows
+    whether an index *can* answer the query regardless of table size.
+    """
+    transaction = connection.begin()
+    try:
+        connection.execute(text("SET LOCAL enable_seqscan = off"))
+        plan = connection.execute(text("EXPLAIN (FORMAT JSON) " + sql), params).scalar()
+    except SQLAlchemyError as e:
+        pytest.skip(f"Could not plan query: {e}")
+    finally:
+        transaction.rollback()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]["Plan"]
+
+@pytest.mark.integration
+class TestSpatialQueryPlans:
+
+    def test_viewport_points_use_geometry_index(self, pg):
+        """Test that the /properties/map point query scans the geometry index."""
+        tiles = tiles_for_bbox(14, BBOX["lat_min"], BBOX["lat_max"], BBOX["lng_min"], BBOX["lng_max"])
+        xs, ys = zip(*tiles)
+        params = {**FILTERS, "z": 14, "xs": list(xs), "ys": list(ys), "tile_limit": 100}
+        plan = explain(pg, POINT_FEATURES_SQL, params)
+        assert GEOMETRY_INDEX in plan_indexes(plan)
+
+    def test_raw_cluster_cells_use_geometry_index(self, pg):
+        """Test that value-filtered clustering scans the geometry index."""
+        params = {**BBOX, **FILTERS, "level": 12, "min_value": 100000}
+        plan = explain(pg, RAW_CELLS_SQL, params)
+        assert GEOMETRY_INDEX in plan_indexes(plan)
+
+    def test_vector_tiles_use_geometry_index(self, pg):
+        """Test that both vector tile queries scan the geometry index."""
+        z = 14
+        x, y = lnglat_to_tile(-122.42, 37.77, z)
+        params = {"z": z, "x": x, "y": y, "property_type": None, "cell_size": 100.0}
+        assert GEOMETRY_INDEX in plan_indexes(explain(pg, POINT_TILE_SQL, params))
+        assert GEOMETRY_INDEX in plan_indexes(explain(pg, CLUSTER_TILE_SQL, params))
+
+    def test_grid_cells_use_primary_key(self, pg):
+        """Test that precomputed cluster cells are read by primary key range."""
+        z = 12
+        x, y = lnglat_to_tile(-122.42, 37.77, z)
+        params = {"level": z, "x_min": x - 4, "x_max": x + 4, "y_min": y - 4, "y_max": y + 4, "property_type": None}
+        plan = explain(pg, GRID_CELLS_SQL, params)
+        assert "property_grid_cells_pkey" in plan_indexes(plan)
+
+    def test_geography_predicate_does_not_use_geometry_index(self, pg):
+        """Test the control case: a geography-side filter cannot use the geometry index."""
+        sql = """
+            SELECT id FROM properties p
+            WHERE ST_Intersects(p.location, ST_MakeEnvelope(:lng_min, :lat_min, :lng_max, :lat_max, 4326)::geography)
+        """
+        assert GEOMETRY_INDEX not in plan_indexes(explain(pg, sql, BBOX))
@@ -0,0 +1,51 @@
+"""
+Tests for streaming export serialization.
+"""
+import csv
+import io
+import json
+
+import pytest
+
+from app.core.streaming import iter_csv, iter_ndjson
+
+RECORDS = [
+    {"id": 1, "address": "1 Main St", "additional_data": {"pool": True}},
+    {"id": 2, "address": "2 Main St, Apt 4", "additional_data": None},
+    {"id": 3, "address": "3 Main St", "additional_data": None},
+]
+
+@pytest.mark.unit
+class TestStreamingExport:
+
+    def test_ndjson_batches(self):
+        """Test that NDJSON output is emitted in batches of whole lines."""
+        chunks = list(iter_ndjson(iter(RECORDS), batch_size=2))
+
+        assert len(chunks) == 2
+        assert all(chunk.endswith("\n") for chunk in chunks)
+        lines = "".join(chunks).splitlines()
+        assert [json.loads(line)["id"] for line in lines] == [1, 2, 3]
+
+    def test_csv_has_single_header_and_escapes_values(self):
+        """Test that CSV output has one header row and quotes embedded commas."""
+        chunks = list(iter_csv(iter(RECORDS), ["id", "address", "additional_data"], batch_size=2))
+
+        assert len(chunks) == 2
+        rows = list(csv.DictReader(io.StringIO("".join(chunks))))
+        assert [row["id"] for row in rows] == ["1", "2", "3"]
+        assert rows[1]["address"] == "2 Main St, Apt 4"
+        assert json.loads(rows[0]["additional_data"]) == {"pool": True}
+
+    def test_generators_are_lazy(self):
+        """Test that records are consumed only as chunks are requested."""
+        consumed = []
+
+        def records():
+            for record in RECORDS:
+                consumed.append(record["id"])
+                yield record
+
+        chunks = iter_ndjson(records(), batch_size=1)
+        next(chunks)
+        assert consumed == [1]